@@ -0,0 +1,259 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+# 发送优先级，数值越小越先发送
+PRIORITY_HIGH = 0  # 管理员命令(XYBot.process_text_message)、@回复(send_text_message)
+PRIORITY_NORMAL = 10  # 普通回复
+PRIORITY_LOW = 20  # 群发、广播(定时任务 @schedule)
+
+_send_priority: ContextVar[Optional[int]] = ContextVar("send_priority", default=None)
+
+
+@contextmanager
+def send_priority(priority: int):
+    """在当前上下文中指定发送优先级。
+
+    Examples:
+        >>> with send_priority(PRIORITY_LOW):
+        ...     await bot.send_text_message(wxid, "公告")
+    """
+    token = _send_priority.set(priority)
+    try:
+        yield
+    finally:
+        _send_priority.reset(token)
+
+
+def current_send_priority() -> Optional[int]:
+    """获取当前上下文指定的发送优先级，未指定时返回None"""
+    return _send_priority.get()
+
+
+class TokenBucket:
+    """令牌桶限速器，等待者按优先级获取令牌
+
+    Args:
+        rate (float): 每秒生成的令牌数，小于等于0表示不限速
+        burst (int): 桶容量，允许的突发数量
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    @property
+    def idle(self) -> bool:
+        """没有等待者且令牌已满"""
+        if self._waiters:
+            return False
+        self._refill()
+        return self._tokens >= self.capacity
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL):
+        """获取一个令牌，令牌不足时等待"""
+        if self.rate <= 0:
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            self._refill()
+            if self._tokens < 1 and self.rate > 0:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+
+@dataclass(order=True)
+class _SendJob:
+    priority: int
+    seq: int
+    func: Callable = field(compare=False)
+    args: tuple = field(compare=False)
+    kwargs: dict = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class SendScheduler:
+    """按接收人分队列的消息发送调度器
+
+    每个会话一个优先级队列和一个令牌桶，不同会话并发发送；
+    所有会话共享一个账号级令牌桶，限制整体发送速率。
+
+    Args:
+        per_chat_rate (float): 单个会话每秒最多发送的消息数
+        per_chat_burst (int): 单个会话允许的突发消息数
+        global_rate (float): 整个账号每秒最多发送的消息数
+        global_burst (int): 整个账号允许的突发消息数
+    """
+
+    def __init__(self, per_chat_rate: float = 1.0, per_chat_burst: int = 1,
+                 global_rate: float = 1.0, global_burst: int = 1):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: dict[str, list[_SendJob]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._chat_buckets: dict[str, TokenBucket] = {}
+        self._seq = itertools.count()
+
+        self._sent = 0
+        self._failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+
+    def configure(self, per_chat_rate: float = None, per_chat_burst: int = None,
+                  global_rate: float = None, global_burst: int = None):
+        """修改发送速率，未传入的参数保持不变"""
+        if per_chat_rate is not None:
+            self.per_chat_rate = per_chat_rate
+        if per_chat_burst is not None:
+            self.per_chat_burst = per_chat_burst
+        if global_rate is not None:
+            self.global_rate = global_rate
+        if global_burst is not None:
+            self.global_burst = global_burst
+
+        self._global_bucket.rate = self.global_rate
+        self._global_bucket.capacity = max(1, self.global_burst)
+        for bucket in self._chat_buckets.values():
+            bucket.rate = self.per_chat_rate
+            bucket.capacity = max(1, self.per_chat_burst)
+
+    async def submit(self, wxid: str, func: Callable, *args, priority: Optional[int] = None, **kwargs) -> Any:
+        """提交一个发送任务并等待其完成
+
+        Args:
+            wxid (str): 接收人wxid，同一接收人的任务按优先级和提交顺序依次发送
+            func (Callable): 实际执行发送的协程函数
+            priority (int, optional): 发送优先级，默认取上下文中的优先级或PRIORITY_NORMAL
+
+        Returns:
+            Any: func的返回值
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not None and self._loop is not loop and self._loop.is_running():
+            # 从其它事件循环(如管理后台线程)提交，转交给调度器所在的事件循环
+            future = asyncio.run_coroutine_threadsafe(
+                self.submit(wxid, func, *args, priority=priority, **kwargs), self._loop)
+            return await asyncio.wrap_future(future)
+        if self._loop is not loop:
+            self._rebind(loop)
+
+        if priority is None:
+            priority = current_send_priority()
+        if priority is None:
+            priority = PRIORITY_NORMAL
+
+        job = _SendJob(priority, next(self._seq), func, args, kwargs, loop.create_future(), time.monotonic())
+        heapq.heappush(self._queues.setdefault(wxid, []), job)
+
+        worker = self._workers.get(wxid)
+        if worker is None or worker.done():
+            self._workers[wxid] = asyncio.create_task(self._drain(wxid))
+
+        return await job.future
+
+    def _rebind(self, loop: asyncio.AbstractEventLoop):
+        """原事件循环已结束，丢弃与其绑定的状态"""
+        self._loop = loop
+        self._queues.clear()
+        self._workers.clear()
+        self._chat_buckets.clear()
+        self._global_bucket = TokenBucket(self.global_rate, self.global_burst)
+
+    def _chat_bucket(self, wxid: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(wxid)
+        if bucket is None:
+            # 清理长时间空闲的会话令牌桶，避免无限增长
+            if len(self._chat_buckets) > 1000:
+                self._chat_buckets = {k: v for k, v in self._chat_buckets.items()
+                                      if k in self._workers or not v.idle}
+            bucket = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._chat_buckets[wxid] = bucket
+        return bucket
+
+    async def _drain(self, wxid: str):
+        queue = self._queues[wxid]
+        bucket = self._chat_bucket(wxid)
+        job = None
+        try:
+            while queue:
+                job = heapq.heappop(queue)
+                if job.future.done():
+                    continue
+
+                await bucket.acquire(job.priority)
+                await self._global_bucket.acquire(job.priority)
+
+                wait = time.monotonic() - job.enqueued_at
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+
+                try:
+                    result = await job.func(*job.args, **job.kwargs)
+                    self._sent += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+                except Exception as e:
+                    self._failed += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+        except asyncio.CancelledError:
+            for pending in [job, *queue]:
+                if pending is not None and not pending.future.done():
+                    pending.future.cancel()
+            queue.clear()
+            raise
+        finally:
+            if not queue:
+                self._queues.pop(wxid, None)
+            if self._workers.get(wxid) is asyncio.current_task():
+                self._workers.pop(wxid, None)
+
+    def get_metrics(self) -> dict:
+        """获取发送队列指标
+
+        Returns:
+            dict: 包含排队总数、各会话队列深度、已发送/失败数量及排队等待时间(秒)
+        """
+        depth = {wxid: len(queue) for wxid, queue in self._queues.items() if queue}
+        processed = self._sent + self._failed
+        return {
+            "queued": sum(depth.values()),
+            "queue_depth": depth,
+            "active_chats": len(self._workers),
+            "sent": self._sent,
+            "failed": self._failed,
+            "avg_wait": self._wait_total / processed if processed else 0.0,
+            "max_wait": self._wait_max,
+        }
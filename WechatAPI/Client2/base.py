@@ -1,4 +1,9 @@
+import asyncio
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
 
 from WechatAPI.errors import *
 
@@ -45,10 +50,23 @@ class WechatAPIClientBase:
         phone (str): 手机号
         ignore_protect (bool): 是否忽略保护机制
     """
+    # 共享连接池配置
+    HTTP_CONNECTION_LIMIT = 100  # 连接池总连接数上限
+    HTTP_CONNECTION_LIMIT_PER_HOST = 50  # 单个协议服务器的连接数上限
+    HTTP_KEEPALIVE_TIMEOUT = 60  # 空闲连接保活时间(秒)
+    HTTP_DNS_CACHE_TTL = 300  # DNS缓存时间(秒)
+    HTTP_TIMEOUT = aiohttp.ClientTimeout(total=300, connect=10)  # 默认超时，与aiohttp默认总超时一致
+    SYNC_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=5)  # 同步消息超时
+    DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=300, connect=10)  # 大文件下载超时
+
     def __init__(self, ip: str, port: int):
         self.ip = ip
         self.port = port
 
+        # 共享HTTP会话，首次请求时在当前事件循环中懒加载创建
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
         self.wxid = ""
         self.nickname = ""
         self.alias = ""
@@ -59,6 +77,52 @@ class WechatAPIClientBase:
         # 调用所有 Mixin 的初始化方法
         super().__init__()
 
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.HTTP_CONNECTION_LIMIT,
+                                         limit_per_host=self.HTTP_CONNECTION_LIMIT_PER_HOST,
+                                         keepalive_timeout=self.HTTP_KEEPALIVE_TIMEOUT,
+                                         ttl_dns_cache=self.HTTP_DNS_CACHE_TTL)
+        return aiohttp.ClientSession(connector=connector, timeout=self.HTTP_TIMEOUT)
+
+    def _get_shared_session(self) -> Optional[aiohttp.ClientSession]:
+        """获取共享的HTTP会话，不存在或已关闭时重新创建。
+
+        会话绑定在创建它的事件循环上。若共享会话属于另一个仍未关闭的事件循环，返回None。
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed:
+            if self._session_loop is loop:
+                return self._session
+            if not self._session_loop.is_closed():
+                return None
+        self._session = self._create_session()
+        self._session_loop = loop
+        return self._session
+
+    @asynccontextmanager
+    async def http_session(self):
+        """所有 Mixin 请求协议服务器时使用的会话上下文。
+
+        在主事件循环中返回共享会话，退出上下文时不关闭，连接保持复用；
+        在其它事件循环(如管理后台线程)中调用时，退回为一次性临时会话。
+
+        Yields:
+            aiohttp.ClientSession: HTTP会话
+        """
+        session = self._get_shared_session()
+        if session is not None:
+            yield session
+            return
+        async with aiohttp.ClientSession(timeout=self.HTTP_TIMEOUT) as session:
+            yield session
+
+    async def close(self):
+        """关闭共享的HTTP会话，释放连接池。"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
     @staticmethod
     def error_handler(json_resp):
         """处理API响应中的错误码
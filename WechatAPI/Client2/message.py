@@ -1,13 +1,9 @@
-import asyncio
 import base64
 import os
-from asyncio import Future
-from asyncio import Queue, sleep
 from io import BytesIO
 from pathlib import Path
 from typing import Union
 
-import aiohttp
 import pysilk
 from loguru import logger
 from pydub import AudioSegment
@@ -15,50 +11,31 @@ from pymediainfo import MediaInfo
 
 from .base import *
 from .protect import protector
+from .send_scheduler import SendScheduler, PRIORITY_HIGH, send_priority, current_send_priority
 from ..errors import *
 
 
 class MessageMixin(WechatAPIClientBase):
     def __init__(self, ip: str, port: int):
-        # 初始化消息队列
+        # 初始化发送调度器：按会话分队列限速，不同会话并发发送
         super().__init__(ip, port)
-        self._message_queue = Queue()
-        self._is_processing = False
+        self.send_scheduler = SendScheduler()
+        # 上次同步返回的Synckey，下次同步时带上，只拉取增量消息
+        self.synckey = ""
 
-    async def _process_message_queue(self):
-        """
-        处理消息队列的异步方法
-        """
-        if self._is_processing:
-            return
-
-        self._is_processing = True
-        while True:
-            if self._message_queue.empty():
-                self._is_processing = False
-                break
+    def get_send_metrics(self) -> dict:
+        """获取发送队列深度和排队等待时间等指标
 
-            func, args, kwargs, future = await self._message_queue.get()
-            try:
-                result = await func(*args, **kwargs)
-                future.set_result(result)
-            except Exception as e:
-                future.set_exception(e)
-            finally:
-                self._message_queue.task_done()
-                await sleep(1)  # 消息发送间隔1秒
+        Returns:
+            dict: 发送调度器指标
+        """
+        return self.send_scheduler.get_metrics()
 
     async def _queue_message(self, func, *args, **kwargs):
         """
-        将消息添加到队列
+        将消息交给发送调度器，按接收人(第一个参数)排队
         """
-        future = Future()
-        await self._message_queue.put((func, args, kwargs, future))
-
-        if not self._is_processing:
-            asyncio.create_task(self._process_message_queue())
-
-        return await future
+        return await self.send_scheduler.submit(args[0], func, *args, **kwargs)
 
     async def revoke_message(self, wxid: str, client_msg_id: int, create_time: int, new_msg_id: int) -> bool:
         """撤回消息。
@@ -82,7 +59,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "ClientMsgId": client_msg_id, "CreateTime": create_time,
                           "NewMsgId": new_msg_id}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/Revoke', json=json_param)
@@ -113,6 +90,10 @@ class MessageMixin(WechatAPIClientBase):
             BanProtection: 登录新设备后4小时内操作
             根据error_handler处理错误
         """
+        if at and current_send_priority() is None:
+            # @回复优先于普通消息和广播发送
+            with send_priority(PRIORITY_HIGH):
+                return await self._queue_message(self._send_text_message, wxid, content, at)
         return await self._queue_message(self._send_text_message, wxid, content, at)
 
     async def _send_text_message(self, wxid: str, content: str, at: list[str] = None) -> tuple[int, int, int]:
@@ -133,7 +114,7 @@ class MessageMixin(WechatAPIClientBase):
         else:
             raise ValueError("Argument 'at' should be str or list")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": content, "Type": 1, "At": at_str}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendTxt', json=json_param)
             json_resp = await response.json()
@@ -179,7 +160,7 @@ class MessageMixin(WechatAPIClientBase):
         else:
             raise ValueError("Argument 'image' can only be str, bytes, or os.PathLike")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Base64": image}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/UploadImg', json=json_param)
             json_resp = await response.json()
@@ -277,7 +258,7 @@ class MessageMixin(WechatAPIClientBase):
         predict_time = int(file_len / 1024 / 300)
         logger.info("开始发送视频: 对方wxid:{} 视频base64略 图片base64略 预计耗时:{}秒", wxid, predict_time)
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Base64": "data:video/mp4;base64,"+ vid_base64, "ImageBase64": "data:image/jpeg;base64,"+image_base64,
                           "PlayLength": duration}
             async with session.post(f'http://{self.ip}:{self.port}/api/Msg/SendVideo', json=json_param) as resp:
@@ -353,7 +334,7 @@ class MessageMixin(WechatAPIClientBase):
 
         format_dict = {"amr": 0, "wav": 4, "mp3": 4}
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Base64": voice_base64, "VoiceTime": duration,
                           "Type": format_dict[format]}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendVoice', json=json_param)
@@ -409,7 +390,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Url": url, "Title": title, "Desc": description,
                           "ThumbUrl": thumb_url}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/ShareLink', json=json_param)
@@ -434,7 +415,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Infourl": Infourl, "Label": Label, "Scale": Scale,
                           "X": X,"Y": Y, "Poiname": Poiname}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/ShareLocation', json=json_param)
@@ -478,7 +459,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Md5": md5, "TotalLen": total_length}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendEmoji', json=json_param)
             json_resp = await response.json()
@@ -516,7 +497,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "CardWxid": card_wxid, "CardAlias": card_alias,
                           "CardNickname": card_nickname}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCard', json=json_param)
@@ -557,7 +538,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Xml": xml, "Type": type}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendApp', json=json_param)
             json_resp = await response.json()
@@ -593,7 +574,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": xml}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCDNFile', json=json_param)
             json_resp = await response.json()
@@ -628,7 +609,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": xml}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCDNImg', json=json_param)
             json_resp = await response.json()
@@ -663,7 +644,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": xml}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCDNVideo', json=json_param)
             json_resp = await response.json()
@@ -699,7 +680,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Md5": md5, "TotalLen": total_len}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendEmoji', json=json_param)
             json_resp = await response.json()
@@ -710,9 +691,12 @@ class MessageMixin(WechatAPIClientBase):
             else:
                 self.error_handler(json_resp)
 
-    async def sync_message(self) -> dict:
+    async def sync_message(self, synckey: str = None) -> dict:
         """同步消息。
 
+        Args:
+            synckey (str, optional): 同步Key，默认使用上次同步返回的Synckey
+
         Returns:
             dict: 返回同步到的消息数据
 
@@ -723,12 +707,18 @@ class MessageMixin(WechatAPIClientBase):
         if not self.wxid:
             raise UserLoggedOut("请先登录")
 
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-            json_param = {"Wxid": self.wxid, "Scene": 0, "Synckey": ""}
-            response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/Sync', json=json_param)
+        async with self.http_session() as session:
+            json_param = {"Wxid": self.wxid, "Scene": 0, "Synckey": self.synckey if synckey is None else synckey}
+            response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/Sync', json=json_param,
+                                          timeout=self.SYNC_TIMEOUT)
             json_resp = await response.json()
 
             if json_resp.get("Success"):
-                return True,json_resp.get("Data")
+                data = json_resp.get("Data")
+                # 记录新的Synckey，协议返回KeyBuf时才更新
+                key_buf = data.get("KeyBuf") if isinstance(data, dict) else None
+                if isinstance(key_buf, dict) and key_buf.get("buffer"):
+                    self.synckey = key_buf.get("buffer")
+                return True,data
             else:
                 return False,json_resp.get("Message")
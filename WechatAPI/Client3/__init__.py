@@ -10,6 +10,7 @@ from .tool import ToolMixin
 from .tool_extension import ToolExtensionMixin
 from .user import UserMixin
 from .pyq import PyqMixin
+from .send_scheduler import SendScheduler, send_priority, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
 import sqlite3
 import os
 from loguru import logger
@@ -0,0 +1,4 @@
+# 与 WechatAPI.Client 共用同一个调度器实现和发送优先级上下文，
+# 框架和插件通过 send_priority 设置的优先级对所有协议版本的客户端都生效
+from WechatAPI.Client.send_scheduler import (PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, SendScheduler,  # noqa: F401
+                                             TokenBucket, current_send_priority, send_priority)
@@ -6172,8 +6172,8 @@ except:
 
                 # 尝试将群成员保存到数据库
                 try:
-                    from database.group_members_db import save_group_members_to_db
-                    save_result = save_group_members_to_db(wxid, members)
+                    from database.group_members_db import save_group_members_to_db_async
+                    save_result = await save_group_members_to_db_async(wxid, members)
                     if save_result:
                         logger.info(f"成功将群 {wxid} 的 {len(members)} 个成员保存到数据库")
                     else:
@@ -6444,8 +6444,8 @@ except:
 
                 # 尝试将群成员保存到数据库
                 try:
-                    from database.group_members_db import save_group_members_to_db
-                    save_result = save_group_members_to_db(wxid, members)
+                    from database.group_members_db import save_group_members_to_db_async
+                    save_result = await save_group_members_to_db_async(wxid, members)
                     if save_result:
                         logger.info(f"成功将群 {wxid} 的 {len(members)} 个成员保存到数据库")
                     else:
@@ -0,0 +1,86 @@
+"""EventManager.emit 的分发开销
+
+在不同处理函数数量和 Content 大小下测量每条消息的分发耗时，处理函数只读取消息字段:
+
+- deepcopy: 原来的 emit，每个处理函数调用前 deepcopy 一次消息
+- MessageView: 同样的循环，改为传入写时复制的消息视图
+- emit: 现在的 EventManager.emit，包含消息视图、路由索引和统计
+
+用法:
+    python benchmarks/emit_benchmark.py [--rounds 次数]
+"""
+import argparse
+import asyncio
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.event_manager import EventManager, MessageView  # noqa: E402
+
+HANDLER_COUNTS = (1, 10, 30)
+PAYLOAD_SIZES = (1024, 1024 * 1024, 4 * 1024 * 1024)
+
+
+def make_message(size):
+    """与 XYBot 处理后的图片消息结构相同的消息"""
+    return {
+        "MsgId": 1234567890,
+        "NewMsgId": 7654321098765432100,
+        "MsgType": 3,
+        "FromUserName": {"string": "12345678@chatroom"},
+        "ToUserName": {"string": "wxid_bot"},
+        "FromWxid": "12345678@chatroom",
+        "ToWxid": "wxid_bot",
+        "SenderWxid": "wxid_sender",
+        "Content": "A" * size,  # 图片的base64内容
+        "ImgBuf": {"iLen": 0},
+        "MsgSource": "<msgsource><atuserlist>wxid_a,wxid_b</atuserlist><silence>1</silence></msgsource>",
+        "Ats": ["wxid_a", "wxid_b"],
+        "IsGroup": True,
+        "CreateTime": 1700000000,
+    }
+
+
+async def read_handler(bot, message):
+    """典型的插件处理函数: 读取内容和发送者"""
+    return message["Content"].startswith("签到") and message["SenderWxid"] == message["FromWxid"] or None
+
+
+async def legacy_emit(handlers, bot, message):
+    for handler in handlers:
+        await handler(bot, copy.deepcopy(message))
+
+
+async def view_emit(handlers, bot, message):
+    for handler in handlers:
+        await handler(bot, MessageView(message))
+
+
+async def measure(emit, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await emit()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+async def main(rounds):
+    print(f"{'处理函数':>6} {'Content':>9} {'deepcopy(µs)':>13} {'MessageView(µs)':>16} {'emit(µs)':>10}")
+    for count in HANDLER_COUNTS:
+        handlers = [read_handler] * count
+        EventManager._handlers["benchmark"] = [(handler, None, 50) for handler in handlers]
+        EventManager._rebuild_index("benchmark")
+        for size in PAYLOAD_SIZES:
+            message = make_message(size)
+            legacy = await measure(lambda: legacy_emit(handlers, None, message), rounds)
+            view = await measure(lambda: view_emit(handlers, None, message), rounds)
+            emit = await measure(lambda: EventManager.emit("benchmark", None, message), rounds)
+            print(f"{count:>10} {size // 1024:>7}KB {legacy:>13.1f} {view:>16.1f} {emit:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="每种组合分发的消息数")
+    asyncio.run(main(parser.parse_args().rounds))
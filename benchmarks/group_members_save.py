@@ -0,0 +1,119 @@
+"""保存整群成员快照的耗时和写入行数
+
+在临时目录的 SQLite 数据库中保存一个群的成员列表，对比:
+
+- 逐条写入: 原来的 save_group_members_to_db，每个成员执行一次 UPSERT，内容没变也写
+- 差异写入: 现在的 save_group_members_to_db，按 row_hash 跳过未变化的成员，
+  变化的成员一次 executemany，退群的成员按批 DELETE
+
+依次测试首次保存、内容相同的重复保存、1 人改名且 100 人退群后的保存，报告耗时和数据库变更的行数。
+
+用法:
+    python benchmarks/group_members_save.py [--members 人数] [--rounds 次数]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loguru import logger  # noqa: E402
+
+GROUP = "12345678@chatroom"
+
+# 原来的 UPSERT，没有 row_hash 列
+LEGACY_UPSERT_SQL = '''
+INSERT INTO group_members
+(group_wxid, member_wxid, nickname, display_name, avatar, inviter_wxid, last_updated, extra_data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(group_wxid, member_wxid) DO UPDATE SET
+    nickname = excluded.nickname,
+    display_name = excluded.display_name,
+    avatar = excluded.avatar,
+    inviter_wxid = excluded.inviter_wxid,
+    last_updated = excluded.last_updated,
+    extra_data = excluded.extra_data
+'''
+
+
+def make_members(count):
+    return [{"UserName": f"wxid_member_{i}", "NickName": f"成员{i}", "DisplayName": f"群昵称{i}",
+             "BigHeadImgUrl": f"http://wx.qlogo.cn/mmhead/{i}/0", "InviterUserName": "wxid_owner",
+             "ChatroomMemberFlag": 0} for i in range(count)]
+
+
+def snapshots(count):
+    """首次保存、重复保存、1 人改名且 100 人退群"""
+    members = make_members(count)
+    changed = [dict(member) for member in members[:count - 100]]
+    changed[0]["NickName"] = "改过的昵称"
+    return [("首次保存", members), ("重复保存", members), ("改名+退群", changed)]
+
+
+def legacy_save(db, member_row, group_wxid, members):
+    """原来的 save_group_members_to_db"""
+    current_time = int(time.time())
+    with db.transaction() as cursor:
+        for member in members:
+            row = member_row(group_wxid, member, current_time)
+            if row is None:
+                continue
+            cursor.execute(LEGACY_UPSERT_SQL, row[:-1])
+
+
+def measure(save, db, group_wxid, members):
+    conn = db.connection()
+    changes = conn.total_changes
+    start = time.perf_counter()
+    save(group_wxid, members)
+    return (time.perf_counter() - start) * 1000, conn.total_changes - changes
+
+
+def main(count, rounds):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # database 包导入时在当前目录的 database/contacts.db 建表
+        try:
+            logger.remove()
+            from database import group_members_db
+            from database.connection import SQLiteConnectionManager
+
+            legacy_db = SQLiteConnectionManager(os.path.join(tmp, "legacy.db"))
+            with legacy_db.transaction() as cursor:
+                cursor.execute("CREATE TABLE group_members (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "group_wxid TEXT NOT NULL, member_wxid TEXT NOT NULL, nickname TEXT, "
+                               "display_name TEXT, avatar TEXT, inviter_wxid TEXT, join_time INTEGER, "
+                               "last_updated INTEGER, extra_data TEXT, UNIQUE(group_wxid, member_wxid))")
+
+            def legacy(group_wxid, members):
+                legacy_save(legacy_db, group_members_db._member_row, group_wxid, members)
+
+            print(f"{count} 人的群，每种情况 {rounds} 轮取平均")
+            print(f"{'':<10} {'逐条写入':>16} {'差异写入':>16}")
+            results = {}
+            for round_index in range(rounds):
+                group_wxid = f"{round_index}_{GROUP}"
+                for name, members in snapshots(count):
+                    before = measure(legacy, legacy_db, group_wxid, members)
+                    after = measure(group_members_db.save_group_members_to_db, group_members_db._db,
+                                    group_wxid, members)
+                    results.setdefault(name, []).append((before, after))
+            for name, runs in results.items():
+                (before_ms, before_rows), (after_ms, after_rows) = [
+                    (sum(run[i][0] for run in runs) / len(runs), runs[0][i][1]) for i in (0, 1)]
+                print(f"{name:<10} {before_ms:>8.1f}ms {before_rows:>4}行 {after_ms:>8.1f}ms {after_rows:>4}行")
+            legacy_db.close()
+            group_members_db._db.close()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=500, help="群成员数")
+    parser.add_argument("--rounds", type=int, default=20, help="每种情况重复的次数")
+    args = parser.parse_args()
+    main(args.members, args.rounds)
@@ -0,0 +1,108 @@
+"""协议服务器请求的连接复用
+
+在本机启动一个模拟协议服务器的 aiohttp 服务，按 UserMixin.get_profile 的方式发送请求，对比:
+
+- 每次新建会话: 原来的写法，每个请求 async with aiohttp.ClientSession()，每次都重新建立TCP连接
+- 共享会话: 现在的 http_session()，所有请求复用同一个连接池
+
+分别测试顺序请求和并发请求，报告平均耗时、吞吐量和服务端接受的TCP连接数。
+
+用法:
+    python benchmarks/http_session.py [--requests 请求数] [--concurrency 并发数]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from WechatAPI.Client.base import WechatAPIClientBase  # noqa: E402
+
+PATH = "/VXAPI/User/GetContractProfile"
+
+
+class StubServer:
+    """返回固定响应，按客户端地址记录接受的连接"""
+
+    def __init__(self):
+        self.connections = set()
+        self.runner = None
+        self.port = None
+
+    async def handle(self, request):
+        self.connections.add(request.transport.get_extra_info("peername"))
+        await request.post()
+        return web.json_response({"Success": True, "Data": {"userInfo": {"NickName": {"string": "测试"}}}})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(PATH, self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def per_call_session(client):
+    async with aiohttp.ClientSession() as session:
+        response = await session.post(f"http://{client.ip}:{client.port}{PATH}", data={"wxid": "wxid_test"})
+        return await response.json()
+
+
+async def shared_session(client):
+    async with client.http_session() as session:
+        response = await session.post(f"http://{client.ip}:{client.port}{PATH}", data={"wxid": "wxid_test"})
+        return await response.json()
+
+
+async def run(server, client, request, requests, concurrency):
+    server.connections.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            assert (await request(client))["Success"]
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        for _ in range(requests):
+            await one()
+    else:
+        await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return elapsed, len(server.connections)
+
+
+async def main(requests, concurrency):
+    server = StubServer()
+    await server.start()
+    client = WechatAPIClientBase("127.0.0.1", server.port)
+    try:
+        for mode, limit in (("顺序", 1), (f"并发{concurrency}", concurrency)):
+            print(f"{mode}请求 {requests} 次")
+            for name, request in (("每次新建会话", per_call_session), ("共享会话    ", shared_session)):
+                await request(client)  # 预热
+                elapsed, connections = await run(server, client, request, requests, limit)
+                print(f"  {name}: 平均 {elapsed / requests * 1e6:.0f}µs/次，{requests / elapsed:.0f} 次/秒，"
+                      f"TCP连接 {connections} 个")
+    finally:
+        await client.close()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="每种方式发送的请求数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发请求数")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,159 @@
+"""消息过滤的回放测试
+
+用随机生成的消息（普通私聊、群聊、公众号、系统账号和黑白名单账号）回放，对比:
+
+- ignore_check: 原来的 XYBot.ignore_check，每次调用构建系统账号列表，名单是列表
+- IgnoreFilter: 现在的过滤器，集合查找加一次正则匹配
+
+两种实现对每条消息的结果必须相同。只统计过滤本身的耗时，日志输出已关闭。
+
+用法:
+    python benchmarks/ignore_filter_replay.py [--messages 条数] [--list-size 名单长度]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger  # noqa: E402
+
+from utils.ignore_filter import IgnoreFilter  # noqa: E402
+
+
+class LegacyIgnoreCheck:
+    """原来的 XYBot.ignore_check"""
+
+    def __init__(self, ignore_mode, whitelist, blacklist):
+        self.ignore_mode = ignore_mode
+        self.whitelist = whitelist
+        self.blacklist = blacklist
+
+    def ignore_check(self, FromWxid: str, SenderWxid: str):
+        # 过滤公众号消息（公众号wxid通常以gh_开头）
+        if SenderWxid and isinstance(SenderWxid, str) and SenderWxid.startswith('gh_'):
+            logger.debug(f"忽略公众号消息: {SenderWxid}")
+            return False
+        if FromWxid and isinstance(FromWxid, str) and FromWxid.startswith('gh_'):
+            logger.debug(f"忽略公众号消息: {FromWxid}")
+            return False
+
+        # 过滤微信团队和系统通知
+        system_accounts = [
+            'weixin', 'filehelper', 'fmessage', 'medianote', 'floatbottle', 'qmessage', 'qqmail', 'tmessage',
+            'weibo', 'newsapp', 'notification_messages', 'helper_entry', 'mphelper', 'brandsessionholder',
+            'weixinreminder', 'officialaccounts',
+        ]
+
+        # 检查是否是系统账号
+        for account in system_accounts:
+            if (SenderWxid and isinstance(SenderWxid, str) and SenderWxid == account) or \
+                    (FromWxid and isinstance(FromWxid, str) and FromWxid == account):
+                logger.debug(f"忽略系统账号消息: {SenderWxid or FromWxid}")
+                return False
+
+        # 微信支付相关通知
+        if (SenderWxid and isinstance(SenderWxid, str) and 'wxpay' in SenderWxid) or \
+                (FromWxid and isinstance(FromWxid, str) and 'wxpay' in FromWxid):
+            logger.debug(f"忽略微信支付相关消息: {SenderWxid or FromWxid}")
+            return False
+
+        # 腾讯游戏相关通知
+        if (SenderWxid and isinstance(SenderWxid, str) and (
+                'tencent' in SenderWxid.lower() or 'game' in SenderWxid.lower())) or \
+                (FromWxid and isinstance(FromWxid, str) and (
+                        'tencent' in FromWxid.lower() or 'game' in FromWxid.lower())):
+            logger.debug(f"忽略腾讯游戏相关消息: {SenderWxid or FromWxid}")
+            return False
+
+        # 微信官方账号通常包含"service"或"official"
+        if (SenderWxid and isinstance(SenderWxid, str) and (
+                'service' in SenderWxid.lower() or 'official' in SenderWxid.lower())) or \
+                (FromWxid and isinstance(FromWxid, str) and (
+                        'service' in FromWxid.lower() or 'official' in FromWxid.lower())):
+            logger.debug(f"忽略官方服务账号消息: {SenderWxid or FromWxid}")
+            return False
+
+        is_group = FromWxid and isinstance(FromWxid, str) and FromWxid.endswith("@chatroom")
+
+        if self.ignore_mode == "Whitelist":
+            if is_group:
+                logger.debug(f"白名单检查: 群聊ID={FromWxid}, 发送者ID={SenderWxid}, "
+                             f"群聊ID在白名单中={FromWxid in self.whitelist}, "
+                             f"发送者ID在白名单中={SenderWxid in self.whitelist}")
+                return SenderWxid in self.whitelist or FromWxid in self.whitelist
+            else:
+                return SenderWxid in self.whitelist
+        elif self.ignore_mode == "Blacklist":
+            if is_group:
+                return (FromWxid not in self.blacklist) and (SenderWxid not in self.blacklist)
+            else:
+                return SenderWxid not in self.blacklist
+        else:
+            return True
+
+
+def make_messages(count, listed, seed=42):
+    """生成 (FromWxid, SenderWxid) 序列，约 80% 是普通消息"""
+    rng = random.Random(seed)
+    users = [f"wxid_{rng.getrandbits(40):010x}" for _ in range(2000)]
+    groups = [f"{rng.randrange(10 ** 10, 10 ** 11)}@chatroom" for _ in range(200)]
+    special = ["gh_3dfda90e39d6", "filehelper", "weixin", "newsapp", "wxpay_notify", "TencentGame",
+               "CustomerService", "official_helper"]
+    messages = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.1:
+            wxid = rng.choice(special)
+            messages.append((wxid, wxid))
+        elif kind < 0.2:
+            sender = rng.choice(listed)
+            messages.append((sender, sender))
+        elif kind < 0.6:
+            messages.append((rng.choice(groups + listed[:5]), rng.choice(users)))
+        else:
+            sender = rng.choice(users)
+            messages.append((sender, sender))
+    return messages
+
+
+def replay(check, messages):
+    start = time.perf_counter()
+    results = [check(from_wxid, sender_wxid) for from_wxid, sender_wxid in messages]
+    return time.perf_counter() - start, results
+
+
+def main(count, list_size):
+    logger.remove()  # 只测量过滤本身，不输出日志
+    listed = [f"wxid_listed_{i}" for i in range(list_size - 5)] + [f"{i}@chatroom" for i in range(5)]
+    listed = listed[-5:] + listed[:-5]  # 前5个是群聊
+    messages = make_messages(count, listed)
+    print(f"回放 {count} 条消息，名单长度 {list_size}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, "main_config.toml")
+        for mode in ("None", "Whitelist", "Blacklist"):
+            with open(config_path, "w", encoding="utf-8") as f:
+                f.write(f'ignore-mode = "{mode}"\nwhitelist = {listed!r}\nblacklist = {listed!r}\n'
+                        .replace("'", '"'))
+            legacy = LegacyIgnoreCheck(mode, list(listed), list(listed))
+            ignore_filter = IgnoreFilter(config_path)
+
+            legacy_time, legacy_results = replay(legacy.ignore_check, messages)
+            filter_time, filter_results = replay(ignore_filter.check, messages)
+            mismatches = sum(a != b for a, b in zip(legacy_results, filter_results))
+            print(f"{mode:>9}: ignore_check {legacy_time:.3f}s ({legacy_time / count * 1e6:.2f}µs/条), "
+                  f"IgnoreFilter {filter_time:.3f}s ({filter_time / count * 1e6:.2f}µs/条), "
+                  f"通过 {sum(filter_results)} 条, 结果不一致 {mismatches} 条")
+            print(f"{'':>9}  规则统计: {ignore_filter.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000, help="回放的消息数")
+    parser.add_argument("--list-size", type=int, default=50, help="白名单和黑名单的长度")
+    args = parser.parse_args()
+    main(args.messages, args.list_size)
@@ -0,0 +1,98 @@
+"""MessageDB 消息记录写入吞吐量
+
+在临时目录的 SQLite 数据库中写入消息，对比:
+
+- 逐条提交: 原来的 save_message，每条消息一个会话和一次提交，SQLite 默认的 rollback 日志
+- 写缓冲: 现在的 save_message，消息进入内存队列，后台按批写入，WAL + synchronous=NORMAL
+
+分别报告调用方等待 save_message 的时间和全部写入磁盘的总耗时。
+
+用法:
+    python benchmarks/message_db_throughput.py [--messages 条数]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+
+from database.messsagDB import DeclarativeBase, Message, MessageDB  # noqa: E402
+
+
+def make_row(i):
+    return dict(msg_id=i, sender_wxid=f"wxid_{i % 50}", from_wxid=f"{i % 20}@chatroom",
+                msg_type=1, content=f"第 {i} 条测试消息", is_group=True)
+
+
+async def count_rows(db_url):
+    engine = create_async_engine(db_url)
+    async with AsyncSession(engine) as session:
+        count = await session.scalar(select(func.count()).select_from(Message))
+    await engine.dispose()
+    return count
+
+
+async def per_row_commit(db_url, messages):
+    """原来的写入方式"""
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(DeclarativeBase.metadata.create_all)
+
+    start = time.perf_counter()
+    for i in range(messages):
+        async with AsyncSession(engine) as session:
+            session.add(Message(timestamp=datetime.now(), **make_row(i)))
+            await session.commit()
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return elapsed, elapsed, await count_rows(db_url)
+
+
+async def write_behind(db_url, messages):
+    """现在的写缓冲，数据库地址来自当前目录的 main_config.toml"""
+    db = MessageDB()
+    await db.initialize()
+
+    start = time.perf_counter()
+    for i in range(messages):
+        await db.save_message(**make_row(i))
+    ingest = time.perf_counter() - start
+    await db.close()
+    total = time.perf_counter() - start
+    return ingest, total, await count_rows(db_url)
+
+
+def report(name, messages, ingest, total, count):
+    print(f"{name}: 调用方等待 {ingest:.2f}s ({ingest / messages * 1e6:.0f}µs/条)，"
+          f"写入完成 {total:.2f}s ({messages / total:.0f} 条/秒)，数据库中 {count} 条")
+
+
+async def main(messages):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        before_url = "sqlite+aiosqlite:///" + os.path.join(tmp, "before.db").replace("\\", "/")
+        after_url = "sqlite+aiosqlite:///" + os.path.join(tmp, "after.db").replace("\\", "/")
+        with open(os.path.join(tmp, "main_config.toml"), "w", encoding="utf-8") as f:
+            f.write(f'[XYBot]\nmsgDB-url = "{after_url}"\n')
+
+        os.chdir(tmp)
+        try:
+            print(f"写入 {messages} 条消息")
+            report("逐条提交", messages, *await per_row_commit(before_url, messages))
+            report("写缓冲  ", messages, *await write_behind(after_url, messages))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="写入的消息数")
+    asyncio.run(main(parser.parse_args().messages))
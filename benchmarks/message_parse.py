@@ -0,0 +1,189 @@
+"""消息归一化和XML解析的耗时
+
+回放 fixtures/messages.json 中录制的消息（文本、图片、语音、文章、文件、引用、拍一拍、撤回），
+按 XYBot 各 process_*_message 和插件中的解析步骤处理，对比:
+
+- 原来: 每个 process_* 自己分割 Content，每一处都用 ET.fromstring 重新解析，find 调用重复
+- 现在: normalize_message 一次归一化，.xml/.msg_source 延迟解析，框架用 parse_xml_shared 共用同一棵树，
+  插件用 parse_xml 拿到缓存树的副本
+
+每条消息处理前清空 XML 缓存，相当于每条消息的内容都不相同，只统计同一条消息内的复用。
+
+用法:
+    python benchmarks/message_parse.py [--rounds 次数]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.message_parser import find_int, find_text, normalize_message, parse_xml, parse_xml_shared  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "messages.json")
+
+QUOTE_TEXT_TAGS = ("title", "des", "action", "url", "lowurl", "dataurl", "lowdataurl", "songlyric", "extinfo",
+                   "sourceusername", "sourcedisplayname", "thumburl", "md5", "statextstr")
+QUOTE_INT_TAGS = ("type", "showtype", "soundtype", "directshare")
+ATTACH_TEXT_TAGS = ("attachid", "emoticonmd5", "fileext", "cdnthumbaeskey", "aeskey")
+
+
+def legacy_normalize(message, bot_wxid, separator=":", strip=False):
+    """原来各 process_* 中复制的归一化代码"""
+    message["Content"] = message.get("Content", {}).get("string", "")
+    if strip:
+        message["Content"] = message["Content"].replace("\n", "").replace("\t", "")
+    if message["FromWxid"].endswith("@chatroom"):
+        message["IsGroup"] = True
+        split_content = message["Content"].split(separator, 1)
+        if len(split_content) > 1:
+            message["Content"] = split_content[1]
+            message["SenderWxid"] = split_content[0]
+        else:
+            message["Content"] = split_content[0]
+            message["SenderWxid"] = bot_wxid
+    else:
+        message["SenderWxid"] = message["FromWxid"]
+        if message["FromWxid"] == bot_wxid:
+            message["FromWxid"] = message["ToWxid"]
+        message["IsGroup"] = False
+
+
+def legacy_find(node, tag, convert=None, default=""):
+    """原来引用消息中每个字段的写法: 先 find 一次判断类型，再 find 一次取值"""
+    if not isinstance(node.find(tag), ET.Element):
+        return default
+    return convert(node.find(tag).text) if convert else node.find(tag).text
+
+
+def legacy_pipeline(message, bot_wxid):
+    msg_type = message["MsgType"]
+    if msg_type == 1:
+        legacy_normalize(message, bot_wxid, separator=":\n")
+        root = ET.fromstring(message.get("MsgSource", ""))
+        ats = root.find("atuserlist").text if root.find("atuserlist") is not None else ""
+        message["Ats"] = ats.strip(",").split(",") if ats else []
+    elif msg_type in (3, 34):
+        legacy_normalize(message, bot_wxid, strip=True)
+        root = ET.fromstring(message["Content"])
+        element = root.find("img" if msg_type == 3 else "voicemsg")
+        element.get("aeskey"), element.get("length")
+    elif msg_type == 49:
+        legacy_normalize(message, bot_wxid, strip=True)
+        root = ET.fromstring(message["Content"])
+        xml_type = int(root.find("appmsg").find("type").text)
+        if xml_type == 57:
+            # process_quote_message
+            root = ET.fromstring(message["Content"])
+            refermsg = root.find("appmsg").find("refermsg")
+            for tag in ("type", "svrid", "fromusr", "chatusr", "displayname", "msgsource", "createtime"):
+                refermsg.find(tag).text
+            quote_appmsg = ET.fromstring(refermsg.find("content").text).find("appmsg")
+            for tag in QUOTE_TEXT_TAGS:
+                legacy_find(quote_appmsg, tag)
+            for tag in QUOTE_INT_TAGS:
+                legacy_find(quote_appmsg, tag, int, 0)
+            legacy_find(quote_appmsg.find("appattach"), "totallen", int, 0)
+            for tag in ATTACH_TEXT_TAGS:
+                legacy_find(quote_appmsg.find("appattach"), tag)
+            # Dify.handle_xml_quote 再解析一次
+            ET.fromstring(message["Content"]).find("appmsg/title")
+        elif xml_type == 6:
+            # process_file_message
+            root = ET.fromstring(message["Content"])
+            root.find("appmsg").find("title").text
+            root.find("appmsg").find("appattach").find("attachid").text
+            root.find("appmsg").find("appattach").find("fileext").text
+        elif xml_type == 5:
+            # AutoSummary._process_xml_message 再解析一次
+            ET.fromstring(message["Content"]).find("appmsg/url")
+    elif msg_type == 10002:
+        legacy_normalize(message, bot_wxid)
+        root = ET.fromstring(message["Content"])
+        if root.attrib["type"] == "pat":
+            pat = ET.fromstring(message["Content"]).find("pat")
+            pat.find("fromusername").text, pat.find("pattedusername").text, pat.find("patsuffix").text
+
+
+def current_pipeline(message, bot_wxid):
+    msg_type = message["MsgType"]
+    if msg_type == 1:
+        msg = normalize_message(message, bot_wxid, separator=":\n")
+        message["Ats"] = list(msg.ats)
+    elif msg_type in (3, 34):
+        msg = normalize_message(message, bot_wxid, strip=True)
+        element = msg.xml.find("img" if msg_type == 3 else "voicemsg")
+        element.get("aeskey"), element.get("length")
+    elif msg_type == 49:
+        msg = normalize_message(message, bot_wxid, strip=True)
+        xml_type = int(msg.xml.find("appmsg").find("type").text)
+        if xml_type == 57:
+            # process_quote_message
+            refermsg = parse_xml_shared(message["Content"]).find("appmsg").find("refermsg")
+            for tag in ("type", "svrid", "fromusr", "chatusr", "displayname", "msgsource", "createtime"):
+                refermsg.find(tag).text
+            quote_appmsg = parse_xml_shared(refermsg.find("content").text).find("appmsg")
+            appattach = quote_appmsg.find("appattach")
+            for tag in QUOTE_TEXT_TAGS:
+                find_text(quote_appmsg, tag)
+            for tag in QUOTE_INT_TAGS:
+                find_int(quote_appmsg, tag)
+            find_int(appattach, "totallen")
+            for tag in ATTACH_TEXT_TAGS:
+                find_text(appattach, tag)
+            # Dify.handle_xml_quote
+            parse_xml(message["Content"]).find("appmsg/title")
+        elif xml_type == 6:
+            # process_file_message
+            appmsg = parse_xml_shared(message["Content"]).find("appmsg")
+            appmsg.find("title").text
+            appmsg.find("appattach").find("attachid").text
+            appmsg.find("appattach").find("fileext").text
+        elif xml_type == 5:
+            # AutoSummary._process_xml_message
+            parse_xml(message["Content"]).find("appmsg/url")
+    elif msg_type == 10002:
+        msg = normalize_message(message, bot_wxid)
+        if msg.xml.attrib["type"] == "pat":
+            pat = parse_xml_shared(message["Content"]).find("pat")
+            pat.find("fromusername").text, pat.find("pattedusername").text, pat.find("patsuffix").text
+
+
+def measure(pipeline, fixture, bot_wxid, rounds):
+    messages = [copy.deepcopy(fixture) for _ in range(rounds)]  # 处理会修改消息，提前复制
+    elapsed = 0.0
+    for message in messages:
+        parse_xml_shared.cache_clear()
+        start = time.perf_counter()
+        pipeline(message, bot_wxid)
+        elapsed += time.perf_counter() - start
+    return elapsed / rounds * 1e6, messages[-1]
+
+
+def main(rounds):
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = json.load(f)
+    bot_wxid = fixtures["bot_wxid"]
+
+    print(f"{'消息':<10} {'原来(µs)':>10} {'现在(µs)':>10}")
+    total_legacy = total_current = 0.0
+    for fixture in fixtures["messages"]:
+        legacy, legacy_message = measure(legacy_pipeline, fixture, bot_wxid, rounds)
+        current, current_message = measure(current_pipeline, fixture, bot_wxid, rounds)
+        fields = ("Content", "FromWxid", "SenderWxid", "IsGroup", "Ats")
+        if any(legacy_message.get(key) != current_message.get(key) for key in fields):
+            print(f"警告: {fixture['name']} 归一化结果不一致")
+        total_legacy += legacy
+        total_current += current
+        print(f"{fixture['name']:<10} {legacy:>10.1f} {current:>10.1f}")
+    print(f"{'合计':<10} {total_legacy:>10.1f} {total_current:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000, help="每条消息处理的次数")
+    main(parser.parse_args().rounds)
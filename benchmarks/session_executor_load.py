@@ -0,0 +1,111 @@
+"""WX849 回调消息处理的负载测试
+
+模拟 1000 条消息分布在 50 个会话中，对比原来每条消息新建两个线程和两个事件循环的处理方式
+与 SessionExecutor 固定线程池的线程数和处理延迟。
+
+用法:
+    python benchmarks/session_executor_load.py [--pace 秒] [--mode io|cpu]
+
+--pace 为相邻消息的提交间隔，0 表示一次性提交（突发）；--mode 为处理函数的负载类型。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dow"))
+
+from common.session_executor import SessionExecutor  # noqa: E402
+
+MESSAGES = 1000
+SESSIONS = 50
+WORK = 0.005  # 每条消息的处理耗时（秒）
+
+
+def handle(mode, submitted_at, latencies, done):
+    if mode == "cpu":
+        end = time.perf_counter() + WORK
+        while time.perf_counter() < end:
+            pass
+    else:
+        time.sleep(WORK)
+    latencies.append(time.perf_counter() - submitted_at)
+    done()
+
+
+def thread_per_message(session_id, fn, *args):
+    """原来的处理方式: 外层线程建事件循环，再为消息处理新建一个线程和事件循环"""
+    def outer():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            def inner():
+                inner_loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(inner_loop)
+                try:
+                    fn(*args)
+                finally:
+                    inner_loop.close()
+
+            thread = threading.Thread(target=inner, daemon=True)
+            thread.start()
+            thread.join()
+        finally:
+            loop.close()
+
+    threading.Thread(target=outer, daemon=True).start()
+
+
+def measure(name, submit, pace, mode):
+    latencies = []
+    finished = threading.Event()
+    count_lock = threading.Lock()
+    count = [0]
+    peak_threads = [threading.active_count()]
+
+    def done():
+        with count_lock:
+            count[0] += 1
+            if count[0] == MESSAGES:
+                finished.set()
+
+    def sample_threads():
+        while not finished.is_set():
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            time.sleep(0.001)
+
+    threading.Thread(target=sample_threads, daemon=True).start()
+    start = time.perf_counter()
+    for i in range(MESSAGES):
+        submit(f"session{i % SESSIONS}", handle, mode, time.perf_counter(), latencies, done)
+        if pace:
+            time.sleep(pace)
+    finished.wait()
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{name}: 峰值线程数 {peak_threads[0]}, "
+          f"p50 {latencies[MESSAGES // 2] * 1000:.1f}ms, p99 {latencies[int(MESSAGES * 0.99)] * 1000:.1f}ms, "
+          f"总耗时 {total:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pace", type=float, default=0.0, help="相邻消息的提交间隔（秒）")
+    parser.add_argument("--mode", choices=("io", "cpu"), default="io", help="处理函数的负载类型")
+    parser.add_argument("--workers", type=int, default=8, help="SessionExecutor 的工作线程数")
+    args = parser.parse_args()
+
+    print(f"{MESSAGES} 条消息，{SESSIONS} 个会话，每条处理 {WORK * 1000:.0f}ms ({args.mode})，提交间隔 {args.pace}s")
+    measure("每条消息新建线程", thread_per_message, args.pace, args.mode)
+
+    executor = SessionExecutor(max_workers=args.workers, name="bench")
+    measure("SessionExecutor", executor.submit, args.pace, args.mode)
+    print(executor.get_stats())
+    executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
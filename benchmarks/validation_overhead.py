@@ -0,0 +1,87 @@
+"""数据库写入参数校验的单次调用开销
+
+对比 MessageDB.save_message 和 KeyvalDB.set 原来使用的 pydantic validate_arguments 与现在的内联检查
+（默认宽松模式和 strict-db-validation 严格模式）。只测量参数校验，不访问数据库。
+
+用法:
+    python benchmarks/validation_overhead.py [--calls 次数]
+"""
+import argparse
+import os
+import sys
+import timeit
+import warnings
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Optional, Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.keyvalDB import KeyvalDB  # noqa: E402
+from database.messsagDB import _check_arg  # noqa: E402
+
+try:
+    from pydantic import validate_arguments
+except ImportError:
+    validate_arguments = None
+
+MESSAGE_ARGS = (1234567890, "wxid_sender", "12345678@chatroom", 1, "你好", True)
+KEYVAL_ARGS = ("plugin:signin:wxid_sender", "2024-01-01", 3600)
+
+
+def check_message(strict, msg_id, sender_wxid, from_wxid, msg_type, content, is_group):
+    """与 MessageDB.save_message 相同的检查"""
+    return (_check_arg("msg_id", msg_id, int, strict),
+            _check_arg("sender_wxid", sender_wxid, str, strict),
+            _check_arg("from_wxid", from_wxid, str, strict),
+            _check_arg("msg_type", msg_type, int, strict),
+            _check_arg("content", content, str, strict),
+            _check_arg("is_group", is_group, bool, strict))
+
+
+def pydantic_validators():
+    """原来的装饰方式"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+
+        @validate_arguments(config=dict(arbitrary_types_allowed=True))
+        def save_message(msg_id: int, sender_wxid: str = "", from_wxid: str = "", msg_type: int = 0,
+                         content: str = "", is_group: bool = False):
+            return msg_id
+
+        @validate_arguments
+        def set_value(key: str, value: Union[str, dict, list], ex: Optional[Union[int, timedelta]] = None):
+            return key
+
+    return save_message, set_value
+
+
+def main(calls):
+    cases = []
+    if validate_arguments is not None:
+        save_message, set_value = pydantic_validators()
+        cases += [
+            ("save_message pydantic", lambda: save_message(*MESSAGE_ARGS)),
+            ("set          pydantic", lambda: set_value(*KEYVAL_ARGS)),
+        ]
+    else:
+        print("未安装 pydantic，跳过原来的校验方式")
+
+    lax, strict = SimpleNamespace(strict_validation=False), SimpleNamespace(strict_validation=True)
+    key, value, ex = KEYVAL_ARGS
+    cases += [
+        ("save_message 内联检查", lambda: check_message(False, *MESSAGE_ARGS)),
+        ("save_message 严格模式", lambda: check_message(True, *MESSAGE_ARGS)),
+        ("set          内联检查", lambda: KeyvalDB._check_set_args(lax, key, value, ex)),
+        ("set          严格模式", lambda: KeyvalDB._check_set_args(strict, key, value, ex)),
+    ]
+
+    for name, call in cases:
+        seconds = min(timeit.repeat(call, number=calls, repeat=3))
+        print(f"{name}: {seconds / calls * 1e6:.2f}µs/次")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000, help="每种方式调用的次数")
+    main(parser.parse_args().calls)
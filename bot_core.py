@@ -14,6 +14,7 @@ from database.XYBotDB import XYBotDB
 from database.keyvalDB import KeyvalDB
 from database.messsagDB import MessageDB
 from utils.decorators import scheduler
+from utils.message_sync import MessageSyncEngine
 from utils.plugin_manager import plugin_manager
 from utils.xybot import XYBot
 from utils.notification_service import init_notification_service, get_notification_service
@@ -209,6 +210,13 @@ async def bot_core():
     # 设置客户端属性
     bot.ignore_protect = config.get("XYBot", {}).get("ignore-protection", False)
 
+    # 配置消息发送调度器
+    send_config = config.get("SendScheduler", {})
+    bot.send_scheduler.configure(per_chat_rate=send_config.get("per-chat-rate", 1.0),
+                                 per_chat_burst=send_config.get("per-chat-burst", 1),
+                                 global_rate=send_config.get("global-rate", 1.0),
+                                 global_burst=send_config.get("global-burst", 1))
+
     # 等待WechatAPI服务启动
     # time_out = 30  # 增加超时时间
     # while not await bot.is_running() and time_out > 0:
@@ -274,7 +282,7 @@ async def bot_core():
 
                             # 直接使用 aiohttp 调用 API，而不是使用 awaken_login 方法
                             # 这样我们可以更好地控制错误处理
-                            async with aiohttp.ClientSession() as session:
+                            async with bot.http_session() as session:
                                 # 根据协议版本选择不同的 API 路径
                                 if protocol_version == "855":
                                     api_base = "/api"
@@ -580,94 +588,108 @@ async def bot_core():
 
     logger.success("开始处理消息")
 
+    # 启动消息同步引擎
+    sync_engine = MessageSyncEngine(bot, config.get("MessageSync", {}))
+    await sync_engine.start()
+    xybot.event_bridge.start()
+
     # 添加重连检测变量
     message_failure_count = 0
     max_failure_count = 3  # 连续失败超过这个数量则认为离线
     is_offline = False
 
-    while True:
-        # 不需要记录当前时间
+    try:
+        while True:
+            # 不需要记录当前时间
 
-        try:
-            ok,data = await bot.sync_message()
-
-            # 如果成功获取消息，重置失败计数
-            if ok:
-                # 如果之前处于离线状态，现在恢复了，发送重连通知
-                if is_offline and message_failure_count > 0:
-                    is_offline = False
-                    message_failure_count = 0
-
-                    # 发送重连通知
-                    notification_service = get_notification_service()
-                    if notification_service and notification_service.enabled and notification_service.triggers.get("reconnect", False):
-                        if notification_service.token:
-                            logger.info(f"发送微信重连通知，微信ID: {bot.wxid}")
-                            asyncio.create_task(notification_service.send_reconnect_notification(bot.wxid))
-                        else:
-                            logger.warning("PushPlus Token未设置，无法发送重连通知")
-
-                # 正常情况下重置计数器
-                if message_failure_count > 0:
-                    message_failure_count = 0
+            try:
+                ok,data = await sync_engine.next_batch()
+
+                # 如果成功获取消息，重置失败计数
+                if ok:
+                    # 如果之前处于离线状态，现在恢复了，发送重连通知
+                    if is_offline and message_failure_count > 0:
+                        is_offline = False
+                        message_failure_count = 0
+
+                        # 发送重连通知
+                        notification_service = get_notification_service()
+                        if notification_service and notification_service.enabled and notification_service.triggers.get("reconnect", False):
+                            if notification_service.token:
+                                logger.info(f"发送微信重连通知，微信ID: {bot.wxid}")
+                                asyncio.create_task(notification_service.send_reconnect_notification(bot.wxid))
+                            else:
+                                logger.warning("PushPlus Token未设置，无法发送重连通知")
+
+                    # 正常情况下重置计数器
+                    if message_failure_count > 0:
+                        message_failure_count = 0
 
-        except Exception as e:
-            logger.warning("获取新消息失败 {}", e)
-            # 增加失败计数
-            message_failure_count += 1
-
-            # 如果连续失败超过阈值，标记为离线状态
-            if message_failure_count >= max_failure_count and not is_offline:
-                is_offline = True
-                logger.warning(f"连续 {message_failure_count} 次获取消息失败，微信可能已离线")
-
-            # 等待一段时间后重试
-            await asyncio.sleep(5)
-            logger.info("5秒后继续尝试获取消息")
-            continue
-
-            # 以下代码已注释，不再自动重新登录
-            # update_bot_status("waiting_login", "等待微信登录")
-            # 清除所有定时任务
-            # scheduler.remove_all_jobs()
-            # logger.success("所有定时任务已清除")
-            # await bot_core()
-            # break
-
-        # 如果成功获取消息但没有数据，处理消息数据
-
-        # 检查data是否为字典类型
-        if isinstance(data, dict):
-            messages = data.get("AddMsgs")
-            if messages:
-                for message in messages:
-                    asyncio.create_task(xybot.process_message(message))
-        elif data:  # 如果data不是字典但有值，记录日志
-            logger.warning(f"Unexpected data type: {type(data)}, value: {data}")
-
-            # 检测特定的错误消息
-            if isinstance(data, str) and "用户可能退出" in data:
-                # 如果检测到用户退出消息，增加失败计数
+            except Exception as e:
+                logger.warning("获取新消息失败 {}", e)
+                # 增加失败计数
                 message_failure_count += 1
 
                 # 如果连续失败超过阈值，标记为离线状态
                 if message_failure_count >= max_failure_count and not is_offline:
                     is_offline = True
-                    logger.warning(f"检测到用户退出消息，微信可能已离线")
-
-                    # 发送离线通知
-                    notification_service = get_notification_service()
-                    if notification_service and notification_service.enabled and notification_service.triggers.get("offline", False):
-                        if notification_service.token:
-                            logger.info(f"发送微信离线通知，微信ID: {bot.wxid}")
-                            asyncio.create_task(notification_service.send_offline_notification(bot.wxid))
-                        else:
-                            logger.warning("PushPlus Token未设置，无法发送离线通知")
-
-                    # 更新状态为离线
-                    update_bot_status("offline", "微信已离线")
-        # 使用异步睡眠替代忙等待循环
-        await asyncio.sleep(0.5)
+                    logger.warning(f"连续 {message_failure_count} 次获取消息失败，微信可能已离线")
+
+                # 等待一段时间后重试
+                await asyncio.sleep(5)
+                logger.info("5秒后继续尝试获取消息")
+                continue
+
+                # 以下代码已注释，不再自动重新登录
+                # update_bot_status("waiting_login", "等待微信登录")
+                # 清除所有定时任务
+                # scheduler.remove_all_jobs()
+                # logger.success("所有定时任务已清除")
+                # await bot_core()
+                # break
+
+            # 如果成功获取消息但没有数据，处理消息数据
+
+            # 检查data是否为字典类型
+            if isinstance(data, dict):
+                messages = data.get("AddMsgs")
+                if messages:
+                    for message in messages:
+                        await xybot.dispatch(message)
+            elif data:  # 如果data不是字典但有值，记录日志
+                logger.warning(f"Unexpected data type: {type(data)}, value: {data}")
+
+                # 检测特定的错误消息
+                if isinstance(data, str) and "用户可能退出" in data:
+                    # 如果检测到用户退出消息，增加失败计数
+                    message_failure_count += 1
+
+                    # 如果连续失败超过阈值，标记为离线状态
+                    if message_failure_count >= max_failure_count and not is_offline:
+                        is_offline = True
+                        logger.warning(f"检测到用户退出消息，微信可能已离线")
+
+                        # 发送离线通知
+                        notification_service = get_notification_service()
+                        if notification_service and notification_service.enabled and notification_service.triggers.get("offline", False):
+                            if notification_service.token:
+                                logger.info(f"发送微信离线通知，微信ID: {bot.wxid}")
+                                asyncio.create_task(notification_service.send_offline_notification(bot.wxid))
+                            else:
+                                logger.warning("PushPlus Token未设置，无法发送离线通知")
+
+                        # 更新状态为离线
+                        update_bot_status("offline", "微信已离线")
+            # 同步间隔由同步引擎控制：有消息时立即再次同步，空闲时退避
+    finally:
+        await sync_engine.stop()
+        await xybot.dispatcher.stop()
+        await xybot.event_bridge.stop()
+        # 写入缓冲中的消息记录
+        await message_db.close()
+        await keyval_db.close()
+        # 关闭共享HTTP连接池
+        await bot.close()
 
     # 返回机器人实例（此处不会执行到，因为上面的无限循环）
     return xybot
\ No newline at end of file
@@ -1,11 +1,15 @@
+import asyncio
+import bisect
 import datetime
+import functools
+import threading
 import tomllib
 from concurrent.futures import ThreadPoolExecutor
-from typing import Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 from loguru import logger
-from sqlalchemy import Column, String, Integer, DateTime, create_engine, JSON, Boolean
-from sqlalchemy import update
+from sqlalchemy import Column, String, Integer, DateTime, create_engine, event, JSON, Boolean
+from sqlalchemy import select, update
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -43,14 +47,32 @@ class XYBotDB(metaclass=Singleton):
 
         self.database_url = main_config["XYBot"]["XYBotDB-url"]
         self.engine = create_engine(self.database_url)
+        if self.database_url.startswith("sqlite"):
+            # WAL 模式下读连接不会被写事务阻塞
+            event.listen(self.engine, "connect", self._set_sqlite_pragma)
         self.DBSession = sessionmaker(bind=self.engine)
 
         # 创建表
         Base.metadata.create_all(self.engine)
         logger.success("数据库初始化成功")
 
-        # 创建线程池执行器
+        # 创建线程池执行器：写操作串行执行，读操作使用独立的小线程池
         self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=main_config["XYBot"].get("XYBotDB-read-workers", 4),
+            thread_name_prefix="database-read")
+
+        # 积分排行的内存索引，首次查询排行时从数据库加载，之后随积分写操作更新
+        self._ranking_lock = threading.Lock()
+        self._ranking_points: Optional[Dict[str, int]] = None
+        self._ranking: List[Tuple[int, str]] = []  # (-积分, wxid)，按积分从高到低排列
+
+    @staticmethod
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
 
     def _execute_in_queue(self, method, *args, **kwargs):
         """在队列中执行数据库操作"""
@@ -81,8 +103,13 @@ class XYBotDB(metaclass=Singleton):
                 # User doesn't exist, create new
                 user = User(wxid=wxid, points=num)
                 session.add(user)
+            # 在同一会话中读回积分，用绝对值更新排行，避免与其他写操作交错时重复累加
+            new_points = session.execute(
+                select(User.points).where(User.wxid == wxid)
+            ).scalar_one()
             logger.info(f"数据库: 用户{wxid}积分增加{num}")
             session.commit()
+            self._update_ranking(wxid, points=new_points)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -109,6 +136,7 @@ class XYBotDB(metaclass=Singleton):
                 session.add(user)
             logger.info(f"数据库: 用户{wxid}积分设置为{num}")
             session.commit()
+            self._update_ranking(wxid, points=num)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -190,13 +218,68 @@ class XYBotDB(metaclass=Singleton):
 
     def get_leaderboard(self, count: int) -> list:
         """Get points leaderboard"""
+        with self._ranking_lock:
+            self._ensure_ranking()
+            return [(wxid, -neg_points) for neg_points, wxid in self._ranking[:count]]
+
+    def get_points_many(self, wxids: Iterable[str]) -> Dict[str, int]:
+        """批量获取积分，不存在的用户积分为0"""
+        wxids = list(dict.fromkeys(wxids))
+        with self._ranking_lock:
+            if self._ranking_points is not None:
+                return {wxid: self._ranking_points.get(wxid, 0) for wxid in wxids}
+
+        points = dict.fromkeys(wxids, 0)
         session = self.DBSession()
         try:
-            users = session.query(User).order_by(User.points.desc()).limit(count).all()
-            return [(user.wxid, user.points) for user in users]
+            # 分批查询，避免超过 SQLite 的参数数量限制
+            for i in range(0, len(wxids), 500):
+                rows = session.execute(
+                    select(User.wxid, User.points).where(User.wxid.in_(wxids[i:i + 500]))
+                ).all()
+                points.update(rows)
+            return points
         finally:
             session.close()
 
+    def get_leaderboard_for(self, wxids: Iterable[str], limit: int) -> List[Tuple[str, int]]:
+        """获取指定用户(如群成员)的积分排行，积分为0的用户不参与排名"""
+        members = set(wxids)
+        result = []
+        with self._ranking_lock:
+            self._ensure_ranking()
+            for neg_points, wxid in self._ranking:
+                if len(result) >= limit:
+                    break
+                if neg_points != 0 and wxid in members:
+                    result.append((wxid, -neg_points))
+        return result
+
+    def _ensure_ranking(self):
+        """加载积分排行索引，调用方需持有 _ranking_lock"""
+        if self._ranking_points is not None:
+            return
+        session = self.DBSession()
+        try:
+            rows = session.execute(select(User.wxid, User.points)).all()
+        finally:
+            session.close()
+        self._ranking_points = {wxid: points for wxid, points in rows}
+        self._ranking = sorted((-points, wxid) for wxid, points in rows)
+
+    def _update_ranking(self, wxid: str, points: int):
+        """积分写入成功后更新排行索引，索引未加载时忽略"""
+        with self._ranking_lock:
+            if self._ranking_points is None:
+                return
+            old = self._ranking_points.get(wxid)
+            if old is not None:
+                index = bisect.bisect_left(self._ranking, (-old, wxid))
+                if index < len(self._ranking) and self._ranking[index] == (-old, wxid):
+                    self._ranking.pop(index)
+            self._ranking_points[wxid] = points
+            bisect.insort(self._ranking, (-points, wxid))
+
     def set_whitelist(self, wxid: str, stat: bool) -> bool:
         """Set user's whitelist status"""
         session = self.DBSession()
@@ -259,7 +342,10 @@ class XYBotDB(metaclass=Singleton):
             if trader.points >= num:
                 trader.points -= num
                 target.points += num
+                trader_points, target_points = trader.points, target.points
                 session.commit()
+                self._update_ranking(trader_wxid, points=trader_points)
+                self._update_ranking(target_wxid, points=target_points)
                 logger.info(f"数据库: 用户{trader_wxid}给用户{target_wxid}转账{num}积分")
                 return True
             logger.info(f"数据库: 转账失败, 用户{trader_wxid}积分不足")
@@ -436,5 +522,110 @@ class XYBotDB(metaclass=Singleton):
         """确保关闭时清理资源"""
         if hasattr(self, 'executor'):
             self.executor.shutdown(wait=True)
+        if hasattr(self, 'read_executor'):
+            self.read_executor.shutdown(wait=True)
         if hasattr(self, 'engine'):
             self.engine.dispose()
+
+
+class AsyncXYBotDB:
+    """XYBotDB 的异步接口，供异步插件使用
+
+    数据库操作在线程池中执行，调用方 await 结果而不阻塞事件循环。
+    写操作进入 XYBotDB 的单线程写队列串行执行，读操作使用独立的读线程池。
+
+    例子:
+
+    - db = AsyncXYBotDB()
+    - points = await db.get_points(wxid)
+    """
+
+    TIMEOUT = 20  # 秒
+
+    def __init__(self, db: Optional[XYBotDB] = None):
+        self.db = db or XYBotDB()
+
+    async def _run(self, executor: ThreadPoolExecutor, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, functools.partial(method, *args, **kwargs)), self.TIMEOUT)
+        except Exception as e:
+            logger.error(f"数据库操作失败: {method.__name__} - {str(e)}")
+            raise
+
+    async def _read(self, method, *args, **kwargs):
+        return await self._run(self.db.read_executor, method, *args, **kwargs)
+
+    async def _write(self, method, *args, **kwargs):
+        return await self._run(self.db.executor, method, *args, **kwargs)
+
+    # USER
+
+    async def add_points(self, wxid: str, num: int) -> bool:
+        return await self._write(self.db._add_points, wxid, num)
+
+    async def set_points(self, wxid: str, num: int) -> bool:
+        return await self._write(self.db._set_points, wxid, num)
+
+    async def get_points(self, wxid: str) -> int:
+        return await self._read(self.db._get_points, wxid)
+
+    async def get_signin_stat(self, wxid: str) -> datetime.datetime:
+        return await self._read(self.db._get_signin_stat, wxid)
+
+    async def set_signin_stat(self, wxid: str, signin_time: datetime.datetime) -> bool:
+        return await self._write(self.db._set_signin_stat, wxid, signin_time)
+
+    async def reset_all_signin_stat(self) -> bool:
+        return await self._write(self.db.reset_all_signin_stat)
+
+    async def get_leaderboard(self, count: int) -> list:
+        return await self._read(self.db.get_leaderboard, count)
+
+    async def get_points_many(self, wxids: Iterable[str]) -> Dict[str, int]:
+        return await self._read(self.db.get_points_many, list(wxids))
+
+    async def get_leaderboard_for(self, wxids: Iterable[str], limit: int) -> List[Tuple[str, int]]:
+        return await self._read(self.db.get_leaderboard_for, list(wxids), limit)
+
+    async def set_whitelist(self, wxid: str, stat: bool) -> bool:
+        return await self._write(self.db.set_whitelist, wxid, stat)
+
+    async def get_whitelist(self, wxid: str) -> bool:
+        return await self._read(self.db.get_whitelist, wxid)
+
+    async def get_whitelist_list(self) -> list:
+        return await self._read(self.db.get_whitelist_list)
+
+    async def safe_trade_points(self, trader_wxid: str, target_wxid: str, num: int) -> bool:
+        return await self._write(self.db._safe_trade_points, trader_wxid, target_wxid, num)
+
+    async def get_user_list(self) -> list:
+        return await self._read(self.db.get_user_list)
+
+    async def get_llm_thread_id(self, wxid: str, namespace: str = None) -> Union[dict, str]:
+        return await self._read(self.db.get_llm_thread_id, wxid, namespace)
+
+    async def save_llm_thread_id(self, wxid: str, data: str, namespace: str) -> bool:
+        return await self._write(self.db.save_llm_thread_id, wxid, data, namespace)
+
+    async def delete_all_llm_thread_id(self) -> bool:
+        return await self._write(self.db.delete_all_llm_thread_id)
+
+    async def get_signin_streak(self, wxid: str) -> int:
+        return await self._read(self.db._get_signin_streak, wxid)
+
+    async def set_signin_streak(self, wxid: str, streak: int) -> bool:
+        return await self._write(self.db._set_signin_streak, wxid, streak)
+
+    # CHATROOM
+
+    async def get_chatroom_list(self) -> list:
+        return await self._read(self.db.get_chatroom_list)
+
+    async def get_chatroom_members(self, chatroom_id: str) -> set:
+        return await self._read(self.db.get_chatroom_members, chatroom_id)
+
+    async def set_chatroom_members(self, chatroom_id: str, members: set) -> bool:
+        return await self._write(self.db.set_chatroom_members, chatroom_id, members)
@@ -0,0 +1,86 @@
+"""
+SQLite 连接管理
+每个线程复用一个长连接，异步调用方通过 run() 在专用线程池中执行数据库操作
+"""
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from loguru import logger
+
+
+class SQLiteConnectionManager:
+    """管理同一个数据库文件的连接
+
+    Args:
+        path: 数据库文件路径
+        workers: 异步接口使用的线程数
+    """
+
+    def __init__(self, path: str, workers: int = 2):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix=f"sqlite-{os.path.basename(path)}")
+
+    def connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接，首次使用时创建"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """在事务中执行，正常结束提交，出错回滚"""
+        conn = self.connection()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    async def run(self, func, *args, **kwargs):
+        """在数据库线程池中执行同步函数，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        """关闭所有连接，应在不再有数据库操作时调用"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"关闭数据库连接失败: {e}")
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(path: str) -> SQLiteConnectionManager:
+    """获取数据库文件对应的连接管理器，同一文件共享一个"""
+    path = os.path.abspath(path)
+    with _managers_lock:
+        if path not in _managers:
+            _managers[path] = SQLiteConnectionManager(path)
+        return _managers[path]
@@ -1,13 +1,38 @@
 import os
 import json
 import time
-import sqlite3
+import hashlib
 from datetime import datetime
 from loguru import logger
 
+from database.connection import get_connection_manager
+
 # 数据库文件路径
 DB_PATH = os.path.join("database", "contacts.db")
 
+# 与联系人共用一个数据库文件和连接管理器
+_db = get_connection_manager(DB_PATH)
+
+# 插入或更新群成员，已存在时保留 id 和 join_time
+UPSERT_MEMBER_SQL = '''
+INSERT INTO group_members
+(group_wxid, member_wxid, nickname, display_name, avatar, inviter_wxid, last_updated, extra_data, row_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(group_wxid, member_wxid) DO UPDATE SET
+    nickname = excluded.nickname,
+    display_name = excluded.display_name,
+    avatar = excluded.avatar,
+    inviter_wxid = excluded.inviter_wxid,
+    last_updated = excluded.last_updated,
+    extra_data = excluded.extra_data,
+    row_hash = excluded.row_hash
+'''
+
+# SQLite 单条语句的参数数量有上限，批量删除时分批
+_SQL_BATCH = 500
+
+MEMBER_COLUMNS = "member_wxid, nickname, display_name, avatar, inviter_wxid, join_time, last_updated, extra_data"
+
 def ensure_db_dir():
     """确保数据库目录存在"""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
@@ -15,117 +40,149 @@ def ensure_db_dir():
 def create_group_members_table():
     """创建群成员表"""
     ensure_db_dir()
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # 创建群成员表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS group_members (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        group_wxid TEXT NOT NULL,
-        member_wxid TEXT NOT NULL,
-        nickname TEXT,
-        display_name TEXT,
-        avatar TEXT,
-        inviter_wxid TEXT,
-        join_time INTEGER,
-        last_updated INTEGER,
-        extra_data TEXT,
-        UNIQUE(group_wxid, member_wxid)
-    )
-    ''')
-
-    # 创建索引以加快查询速度
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_group_wxid ON group_members (group_wxid)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_member_wxid ON group_members (member_wxid)')
-
-    conn.commit()
-    conn.close()
+    with _db.transaction() as cursor:
+        # 创建群成员表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS group_members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_wxid TEXT NOT NULL,
+            member_wxid TEXT NOT NULL,
+            nickname TEXT,
+            display_name TEXT,
+            avatar TEXT,
+            inviter_wxid TEXT,
+            join_time INTEGER,
+            last_updated INTEGER,
+            extra_data TEXT,
+            row_hash TEXT,
+            UNIQUE(group_wxid, member_wxid)
+        )
+        ''')
+
+        # 旧版本创建的表没有 row_hash 列
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(group_members)")}
+        if "row_hash" not in columns:
+            cursor.execute("ALTER TABLE group_members ADD COLUMN row_hash TEXT")
+
+        # 创建索引以加快查询速度
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_group_wxid ON group_members (group_wxid)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_member_wxid ON group_members (member_wxid)')
+
     logger.info("群成员数据表创建完成")
 
-def save_group_members_to_db(group_wxid, members):
+def _member_row(group_wxid, member, current_time):
+    """把群成员字典转换为 group_members 表的一行，缺少wxid时返回None"""
+    # 提取基本字段
+    member_wxid = member.get("wxid") or member.get("Wxid") or member.get("UserName") or ""
+    if not member_wxid:
+        return None
+
+    # 处理昵称字段
+    nickname = None
+    if member.get("NickName"):
+        nickname = member.get("NickName")
+    elif member.get("nickname"):
+        nickname = member.get("nickname")
+
+    # 处理显示名字段
+    display_name = None
+    if member.get("DisplayName"):
+        display_name = member.get("DisplayName")
+    elif member.get("display_name"):
+        display_name = member.get("display_name")
+
+    # 处理头像字段
+    avatar = None
+    if member.get("BigHeadImgUrl"):
+        avatar = member.get("BigHeadImgUrl")
+    elif member.get("SmallHeadImgUrl"):
+        avatar = member.get("SmallHeadImgUrl")
+    elif member.get("avatar"):
+        avatar = member.get("avatar")
+    elif member.get("HeadImgUrl"):
+        avatar = member.get("HeadImgUrl")
+
+    # 处理邀请人字段
+    inviter_wxid = member.get("InviterUserName") or ""
+
+    # 将其他字段存储为JSON
+    extra_data = {}
+    for key, value in member.items():
+        if key not in ["wxid", "Wxid", "UserName", "NickName", "nickname", "DisplayName", "display_name",
+                      "BigHeadImgUrl", "SmallHeadImgUrl", "avatar", "HeadImgUrl", "InviterUserName"]:
+            extra_data[key] = value
+
+    extra_data_json = json.dumps(extra_data, ensure_ascii=False, sort_keys=True)
+
+    # 成员内容的哈希，用于保存整群快照时跳过未变化的成员
+    row_hash = hashlib.sha1(json.dumps(
+        [nickname, display_name, avatar, inviter_wxid, extra_data_json], ensure_ascii=False
+    ).encode("utf-8")).hexdigest()
+    return (group_wxid, member_wxid, nickname, display_name, avatar, inviter_wxid, current_time, extra_data_json,
+            row_hash)
+
+def _row_to_member(row):
+    member = {
+        "wxid": row[0],
+        "nickname": row[1] or "",
+        "display_name": row[2] or "",
+        "avatar": row[3] or "",
+        "inviter_wxid": row[4] or "",
+        "join_time": row[5] or 0,
+        "last_updated": row[6] or 0
+    }
+
+    # 解析额外数据
+    if row[7]:
+        try:
+            extra_data = json.loads(row[7])
+            for key, value in extra_data.items():
+                member[key] = value
+        except:
+            pass
+    return member
+
+def save_group_members_to_db(group_wxid, members, remove_missing=True):
     """保存群成员列表到数据库
 
+    与数据库中已保存的成员按内容哈希比较，只写入新增或变化的成员。
+
     Args:
         group_wxid: 群聊的wxid
         members: 群成员列表
+        remove_missing: members 是否为完整的成员列表，为True时删除不在列表中的成员
     
     Returns:
         bool: 是否成功保存
     """
-    ensure_db_dir()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # 创建表（如果不存在）
-        create_group_members_table()
-
-        # 准备批量插入
         current_time = int(time.time())
+        rows = {}
         for member in members:
-            # 提取基本字段
-            member_wxid = member.get("wxid") or member.get("Wxid") or member.get("UserName") or ""
-            if not member_wxid:
+            row = _member_row(group_wxid, member, current_time)
+            if row is None:
                 logger.warning(f"跳过没有wxid的群成员: {member}")
                 continue
-
-            # 处理昵称字段
-            nickname = None
-            if member.get("NickName"):
-                nickname = member.get("NickName")
-            elif member.get("nickname"):
-                nickname = member.get("nickname")
-
-            # 处理显示名字段
-            display_name = None
-            if member.get("DisplayName"):
-                display_name = member.get("DisplayName")
-            elif member.get("display_name"):
-                display_name = member.get("display_name")
-
-            # 处理头像字段
-            avatar = None
-            if member.get("BigHeadImgUrl"):
-                avatar = member.get("BigHeadImgUrl")
-            elif member.get("SmallHeadImgUrl"):
-                avatar = member.get("SmallHeadImgUrl")
-            elif member.get("avatar"):
-                avatar = member.get("avatar")
-            elif member.get("HeadImgUrl"):
-                avatar = member.get("HeadImgUrl")
-
-            # 处理邀请人字段
-            inviter_wxid = member.get("InviterUserName") or ""
-
-            # 将其他字段存储为JSON
-            extra_data = {}
-            for key, value in member.items():
-                if key not in ["wxid", "Wxid", "UserName", "NickName", "nickname", "DisplayName", "display_name", 
-                              "BigHeadImgUrl", "SmallHeadImgUrl", "avatar", "HeadImgUrl", "InviterUserName"]:
-                    extra_data[key] = value
-
-            extra_data_json = json.dumps(extra_data, ensure_ascii=False)
-
-            # 插入或更新群成员
-            cursor.execute('''
-            INSERT OR REPLACE INTO group_members
-            (group_wxid, member_wxid, nickname, display_name, avatar, inviter_wxid, last_updated, extra_data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                group_wxid,
-                member_wxid,
-                nickname,
-                display_name,
-                avatar,
-                inviter_wxid,
-                current_time,
-                extra_data_json
-            ))
-
-        conn.commit()
-        conn.close()
-        logger.success(f"成功保存群 {group_wxid} 的 {len(members)} 个成员到数据库")
+            rows[row[1]] = row
+
+        with _db.transaction() as cursor:
+            stored = dict(cursor.execute(
+                'SELECT member_wxid, row_hash FROM group_members WHERE group_wxid = ?', (group_wxid,)
+            ).fetchall())
+
+            changed = [row for member_wxid, row in rows.items() if stored.get(member_wxid) != row[-1]]
+            if changed:
+                cursor.executemany(UPSERT_MEMBER_SQL, changed)
+
+            removed = [member_wxid for member_wxid in stored if member_wxid not in rows] if remove_missing else []
+            for i in range(0, len(removed), _SQL_BATCH):
+                batch = removed[i:i + _SQL_BATCH]
+                cursor.execute(
+                    f'DELETE FROM group_members WHERE group_wxid = ? AND member_wxid IN ({",".join("?" * len(batch))})',
+                    (group_wxid, *batch))
+
+        logger.success(f"成功保存群 {group_wxid} 的 {len(members)} 个成员到数据库"
+                       f"(写入 {len(changed)} 个，删除 {len(removed)} 个，未变化 {len(rows) - len(changed)} 个)")
         return True
     except Exception as e:
         logger.error(f"保存群成员到数据库失败: {str(e)}")
@@ -140,45 +197,16 @@ def get_group_members_from_db(group_wxid):
     Returns:
         list: 群成员列表
     """
-    ensure_db_dir()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # 查询群成员
-        cursor.execute('''
-        SELECT member_wxid, nickname, display_name, avatar, inviter_wxid, join_time, last_updated, extra_data
+        rows = _db.connection().execute(f'''
+        SELECT {MEMBER_COLUMNS}
         FROM group_members
         WHERE group_wxid = ?
         ORDER BY nickname COLLATE NOCASE
-        ''', (group_wxid,))
-        
-        rows = cursor.fetchall()
-        members = []
-        
-        for row in rows:
-            member = {
-                "wxid": row[0],
-                "nickname": row[1] or "",
-                "display_name": row[2] or "",
-                "avatar": row[3] or "",
-                "inviter_wxid": row[4] or "",
-                "join_time": row[5] or 0,
-                "last_updated": row[6] or 0
-            }
-            
-            # 解析额外数据
-            if row[7]:
-                try:
-                    extra_data = json.loads(row[7])
-                    for key, value in extra_data.items():
-                        member[key] = value
-                except:
-                    pass
-            
-            members.append(member)
-        
-        conn.close()
+        ''', (group_wxid,)).fetchall()
+
+        members = [_row_to_member(row) for row in rows]
         logger.info(f"从数据库加载了群 {group_wxid} 的 {len(members)} 个成员")
         return members
     except Exception as e:
@@ -195,44 +223,14 @@ def get_group_member_from_db(group_wxid, member_wxid):
     Returns:
         dict: 成员信息，如果不存在则返回None
     """
-    ensure_db_dir()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # 查询群成员
-        cursor.execute('''
-        SELECT member_wxid, nickname, display_name, avatar, inviter_wxid, join_time, last_updated, extra_data
+        row = _db.connection().execute(f'''
+        SELECT {MEMBER_COLUMNS}
         FROM group_members
         WHERE group_wxid = ? AND member_wxid = ?
-        ''', (group_wxid, member_wxid))
-        
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return None
-        
-        member = {
-            "wxid": row[0],
-            "nickname": row[1] or "",
-            "display_name": row[2] or "",
-            "avatar": row[3] or "",
-            "inviter_wxid": row[4] or "",
-            "join_time": row[5] or 0,
-            "last_updated": row[6] or 0
-        }
-        
-        # 解析额外数据
-        if row[7]:
-            try:
-                extra_data = json.loads(row[7])
-                for key, value in extra_data.items():
-                    member[key] = value
-            except:
-                pass
-        
-        conn.close()
-        return member
+        ''', (group_wxid, member_wxid)).fetchone()
+        return _row_to_member(row) if row else None
     except Exception as e:
         logger.error(f"从数据库获取群 {group_wxid} 的成员 {member_wxid} 失败: {str(e)}")
         return None
@@ -247,76 +245,17 @@ def update_group_member_in_db(group_wxid, member):
     Returns:
         bool: 是否成功更新
     """
-    ensure_db_dir()
+    member_wxid = member.get("wxid") or member.get("Wxid") or member.get("UserName") or ""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # 创建表（如果不存在）
-        create_group_members_table()
-
-        # 提取基本字段
-        member_wxid = member.get("wxid") or member.get("Wxid") or member.get("UserName") or ""
-        if not member_wxid:
+        row = _member_row(group_wxid, member, int(time.time()))
+        if row is None:
             logger.error("更新群成员失败: 缺少wxid")
             return False
 
-        # 处理昵称字段
-        nickname = None
-        if member.get("NickName"):
-            nickname = member.get("NickName")
-        elif member.get("nickname"):
-            nickname = member.get("nickname")
-
-        # 处理显示名字段
-        display_name = None
-        if member.get("DisplayName"):
-            display_name = member.get("DisplayName")
-        elif member.get("display_name"):
-            display_name = member.get("display_name")
-
-        # 处理头像字段
-        avatar = None
-        if member.get("BigHeadImgUrl"):
-            avatar = member.get("BigHeadImgUrl")
-        elif member.get("SmallHeadImgUrl"):
-            avatar = member.get("SmallHeadImgUrl")
-        elif member.get("avatar"):
-            avatar = member.get("avatar")
-        elif member.get("HeadImgUrl"):
-            avatar = member.get("HeadImgUrl")
-
-        # 处理邀请人字段
-        inviter_wxid = member.get("InviterUserName") or ""
-
-        # 将其他字段存储为JSON
-        extra_data = {}
-        for key, value in member.items():
-            if key not in ["wxid", "Wxid", "UserName", "NickName", "nickname", "DisplayName", "display_name", 
-                          "BigHeadImgUrl", "SmallHeadImgUrl", "avatar", "HeadImgUrl", "InviterUserName"]:
-                extra_data[key] = value
-
-        extra_data_json = json.dumps(extra_data, ensure_ascii=False)
-        current_time = int(time.time())
-
         # 插入或更新群成员
-        cursor.execute('''
-        INSERT OR REPLACE INTO group_members
-        (group_wxid, member_wxid, nickname, display_name, avatar, inviter_wxid, last_updated, extra_data)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            group_wxid,
-            member_wxid,
-            nickname,
-            display_name,
-            avatar,
-            inviter_wxid,
-            current_time,
-            extra_data_json
-        ))
-
-        conn.commit()
-        conn.close()
+        with _db.transaction() as cursor:
+            cursor.execute(UPSERT_MEMBER_SQL, row)
+
         logger.info(f"成功更新群 {group_wxid} 的成员 {member_wxid}")
         return True
     except Exception as e:
@@ -333,19 +272,14 @@ def delete_group_member_from_db(group_wxid, member_wxid):
     Returns:
         bool: 是否成功删除
     """
-    ensure_db_dir()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # 删除群成员
-        cursor.execute('''
-        DELETE FROM group_members
-        WHERE group_wxid = ? AND member_wxid = ?
-        ''', (group_wxid, member_wxid))
+        with _db.transaction() as cursor:
+            cursor.execute('''
+            DELETE FROM group_members
+            WHERE group_wxid = ? AND member_wxid = ?
+            ''', (group_wxid, member_wxid))
 
-        conn.commit()
-        conn.close()
         logger.info(f"从数据库删除群 {group_wxid} 的成员 {member_wxid}")
         return True
     except Exception as e:
@@ -361,16 +295,11 @@ def delete_all_group_members(group_wxid):
     Returns:
         bool: 是否成功删除
     """
-    ensure_db_dir()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # 删除群所有成员
-        cursor.execute('DELETE FROM group_members WHERE group_wxid = ?', (group_wxid,))
+        with _db.transaction() as cursor:
+            cursor.execute('DELETE FROM group_members WHERE group_wxid = ?', (group_wxid,))
 
-        conn.commit()
-        conn.close()
         logger.info(f"从数据库删除群 {group_wxid} 的所有成员")
         return True
     except Exception as e:
@@ -386,27 +315,32 @@ def get_member_groups(member_wxid):
     Returns:
         list: 群wxid列表
     """
-    ensure_db_dir()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # 查询成员所在的群
-        cursor.execute('''
+        rows = _db.connection().execute('''
         SELECT DISTINCT group_wxid
         FROM group_members
         WHERE member_wxid = ?
-        ''', (member_wxid,))
-        
-        rows = cursor.fetchall()
-        groups = [row[0] for row in rows]
-        
-        conn.close()
-        return groups
+        ''', (member_wxid,)).fetchall()
+        return [row[0] for row in rows]
     except Exception as e:
         logger.error(f"获取成员 {member_wxid} 所在的群失败: {str(e)}")
         return []
 
+# 异步接口，在数据库线程中执行，不阻塞事件循环
+
+async def save_group_members_to_db_async(group_wxid, members, remove_missing=True):
+    return await _db.run(save_group_members_to_db, group_wxid, members, remove_missing)
+
+async def get_group_members_from_db_async(group_wxid):
+    return await _db.run(get_group_members_from_db, group_wxid)
+
+async def get_group_member_from_db_async(group_wxid, member_wxid):
+    return await _db.run(get_group_member_from_db, group_wxid, member_wxid)
+
+async def update_group_member_in_db_async(group_wxid, member):
+    return await _db.run(update_group_member_in_db, group_wxid, member)
+
 # 初始化数据库
 def init_db():
     """初始化数据库"""
@@ -1,18 +1,30 @@
 import asyncio
+import heapq
+import json
 import logging
+import time
 import tomllib
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Union, List
+from typing import Dict, Optional, Union, List, Tuple
 
-from pydantic import validate_arguments
 from sqlalchemy import Column, String, Text, DateTime, delete, select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_scoped_session
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from utils.singleton import Singleton
 
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
 DeclarativeBase = declarative_base()
 
+# 缓存条目: (值, 过期时间戳)，值为None表示键不存在
+_Entry = Tuple[Optional[str], Optional[float]]
+_MISSING: _Entry = (None, None)
+
 
 class KeyValue(DeclarativeBase):
     __tablename__ = 'key_value_store'
@@ -23,12 +35,20 @@ class KeyValue(DeclarativeBase):
 
 
 class KeyvalDB(metaclass=Singleton):
+    """类Redis的键值存储
+
+    默认后端为 SQLite，前面有一层有容量上限的 LRU+TTL 内存缓存：读取优先命中缓存，
+    写入先进入缓存和待写缓冲，由后台任务批量写入数据库。过期时间用最小堆管理，到期即删除。
+    keyvalDB-backend 设置为 redis 时，所有操作直接转发到 [WechatAPIServer] 中配置的 Redis。
+    """
     _instance = None
 
     def __new__(cls):
         with open("main_config.toml", "rb") as f:
             main_config = tomllib.load(f)
-        db_url = main_config["XYBot"]["keyvalDB-url"]
+        xybot_config = main_config["XYBot"]
+        db_url = xybot_config["keyvalDB-url"]
+        strict_validation = xybot_config.get("strict-db-validation", False)
 
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -37,6 +57,8 @@ class KeyvalDB(metaclass=Singleton):
                 echo=False,
                 future=True
             )
+            # 调试时开启严格参数校验，类型不符直接报错而不是自动转换
+            cls._instance.strict_validation = strict_validation
             cls._async_session_factory = async_scoped_session(
                 sessionmaker(
                     cls._instance.engine,
@@ -45,16 +67,202 @@ class KeyvalDB(metaclass=Singleton):
                 ),
                 scopefunc=asyncio.current_task
             )
+
+            cls._instance.cache_size = max(1, xybot_config.get("keyvalDB-cache-size", 10000))
+            cls._instance.flush_interval = xybot_config.get("keyvalDB-flush-interval", 1.0)
+            cls._instance._cache = OrderedDict()
+            cls._instance._dirty = {}  # 待写入，值为None表示删除
+            cls._instance._flushing = {}  # 正在写入
+            cls._instance._write_seq = 0  # 每次写入加一，用于判断读取数据库期间是否有写入
+            cls._instance._expiry = {}
+            cls._instance._expiry_heap = []
+            cls._instance._tasks = []
+            cls._instance._lock = asyncio.Lock()
+            cls._instance._flush_lock = asyncio.Lock()  # 同一时间只有一次批量写入
+
+            cls._instance._redis = None
+            if xybot_config.get("keyvalDB-backend", "sqlite") == "redis":
+                if aioredis is None:
+                    logging.error("未安装redis库，键值存储继续使用SQLite")
+                else:
+                    api_config = main_config.get("WechatAPIServer", {})
+                    cls._instance._redis = aioredis.Redis(
+                        host=api_config.get("redis-host", "127.0.0.1"),
+                        port=api_config.get("redis-port", 6379),
+                        password=api_config.get("redis-password") or None,
+                        db=xybot_config.get("keyvalDB-redis-db", 1),
+                        decode_responses=True
+                    )
         return cls._instance
 
     async def initialize(self):
         """异步初始化数据库"""
+        if self._redis is not None:
+            await self._redis.ping()
+            return
+
         async with self.engine.begin() as conn:
             await conn.run_sync(DeclarativeBase.metadata.create_all)
-        # 启动后台清理任务
-        asyncio.create_task(self._cleanup_expired())
 
-    @validate_arguments
+        # 启动时清理一次已过期的数据，并把其余带过期时间的键放入过期堆
+        async with self._async_session_factory() as session:
+            await session.execute(delete(KeyValue).where(KeyValue.expire_time < datetime.now()))
+            await session.commit()
+            result = await session.execute(
+                select(KeyValue.key, KeyValue.expire_time).where(KeyValue.expire_time.is_not(None)))
+            for key, expire_time in result.all():
+                self._track_expiry(key, expire_time.timestamp())
+
+        # 启动后台写入和过期清理任务
+        self._tasks = [asyncio.create_task(self._flush_loop()),
+                       asyncio.create_task(self._expire_loop())]
+
+    # 参数校验
+
+    def _check_set_args(self, key, value, ex):
+        """校验 set 的参数，返回转换后的 (key, ex)"""
+        if self.strict_validation:
+            if not isinstance(key, str):
+                raise ValueError(f"参数 key 应为 str，实际为 {type(key).__name__}")
+            if not isinstance(value, (str, dict, list)):
+                raise ValueError(f"参数 value 应为 str、dict 或 list，实际为 {type(value).__name__}")
+            if ex is not None and (isinstance(ex, bool) or not isinstance(ex, (int, timedelta))):
+                raise ValueError(f"参数 ex 应为 int 或 timedelta，实际为 {type(ex).__name__}")
+            return key, ex
+
+        if value is None:
+            raise ValueError("参数 value 不能为空")
+        if type(key) is not str:
+            key = str(key)
+        if ex is not None and not isinstance(ex, (int, timedelta)):
+            try:
+                ex = int(ex)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"参数 ex 无法转换为 int: {ex!r}") from e
+        return key, ex
+
+    @staticmethod
+    def _expire_at(ex: Optional[Union[int, timedelta]]) -> Optional[float]:
+        if not ex:
+            return None
+        seconds = ex.total_seconds() if isinstance(ex, timedelta) else ex
+        return time.time() + seconds
+
+    # 缓存层
+
+    def _cache_put(self, key: str, entry: _Entry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _track_expiry(self, key: str, expire_at: Optional[float]):
+        if expire_at is None:
+            self._expiry.pop(key, None)
+            return
+        self._expiry[key] = expire_at
+        heapq.heappush(self._expiry_heap, (expire_at, key))
+
+    async def _load(self, key: str) -> _Entry:
+        async with self._async_session_factory() as session:
+            result = await session.get(KeyValue, key)
+            if not result:
+                return _MISSING
+            expire_at = result.expire_time.timestamp() if result.expire_time else None
+            return result.value, expire_at
+
+    def _memory_entry(self, key: str) -> Optional[_Entry]:
+        """依次查找待写缓冲、正在写入的数据和缓存，都没有时返回None"""
+        if key in self._dirty:
+            return self._dirty[key]
+        if key in self._flushing:
+            return self._flushing[key]
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        return None
+
+    async def _lookup(self, key: str) -> _Entry:
+        """依次查找内存和数据库，过期的键视为不存在"""
+        entry = self._memory_entry(key)
+        if entry is None:
+            write_seq = self._write_seq
+            entry = await self._load(key)
+            # 读取数据库期间同一个键可能被 set()/delete() 修改，此时以内存中的新值为准，
+            # 不能用读到的旧值覆盖缓存
+            newer = self._memory_entry(key)
+            if newer is not None:
+                entry = newer
+            elif write_seq == self._write_seq:
+                self._cache_put(key, entry)
+
+        value, expire_at = entry
+        if value is not None and expire_at is not None and expire_at <= time.time():
+            self._write(key, None, None)
+            return _MISSING
+        return entry
+
+    def _write(self, key: str, value: Optional[str], expire_at: Optional[float]):
+        """写入缓存和待写缓冲，value为None表示删除"""
+        entry = (value, expire_at)
+        self._write_seq += 1
+        self._dirty[key] = entry
+        self._cache_put(key, entry)
+        self._track_expiry(key, expire_at)
+
+    async def _flush(self):
+        """把待写缓冲中的数据在一个事务中写入数据库
+
+        后台任务、keys() 和 close() 都可能触发写入，用锁串行执行，避免两次写入交换缓冲、
+        互相清空或乱序提交。
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            self._flushing, self._dirty = self._dirty, {}
+            async with self._async_session_factory() as session:
+                try:
+                    deleted = [key for key, (value, _) in self._flushing.items() if value is None]
+                    if deleted:
+                        await session.execute(delete(KeyValue).where(KeyValue.key.in_(deleted)))
+                    for key, (value, expire_at) in self._flushing.items():
+                        if value is not None:
+                            await session.merge(KeyValue(
+                                key=key,
+                                value=value,
+                                expire_time=datetime.fromtimestamp(expire_at) if expire_at else None
+                            ))
+                    await session.commit()
+                except Exception as e:
+                    logging.error(f"批量写入键值失败: {str(e)}")
+                    await session.rollback()
+                    # 保留写入失败的数据，下次重试；期间被重新写入的键以新值为准
+                    self._dirty = {**self._flushing, **self._dirty}
+                except asyncio.CancelledError:
+                    self._dirty = {**self._flushing, **self._dirty}
+                    raise
+                finally:
+                    self._flushing = {}
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def _expire_loop(self):
+        """按过期堆删除到期的键"""
+        while True:
+            now = time.time()
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expire_at, key = heapq.heappop(self._expiry_heap)
+                # 键被重新设置过期时间后，旧的堆条目作废
+                if self._expiry.get(key) == expire_at:
+                    self._write(key, None, None)
+            delay = self._expiry_heap[0][0] - now if self._expiry_heap else 1
+            await asyncio.sleep(min(max(delay, 0.05), 1))
+
+    # 基本操作
+
     async def set(
             self,
             key: str,
@@ -62,103 +270,182 @@ class KeyvalDB(metaclass=Singleton):
             ex: Optional[Union[int, timedelta]] = None
     ) -> bool:
         """设置键值对，支持过期时间（秒或timedelta）"""
-        async with self._async_session_factory() as session:
-            try:
-                expire_time = None
-                if ex:
-                    # 统一处理时间类型转换
-                    if isinstance(ex, int):
-                        expire_time = datetime.now() + timedelta(seconds=ex)
-                    else:
-                        expire_time = datetime.now() + ex
-
-                kv = KeyValue(
-                    key=key,
-                    value=str(value),
-                    expire_time=expire_time
-                )
-                await session.merge(kv)
-                await session.commit()
-                return True
-            except Exception as e:
-                logging.error(f"设置键值失败: {str(e)}")
-                await session.rollback()
-                return False
+        key, ex = self._check_set_args(key, value, ex)
+        if self._redis is not None:
+            return bool(await self._redis.set(key, str(value), ex=ex or None))
+        self._write(key, str(value), self._expire_at(ex))
+        return True
 
     async def get(self, key: str) -> Optional[str]:
         """获取键值，自动处理过期数据"""
-        async with self._async_session_factory() as session:
-            result = await session.get(KeyValue, key)
-            if not result:
-                return None
-
-            if result.expire_time and result.expire_time < datetime.now():
-                await session.delete(result)
-                await session.commit()
-                return None
-
-            return result.value
+        if self._redis is not None:
+            return await self._redis.get(key)
+        value, _ = await self._lookup(key)
+        return value
 
     async def delete(self, key: str) -> bool:
         """删除键值"""
-        async with self._async_session_factory() as session:
-            result = await session.execute(delete(KeyValue).where(KeyValue.key == key))
-            await session.commit()
-            return result.rowcount > 0
+        if self._redis is not None:
+            return await self._redis.delete(key) > 0
+        value, _ = await self._lookup(key)
+        if value is None:
+            return False
+        self._write(key, None, None)
+        return True
 
     async def exists(self, key: str) -> bool:
         """检查键是否存在"""
-        async with self._async_session_factory() as session:
-            result = await session.get(KeyValue, key)
-            if result and result.expire_time and result.expire_time < datetime.now():
-                await session.delete(result)
-                await session.commit()
-                return False
-            return result is not None
+        if self._redis is not None:
+            return await self._redis.exists(key) > 0
+        value, _ = await self._lookup(key)
+        return value is not None
 
     async def ttl(self, key: str) -> int:
         """获取剩余生存时间（秒）"""
-        async with self._async_session_factory() as session:
-            result = await session.get(KeyValue, key)
-            if not result or not result.expire_time:
-                return -1
+        if self._redis is not None:
+            return await self._redis.ttl(key)
+        value, expire_at = await self._lookup(key)
+        if value is None or expire_at is None:
+            return -1
 
-            remaining = (result.expire_time - datetime.now()).total_seconds()
-            # 明确返回类型处理
-            return int(remaining) if remaining > 0 else -2
+        remaining = expire_at - time.time()
+        # 明确返回类型处理
+        return int(remaining) if remaining > 0 else -2
 
     async def expire(self, key: str, ex: Union[int, timedelta]) -> bool:
         """设置过期时间"""
-        async with self._async_session_factory() as session:
-            result = await session.get(KeyValue, key)
-            if not result:
-                return False
-
-            expire_time = datetime.now() + (ex if isinstance(ex, timedelta) else timedelta(seconds=ex))
-            result.expire_time = expire_time
-            await session.commit()
-            return True
+        if self._redis is not None:
+            return bool(await self._redis.expire(key, ex))
+        value, _ = await self._lookup(key)
+        if value is None:
+            return False
+        self._write(key, value, self._expire_at(ex))
+        return True
 
     async def keys(self, pattern: str = "*") -> List[str]:
         """查找匹配模式的键"""
+        if self._redis is not None:
+            return await self._redis.keys(pattern)
+        await self._flush()
+        now = time.time()
         async with self._async_session_factory() as session:
             # 显式指定查询列类型
-            query = select(KeyValue.key).where(KeyValue.key.like(pattern.replace("*", "%")))
+            query = select(KeyValue.key).where(
+                KeyValue.key.like(pattern.replace("*", "%").replace("?", "_")))
             result = await session.execute(query)
-            return [str(row[0]) for row in result.all()]  # 确保返回字符串类型
+            # 确保返回字符串类型，跳过已过期但尚未清理的键
+            return [str(row[0]) for row in result.all() if self._expiry.get(row[0], now + 1) > now]
 
-    async def _cleanup_expired(self, interval: int = 3600):
-        """后台定时清理过期数据"""
-        while True:
-            async with self._async_session_factory() as session:
-                await session.execute(
-                    delete(KeyValue).where(KeyValue.expire_time < datetime.now())
-                )
-                await session.commit()
-            await asyncio.sleep(interval)
+    # 批量与计数操作
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """批量获取键值，不存在的键返回None"""
+        if self._redis is not None:
+            return await self._redis.mget(keys)
+        return [(await self._lookup(key))[0] for key in keys]
+
+    async def mset(self, mapping: Dict[str, Union[str, dict, list]],
+                   ex: Optional[Union[int, timedelta]] = None) -> bool:
+        """批量设置键值对，ex 对所有键生效"""
+        checked = {}
+        for key, value in mapping.items():
+            key, ex = self._check_set_args(key, value, ex)
+            checked[key] = str(value)
+
+        if self._redis is not None:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                for key, value in checked.items():
+                    pipe.set(key, value, ex=ex or None)
+                await pipe.execute()
+            return True
+
+        expire_at = self._expire_at(ex)
+        for key, value in checked.items():
+            self._write(key, value, expire_at)
+        return True
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        """将键的整数值增加 amount，键不存在时视为0，保留原有过期时间"""
+        if self._redis is not None:
+            return await self._redis.incrby(key, amount)
+        async with self._lock:
+            value, expire_at = await self._lookup(key)
+            try:
+                result = int(value or 0) + amount
+            except ValueError:
+                raise ValueError(f"键 {key} 的值不是整数: {value!r}")
+            self._write(key, str(result), expire_at)
+            return result
+
+    # 哈希操作，SQLite 后端把整个哈希以JSON存为一个值
+
+    async def _load_hash(self, name: str) -> Tuple[Dict[str, str], Optional[float]]:
+        value, expire_at = await self._lookup(name)
+        if value is None:
+            return {}, None
+        try:
+            data = json.loads(value)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            raise ValueError(f"键 {name} 的值不是哈希")
+        return data, expire_at
+
+    async def hset(self, name: str, key: Optional[str] = None, value=None,
+                   mapping: Optional[Dict[str, object]] = None) -> int:
+        """设置哈希字段，返回新增字段的数量"""
+        fields = {str(k): str(v) for k, v in (mapping or {}).items()}
+        if key is not None:
+            fields[str(key)] = str(value)
+        if not fields:
+            return 0
+
+        if self._redis is not None:
+            return await self._redis.hset(name, mapping=fields)
+        async with self._lock:
+            data, expire_at = await self._load_hash(name)
+            added = sum(1 for field in fields if field not in data)
+            data.update(fields)
+            self._write(name, json.dumps(data, ensure_ascii=False), expire_at)
+            return added
+
+    async def hget(self, name: str, key: str) -> Optional[str]:
+        """获取哈希字段的值"""
+        if self._redis is not None:
+            return await self._redis.hget(name, key)
+        data, _ = await self._load_hash(name)
+        return data.get(key)
+
+    async def hgetall(self, name: str) -> Dict[str, str]:
+        """获取哈希的所有字段"""
+        if self._redis is not None:
+            return await self._redis.hgetall(name)
+        data, _ = await self._load_hash(name)
+        return data
+
+    async def hdel(self, name: str, *keys: str) -> int:
+        """删除哈希字段，返回删除的数量"""
+        if self._redis is not None:
+            return await self._redis.hdel(name, *keys)
+        async with self._lock:
+            data, expire_at = await self._load_hash(name)
+            removed = sum(1 for key in keys if data.pop(key, None) is not None)
+            if removed:
+                if data:
+                    self._write(name, json.dumps(data, ensure_ascii=False), expire_at)
+                else:
+                    self._write(name, None, None)
+            return removed
 
     async def close(self):
-        """关闭数据库连接"""
+        """写入缓冲中的数据并关闭数据库连接"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._redis is not None:
+            await self._redis.close()
+        await self._flush()
         await self.engine.dispose()
 
     async def __aenter__(self):
@@ -4,9 +4,8 @@ import tomllib
 from datetime import datetime, timedelta
 from typing import Optional, List
 
-from pydantic import validate_arguments
 from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, delete
-from sqlalchemy import select
+from sqlalchemy import event, insert, select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_scoped_session
 from sqlalchemy.orm import declarative_base, sessionmaker
 
@@ -29,13 +28,35 @@ class Message(DeclarativeBase):
     is_group = Column(Boolean, default=False, comment='是否群消息')
 
 
+def _check_arg(name: str, value, expected: type, strict: bool):
+    """检查参数类型：严格模式下类型不符直接报错，否则按 pydantic 宽松模式的方式转换"""
+    if type(value) is expected:
+        return value
+    if strict:
+        raise ValueError(f"参数 {name} 应为 {expected.__name__}，实际为 {type(value).__name__}")
+    if expected is bool and isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("1", "true", "yes", "on", "y", "t"):
+            return True
+        if lowered in ("0", "false", "no", "off", "n", "f", ""):
+            return False
+        raise ValueError(f"参数 {name} 无法转换为 bool: {value!r}")
+    if value is None:
+        raise ValueError(f"参数 {name} 不能为空")
+    try:
+        return expected(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"参数 {name} 无法转换为 {expected.__name__}: {value!r}") from e
+
+
 class MessageDB(metaclass=Singleton):
     _instance = None
 
     def __new__(cls):
         with open("main_config.toml", "rb") as f:
             main_config = tomllib.load(f)
-        db_url = main_config["XYBot"]["msgDB-url"]
+        xybot_config = main_config["XYBot"]
+        db_url = xybot_config["msgDB-url"]
 
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -44,6 +65,23 @@ class MessageDB(metaclass=Singleton):
                 echo=False,
                 future=True
             )
+            if db_url.startswith("sqlite"):
+                event.listen(cls._instance.engine.sync_engine, "connect", cls._set_sqlite_pragma)
+
+            # 写缓冲：消息先进入内存队列，由后台任务按批写入
+            # 调试时开启严格参数校验，类型不符直接报错而不是自动转换
+            cls._instance.strict_validation = xybot_config.get("strict-db-validation", False)
+
+            cls._instance.batch_size = max(1, xybot_config.get("msgDB-batch-size", 200))
+            cls._instance.flush_interval = xybot_config.get("msgDB-flush-interval", 0.5)
+            cls._instance.overflow_policy = xybot_config.get("msgDB-overflow-policy", "block")
+            cls._instance._pending = asyncio.Queue(maxsize=xybot_config.get("msgDB-queue-size", 10000))
+            cls._instance._flusher = None
+            cls._instance._batch = []
+            cls._instance._inflight = None
+            cls._instance._write_lock = asyncio.Lock()  # 各批按取出的顺序依次写入
+            cls._instance.written = 0
+            cls._instance.dropped = 0
             cls._async_session_factory = async_scoped_session(
                 sessionmaker(
                     cls._instance.engine,
@@ -54,12 +92,19 @@ class MessageDB(metaclass=Singleton):
             )
         return cls._instance
 
+    @staticmethod
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """SQLite 使用 WAL 日志，提交时不再每次 fsync"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
     async def initialize(self):
         """异步初始化数据库"""
         async with self.engine.begin() as conn:
             await conn.run_sync(DeclarativeBase.metadata.create_all)
 
-    @validate_arguments(config=dict(arbitrary_types_allowed=True))
     async def save_message(self,
                            msg_id: int,
                            sender_wxid: str = "",
@@ -67,26 +112,104 @@ class MessageDB(metaclass=Singleton):
                            msg_type: int = 0,
                            content: str = "",
                            is_group: bool = False) -> bool:
-        """异步保存消息到数据库"""
+        """保存消息到写缓冲，由后台任务批量写入数据库
+
+        队列已满时，overflow-policy 为 block 则等待，为 drop 则丢弃消息并返回 False
+        """
+        strict = self.strict_validation
+        row = {
+            "msg_id": _check_arg("msg_id", msg_id, int, strict),
+            "sender_wxid": _check_arg("sender_wxid", sender_wxid, str, strict),
+            "from_wxid": _check_arg("from_wxid", from_wxid, str, strict),
+            "msg_type": _check_arg("msg_type", msg_type, int, strict),
+            "content": _check_arg("content", content, str, strict),
+            "is_group": _check_arg("is_group", is_group, bool, strict),
+            "timestamp": datetime.now(),
+        }
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+        try:
+            self._pending.put_nowait(row)
+        except asyncio.QueueFull:
+            if self.overflow_policy == "drop":
+                self.dropped += 1
+                logging.warning(f"消息写入队列已满，丢弃消息: {msg_id}")
+                return False
+            await self._pending.put(row)
+        return True
+
+    def _take_pending(self, limit: int) -> List[dict]:
+        rows = []
+        while len(rows) < limit and not self._pending.empty():
+            rows.append(self._pending.get_nowait())
+        return rows
+
+    async def _write_rows(self, rows: List[dict]) -> bool:
+        """在一个事务中批量插入消息"""
         async with self._async_session_factory() as session:
             try:
-                message = Message(
-                    msg_id=msg_id,
-                    sender_wxid=sender_wxid,
-                    from_wxid=from_wxid,
-                    msg_type=msg_type,
-                    content=content,
-                    is_group=is_group,
-                    timestamp=datetime.now()
-                )
-                session.add(message)
+                await session.execute(insert(Message), rows)
                 await session.commit()
+                self.written += len(rows)
                 return True
             except Exception as e:
-                logging.error(f"保存消息失败: {str(e)}")
+                logging.error(f"批量保存消息失败({len(rows)}条): {str(e)}")
                 await session.rollback()
                 return False
 
+    async def _flush_loop(self):
+        """后台写入任务：攒够 batch-size 条或等待 flush-interval 秒后写入一批"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = [await self._pending.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                self._batch.extend(self._take_pending(self.batch_size - len(self._batch)))
+                timeout = deadline - loop.time()
+                if len(self._batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._write_in_order(self._take_batch)
+
+    def _take_batch(self) -> List[dict]:
+        rows, self._batch = self._batch, []
+        return rows
+
+    async def _write_in_order(self, take):
+        """取出一批消息并写入，同一时间只有一次写入
+
+        在锁内、上一次写入完成后才取出消息，先取出的消息一定先写入。
+        写入过程不随调用方取消，被取消时消息留在缓冲中，由 close 写入。
+        """
+        async with self._write_lock:
+            if self._inflight is not None and not self._inflight.done():
+                await asyncio.shield(self._inflight)
+            rows = take()
+            if rows:
+                self._inflight = asyncio.ensure_future(self._write_rows(rows))
+                await asyncio.shield(self._inflight)
+
+    async def flush(self):
+        """立即写入缓冲中的全部消息
+
+        包括后台任务已取出、还在等待凑满一批的消息。调用前保存的消息在返回时都已写入，且按保存顺序写入。
+        """
+        await self._write_in_order(lambda: self._take_batch() + self._take_pending(self._pending.qsize()))
+
+    def get_metrics(self) -> dict:
+        """获取写缓冲统计信息"""
+        return {
+            "pending": self._pending.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
     async def get_messages(self,
                            start_time: Optional[datetime] = None,
                            end_time: Optional[datetime] = None,
@@ -96,6 +219,7 @@ class MessageDB(metaclass=Singleton):
                            is_group: Optional[bool] = None,
                            limit: int = 100) -> List[Message]:
         """异步查询消息记录"""
+        await self.flush()
         async with self._async_session_factory() as session:
             try:
                 query = select(Message).order_by(Message.timestamp.desc()).limit(limit)
@@ -120,7 +244,15 @@ class MessageDB(metaclass=Singleton):
                 return []
 
     async def close(self):
-        """关闭数据库连接"""
+        """写入缓冲中的消息并关闭数据库连接"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
         await self.engine.dispose()
 
     async def cleanup_messages(self):
@@ -17,7 +17,9 @@ from bridge.reply import Reply, ReplyType
 from channel.chat_channel import ChatChannel
 from channel.chat_message import ChatMessage
 from channel.wx849.wx849_message import WX849Message  # 改为从wx849_message导入WX849Message
+from common.dedup_cache import DedupCache
 from common.expired_dict import ExpiredDict
+from common.session_executor import SessionExecutor
 from common.log import logger
 from common.singleton import singleton
 from common.time_check import time_checker
@@ -194,92 +196,64 @@ class WX849Channel(ChatChannel):
     """
     NOT_SUPPORT_REPLYTYPE = []
 
-    # 创建一个全局锁，用于线程安全的消息去重
-    _message_lock = threading.Lock()
-
-    # 创建一个全局集合，用于记录已处理的消息ID
-    _processed_message_ids = set()
-
-    # 不再使用单独的图片消息ID集合，所有消息ID都记录在_processed_message_ids中
+    # 所有消息ID都记录在received_msgs中去重，包括图片消息
 
     def _process_single_message_independently(self, msg_id: str, msg: dict):
-        """在独立线程中处理单条消息"""
+        """在消息工作线程中处理单条消息，同一会话的消息按顺序处理"""
         try:
-            # 创建新的事件循环
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
             # 记录处理信息
             thread_id = threading.get_ident()
-            logger.debug(f"[WX849] 独立消息处理线程 {thread_id} 开始处理 - 消息ID: {msg_id}")
-
-            try:
-                # 构建标准的消息对象
-                is_group = False
-
-                # 判断是否是群消息
-                from_user_id = msg.get("fromUserName", msg.get("FromUserName", ""))
-                to_user_id = msg.get("toUserName", msg.get("ToUserName", ""))
-
-                if isinstance(from_user_id, dict) and "string" in from_user_id:
-                    from_user_id = from_user_id["string"]
-                if isinstance(to_user_id, dict) and "string" in to_user_id:
-                    to_user_id = to_user_id["string"]
-
-                if from_user_id and from_user_id.endswith("@chatroom"):
-                    is_group = True
-                elif to_user_id and to_user_id.endswith("@chatroom"):
-                    is_group = True
-                    # 交换发送者和接收者，确保from_user_id是群ID
-                    from_user_id, to_user_id = to_user_id, from_user_id
-
-                # 创建消息对象
-                cmsg = WX849Message(msg, is_group)
-
-                # 注释掉从回调消息中获取发送者昵称的部分，改用API接口获取
-                # if "SenderNickName" in msg and msg["SenderNickName"]:
-                #     cmsg.sender_nickname = msg["SenderNickName"]
-                #     logger.debug(f"[WX849] 使用回调中的发送者昵称: {cmsg.sender_nickname}")
-
-                # 处理被@消息
-                if is_group and "@" in str(msg.get("Content", "")):
-                    # 检查是否有@列表
-                    at_list = []
-
-                    # 方法1: 从RawLogLine中提取@列表
-                    raw_log_line = msg.get("RawLogLine", "")
-
-                    # 检查是否是被@消息
-                    if raw_log_line and "收到被@消息" in raw_log_line:
-                        logger.debug(f"[WX849] 检测到被@消息: {raw_log_line}")
-                        # 设置is_at标志
-                        cmsg.is_at = True
-                    # 检查是否有IsAtMessage标志
-                    elif "IsAtMessage" in msg and msg["IsAtMessage"]:
-                        logger.debug(f"[WX849] 检测到IsAtMessage标志")
-                        # 设置is_at标志
-                        cmsg.is_at = True
+            logger.debug(f"[WX849] 消息工作线程 {thread_id} 开始处理 - 消息ID: {msg_id}")
+
+            # 构建标准的消息对象
+            is_group = False
+
+            # 判断是否是群消息
+            from_user_id = msg.get("fromUserName", msg.get("FromUserName", ""))
+            to_user_id = msg.get("toUserName", msg.get("ToUserName", ""))
+
+            if isinstance(from_user_id, dict) and "string" in from_user_id:
+                from_user_id = from_user_id["string"]
+            if isinstance(to_user_id, dict) and "string" in to_user_id:
+                to_user_id = to_user_id["string"]
+
+            if from_user_id and from_user_id.endswith("@chatroom"):
+                is_group = True
+            elif to_user_id and to_user_id.endswith("@chatroom"):
+                is_group = True
+                # 交换发送者和接收者，确保from_user_id是群ID
+                from_user_id, to_user_id = to_user_id, from_user_id
+
+            # 创建消息对象
+            cmsg = WX849Message(msg, is_group)
+
+            # 注释掉从回调消息中获取发送者昵称的部分，改用API接口获取
+            # if "SenderNickName" in msg and msg["SenderNickName"]:
+            #     cmsg.sender_nickname = msg["SenderNickName"]
+            #     logger.debug(f"[WX849] 使用回调中的发送者昵称: {cmsg.sender_nickname}")
+
+            # 处理被@消息
+            if is_group and "@" in str(msg.get("Content", "")):
+                # 检查是否有@列表
+                at_list = []
+
+                # 方法1: 从RawLogLine中提取@列表
+                raw_log_line = msg.get("RawLogLine", "")
+
+                # 检查是否是被@消息
+                if raw_log_line and "收到被@消息" in raw_log_line:
+                    logger.debug(f"[WX849] 检测到被@消息: {raw_log_line}")
+                    # 设置is_at标志
+                    cmsg.is_at = True
+                # 检查是否有IsAtMessage标志
+                elif "IsAtMessage" in msg and msg["IsAtMessage"]:
+                    logger.debug(f"[WX849] 检测到IsAtMessage标志")
+                    # 设置is_at标志
+                    cmsg.is_at = True
 
-                        # 尝试从日志行中提取@列表
-                        if "@:" in raw_log_line:
-                            try:
-                                at_part = raw_log_line.split("@:", 1)[1].split(" ", 1)[0]
-                                if at_part.startswith("[") and at_part.endswith("]"):
-                                    # 解析@列表
-                                    at_list_str = at_part[1:-1]  # 去除[]
-                                    if at_list_str:
-                                        at_items = at_list_str.split(",")
-                                        for item in at_items:
-                                            item = item.strip().strip("'\"")
-                                            if item:
-                                                at_list.append(item)
-                                        logger.debug(f"[WX849] 从被@消息中提取到@列表: {at_list}")
-                            except Exception as e:
-                                logger.debug(f"[WX849] 从被@消息中提取@列表失败: {e}")
-                    # 普通消息中的@列表提取
-                    elif raw_log_line and "@:" in raw_log_line:
+                    # 尝试从日志行中提取@列表
+                    if "@:" in raw_log_line:
                         try:
-                            # 尝试从日志行中提取@列表
                             at_part = raw_log_line.split("@:", 1)[1].split(" ", 1)[0]
                             if at_part.startswith("[") and at_part.endswith("]"):
                                 # 解析@列表
@@ -290,160 +264,134 @@ class WX849Channel(ChatChannel):
                                         item = item.strip().strip("'\"")
                                         if item:
                                             at_list.append(item)
-                                    logger.debug(f"[WX849] 从RawLogLine提取到@列表: {at_list}")
-                        except Exception as e:
-                            logger.debug(f"[WX849] 从RawLogLine提取@列表失败: {e}")
-
-                    # 方法2: 从MsgSource中提取@列表
-                    if not at_list and "MsgSource" in msg:
-                        try:
-                            msg_source = msg.get("MsgSource", "")
-                            if msg_source:
-                                root = ET.fromstring(msg_source)
-                                atuserlist_elem = root.find('atuserlist')
-                                if atuserlist_elem is not None and atuserlist_elem.text:
-                                    at_users = atuserlist_elem.text.split(",")
-                                    for user in at_users:
-                                        if user.strip():
-                                            at_list.append(user.strip())
-                                    logger.debug(f"[WX849] 从MsgSource提取到@列表: {at_list}")
+                                    logger.debug(f"[WX849] 从被@消息中提取到@列表: {at_list}")
                         except Exception as e:
-                            logger.debug(f"[WX849] 从MsgSource提取@列表失败: {e}")
-
-                    # 设置@列表到消息对象
-                    if at_list:
-                        cmsg.at_list = at_list
-                        # 设置is_at标志
-                        cmsg.is_at = self.wxid in at_list
-                        logger.debug(f"[WX849] 设置@列表: {at_list}, is_at: {cmsg.is_at}")
+                            logger.debug(f"[WX849] 从被@消息中提取@列表失败: {e}")
+                # 普通消息中的@列表提取
+                elif raw_log_line and "@:" in raw_log_line:
+                    try:
+                        # 尝试从日志行中提取@列表
+                        at_part = raw_log_line.split("@:", 1)[1].split(" ", 1)[0]
+                        if at_part.startswith("[") and at_part.endswith("]"):
+                            # 解析@列表
+                            at_list_str = at_part[1:-1]  # 去除[]
+                            if at_list_str:
+                                at_items = at_list_str.split(",")
+                                for item in at_items:
+                                    item = item.strip().strip("'\"")
+                                    if item:
+                                        at_list.append(item)
+                                logger.debug(f"[WX849] 从RawLogLine提取到@列表: {at_list}")
+                    except Exception as e:
+                        logger.debug(f"[WX849] 从RawLogLine提取@列表失败: {e}")
 
-                # 处理消息
-                logger.debug(f"[WX849] 处理回调消息: ID:{cmsg.msg_id} 类型:{cmsg.msg_type}")
+                # 方法2: 从MsgSource中提取@列表
+                if not at_list and "MsgSource" in msg:
+                    try:
+                        msg_source = msg.get("MsgSource", "")
+                        if msg_source:
+                            root = ET.fromstring(msg_source)
+                            atuserlist_elem = root.find('atuserlist')
+                            if atuserlist_elem is not None and atuserlist_elem.text:
+                                at_users = atuserlist_elem.text.split(",")
+                                for user in at_users:
+                                    if user.strip():
+                                        at_list.append(user.strip())
+                                logger.debug(f"[WX849] 从MsgSource提取到@列表: {at_list}")
+                    except Exception as e:
+                        logger.debug(f"[WX849] 从MsgSource提取@列表失败: {e}")
 
-                # 使用线程安全的方式检查和标记消息
-                with self.__class__._message_lock:
-                    # 检查消息是否已经处理过 - 使用全局集合
-                    if cmsg.msg_id in self.__class__._processed_message_ids:
-                        logger.debug(f"[WX849] 消息 {cmsg.msg_id} 已在全局集合中标记为处理过，忽略")
-                        return
+                # 设置@列表到消息对象
+                if at_list:
+                    cmsg.at_list = at_list
+                    # 设置is_at标志
+                    cmsg.is_at = self.wxid in at_list
+                    logger.debug(f"[WX849] 设置@列表: {at_list}, is_at: {cmsg.is_at}")
 
-                    # 检查本地字典中是否有这个消息ID（兼容旧代码）
-                    if cmsg.msg_id in self.received_msgs:
-                        logger.debug(f"[WX849] 消息 {cmsg.msg_id} 已在本地字典中标记为处理过，忽略")
-                        return
+            # 处理消息
+            logger.debug(f"[WX849] 处理回调消息: ID:{cmsg.msg_id} 类型:{cmsg.msg_type}")
 
-                    # 标记消息为已处理 - 在全局集合和本地字典中标记
-                    # 所有消息都在这里标记，包括图片消息
-                    self.__class__._processed_message_ids.add(cmsg.msg_id)
-                    self.received_msgs[cmsg.msg_id] = True
+            # 检查并标记消息，检查和标记是一次原子操作
+            if self.received_msgs.check_and_add(cmsg.msg_id):
+                logger.debug(f"[WX849] 消息 {cmsg.msg_id} 已处理过，忽略")
+                return
 
-                    # 如果集合太大，清理一下
-                    if len(self.__class__._processed_message_ids) > 1000:
-                        # 只保留最近的500条
-                        self.__class__._processed_message_ids = set(list(self.__class__._processed_message_ids)[-500:])
+            # 检查消息时间是否过期
+            create_time = cmsg.create_time  # 消息时间戳
+            current_time = int(time.time())
 
-                    # 不再使用_processed_image_ids集合
+            # 设置超时时间为60秒
+            timeout = 60
+            if int(create_time) < current_time - timeout:
+                logger.debug(f"[WX849] 历史消息 {cmsg.msg_id} 已跳过，时间差: {current_time - int(create_time)}秒")
+                return
 
-                # 检查消息时间是否过期
-                create_time = cmsg.create_time  # 消息时间戳
-                current_time = int(time.time())
+            # 创建一个全新的消息对象，避免共享引用
+            new_msg = WX849Message(msg, is_group)
 
-                # 设置超时时间为60秒
-                timeout = 60
-                if int(create_time) < current_time - timeout:
-                    logger.debug(f"[WX849] 历史消息 {cmsg.msg_id} 已跳过，时间差: {current_time - int(create_time)}秒")
-                    return
+            # 复制原始消息对象的属性
+            for attr_name in dir(cmsg):
+                if not attr_name.startswith('_') and not callable(getattr(cmsg, attr_name)):
+                    try:
+                        setattr(new_msg, attr_name, getattr(cmsg, attr_name))
+                    except Exception:
+                        pass
 
-                # 创建一个全新的消息对象，避免共享引用
-                new_msg = WX849Message(msg, is_group)
+            # 设置正确的接收者和会话ID
+            if is_group:
+                # 如果是群聊，接收者应该是群ID
+                new_msg.to_user_id = from_user_id  # 群ID
+                new_msg.session_id = from_user_id  # 使用群ID作为会话ID
+                new_msg.other_user_id = from_user_id  # 群ID
+                new_msg.is_group = True
 
-                # 复制原始消息对象的属性
-                for attr_name in dir(cmsg):
-                    if not attr_name.startswith('_') and not callable(getattr(cmsg, attr_name)):
-                        try:
-                            setattr(new_msg, attr_name, getattr(cmsg, attr_name))
-                        except Exception:
-                            pass
-
-                # 设置正确的接收者和会话ID
-                if is_group:
-                    # 如果是群聊，接收者应该是群ID
-                    new_msg.to_user_id = from_user_id  # 群ID
-                    new_msg.session_id = from_user_id  # 使用群ID作为会话ID
-                    new_msg.other_user_id = from_user_id  # 群ID
-                    new_msg.is_group = True
-
-                    # 确保群聊消息的其他字段也是正确的
-                    new_msg.group_id = from_user_id
-
-                    # 清除可能从其他消息继承的私聊相关字段
-                    if hasattr(new_msg, 'other_user_nickname'):
-                        delattr(new_msg, 'other_user_nickname')
-                else:
-                    # 如果是私聊，接收者应该是发送者ID
-                    sender_wxid = msg.get("SenderWxid", "")
-                    if not sender_wxid:
-                        sender_wxid = from_user_id
-
-                    new_msg.to_user_id = sender_wxid
-                    new_msg.session_id = sender_wxid  # 使用发送者ID作为会话ID
-                    new_msg.other_user_id = sender_wxid
-                    new_msg.is_group = False
-
-                    # 清除可能从其他消息继承的群聊相关字段
-                    if hasattr(new_msg, 'group_name'):
-                        delattr(new_msg, 'group_name')
-                    if hasattr(new_msg, 'group_id'):
-                        delattr(new_msg, 'group_id')
-                    if hasattr(new_msg, 'is_at'):
-                        new_msg.is_at = False
-                    if hasattr(new_msg, 'at_list'):
-                        new_msg.at_list = []
-
-                # 使用新的消息对象替换原始消息对象
-                cmsg = new_msg
-
-                # 创建一个新的线程来处理消息，确保每个消息都有完全独立的处理环境
-                def process_message_in_new_thread():
-                    try:
-                        # 创建新的事件循环
-                        msg_loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(msg_loop)
+                # 确保群聊消息的其他字段也是正确的
+                new_msg.group_id = from_user_id
 
-                        try:
-                            # 调用原有的消息处理逻辑
-                            if is_group:
-                                self.handle_group(cmsg)
-                            else:
-                                self.handle_single(cmsg)
-                        finally:
-                            # 关闭事件循环
-                            msg_loop.close()
-                    except Exception as e:
-                        logger.error(f"[WX849] 消息处理线程执行异常: {e}")
-                        logger.error(traceback.format_exc())
+                # 清除可能从其他消息继承的私聊相关字段
+                if hasattr(new_msg, 'other_user_nickname'):
+                    delattr(new_msg, 'other_user_nickname')
+            else:
+                # 如果是私聊，接收者应该是发送者ID
+                sender_wxid = msg.get("SenderWxid", "")
+                if not sender_wxid:
+                    sender_wxid = from_user_id
 
-                # 启动新线程处理消息
-                msg_thread = threading.Thread(target=process_message_in_new_thread)
-                msg_thread.daemon = True
-                msg_thread.start()
+                new_msg.to_user_id = sender_wxid
+                new_msg.session_id = sender_wxid  # 使用发送者ID作为会话ID
+                new_msg.other_user_id = sender_wxid
+                new_msg.is_group = False
 
-                # 等待消息处理线程完成
-                msg_thread.join()
-            finally:
-                # 关闭事件循环
-                loop.close()
+                # 清除可能从其他消息继承的群聊相关字段
+                if hasattr(new_msg, 'group_name'):
+                    delattr(new_msg, 'group_name')
+                if hasattr(new_msg, 'group_id'):
+                    delattr(new_msg, 'group_id')
+                if hasattr(new_msg, 'is_at'):
+                    new_msg.is_at = False
+                if hasattr(new_msg, 'at_list'):
+                    new_msg.at_list = []
+
+            # 使用新的消息对象替换原始消息对象
+            cmsg = new_msg
+
+            # 调用原有的消息处理逻辑
+            if is_group:
+                self.handle_group(cmsg)
+            else:
+                self.handle_single(cmsg)
 
-            logger.debug(f"[WX849] 独立消息处理线程 {thread_id} 处理完成 - 消息ID: {msg_id}")
+            logger.debug(f"[WX849] 消息工作线程 {thread_id} 处理完成 - 消息ID: {msg_id}")
         except Exception as e:
-            logger.error(f"[WX849] 独立消息处理线程 {thread_id} 执行异常: {e}")
+            logger.error(f"[WX849] 消息工作线程处理消息 {msg_id} 异常: {e}")
             logger.error(traceback.format_exc())
 
 
 
     def __init__(self):
         super().__init__()
-        self.received_msgs = ExpiredDict(conf().get("expires_in_seconds", 3600))
+        # 最近处理过的消息ID，超过容量时淘汰最早的，超过有效期后不再视为重复
+        self.received_msgs = DedupCache(conf().get("wx849_dedup_size", 10000), conf().get("expires_in_seconds", 3600))
         self.bot = None
         self.user_id = None
         self.name = None
@@ -475,6 +423,14 @@ class WX849Channel(ChatChannel):
             logger.info(f"[WX849] 消息回调API密钥: {self.api_key}")
         else:
             logger.info("[WX849] 未设置API密钥，将不进行授权验证")
+        # 消息事件桥，接收原始框架直接推送的结构化消息，端口为0时不启用
+        self.event_bridge_host = conf().get("wx849_event_bridge_host", "127.0.0.1")
+        self.event_bridge_port = conf().get("wx849_event_bridge_port", 8089)
+        self.event_bridge_key = conf().get("wx849_event_bridge_key", "")
+        self.event_bridge_server = None
+        # 消息处理和回复发送使用固定大小的线程池，不再为每条消息创建线程和事件循环
+        self.message_executor = SessionExecutor(conf().get("wx849_message_workers", 8), "wx849-msg")
+        self.reply_executor = SessionExecutor(conf().get("wx849_send_workers", 4), "wx849-send")
         # 新增属性，用于记录正在等待图片的会话
         self.waiting_for_image = ExpiredDict(300)  # 设置5分钟过期，固定值
         # 新增属性，用于记录会话最近图片消息
@@ -734,6 +690,8 @@ class WX849Channel(ChatChannel):
             await self.http_site.start()
             logger.info(f"[WX849] HTTP服务器已启动，回调URL: http://{self.listen_host}:{self.listen_port}/wx849/callback")
 
+            await self._start_event_bridge()
+
             # 显示回调配置说明
             logger.info("[WX849] 请在原始框架配置文件中添加以下回调设置:")
             logger.info(f"  \"callback_url\": \"http://{self.listen_host}:{self.listen_port}/wx849/callback\",")
@@ -749,6 +707,49 @@ class WX849Channel(ChatChannel):
             logger.error(traceback.format_exc())
             return False
 
+    async def _start_event_bridge(self):
+        """启动消息事件桥服务，接收原始框架推送的消息事件"""
+        if not self.event_bridge_port or self.event_bridge_server is not None:
+            return
+        try:
+            self.event_bridge_server = await asyncio.start_server(
+                self._handle_event_bridge, self.event_bridge_host, self.event_bridge_port)
+            logger.info(f"[WX849] 消息事件桥已启动，监听地址: {self.event_bridge_host}:{self.event_bridge_port}")
+        except OSError as e:
+            logger.error(f"[WX849] 启动消息事件桥失败: {e}")
+
+    async def _handle_event_bridge(self, reader, writer):
+        """处理事件桥连接：第一行为认证信息，回复确认后每行一个JSON消息事件"""
+        peer = writer.get_extra_info("peername")
+        try:
+            handshake = json.loads(await reader.readline() or b"{}")
+            if self.event_bridge_key and (not isinstance(handshake, dict)
+                                          or handshake.get("auth") != self.event_bridge_key):
+                logger.warning(f"[WX849] 事件桥连接认证失败，来源: {peer}")
+                writer.write(b'{"ok": false, "error": "unauthorized"}\n')
+                await writer.drain()
+                return
+            # 原始框架收到确认后才开始发送事件，认证失败时事件留在对方的缓冲中
+            writer.write(b'{"ok": true}\n')
+            await writer.drain()
+            logger.info(f"[WX849] 原始框架已连接消息事件桥，来源: {peer}")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    event = json.loads(line)
+                except ValueError as e:
+                    logger.warning(f"[WX849] 事件桥收到无效的消息事件: {e}")
+                    continue
+                await self._process_callback_message({"messages": [event]})
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"[WX849] 事件桥连接异常: {e}")
+        finally:
+            logger.info(f"[WX849] 消息事件桥连接已断开，来源: {peer}")
+            writer.close()
+
     # 添加回调处理方法
     async def _handle_callback(self, request):
         """处理原始框架的消息回调"""
@@ -782,9 +783,27 @@ class WX849Channel(ChatChannel):
             "wxid": self.wxid,
             "nickname": self.name,
             "is_logged_in": self.is_logged_in,
-            "version": "DOW-WX849-1.0"
+            "version": "DOW-WX849-1.0",
+            "dedup": self.received_msgs.get_stats(),
+            "message_executor": self.message_executor.get_stats(),
+            "reply_executor": self.reply_executor.get_stats(),
         })
 
+    @staticmethod
+    def _message_session_id(msg):
+        """获取回调消息所属的会话，群聊为群ID，私聊为对方wxid"""
+        user_ids = []
+        for key in ("FromUserName", "fromUserName", "ToUserName", "toUserName"):
+            user_id = msg.get(key, "")
+            if isinstance(user_id, dict):
+                user_id = user_id.get("string", "")
+            if user_id:
+                user_ids.append(user_id)
+        for user_id in user_ids:
+            if user_id.endswith("@chatroom"):
+                return user_id
+        return msg.get("FromWxid") or (user_ids[0] if user_ids else "")
+
     # 添加回调消息处理方法
     async def _process_callback_message(self, data):
         """处理从回调接收到的消息"""
@@ -1004,17 +1023,13 @@ class WX849Channel(ChatChannel):
                     msg_type = msg.get('MsgType', 0)
                     # 让图片消息正常处理
 
-                    # 创建独立的处理线程
-                    process = threading.Thread(
-                        target=self._process_single_message_independently,
-                        args=(msg_id, msg),
-                        daemon=True  # 设置为守护线程，主线程退出时自动结束
-                    )
-                    process.start()
-                    logger.debug(f"[WX849] 已启动独立处理流程 - 消息ID: {msg_id}")
+                    # 交给消息线程池，同一会话的消息按到达顺序处理
+                    self.message_executor.submit(self._message_session_id(msg),
+                                                 self._process_single_message_independently, msg_id, msg)
+                    logger.debug(f"[WX849] 已提交消息处理 - 消息ID: {msg_id}")
 
                 except Exception as e:
-                    logger.error(f"[WX849] 创建消息处理线程失败: {e}")
+                    logger.error(f"[WX849] 提交消息处理失败: {e}")
                     logger.error(traceback.format_exc())
 
             return True
@@ -1082,6 +1097,12 @@ class WX849Channel(ChatChannel):
             await self.http_site.stop()
         if self.http_runner:
             await self.http_runner.cleanup()
+        if self.event_bridge_server:
+            self.event_bridge_server.close()
+            await self.event_bridge_server.wait_closed()
+            self.event_bridge_server = None
+        self.message_executor.shutdown()
+        self.reply_executor.shutdown()
 
         logger.info("[WX849] HTTP服务器已关闭")
 
@@ -3348,243 +3369,6 @@ class WX849Channel(ChatChannel):
             logger.error(f"[WX849] 发送图片失败: {e}")
             return None
 
-    def _process_message_independently(self, message_id: str, msg: dict):
-        """在独立线程中处理单条消息"""
-        try:
-            # 创建新的事件循环
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            # 记录处理信息
-            thread_id = threading.get_ident()
-            logger.debug(f"[WX849] 独立消息处理线程 {thread_id} 开始处理 - 消息ID: {message_id}")
-
-            try:
-                # 构建标准的消息对象
-                is_group = False
-
-                # 判断是否是群消息
-                from_user_id = msg.get("fromUserName", msg.get("FromUserName", ""))
-                to_user_id = msg.get("toUserName", msg.get("ToUserName", ""))
-
-                if isinstance(from_user_id, dict) and "string" in from_user_id:
-                    from_user_id = from_user_id["string"]
-                if isinstance(to_user_id, dict) and "string" in to_user_id:
-                    to_user_id = to_user_id["string"]
-
-                if from_user_id and from_user_id.endswith("@chatroom"):
-                    is_group = True
-                elif to_user_id and to_user_id.endswith("@chatroom"):
-                    is_group = True
-                    # 交换发送者和接收者，确保from_user_id是群ID
-                    from_user_id, to_user_id = to_user_id, from_user_id
-
-                # 创建消息对象
-                cmsg = WX849Message(msg, is_group)
-
-                # 检查是否有发送者昵称信息，优先使用这个
-                if "SenderNickName" in msg and msg["SenderNickName"]:
-                    cmsg.sender_nickname = msg["SenderNickName"]
-                    logger.debug(f"[WX849] 使用回调中的发送者昵称: {cmsg.sender_nickname}")
-
-                # 处理被@消息
-                if is_group and "@" in str(msg.get("Content", "")):
-                    # 检查是否有@列表
-                    at_list = []
-
-                    # 方法1: 从RawLogLine中提取@列表
-                    raw_log_line = msg.get("RawLogLine", "")
-
-                    # 检查是否是被@消息
-                    if raw_log_line and "收到被@消息" in raw_log_line:
-                        logger.debug(f"[WX849] 检测到被@消息: {raw_log_line}")
-                        # 设置is_at标志
-                        cmsg.is_at = True
-                    # 检查是否有IsAtMessage标志
-                    elif "IsAtMessage" in msg and msg["IsAtMessage"]:
-                        logger.debug(f"[WX849] 检测到IsAtMessage标志")
-                        # 设置is_at标志
-                        cmsg.is_at = True
-
-                        # 确保at_list中包含机器人wxid
-                        if not hasattr(cmsg, 'at_list'):
-                            cmsg.at_list = []
-                        if self.wxid not in cmsg.at_list:
-                            cmsg.at_list.append(self.wxid)
-
-                        # 尝试从日志行中提取@列表
-                        if "@:" in raw_log_line:
-                            try:
-                                at_part = raw_log_line.split("@:", 1)[1].split(" ", 1)[0]
-                                if at_part.startswith("[") and at_part.endswith("]"):
-                                    # 解析@列表
-                                    at_list_str = at_part[1:-1]  # 去除[]
-                                    if at_list_str:
-                                        at_items = at_list_str.split(",")
-                                        for item in at_items:
-                                            item = item.strip().strip("'\"")
-                                            if item:
-                                                at_list.append(item)
-                                        logger.debug(f"[WX849] 从被@消息中提取到@列表: {at_list}")
-                            except Exception as e:
-                                logger.debug(f"[WX849] 从被@消息中提取@列表失败: {e}")
-                    # 普通消息中的@列表提取
-                    elif raw_log_line and "@:" in raw_log_line:
-                        try:
-                            # 尝试从日志行中提取@列表
-                            at_part = raw_log_line.split("@:", 1)[1].split(" ", 1)[0]
-                            if at_part.startswith("[") and at_part.endswith("]"):
-                                # 解析@列表
-                                at_list_str = at_part[1:-1]  # 去除[]
-                                if at_list_str:
-                                    at_items = at_list_str.split(",")
-                                    for item in at_items:
-                                        item = item.strip().strip("'\"")
-                                        if item:
-                                            at_list.append(item)
-                                    logger.debug(f"[WX849] 从RawLogLine提取到@列表: {at_list}")
-                        except Exception as e:
-                            logger.debug(f"[WX849] 从RawLogLine提取@列表失败: {e}")
-
-                    # 方法2: 从MsgSource中提取@列表
-                    if not at_list and "MsgSource" in msg:
-                        try:
-                            msg_source = msg.get("MsgSource", "")
-                            if msg_source:
-                                root = ET.fromstring(msg_source)
-                                atuserlist_elem = root.find('atuserlist')
-                                if atuserlist_elem is not None and atuserlist_elem.text:
-                                    at_users = atuserlist_elem.text.split(",")
-                                    for user in at_users:
-                                        if user.strip():
-                                            at_list.append(user.strip())
-                                    logger.debug(f"[WX849] 从MsgSource提取到@列表: {at_list}")
-                        except Exception as e:
-                            logger.debug(f"[WX849] 从MsgSource提取@列表失败: {e}")
-
-                    # 设置@列表到消息对象
-                    if at_list:
-                        cmsg.at_list = at_list
-                        # 设置is_at标志
-                        cmsg.is_at = self.wxid in at_list
-                        logger.debug(f"[WX849] 设置@列表: {at_list}, is_at: {cmsg.is_at}")
-
-                # 处理消息
-                logger.debug(f"[WX849] 处理回调消息: ID:{cmsg.msg_id} 类型:{cmsg.msg_type}")
-
-                # 使用线程安全的方式检查和标记消息
-                with self.__class__._message_lock:
-                    # 检查消息是否已经处理过
-                    if cmsg.msg_id in self.received_msgs:
-                        logger.debug(f"[WX849] 消息 {cmsg.msg_id} 已处理过，忽略")
-                        return
-
-                    # 标记消息为已处理
-                    self.received_msgs[cmsg.msg_id] = True
-
-                # 检查消息时间是否过期
-                create_time = cmsg.create_time  # 消息时间戳
-                current_time = int(time.time())
-
-                # 设置超时时间为60秒
-                timeout = 60
-                if int(create_time) < current_time - timeout:
-                    logger.debug(f"[WX849] 历史消息 {cmsg.msg_id} 已跳过，时间差: {current_time - int(create_time)}秒")
-                    return
-
-                # 创建一个全新的消息对象，避免共享引用
-                new_msg = WX849Message(msg, is_group)
-
-                # 复制原始消息对象的属性
-                for attr_name in dir(cmsg):
-                    if not attr_name.startswith('_') and not callable(getattr(cmsg, attr_name)):
-                        try:
-                            setattr(new_msg, attr_name, getattr(cmsg, attr_name))
-                        except Exception:
-                            pass
-
-                # 设置正确的接收者和会话ID
-                if is_group:
-                    # 如果是群聊，接收者应该是群ID
-                    new_msg.to_user_id = from_user_id  # 群ID
-                    new_msg.session_id = from_user_id  # 使用群ID作为会话ID
-                    new_msg.other_user_id = from_user_id  # 群ID
-                    new_msg.is_group = True
-
-                    # 确保群聊消息的其他字段也是正确的
-                    new_msg.group_id = from_user_id
-
-                    # 清除可能从其他消息继承的私聊相关字段
-                    if hasattr(new_msg, 'other_user_nickname'):
-                        delattr(new_msg, 'other_user_nickname')
-                else:
-                    # 如果是私聊，接收者应该是发送者ID
-                    sender_wxid = msg.get("SenderWxid", "")
-                    if not sender_wxid:
-                        sender_wxid = from_user_id
-
-                    new_msg.to_user_id = sender_wxid
-                    new_msg.session_id = sender_wxid  # 使用发送者ID作为会话ID
-                    new_msg.other_user_id = sender_wxid
-                    new_msg.is_group = False
-
-                    # 清除可能从其他消息继承的群聊相关字段
-                    if hasattr(new_msg, 'group_name'):
-                        delattr(new_msg, 'group_name')
-                    if hasattr(new_msg, 'group_id'):
-                        delattr(new_msg, 'group_id')
-                    if hasattr(new_msg, 'is_at'):
-                        new_msg.is_at = False
-                    if hasattr(new_msg, 'at_list'):
-                        new_msg.at_list = []
-                    # 确保没有任何群聊相关的属性
-                    for attr_name in dir(new_msg):
-                        if not attr_name.startswith('_') and not callable(getattr(new_msg, attr_name)):
-                            if 'group' in attr_name.lower() or 'at' in attr_name.lower():
-                                try:
-                                    delattr(new_msg, attr_name)
-                                except Exception:
-                                    pass
-
-                # 使用新的消息对象替换原始消息对象
-                cmsg = new_msg
-
-                # 创建一个新的线程来处理消息，确保每个消息都有完全独立的处理环境
-                def process_message_in_new_thread():
-                    try:
-                        # 创建新的事件循环
-                        msg_loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(msg_loop)
-
-                        try:
-                            # 调用原有的消息处理逻辑
-                            if is_group:
-                                self.handle_group(cmsg)
-                            else:
-                                self.handle_single(cmsg)
-                        finally:
-                            # 关闭事件循环
-                            msg_loop.close()
-                    except Exception as e:
-                        logger.error(f"[WX849] 消息处理线程执行异常: {e}")
-                        logger.error(traceback.format_exc())
-
-                # 启动新线程处理消息
-                msg_thread = threading.Thread(target=process_message_in_new_thread)
-                msg_thread.daemon = True
-                msg_thread.start()
-
-                # 等待消息处理线程完成
-                msg_thread.join()
-            finally:
-                # 关闭事件循环
-                loop.close()
-
-            logger.debug(f"[WX849] 独立消息处理线程 {thread_id} 处理完成 - 消息ID: {message_id}")
-        except Exception as e:
-            logger.error(f"[WX849] 独立消息处理线程 {thread_id} 执行异常: {e}")
-            logger.error(traceback.format_exc())
-
     async def _process_message_async(self, message_id: str, reply: Reply, context: Context, receiver: str, session_id: str):
         """异步处理消息"""
         try:
@@ -3982,8 +3766,7 @@ class WX849Channel(ChatChannel):
             msg_dict["Type"] = 43  # 视频消息
             msg_dict["Content"] = thread_local.reply.content  # 视频URL
 
-        # 创建一个完全独立的处理流程
-        # 每个消息都有自己的线程、事件循环和上下文对象
+        # 交给发送线程池处理，发给同一接收者的消息按顺序发送
 
         # 创建一个副本，避免线程本地存储的问题
         message_id = thread_local.message_id
@@ -3994,34 +3777,20 @@ class WX849Channel(ChatChannel):
 
         def process_message_in_isolated_environment():
             try:
-                # 创建新的事件循环
-                isolated_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(isolated_loop)
-
-                try:
-                    # 调用独立处理函数
-                    isolated_loop.run_until_complete(
-                        self._process_message_async(
-                            message_id,
-                            reply_copy,
-                            context_copy,
-                            receiver_copy,
-                            session_id_copy
-                        )
+                self.reply_executor.run_coroutine(
+                    self._process_message_async(
+                        message_id,
+                        reply_copy,
+                        context_copy,
+                        receiver_copy,
+                        session_id_copy
                     )
-                finally:
-                    # 关闭事件循环
-                    isolated_loop.close()
+                )
             except Exception as e:
-                logger.error(f"[WX849] 独立处理环境执行异常: {e}")
+                logger.error(f"[WX849] 发送消息执行异常: {e}")
                 logger.error(traceback.format_exc())
 
-        # 启动独立线程处理消息
-        process = threading.Thread(
-            target=process_message_in_isolated_environment,
-            daemon=True  # 设置为守护线程，主线程退出时自动结束
-        )
-        process.start()
+        self.reply_executor.submit(receiver_copy, process_message_in_isolated_environment)
 
         # 不等待处理完成，立即返回
         logger.debug(f"[WX849] 已启动独立处理流程 - 消息ID: {thread_local.message_id}, 接收者: {thread_local.receiver}, 消息类型: {thread_local.reply.type}")
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class DedupCache:
+    """消息去重缓存
+
+    按插入顺序保存最近见过的key，超过容量时淘汰最早插入的（先进先出，不是LRU），
+    超过有效期的key视为未见过。命中不会刷新key的位置和有效期，重复消息不会延长去重窗口，
+    插入顺序也就是过期顺序。查找和插入都是O(1)，线程安全。
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        """
+        :param maxsize: 最多保存的key数量
+        :param ttl: key的有效期（秒）
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl if ttl else 3600
+        self._entries = OrderedDict()  # key -> 过期时间，按插入顺序排列
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def check_and_add(self, key):
+        """检查key是否已见过，没见过则记录下来
+
+        :return: 已见过返回True，否则返回False
+        """
+        now = time.monotonic()
+        with self._lock:
+            expiry = self._entries.get(key)
+            if expiry is not None:
+                if expiry > now:
+                    self.hits += 1
+                    return True
+                del self._entries[key]
+                self.expired += 1
+
+            self.misses += 1
+            self._entries[key] = now + self.ttl
+            self._evict(now)
+            return False
+
+    def _evict(self, now):
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+        if now < self._next_purge:
+            return
+        # 最早插入的key最先过期，定期从头部清理过期的key
+        self._next_purge = now + 1
+        while self._entries:
+            key, expiry = next(iter(self._entries.items()))
+            if expiry > now:
+                break
+            self._entries.popitem(last=False)
+            self.expired += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            expiry = self._entries.get(key)
+            return expiry is not None and expiry > time.monotonic()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """获取去重统计信息"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "duplicates": self.hits,
+                "unique": self.misses,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
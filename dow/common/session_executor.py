@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from common.log import logger
+
+
+class SessionExecutor:
+    """固定大小的线程池，同一会话的任务按提交顺序依次执行，不同会话的任务并行执行
+
+    每个工作线程有一个长期使用的事件循环，任务中可以直接用 asyncio.get_event_loop()
+    运行协程，不需要为每条消息新建线程和事件循环。
+    """
+
+    def __init__(self, max_workers=8, name="session", batch_size=16):
+        """
+        :param max_workers: 工作线程数
+        :param name: 线程名前缀
+        :param batch_size: 一个会话连续执行的任务数，超过后让出线程给其他会话
+        """
+        self.batch_size = max(1, batch_size)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queues = {}  # 会话ID -> 待执行任务，会话在字典中表示已安排到线程池
+        self._local = threading.local()
+        self._loops = []  # 各工作线程的事件循环，关闭线程池时一起关闭
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def submit(self, session_id, fn, *args, **kwargs):
+        """提交任务，立即返回"""
+        task = (fn, args, kwargs, time.time())
+        with self._lock:
+            self.submitted += 1
+            queue = self._queues.get(session_id)
+            if queue is not None:
+                queue.append(task)
+                return
+            self._queues[session_id] = deque([task])
+        self._pool.submit(self._drain, session_id)
+
+    def run_coroutine(self, coro):
+        """在当前工作线程的事件循环中运行协程，只能在任务中调用"""
+        return self._loop().run_until_complete(coro)
+
+    def _loop(self):
+        loop = getattr(self._local, "loop", None)
+        if loop is None or loop.is_closed():
+            loop = asyncio.new_event_loop()
+            self._local.loop = loop
+            with self._lock:
+                self._loops.append(loop)
+        # 任务中的 asyncio.run() 等调用会清除当前事件循环，每次执行任务前重新设置
+        asyncio.set_event_loop(loop)
+        return loop
+
+    def _drain(self, session_id):
+        for _ in range(self.batch_size):
+            with self._lock:
+                queue = self._queues[session_id]
+                if not queue:
+                    del self._queues[session_id]
+                    return
+                fn, args, kwargs, submitted_at = queue.popleft()
+
+            self._loop()
+            failed = False
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                failed = True
+                logger.exception(f"[SessionExecutor] 会话 {session_id} 的任务执行异常: {e}")
+            latency = time.time() - submitted_at
+            with self._lock:
+                self.completed += 1
+                self.failed += failed
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+        # 执行了一批后重新排队，避免一个会话一直占用工作线程
+        self._pool.submit(self._drain, session_id)
+
+    def get_stats(self):
+        """获取执行统计信息"""
+        with self._lock:
+            pending = sum(len(queue) for queue in self._queues.values())
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "pending": pending,
+                "sessions": len(self._queues),
+                "avg_latency_ms": round(self.total_latency / self.completed * 1000, 1) if self.completed else 0,
+                "max_latency_ms": round(self.max_latency * 1000, 1),
+            }
+
+    def shutdown(self, wait=False):
+        """关闭线程池
+
+        :param wait: 为True时等待已提交的任务执行完并关闭各线程的事件循环，否则丢弃还没开始执行的任务
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        if wait:
+            with self._lock:
+                loops, self._loops = self._loops, []
+            for loop in loops:
+                loop.close()
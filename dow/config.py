@@ -189,6 +189,12 @@ available_setting = {
     "wx849_callback_host": "127.0.0.1",  # 微信849回调服务监听地址
     "wx849_callback_port": 8088,  # 微信849回调服务监听端口
     "wx849_callback_key": "",  # 微信849回调服务API密钥
+    "wx849_event_bridge_host": "127.0.0.1",  # 消息事件桥监听地址，原始框架直接推送结构化消息
+    "wx849_event_bridge_port": 8089,  # 消息事件桥监听端口，0表示不启用
+    "wx849_event_bridge_key": "",  # 消息事件桥密钥，需与原始框架 [EventBridge] key 一致，为空时不验证
+    "wx849_message_workers": 8,  # 处理回调消息的线程数，同一会话的消息按顺序处理
+    "wx849_send_workers": 4,  # 发送回复的线程数，发给同一接收者的消息按顺序发送
+    "wx849_dedup_size": 10000,  # 消息去重记录的最大数量，有效期为expires_in_seconds
     "log_level": "INFO",
     "wx849_wxid": "",
     "wx849_device_name": "DoW微信机器人",
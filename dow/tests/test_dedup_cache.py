@@ -0,0 +1,108 @@
+import threading
+import unittest
+from unittest import mock
+
+from common.dedup_cache import DedupCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDedupCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("common.dedup_cache.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_and_miss(self):
+        """第一次见到的key返回False，再次见到返回True"""
+        cache = DedupCache(maxsize=10, ttl=60)
+        self.assertFalse(cache.check_and_add("a"))
+        self.assertTrue(cache.check_and_add("a"))
+        self.assertFalse(cache.check_and_add("b"))
+        self.assertIn("a", cache)
+        self.assertNotIn("c", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_capacity_evicts_oldest(self):
+        """超过容量时按插入顺序淘汰，命中不改变淘汰顺序"""
+        cache = DedupCache(maxsize=3, ttl=60)
+        for key in ("a", "b", "c"):
+            cache.check_and_add(key)
+        self.assertTrue(cache.check_and_add("a"))  # 命中不刷新位置
+
+        cache.check_and_add("d")
+        self.assertNotIn("a", cache)
+        self.assertEqual([key for key in "abcd" if key in cache], ["b", "c", "d"])
+
+        cache.check_and_add("e")
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 3)
+        self.assertFalse(cache.check_and_add("a"))  # 被淘汰后视为没见过
+
+    def test_ttl_expiry(self):
+        """超过有效期的key视为没见过，重新记录后重新计时"""
+        cache = DedupCache(maxsize=10, ttl=60)
+        cache.check_and_add("a")
+        self.clock.now += 59
+        self.assertTrue(cache.check_and_add("a"))  # 命中不延长有效期
+
+        self.clock.now += 1
+        self.assertNotIn("a", cache)
+        self.assertFalse(cache.check_and_add("a"))
+        self.clock.now += 59
+        self.assertTrue(cache.check_and_add("a"))
+
+    def test_expired_keys_purged(self):
+        """过期的key在后续插入时从头部清理"""
+        cache = DedupCache(maxsize=10, ttl=60)
+        for key in ("a", "b", "c"):
+            cache.check_and_add(key)
+            self.clock.now += 1
+        self.clock.now += 58.5  # a、b已过期，c未过期
+        cache.check_and_add("d")
+        self.assertEqual(len(cache), 2)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.get_stats()["expired"], 2)
+
+    def test_stats(self):
+        cache = DedupCache(maxsize=2, ttl=60)
+        for key in ("a", "a", "b", "c", "c"):
+            cache.check_and_add(key)
+        self.clock.now += 61
+        cache.check_and_add("c")
+
+        self.assertEqual(cache.get_stats(), {
+            "size": 1,
+            "duplicates": 2,
+            "unique": 4,
+            "evicted": 1,
+            "expired": 2,
+        })
+
+    def test_concurrent_adds(self):
+        """多个线程同时提交同一批key，每个key只有一次未命中"""
+        cache = DedupCache(maxsize=10000, ttl=60)
+        misses = []
+
+        def worker():
+            misses.append(sum(not cache.check_and_add(i) for i in range(1000)))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(misses), 1000)
+        self.assertEqual(cache.get_stats()["duplicates"], 7000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from common.session_executor import SessionExecutor
+
+
+def wait_idle(executor, timeout=5):
+    """等待所有会话的任务执行完毕"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if executor.get_stats()["sessions"] == 0:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"任务未在 {timeout} 秒内执行完毕: {executor.get_stats()}")
+
+
+class TestSessionExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = None
+
+    def tearDown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+    def test_session_order(self):
+        """同一会话的任务按提交顺序执行"""
+        self.executor = SessionExecutor(max_workers=4, batch_size=3)
+        results = {f"s{i}": [] for i in range(5)}
+
+        def task(session_id, seq):
+            time.sleep(0.001 * (seq % 3))
+            results[session_id].append(seq)
+
+        for seq in range(40):
+            for session_id in results:
+                self.executor.submit(session_id, task, session_id, seq)
+        wait_idle(self.executor)
+
+        for session_id, seqs in results.items():
+            self.assertEqual(seqs, list(range(40)), session_id)
+
+    def test_sessions_run_in_parallel(self):
+        """一个会话阻塞时，其他会话的任务照常执行"""
+        self.executor = SessionExecutor(max_workers=2)
+        release = threading.Event()
+        done = threading.Event()
+
+        self.executor.submit("slow", release.wait, 5)
+        self.executor.submit("fast", done.set)
+        self.assertTrue(done.wait(2))
+        release.set()
+        wait_idle(self.executor)
+
+    def test_batch_size_hand_off(self):
+        """一个会话执行 batch_size 个任务后让出线程，其他会话的任务插入执行"""
+        self.executor = SessionExecutor(max_workers=1, batch_size=2)
+        release = threading.Event()
+        order = []
+
+        self.executor.submit("a", lambda: (release.wait(5), order.append("a1")))
+        for seq in range(2, 7):
+            self.executor.submit("a", order.append, f"a{seq}")
+        self.executor.submit("b", order.append, "b1")
+        release.set()
+        wait_idle(self.executor)
+
+        self.assertEqual(order, ["a1", "a2", "b1", "a3", "a4", "a5", "a6"])
+
+    def test_failure_counting(self):
+        """任务异常被计数，不影响同一会话后续的任务"""
+        self.executor = SessionExecutor(max_workers=4)
+        results = []
+
+        def fail():
+            raise ValueError("boom")
+
+        for i in range(20):
+            self.executor.submit(f"s{i % 4}", fail)
+        self.executor.submit("s0", results.append, "ok")
+        wait_idle(self.executor)
+
+        stats = self.executor.get_stats()
+        self.assertEqual(results, ["ok"])
+        self.assertEqual(stats["submitted"], 21)
+        self.assertEqual(stats["completed"], 21)
+        self.assertEqual(stats["failed"], 20)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_run_coroutine_reuses_loop(self):
+        """任务中可以运行协程，任务调用 asyncio.run() 后事件循环仍然可用"""
+        self.executor = SessionExecutor(max_workers=1)
+        loops = []
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        def task():
+            loops.append(self.executor.run_coroutine(current_loop()))
+
+        self.executor.submit("s", task)
+        self.executor.submit("s", asyncio.run, asyncio.sleep(0))
+        self.executor.submit("s", task)
+        wait_idle(self.executor)
+
+        self.assertEqual(len(loops), 2)
+        self.assertIs(loops[0], loops[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 from utils.plugin_base import PluginBase
 from utils.decorators import on_text_message, on_file_message, on_article_message
+from utils.message_parser import parse_xml
 import aiohttp
 import asyncio
 import re
@@ -311,7 +312,7 @@ class AutoSummary(PluginBase):
             logger.debug(f"完整XML内容: {content}")
 
             try:
-                root = ET.fromstring(content)
+                root = parse_xml(content)
                 logger.info(f"解析XML根节点: {root.tag}")
 
                 # 记录所有子节点以便调试
@@ -23,6 +23,7 @@ import os
 from WechatAPI import WechatAPIClient
 from database.XYBotDB import XYBotDB
 from utils.decorators import *
+from utils.message_parser import parse_xml
 from utils.plugin_base import PluginBase
 from gtts import gTTS
 import traceback
@@ -889,7 +890,7 @@ class Dify(PluginBase):
             # 如果有OriginalContent，尝试解析XML
             if "OriginalContent" in message:
                 try:
-                    root = ET.fromstring(message.get("OriginalContent", ""))
+                    root = parse_xml(message.get("OriginalContent", ""))
                     title = root.find("appmsg/title")
                     if title is not None and title.text:
                         # 检查引用消息的标题中是否包含@机器人
@@ -2498,7 +2499,7 @@ class Dify(PluginBase):
                 return True
 
             # 解析XML内容
-            root = ET.fromstring(message["Content"])
+            root = parse_xml(message["Content"])
             appmsg = root.find("appmsg")
             if appmsg is None:
                 return True
@@ -170,7 +170,7 @@ class Reminder(PluginBase):
         finally:
             conn.close()
 
-    @on_text_message(priority=90)
+    @on_text_message(priority=90, prefixes="commands")
     async def handle_text(self, bot: WechatAPIClient, message: dict):
         wxid = message["SenderWxid"]
         content = message["Content"].strip()
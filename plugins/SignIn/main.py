@@ -5,7 +5,7 @@ from random import randint
 import pytz
 
 from WechatAPI import WechatAPIClient
-from database.XYBotDB import XYBotDB
+from database.XYBotDB import AsyncXYBotDB
 from utils.decorators import *
 from utils.plugin_base import PluginBase
 
@@ -36,7 +36,7 @@ class SignIn(PluginBase):
 
         self.timezone = main_config["timezone"]
 
-        self.db = XYBotDB()
+        self.db = AsyncXYBotDB()
 
         # 每日签到排名数据
         self.today_signin_count = 0
@@ -48,7 +48,7 @@ class SignIn(PluginBase):
             self.today_signin_count = 0
             self.last_reset_date = current_date
 
-    @on_text_message
+    @on_text_message(commands="command")
     async def handle_text(self, bot: WechatAPIClient, message: dict):
         if not self.enable:
             return
@@ -64,7 +64,7 @@ class SignIn(PluginBase):
 
         sign_wxid = message["SenderWxid"]
 
-        last_sign = self.db.get_signin_stat(sign_wxid)
+        last_sign = await self.db.get_signin_stat(sign_wxid)
         now = datetime.now(tz=pytz.timezone(self.timezone)).replace(hour=0, minute=0, second=0, microsecond=0)
 
         # 确保 last_sign 用了时区
@@ -79,20 +79,20 @@ class SignIn(PluginBase):
 
         # 检查是否断开连续签到（超过1天没签到）
         if last_sign and (now - last_sign).days > 1:
-            old_streak = self.db.get_signin_streak(sign_wxid)
+            old_streak = await self.db.get_signin_streak(sign_wxid)
             streak = 1  # 重置连续签到天数
             streak_broken = True
         else:
-            old_streak = self.db.get_signin_streak(sign_wxid)
+            old_streak = await self.db.get_signin_streak(sign_wxid)
             streak = old_streak + 1 if old_streak else 1  # 如果是第一次签到，从1开始
             streak_broken = False
 
-        self.db.set_signin_stat(sign_wxid, now)
-        self.db.set_signin_streak(sign_wxid, streak)  # 设置连续签到天数
+        await self.db.set_signin_stat(sign_wxid, now)
+        await self.db.set_signin_streak(sign_wxid, streak)  # 设置连续签到天数
         streak_points = min(streak // self.streak_cycle, self.max_streak_point)  # 计算连续签到奖励
 
         signin_points = randint(self.min_points, self.max_points)  # 随机积分
-        self.db.add_points(sign_wxid, signin_points + streak_points)  # 增加积分
+        await self.db.add_points(sign_wxid, signin_points + streak_points)  # 增加积分
 
         # 增加签到计数并获取排名
         self.today_signin_count += 1
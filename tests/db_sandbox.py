@@ -0,0 +1,26 @@
+"""让测试中的联系人和群成员数据库使用临时目录
+
+导入 database 包时会在当前目录的 database/contacts.db 上建表并切换到 WAL 模式，
+在仓库根目录运行测试会改动提交的数据库文件。测试模块在导入 database 之前先导入本模块，
+数据库连接管理器在导入时记录的是临时目录中的绝对路径，之后切换回原目录也不受影响。
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+DB_DIR = None
+
+if "database.contacts_db" not in sys.modules:
+    DB_DIR = tempfile.mkdtemp(prefix="xybot-test-")
+    atexit.register(shutil.rmtree, DB_DIR, True)
+    _cwd = os.getcwd()
+    os.chdir(DB_DIR)
+    try:
+        import database.contacts_db  # noqa: F401
+        import database.group_members_db  # noqa: F401
+    except ImportError:  # 依赖未安装，由各测试模块自己跳过
+        pass
+    finally:
+        os.chdir(_cwd)
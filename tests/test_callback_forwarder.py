@@ -0,0 +1,142 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from contextlib import asynccontextmanager
+from unittest import mock
+
+try:
+    import aiohttp
+
+    from test_event_bridge import import_daemon
+    daemon = import_daemon()
+except ImportError as e:  # aiohttp、loguru 未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    async def text(self):
+        return self.body.decode()
+
+
+class FakeSession:
+    """代替 aiohttp.ClientSession，down 为 True 时模拟DOW框架不可用，记录每批送达的消息ID"""
+
+    def __init__(self):
+        self.down = False
+        self.attempts = 0
+        self.batches = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    @asynccontextmanager
+    async def post(self, url, json):
+        self.attempts += 1
+        if self.down:
+            raise aiohttp.ClientConnectionError("连接被拒绝")
+        self.batches.append([message["MsgId"] for message in json["messages"]])
+        yield FakeResponse(200, b'{"success": true}')
+
+
+class TestCallbackForwarder(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.spool_file = os.path.join(self._tmp.name, "spool.jsonl")
+        self.session = FakeSession()
+        for patch in (mock.patch.object(daemon.aiohttp, "ClientSession", return_value=self.session),
+                      mock.patch.object(daemon.aiohttp, "TCPConnector")):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def start_forwarder(self, **kwargs):
+        kwargs.setdefault("max_retries", 0)
+        forwarder = daemon.CallbackForwarder("http://dow/callback", spool_file=self.spool_file, **kwargs)
+        forwarder._replay_backoff = 0.05  # 缩短补发间隔
+        forwarder.start()
+        self.addCleanup(forwarder.stop)
+        return forwarder
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail("等待超时")
+            time.sleep(0.01)
+
+    def spooled_ids(self):
+        with open(self.spool_file, encoding="utf-8") as f:
+            return [[message["MsgId"] for message in json.loads(line)] for line in f]
+
+    def test_retry_then_spool(self):
+        self.session.down = True
+        forwarder = self.start_forwarder(max_retries=1)
+        forwarder.submit({"MsgId": 1})
+        self.wait_for(lambda: forwarder.spooled == 1)
+
+        self.assertEqual((self.session.attempts, forwarder.retries, forwarder.sent), (2, 1, 0))
+        self.assertEqual(self.spooled_ids(), [[1]])
+
+    def test_order_kept_while_spooled(self):
+        self.session.down = True
+        forwarder = self.start_forwarder()
+        forwarder.submit({"MsgId": 1})
+        self.wait_for(lambda: forwarder.spooled == 1)
+        time.sleep(0.1)  # 补发时间已到，补发失败后新消息追加到暂存文件
+        forwarder.submit({"MsgId": 2})
+        self.wait_for(lambda: forwarder.spooled == 2)
+        self.assertEqual(self.spooled_ids(), [[1], [2]])
+
+        self.session.down = False
+        time.sleep(0.1)
+        forwarder.submit({"MsgId": 3})
+        self.wait_for(lambda: forwarder.sent == 3)
+
+        self.assertEqual(self.session.batches, [[1], [2], [3]])
+        self.assertFalse(os.path.exists(self.spool_file))
+
+    def test_replay_after_restart(self):
+        with open(self.spool_file, "w", encoding="utf-8") as f:
+            f.write('[{"MsgId": 1}]\n[{"MsgId": 2}, {"MsgId": 3}]\n')
+        forwarder = self.start_forwarder()
+        self.wait_for(lambda: forwarder.sent == 3)
+        forwarder.submit({"MsgId": 4})
+        self.wait_for(lambda: forwarder.sent == 4)
+
+        self.assertEqual(self.session.batches, [[1], [2, 3], [4]])
+        self.assertFalse(os.path.exists(self.spool_file))
+
+    def test_spool_rewrite_failure_keeps_forwarder_running(self):
+        with open(self.spool_file, "w", encoding="utf-8") as f:
+            f.write('[{"MsgId": 1}]\n')
+        with mock.patch.object(daemon.os, "remove", side_effect=PermissionError("只读文件系统")):
+            forwarder = self.start_forwarder()
+            self.wait_for(lambda: forwarder.sent == 1)
+            time.sleep(0.1)
+            self.assertTrue(forwarder._thread.is_alive())
+            forwarder.submit({"MsgId": 2})  # 暂存文件删不掉时仍处于暂存状态，新消息排在后面
+            self.wait_for(lambda: forwarder.spooled == 1)
+
+        time.sleep(0.2)
+        forwarder.submit({"MsgId": 3})
+        self.wait_for(lambda: not os.path.exists(self.spool_file) and self.session.batches[-1] == [3])
+
+        self.assertTrue(forwarder._thread.is_alive())
+        delivered = [msg_id for batch in self.session.batches for msg_id in batch]
+        self.assertEqual(delivered[-3:], [1, 2, 3])  # 删除失败前送达的批次可能重复发送
+
+
+if __name__ == "__main__":
+    unittest.main()
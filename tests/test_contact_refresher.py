@@ -0,0 +1,142 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+
+try:
+    from utils.contact_refresher import ContactRefresher, parse_contact_detail
+except ImportError as e:  # loguru、sqlalchemy 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+class FakeBot:
+    """测试用的客户端，记录每次 get_contract_detail 的参数"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def get_contract_detail(self, wxids):
+        self.calls.append(wxids)
+        await asyncio.sleep(self.delay)
+        wxids = wxids if isinstance(wxids, list) else [wxids]
+        return [{"UserName": {"string": wxid}, "NickName": {"string": f"昵称_{wxid}"},
+                 "BigHeadImgUrl": f"http://avatar/{wxid}"} for wxid in wxids]
+
+
+class TestContactRefresher(unittest.IsolatedAsyncioTestCase):
+    """用内存字典代替 contacts.db，只测试刷新服务的调度"""
+
+    def setUp(self):
+        self.contacts = {}
+        self.saved = []
+        self.db_reads = 0
+        self.bot = FakeBot(delay=0.01)
+
+        async def get_contact(wxid):
+            self.db_reads += 1
+            return self.contacts.get(wxid)
+
+        async def update_contact(info):
+            self.saved.append(info)
+            self.contacts[info["wxid"]] = dict(info, last_updated=int(time.time()))
+            return True
+
+        patches = [mock.patch("utils.contact_refresher.get_contact_from_db_async", get_contact),
+                   mock.patch("utils.contact_refresher.update_contact_in_db_async", update_contact)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def make_refresher(self, **config):
+        config.setdefault("batch-delay", 0.01)
+        return ContactRefresher(self.bot, config)
+
+    async def test_concurrent_refreshes_single_flight(self):
+        refresher = self.make_refresher()
+        await asyncio.gather(*(refresher.refresh("wxid_a") for _ in range(50)))
+
+        self.assertEqual(self.bot.calls, ["wxid_a"])
+        self.assertEqual(self.db_reads, 1)
+        self.assertEqual(self.contacts["wxid_a"]["nickname"], "昵称_wxid_a")
+        self.assertEqual(refresher.get_metrics()["inflight"], 0)
+
+    async def test_pending_wxids_batched(self):
+        refresher = self.make_refresher()
+        wxids = [f"wxid_{i}" for i in range(5)]
+        await asyncio.gather(*(refresher.refresh(wxid) for wxid in wxids))
+
+        self.assertEqual(self.bot.calls, [wxids])
+        self.assertEqual(sorted(info["wxid"] for info in self.saved), wxids)
+        self.assertEqual(refresher.fetched, 5)
+
+    async def test_batch_split_at_batch_size(self):
+        refresher = self.make_refresher(**{"batch-size": 20})
+        wxids = [f"wxid_{i}" for i in range(45)]
+        await asyncio.gather(*(refresher.refresh(wxid) for wxid in wxids))
+
+        self.assertEqual([len(call) for call in self.bot.calls], [20, 20, 5])
+        self.assertEqual(len(self.contacts), 45)
+
+    async def test_refetch_after_ttl(self):
+        refresher = self.make_refresher(ttl=100)
+        now = time.time()
+        with mock.patch("utils.contact_refresher.time.time", return_value=now):
+            await refresher.refresh("wxid_a")
+            await refresher.refresh("wxid_a")
+        self.assertEqual(len(self.bot.calls), 1)
+        self.assertEqual(refresher.hits, 1)
+
+        self.contacts["wxid_a"]["last_updated"] = now
+        with mock.patch("utils.contact_refresher.time.time", return_value=now + 101):
+            await refresher.refresh("wxid_a")
+        self.assertEqual(len(self.bot.calls), 2)
+
+    async def test_fresh_db_contact_not_fetched(self):
+        self.contacts["wxid_a"] = {"wxid": "wxid_a", "nickname": "已有", "last_updated": int(time.time())}
+        refresher = self.make_refresher()
+        await refresher.refresh("wxid_a")
+        await refresher.refresh("wxid_a")
+
+        self.assertEqual(self.bot.calls, [])
+        self.assertEqual(self.db_reads, 1)
+
+    async def test_chatroom_saved_without_fetch(self):
+        refresher = self.make_refresher()
+        await refresher.refresh("123@chatroom")
+
+        self.assertEqual(self.bot.calls, [])
+        self.assertEqual(self.saved, [{"wxid": "123@chatroom", "nickname": "123@chatroom", "type": "group"}])
+
+    async def test_lru_bound(self):
+        refresher = self.make_refresher(**{"cache-size": 3})
+        for wxid in ("a", "b", "c"):
+            await refresher.refresh(wxid)
+        await refresher.refresh("a")  # 命中后移到末尾
+        await refresher.refresh("d")
+
+        self.assertEqual(list(refresher._refreshed), ["c", "a", "d"])
+        self.assertEqual(refresher.get_metrics()["cached"], 3)
+
+    async def test_failed_fetch_keeps_existing(self):
+        self.contacts["wxid_a"] = {"wxid": "wxid_a", "nickname": "旧昵称", "last_updated": 0}
+        self.bot.get_contract_detail = mock.AsyncMock(side_effect=RuntimeError("网络错误"))
+        refresher = self.make_refresher()
+        await asyncio.wait_for(refresher.refresh("wxid_a"), 1)
+
+        self.assertEqual(self.saved, [])
+        self.assertEqual(refresher.get_metrics()["inflight"], 0)
+
+    def test_parse_contact_detail(self):
+        detail = {"NickName": {"string": "张三"}, "SmallHeadImgUrl": "http://small",
+                  "Remark": {"string": "备注"}, "Alias": {"string": ""}}
+        self.assertEqual(parse_contact_detail("wxid_a", detail),
+                         {"wxid": "wxid_a", "nickname": "张三", "avatar": "http://small",
+                          "remark": "备注", "alias": ""})
+        self.assertEqual(parse_contact_detail("wxid_b", {})["nickname"], "wxid_b")
+
+
+if __name__ == "__main__":
+    unittest.main()
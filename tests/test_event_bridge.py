@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+try:
+    from utils import event_bridge
+    from utils.event_bridge import MessageEventBridge
+except ImportError as e:  # loguru 未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+def import_daemon():
+    """在临时目录中导入回调守护进程，它在导入时会在当前目录创建日志文件"""
+    if "wx849_callback_daemon" in sys.modules:
+        return sys.modules["wx849_callback_daemon"]
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="xybot-test-"))
+    try:
+        import wx849_callback_daemon
+    finally:
+        os.chdir(cwd)
+    return wx849_callback_daemon
+
+
+class FakeEventBridgeServer:
+    """与 WX849Channel._handle_event_bridge 相同的握手协议，记录收到的事件"""
+
+    def __init__(self, key="", ack=True):
+        self.key = key
+        self.ack = ack
+        self.events = []
+        self.accepted = 0
+        self.writers = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_connections()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_connections(self):
+        for writer in self.writers:
+            writer.close()
+        self.writers.clear()
+
+    async def handle(self, reader, writer):
+        handshake = json.loads(await reader.readline() or b"{}")
+        if not self.ack:
+            await reader.read()  # 不回复确认
+            writer.close()
+            return
+        if self.key and handshake.get("auth") != self.key:
+            writer.write(b'{"ok": false, "error": "unauthorized"}\n')
+            await writer.drain()
+            writer.close()
+            return
+        writer.write(b'{"ok": true}\n')
+        await writer.drain()
+        self.accepted += 1
+        self.writers.append(writer)
+        while line := await reader.readline():
+            self.events.append(json.loads(line)["MsgId"])
+        writer.close()
+
+
+class TestMessageEventBridge(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeEventBridgeServer(key="secret")
+        self.port = await self.server.start()
+        self.bridge = None
+
+    async def asyncTearDown(self):
+        if self.bridge is not None:
+            await self.bridge.stop()
+        await self.server.stop()
+
+    def start_bridge(self, key="secret"):
+        self.bridge = MessageEventBridge({"enabled": True, "port": self.port, "key": key})
+        self.bridge.start()
+        return self.bridge
+
+    async def wait_for(self, condition, timeout=5):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("等待超时")
+            await asyncio.sleep(0.01)
+
+    async def test_events_sent_after_ack(self):
+        bridge = self.start_bridge()
+        for msg_id in range(3):
+            bridge.publish({"MsgId": msg_id})
+        await self.wait_for(lambda: len(self.server.events) == 3)
+
+        self.assertEqual(self.server.events, [0, 1, 2])
+        self.assertEqual(bridge.get_metrics()["sent"], 3)
+        self.assertTrue(bridge.get_metrics()["connected"])
+
+    async def test_rejected_handshake_keeps_events_until_accepted(self):
+        bridge = self.start_bridge(key="wrong")
+        for msg_id in range(3):
+            bridge.publish({"MsgId": msg_id})
+        await self.wait_for(lambda: bridge.rejected >= 1)
+
+        metrics = bridge.get_metrics()
+        self.assertEqual((metrics["sent"], metrics["pending"], metrics["connected"]), (0, 3, False))
+
+        self.server.key = "wrong"  # 两边密钥改为一致后，重连时补发
+        await self.wait_for(lambda: len(self.server.events) == 3)
+        self.assertEqual(self.server.events, [0, 1, 2])
+        self.assertEqual(bridge.sent, 3)
+
+    async def test_handshake_without_ack_times_out(self):
+        self.server.ack = False
+        with mock.patch.object(event_bridge, "HANDSHAKE_TIMEOUT", 0.1):
+            bridge = self.start_bridge()
+            bridge.publish({"MsgId": 1})
+            await self.wait_for(lambda: bridge.rejected >= 1)
+        self.assertEqual((bridge.sent, len(bridge._events)), (0, 1))
+
+    async def test_events_requeued_after_disconnect(self):
+        bridge = self.start_bridge()
+        bridge.publish({"MsgId": 1})
+        await self.wait_for(lambda: self.server.events == [1])
+
+        self.server.drop_connections()
+        await asyncio.sleep(0.05)  # 对方关闭连接后本地读到EOF
+        bridge.publish({"MsgId": 2})
+        bridge.publish({"MsgId": 3})
+        await self.wait_for(lambda: len(self.server.events) == 3)
+
+        self.assertEqual(self.server.events, [1, 2, 3])
+        self.assertEqual(self.server.accepted, 2)
+        self.assertEqual(bridge.sent, 3)
+
+    async def test_bounded_buffer_drops_oldest(self):
+        bridge = MessageEventBridge({"enabled": True, "port": self.port, "key": "secret", "queue-size": 2})
+        for msg_id in range(3):
+            bridge.publish({"MsgId": msg_id})
+        self.assertEqual([json.loads(event)["MsgId"] for event in bridge._events], [1, 2])
+        self.assertEqual(bridge.dropped, 1)
+
+
+class TestDaemonEventBridgeProbe(unittest.IsolatedAsyncioTestCase):
+    """回调守护进程只有在DOW框架接受事件桥时才停止扫描日志"""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.daemon = import_daemon()
+        except ImportError as e:  # aiohttp 未安装
+            raise unittest.SkipTest(f"缺少依赖: {e}")
+
+    async def asyncSetUp(self):
+        self.server = FakeEventBridgeServer(key="secret")
+        self.port = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def probe(self, key):
+        return await asyncio.to_thread(self.daemon.probe_event_bridge, {"port": self.port, "key": key})
+
+    async def test_probe(self):
+        self.assertTrue(await self.probe("secret"))
+        self.assertFalse(await self.probe("wrong"))
+        self.server.ack = False
+        self.assertFalse(await asyncio.to_thread(
+            self.daemon.probe_event_bridge, {"port": self.port, "key": "secret"}, 0.2))
+
+    async def test_probe_without_server(self):
+        with socket.socket() as sock:  # 取一个没有监听的端口
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.assertFalse(await asyncio.to_thread(self.daemon.probe_event_bridge, {"port": port}))
+
+    async def test_watch_stops_monitor_once_accepted(self):
+        monitor = SimpleNamespace(is_running=True, tailer=mock.Mock())
+        self.server.key = "other"
+        watch = asyncio.create_task(asyncio.to_thread(
+            self.daemon.watch_event_bridge, monitor, {"port": self.port, "key": "secret"}, 0.05))
+        await asyncio.sleep(0.2)
+        self.assertTrue(monitor.is_running)
+
+        self.server.key = "secret"
+        await asyncio.wait_for(watch, 5)
+        self.assertFalse(monitor.is_running)
+        monitor.tailer.stop.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
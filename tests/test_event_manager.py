@@ -0,0 +1,335 @@
+import asyncio
+import pickle
+import re
+import time
+import unittest
+
+try:
+    from utils.decorators import on_text_message
+    from utils.event_manager import EventManager, MessageView, _DispatchIndex
+except ImportError as e:  # loguru 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+def make_message():
+    return {
+        "MsgId": 1,
+        "Content": "x" * 1024,
+        "Ats": ["wxid_a"],
+        "Extra": {"nested": [1, 2]},
+    }
+
+
+class TestMessageView(unittest.TestCase):
+    def test_immutable_fields_shared(self):
+        """字符串等不可变字段与原消息共享，不复制"""
+        message = make_message()
+        view = MessageView(message)
+        self.assertIs(view["Content"], message["Content"])
+
+    def test_mutable_fields_private(self):
+        """修改视图中的列表和字典不影响原消息"""
+        message = make_message()
+        view = MessageView(message)
+        view["Ats"].append("wxid_b")
+        view["Extra"]["nested"].append(3)
+        view.setdefault("New", []).append(1)
+        view["MsgId"] = 2
+
+        self.assertEqual(message, make_message())
+        self.assertEqual(view["Ats"], ["wxid_a", "wxid_b"])
+        self.assertEqual(view["Extra"]["nested"], [1, 2, 3])
+
+    def test_views_isolated(self):
+        message = make_message()
+        first, second = MessageView(message), MessageView(message)
+        first["Ats"].append("wxid_b")
+        self.assertEqual(second["Ats"], ["wxid_a"])
+
+    def test_copies_do_not_expose_original(self):
+        """dict(view)、{**view}、update、values、items 和 copy 都拿到私有副本"""
+        copies = [
+            lambda view: dict(view),
+            lambda view: {**view},
+            lambda view: {k: v for k, v in view.items()},
+            lambda view: dict(zip(view.keys(), view.values())),
+            lambda view: view.copy(),
+        ]
+        for make_copy in copies:
+            message = make_message()
+            copied = make_copy(MessageView(message))
+            copied["Ats"].append("wxid_b")
+            copied["Extra"]["nested"].append(3)
+            self.assertEqual(message, make_message())
+
+        message = make_message()
+        target = {}
+        target.update(MessageView(message))
+        target["Ats"].append("wxid_b")
+        self.assertEqual(message, make_message())
+
+    def test_get_and_pop(self):
+        message = make_message()
+        view = MessageView(message)
+        view.get("Ats").append("wxid_b")
+        self.assertIsNone(view.get("Missing"))
+        view.pop("Extra")["nested"].append(3)
+        self.assertNotIn("Extra", view)
+        self.assertEqual(message, make_message())
+
+    def test_pickle(self):
+        view = MessageView(make_message())
+        view["Ats"].append("wxid_b")
+        restored = pickle.loads(pickle.dumps(view))
+        self.assertIsInstance(restored, MessageView)
+        self.assertEqual(restored["Ats"], ["wxid_a", "wxid_b"])
+
+
+class EmitTestCase(unittest.IsolatedAsyncioTestCase):
+    """每个测试使用空的处理函数表和统计，结束后恢复"""
+
+    def setUp(self):
+        self._saved = (EventManager._handlers, EventManager._indexes, EventManager._stats,
+                       EventManager._handler_stats, EventManager.handler_timeout, EventManager.handler_budget)
+        EventManager._handlers = {}
+        EventManager._indexes = {}
+        EventManager._stats = {}
+        EventManager._handler_stats = {}
+        EventManager.configure()
+
+    def tearDown(self):
+        (EventManager._handlers, EventManager._indexes, EventManager._stats, EventManager._handler_stats,
+         EventManager.handler_timeout, EventManager.handler_budget) = self._saved
+
+    def bind(self, *handlers):
+        EventManager._handlers["text_message"] = [(handler, None, 50) for handler in handlers]
+        EventManager._rebuild_index("text_message")
+
+    async def emit_text(self, content):
+        await EventManager.emit("text_message", None, {"MsgId": 1, "Content": content})
+
+
+class TestEmitIsolation(EmitTestCase):
+    async def test_handler_changes_stay_private(self):
+        seen = []
+
+        async def mutate(bot, message, extra):
+            message["Ats"].append("wxid_b")
+            message["Content"] = "changed"
+            extra["key"].append(1)
+
+        async def observe(bot, message, extra):
+            seen.append((list(message["Ats"]), message["Content"], list(extra["key"])))
+
+        self.bind(mutate, observe)
+        message = make_message()
+        extra = {"key": []}
+        await EventManager.emit("text_message", None, message, extra=extra)
+
+        self.assertEqual(seen, [(["wxid_a"], "x" * 1024, [])])
+        self.assertEqual(message, make_message())
+        self.assertEqual(extra, {"key": []})
+
+
+class RoutedPlugin:
+    """每种路由方式各一个处理函数，记录被调用的处理函数名"""
+
+    menu_commands = ["菜单", "帮助"]
+
+    def __init__(self):
+        self.called = []
+
+    @on_text_message(commands=["签到"])
+    async def sign_in(self, bot, message):
+        self.called.append("sign_in")
+
+    @on_text_message(commands="menu_commands")  # 绑定时从插件实例的属性读取
+    async def menu(self, bot, message):
+        self.called.append("menu")
+
+    @on_text_message(prefixes=["#", "#重载"])
+    async def admin(self, bot, message):
+        self.called.append("admin")
+
+    @on_text_message(regex=r"天气\s*(\S+)")
+    async def weather(self, bot, message):
+        self.called.append("weather")
+
+    @on_text_message(commands=["点歌"], regex=[re.compile(r"来一首")])
+    async def song(self, bot, message):
+        self.called.append("song")
+
+    @on_text_message
+    async def log_all(self, bot, message):
+        self.called.append("log_all")
+
+
+class TestDispatchIndex(unittest.TestCase):
+    def handlers(self, *routes):
+        handlers = []
+        for commands, prefixes, regex in routes:
+            async def handler(bot, message):
+                pass
+            on_text_message(commands=commands, prefixes=prefixes, regex=regex)(handler)
+            handlers.append((handler, None, 50))
+        return handlers
+
+    def test_match(self):
+        index = _DispatchIndex(self.handlers((["签到"], None, None), (None, ["/", "/ai"], None),
+                                             (None, None, r"\d+$"), (None, None, None)))
+        self.assertEqual(index.routed, [True, True, True, False])
+        self.assertEqual(index.match("签到"), {0})
+        self.assertEqual(index.match("签到 今天"), {0})
+        self.assertEqual(index.match("签到了"), set())  # 命令词匹配整个第一个词
+        self.assertEqual(index.match("/ai 你好"), {1})
+        self.assertEqual(index.match("123"), {2})
+        self.assertEqual(index.match("a123"), set())  # 正则从开头匹配
+        self.assertEqual(index.match(""), set())
+
+    def test_no_routes(self):
+        index = _DispatchIndex(self.handlers((None, None, None), ([], [], None)))
+        self.assertFalse(index.has_routes)
+
+
+class TestRouting(EmitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.plugin = RoutedPlugin()
+        EventManager.bind_instance(self.plugin)
+
+    async def called(self, content):
+        self.plugin.called.clear()
+        await self.emit_text(content)
+        return sorted(self.plugin.called)
+
+    async def test_routed_handlers_only_for_matching_messages(self):
+        cases = {
+            "签到": ["log_all", "sign_in"],
+            "  帮助  ": ["log_all", "menu"],  # 内容去掉首尾空白后匹配
+            "菜单 第二页": ["log_all", "menu"],
+            "#重载插件": ["admin", "log_all"],
+            "天气 北京": ["log_all", "weather"],
+            "点歌 晴天": ["log_all", "song"],
+            "来一首晴天": ["log_all", "song"],
+            "今天天气 北京": ["log_all"],
+            "你好": ["log_all"],
+        }
+        for content, expected in cases.items():
+            with self.subTest(content=content):
+                self.assertEqual(await self.called(content), expected)
+
+    async def test_stats_count_invoked_handlers(self):
+        await self.called("你好")
+        await self.called("签到")
+        stats = EventManager.get_stats()["text_message"]
+        self.assertEqual((stats["messages"], stats["candidates"], stats["invoked"]), (2, 12, 3))
+
+    async def test_unbind_rebuilds_index(self):
+        EventManager.unbind_instance(self.plugin)
+        other = RoutedPlugin()
+        EventManager.bind_instance(other)
+
+        await self.emit_text("签到")
+        self.assertEqual(self.plugin.called, [])
+        self.assertEqual(sorted(other.called), ["log_all", "sign_in"])
+
+
+class TestExecution(EmitTestCase):
+    """旁观者并发执行，超时只按我们设置的期限计算"""
+
+    async def test_observers_run_concurrently(self):
+        events = []
+
+        @on_text_message(blocking=False)
+        async def observer(bot, message):
+            events.append("observer start")
+            await asyncio.sleep(0.1)
+            events.append("observer end")
+
+        @on_text_message
+        async def stop(bot, message):
+            events.append("stop")
+            await asyncio.sleep(0.1)
+            return False
+
+        @on_text_message
+        async def after_stop(bot, message):
+            events.append("after stop")
+
+        self.bind(observer, stop, observer, after_stop)
+        start = time.monotonic()
+        await self.emit_text("你好")
+
+        # 阻塞处理函数返回 False 不影响旁观者，emit 等旁观者全部结束后返回
+        self.assertLess(time.monotonic() - start, 0.18)  # 依次执行需要 0.3 秒
+        self.assertEqual(events.count("observer end"), 2)
+        self.assertNotIn("after stop", events)
+
+    async def test_observer_error_does_not_stop_event(self):
+        called = []
+
+        @on_text_message(blocking=False)
+        async def failing(bot, message):
+            raise RuntimeError("插件出错")
+
+        @on_text_message
+        async def blocking(bot, message):
+            called.append("blocking")
+
+        self.bind(failing, blocking)
+        await self.emit_text("你好")
+        self.assertEqual(called, ["blocking"])
+
+    async def test_handler_timeout(self):
+        called = []
+
+        @on_text_message(timeout=0.05)
+        async def slow(bot, message):
+            await asyncio.sleep(1)
+            called.append("slow")
+
+        @on_text_message
+        async def after(bot, message):
+            called.append("after")
+
+        self.bind(slow, after)
+        start = time.monotonic()
+        await self.emit_text("你好")
+
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(called, ["after"])  # 超时的处理函数被取消，事件继续传递
+        self.assertEqual(EventManager.get_handler_stats()[slow.__qualname__]["timeouts"], 1)
+
+    async def test_default_timeout_and_budget(self):
+        @on_text_message
+        async def slow(bot, message):
+            await asyncio.sleep(1)
+
+        @on_text_message(timeout=0.2)
+        async def over_budget(bot, message):
+            await asyncio.sleep(0.06)
+
+        EventManager.configure(handler_timeout=0.05, handler_budget=0.03)
+        self.bind(slow, over_budget)
+        await self.emit_text("你好")
+
+        stats = EventManager.get_handler_stats()
+        self.assertEqual(stats[slow.__qualname__]["timeouts"], 1)
+        # 处理函数自己的超时设置优先于全局配置
+        self.assertEqual(stats[over_budget.__qualname__]["timeouts"], 0)
+        self.assertEqual(stats[over_budget.__qualname__]["slow"], 1)
+
+    async def test_handler_own_timeout_error_not_counted(self):
+        """处理函数内部请求超时抛出的 TimeoutError 原样抛出，不算作处理函数超时"""
+        @on_text_message(timeout=1)
+        async def request(bot, message):
+            await asyncio.wait_for(asyncio.sleep(1), 0.01)
+
+        self.bind(request)
+        with self.assertRaises(TimeoutError):
+            await self.emit_text("你好")
+        self.assertEqual(EventManager.get_handler_stats()[request.__qualname__]["timeouts"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import time
+import unittest
+from unittest import mock
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+import wechatapi_sandbox  # noqa: F401  必须在导入 WechatAPI 之前
+
+try:
+    from utils.xybot import XYBot
+except ImportError as e:  # aiohttp、pysilk、xywechatpad_binary 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+GROUP = "12345678@chatroom"
+
+
+def make_members(bot_display_name="机器人群昵称"):
+    members = [{"wxid": "wxid_a", "nickname": "成员A"}, {"wxid": "wxid_b", "nickname": "成员B"}]
+    if bot_display_name is not None:
+        members.append({"wxid": "wxid_bot", "nickname": "机器人", "DisplayName": bot_display_name})
+    return members
+
+
+class TestGroupMemberCache(unittest.IsolatedAsyncioTestCase):
+    """群成员列表和机器人群昵称按 TTL 缓存，群成员变化的系统消息使缓存失效"""
+
+    def setUp(self):
+        # 只设置缓存用到的属性，不执行连接协议服务器的初始化
+        self.xybot = XYBot.__new__(XYBot)
+        self.xybot.wxid = "wxid_bot"
+        self.xybot.group_member_ttl = 600
+        self.xybot.display_name_ttl = 3600
+        self.xybot._group_members = {}
+        self.xybot._bot_display_names = {}
+        self.xybot.update_contact_info = mock.AsyncMock()
+        self.fetch = mock.AsyncMock(side_effect=lambda group_wxid: make_members())
+        self.xybot._fetch_chatroom_member_list = self.fetch
+
+    def later(self, seconds):
+        """把当前时间往后拨 seconds 秒"""
+        return mock.patch("time.time", return_value=time.time() + seconds)
+
+    async def test_member_list_cached_until_ttl(self):
+        members = await self.xybot.get_chatroom_member_list(GROUP)
+        members.clear()  # 修改返回的列表不影响缓存
+        self.assertEqual(await self.xybot.get_chatroom_member_list(GROUP), make_members())
+        self.assertEqual(self.fetch.await_count, 1)
+
+        await self.xybot.get_chatroom_member_list(GROUP, use_cache=False)
+        self.assertEqual(self.fetch.await_count, 2)
+
+        with self.later(599):
+            await self.xybot.get_chatroom_member_list(GROUP)
+        self.assertEqual(self.fetch.await_count, 2)
+        with self.later(601):
+            await self.xybot.get_chatroom_member_list(GROUP)
+        self.assertEqual(self.fetch.await_count, 3)
+
+    async def test_failed_fetch_not_cached(self):
+        self.fetch.side_effect = lambda group_wxid: []
+        self.assertEqual(await self.xybot.get_chatroom_member_list(GROUP), [])
+        self.assertEqual(await self.xybot.get_chatroom_member_list(GROUP), [])
+        self.assertEqual(self.fetch.await_count, 2)
+
+    async def test_bot_display_name_cached(self):
+        self.assertEqual(await self.xybot.get_bot_display_name(GROUP), "机器人群昵称")
+        self.assertEqual(await self.xybot.get_bot_display_name(GROUP), "机器人群昵称")
+        self.assertEqual(self.fetch.await_count, 1)
+
+    async def test_bot_display_name_falls_back_to_nickname(self):
+        self.fetch.side_effect = lambda group_wxid: make_members(bot_display_name="")
+        self.assertEqual(await self.xybot.get_bot_display_name(GROUP), "机器人")
+
+    async def test_bot_missing_from_roster_cached(self):
+        """成员列表中没有机器人时缓存空昵称，不会每条@消息都请求接口"""
+        self.fetch.side_effect = lambda group_wxid: make_members(bot_display_name=None)
+        self.assertEqual(await self.xybot.get_bot_display_name(GROUP), "")
+        self.assertEqual(await self.xybot.get_bot_display_name(GROUP), "")
+        self.assertEqual(self.fetch.await_count, 1)
+
+    async def test_bot_display_name_ttl(self):
+        await self.xybot.get_bot_display_name(GROUP)
+        with self.later(601):  # 成员列表过期不影响群昵称缓存
+            await self.xybot.get_bot_display_name(GROUP)
+        self.assertEqual(self.fetch.await_count, 1)
+        with self.later(3601):
+            await self.xybot.get_bot_display_name(GROUP)
+        self.assertEqual(self.fetch.await_count, 2)
+
+    async def test_invalidate_group_cache(self):
+        await self.xybot.get_bot_display_name(GROUP)
+
+        # 只清除成员列表时保留机器人的群昵称
+        self.xybot.invalidate_group_cache(GROUP)
+        await self.xybot.get_bot_display_name(GROUP)
+        self.assertEqual(self.fetch.await_count, 1)
+        await self.xybot.get_chatroom_member_list(GROUP)
+        self.assertEqual(self.fetch.await_count, 2)
+
+        self.fetch.side_effect = lambda group_wxid: make_members(bot_display_name="新昵称")
+        self.xybot.invalidate_group_cache(GROUP, display_name=True)
+        self.assertEqual(await self.xybot.get_bot_display_name(GROUP), "新昵称")
+        self.assertEqual(self.fetch.await_count, 3)
+
+        self.xybot.invalidate_group_cache("other@chatroom", display_name=True)  # 没有缓存的群也可以清除
+
+    async def test_roster_notice_invalidates_cache(self):
+        await self.xybot.get_bot_display_name(GROUP)
+        await self.xybot.get_chatroom_member_list("other@chatroom")
+
+        async def notice(content):
+            await self.xybot.process_message({"MsgId": 1, "MsgType": 10000, "FromUserName": {"string": GROUP},
+                                              "ToWxid": {"string": "wxid_bot"}, "Content": {"string": content}})
+
+        await notice("\"成员C\"加入了群聊")
+        self.assertNotIn(GROUP, self.xybot._group_members)
+        self.assertIn(GROUP, self.xybot._bot_display_names)
+        self.assertIn("other@chatroom", self.xybot._group_members)  # 其它群的缓存不受影响
+
+        await notice("你修改了群昵称为\"新昵称\"")
+        self.assertNotIn(GROUP, self.xybot._bot_display_names)
+
+        await self.xybot.get_chatroom_member_list(GROUP)
+        await notice("欢迎新朋友")  # 与成员无关的提示不清除缓存
+        self.assertIn(GROUP, self.xybot._group_members)
+
+
+if __name__ == "__main__":
+    unittest.main()
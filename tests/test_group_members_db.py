@@ -0,0 +1,77 @@
+import unittest
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+
+try:
+    from database import group_members_db
+    from database.group_members_db import (get_group_member_from_db, get_group_members_from_db,
+                                           save_group_members_to_db)
+except ImportError as e:  # loguru 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+def make_members(count, start=0):
+    return [{"UserName": f"wxid_{i}", "NickName": f"成员{i}", "DisplayName": f"群昵称{i}",
+             "BigHeadImgUrl": f"http://avatar/{i}", "InviterUserName": "wxid_owner"}
+            for i in range(start, start + count)]
+
+
+class TestSaveGroupMembers(unittest.TestCase):
+    """按 row_hash 只写入变化的成员，完整快照中没有的成员被删除"""
+
+    def setUp(self):
+        self.group = f"{self.id()}@chatroom"
+
+    def save(self, members, remove_missing=True):
+        """保存成员列表，返回数据库变更的行数"""
+        conn = group_members_db._db.connection()
+        changes = conn.total_changes
+        self.assertTrue(save_group_members_to_db(self.group, members, remove_missing))
+        return conn.total_changes - changes
+
+    def stored_wxids(self):
+        return sorted(member["wxid"] for member in get_group_members_from_db(self.group))
+
+    def test_unchanged_members_not_written(self):
+        members = make_members(50)
+        self.assertEqual(self.save(members), 50)
+        before = get_group_member_from_db(self.group, "wxid_0")
+
+        self.assertEqual(self.save(make_members(50)), 0)
+        self.assertEqual(get_group_member_from_db(self.group, "wxid_0"), before)
+
+    def test_changed_member_updated(self):
+        members = make_members(50)
+        self.save(members)
+        conn = group_members_db._db.connection()
+        conn.execute("UPDATE group_members SET join_time = 123 WHERE group_wxid = ? AND member_wxid = 'wxid_7'",
+                     (self.group,))
+        conn.commit()
+
+        members[7]["NickName"] = "新昵称"
+        members[9]["ChatroomMemberFlag"] = 1  # 额外字段变化也要写入
+        self.assertEqual(self.save(members), 2)
+
+        member = get_group_member_from_db(self.group, "wxid_7")
+        self.assertEqual(member["nickname"], "新昵称")
+        self.assertEqual(member["join_time"], 123)  # 更新时保留加入时间
+        self.assertEqual(get_group_member_from_db(self.group, "wxid_9")["ChatroomMemberFlag"], 1)
+
+    def test_missing_members_removed(self):
+        self.save(make_members(1200))
+        # 删除的成员超过一条语句的参数上限，分批删除
+        self.assertEqual(self.save(make_members(100)), 1100)
+        self.assertEqual(self.stored_wxids(), sorted(f"wxid_{i}" for i in range(100)))
+
+    def test_partial_list_keeps_other_members(self):
+        self.save(make_members(10))
+        self.assertEqual(self.save(make_members(3, start=10), remove_missing=False), 3)
+        self.assertEqual(len(self.stored_wxids()), 13)
+
+    def test_member_without_wxid_skipped(self):
+        self.assertEqual(self.save(make_members(2) + [{"NickName": "没有wxid"}]), 2)
+        self.assertEqual(self.stored_wxids(), ["wxid_0", "wxid_1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+
+import wechatapi_sandbox  # noqa: F401  必须在导入 WechatAPI 之前
+
+try:
+    from aiohttp import web
+
+    from WechatAPI.Client.base import WechatAPIClientBase
+    from WechatAPI.Client2.base import WechatAPIClientBase as WechatAPIClientBase2
+    from WechatAPI.Client3.base import WechatAPIClientBase as WechatAPIClientBase3
+except ImportError as e:  # aiohttp、pysilk、xywechatpad_binary 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+CLIENT_CLASSES = (WechatAPIClientBase, WechatAPIClientBase2, WechatAPIClientBase3)
+
+
+class TestHttpSession(unittest.IsolatedAsyncioTestCase):
+    """三个客户端的 http_session() 行为相同，每个测试对三个客户端各运行一次"""
+
+    async def asyncSetUp(self):
+        self.connections = set()
+
+        async def handle(request):
+            self.connections.add(request.transport.get_extra_info("peername"))
+            return web.json_response({"Success": True})
+
+        app = web.Application()
+        app.router.add_post("/VXAPI/Test", handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def request(self, client):
+        async with client.http_session() as session:
+            response = await session.post(f"http://{client.ip}:{client.port}/VXAPI/Test")
+            self.assertTrue((await response.json())["Success"])
+            return session
+
+    async def test_shared_session_reused(self):
+        for client_class in CLIENT_CLASSES:
+            with self.subTest(client=client_class.__module__):
+                self.connections.clear()
+                client = client_class("127.0.0.1", self.port)
+                sessions = [await self.request(client) for _ in range(3)]
+
+                self.assertIs(sessions[0], sessions[2])
+                self.assertIs(client._session, sessions[0])
+                self.assertFalse(sessions[0].closed)  # 退出上下文时不关闭
+                self.assertEqual(len(self.connections), 1)  # 顺序请求复用同一个连接
+                await client.close()
+
+    async def test_other_loop_uses_temporary_session(self):
+        for client_class in CLIENT_CLASSES:
+            with self.subTest(client=client_class.__module__):
+                client = client_class("127.0.0.1", self.port)
+                shared = await self.request(client)
+
+                # 在另一个线程的事件循环中请求，例如管理后台
+                temporary = await asyncio.to_thread(asyncio.run, self.request(client))
+
+                self.assertIsNot(temporary, shared)
+                self.assertTrue(temporary.closed)
+                self.assertIs(client._session, shared)
+                self.assertFalse(shared.closed)
+                await client.close()
+
+    async def test_close_releases_session(self):
+        for client_class in CLIENT_CLASSES:
+            with self.subTest(client=client_class.__module__):
+                client = client_class("127.0.0.1", self.port)
+                first = await self.request(client)
+                await client.close()
+
+                self.assertTrue(first.closed)
+                self.assertIsNone(client._session)
+                await client.close()  # 重复关闭不报错
+
+                second = await self.request(client)  # 关闭后再次请求时重新创建
+                self.assertIsNot(second, first)
+                self.assertFalse(second.closed)
+                await client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    from utils.ignore_filter import IgnoreFilter
+except ImportError as e:  # loguru 未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+class TestIgnoreFilter(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.config_path = os.path.join(self._tmp.name, "main_config.toml")
+
+    def write_config(self, text, mtime=None):
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(self.config_path, (mtime, mtime))
+
+    def make_filter(self, text, reload_interval=0):
+        self.write_config(text)
+        return IgnoreFilter(self.config_path, reload_interval)
+
+    def test_special_accounts(self):
+        ignore_filter = self.make_filter('ignore-mode = "None"\n')
+        cases = {
+            "gh_123456": "official_account",
+            "filehelper": "system_account",
+            "wxpay_notify": "wxpay",
+            "TencentNews": "tencent_game",
+            "my_GAME_bot": "tencent_game",
+            "CustomerService": "service_account",
+            "xx_official_xx": "service_account",
+        }
+        for wxid, rule in cases.items():
+            with self.subTest(wxid=wxid):
+                self.assertFalse(ignore_filter.check(wxid, wxid))
+                self.assertEqual(ignore_filter._special_rule(wxid), rule)
+
+        # 只有 gh_ 前缀算公众号，wxpay 区分大小写，系统账号需要完全相同
+        for wxid in ("wxid_gh_1", "WXPAY", "weixin_user", "wxid_normal"):
+            with self.subTest(wxid=wxid):
+                self.assertIsNone(ignore_filter._special_rule(wxid))
+        self.assertFalse(ignore_filter.check("filehelper", "wxid_normal"))
+        self.assertTrue(ignore_filter.check("wxid_normal", "wxid_normal"))
+        self.assertTrue(ignore_filter.check(None, ""))
+
+    def test_rule_cache_bounded(self):
+        ignore_filter = self.make_filter('ignore-mode = "None"\n')
+        with mock.patch("utils.ignore_filter.RULE_CACHE_SIZE", 3):
+            for wxid in ("gh_1", "wxid_a", "wxid_b", "wxid_c"):
+                ignore_filter.check(wxid, wxid)
+        self.assertEqual(ignore_filter._rule_cache, {"wxid_c": None})
+        self.assertFalse(ignore_filter.check("gh_1", "gh_1"))
+        self.assertEqual(ignore_filter._rule_cache["gh_1"], "official_account")
+
+    def test_whitelist(self):
+        ignore_filter = self.make_filter('ignore-mode = "Whitelist"\n'
+                                         'whitelist = ["wxid_friend", "111@chatroom"]\n'
+                                         'blacklist = []\n')
+        self.assertIsInstance(ignore_filter.whitelist, frozenset)
+        self.assertTrue(ignore_filter.check("wxid_friend", "wxid_friend"))
+        self.assertFalse(ignore_filter.check("wxid_other", "wxid_other"))
+        self.assertTrue(ignore_filter.check("111@chatroom", "wxid_other"))
+        self.assertTrue(ignore_filter.check("222@chatroom", "wxid_friend"))
+        self.assertFalse(ignore_filter.check("222@chatroom", "wxid_other"))
+        # 私聊时来源在白名单中不算
+        self.assertFalse(ignore_filter.check("wxid_friend", "wxid_other"))
+
+    def test_blacklist(self):
+        ignore_filter = self.make_filter('ignore-mode = "Blacklist"\n'
+                                         'whitelist = []\n'
+                                         'blacklist = ["wxid_bad", "111@chatroom"]\n')
+        self.assertFalse(ignore_filter.check("wxid_bad", "wxid_bad"))
+        self.assertTrue(ignore_filter.check("wxid_ok", "wxid_ok"))
+        self.assertFalse(ignore_filter.check("111@chatroom", "wxid_ok"))
+        self.assertFalse(ignore_filter.check("222@chatroom", "wxid_bad"))
+        self.assertTrue(ignore_filter.check("222@chatroom", "wxid_ok"))
+
+    def test_auto_restart_section(self):
+        ignore_filter = self.make_filter('[AutoRestart]\n'
+                                         'ignore-mode = "Blacklist"\n'
+                                         'blacklist = ["wxid_bad"]\n')
+        self.assertEqual(ignore_filter.ignore_mode, "Blacklist")
+        self.assertFalse(ignore_filter.check("wxid_bad", "wxid_bad"))
+
+    def test_missing_config(self):
+        ignore_filter = IgnoreFilter(os.path.join(self._tmp.name, "missing.toml"), 0)
+        self.assertEqual(ignore_filter.ignore_mode, "None")
+        self.assertTrue(ignore_filter.check("wxid_a", "wxid_a"))
+
+    def test_hot_reload(self):
+        self.write_config('ignore-mode = "Blacklist"\nblacklist = ["wxid_a"]\n', mtime=1000)
+        ignore_filter = IgnoreFilter(self.config_path, reload_interval=5)
+        self.assertFalse(ignore_filter.check("wxid_a", "wxid_a"))
+
+        self.write_config('ignore-mode = "Blacklist"\nblacklist = ["wxid_b"]\n', mtime=2000)
+        now = ignore_filter._next_check
+        with mock.patch("utils.ignore_filter.time.monotonic", return_value=now - 1):
+            self.assertFalse(ignore_filter.check("wxid_a", "wxid_a"))  # 未到检查时间
+        with mock.patch("utils.ignore_filter.time.monotonic", return_value=now):
+            self.assertTrue(ignore_filter.check("wxid_a", "wxid_a"))
+        self.assertFalse(ignore_filter.check("wxid_b", "wxid_b"))
+        self.assertEqual(ignore_filter.blacklist, frozenset({"wxid_b"}))
+
+    def test_invalid_config_keeps_previous(self):
+        self.write_config('ignore-mode = "Blacklist"\nblacklist = ["wxid_a"]\n', mtime=1000)
+        ignore_filter = IgnoreFilter(self.config_path, reload_interval=5)
+        self.write_config('ignore-mode = "Blacklist\n', mtime=2000)
+        with mock.patch("utils.ignore_filter.time.monotonic", return_value=ignore_filter._next_check):
+            self.assertFalse(ignore_filter.check("wxid_a", "wxid_a"))
+        self.assertEqual(ignore_filter.blacklist, frozenset({"wxid_a"}))
+
+    def test_counters(self):
+        ignore_filter = self.make_filter('ignore-mode = "Blacklist"\nblacklist = ["wxid_bad"]\n')
+        for from_wxid, sender_wxid in [("gh_1", "gh_1"), ("weixin", "weixin"), ("wxid_bad", "wxid_bad"),
+                                       ("wxid_ok", "wxid_ok"), ("1@chatroom", "wxid_ok"), ("wxpay", "wxpay")]:
+            ignore_filter.check(from_wxid, sender_wxid)
+        self.assertEqual(ignore_filter.get_stats(), {"official_account": 1, "system_account": 1, "blacklist": 1,
+                                                     "passed": 2, "wxpay": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
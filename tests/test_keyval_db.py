@@ -0,0 +1,350 @@
+import asyncio
+import fnmatch
+import os
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+
+try:
+    from database.keyvalDB import KeyvalDB
+    from utils.singleton import Singleton
+except ImportError as e:  # sqlalchemy、aiosqlite 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+class FakeRedis:
+    """测试用的内存 Redis，只实现 KeyvalDB 用到的命令，值都按 decode_responses=True 保存为字符串"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.commands = []
+
+    def _alive(self, key):
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    async def ping(self):
+        return True
+
+    async def close(self):
+        pass
+
+    async def set(self, key, value, ex=None):
+        self.commands.append(("set", key, value, ex))
+        self.data[key] = str(value)
+        self.expiry.pop(key, None)
+        if ex:
+            seconds = ex.total_seconds() if hasattr(ex, "total_seconds") else ex
+            self.expiry[key] = time.time() + seconds
+        return True
+
+    async def get(self, key):
+        return self.data.get(key) if self._alive(key) else None
+
+    async def delete(self, key):
+        existed = self._alive(key)
+        self.data.pop(key, None)
+        self.expiry.pop(key, None)
+        return int(existed)
+
+    async def exists(self, key):
+        return int(self._alive(key))
+
+    async def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        if key not in self.expiry:
+            return -1
+        return int(self.expiry[key] - time.time())
+
+    async def expire(self, key, ex):
+        if not self._alive(key):
+            return False
+        seconds = ex.total_seconds() if hasattr(ex, "total_seconds") else ex
+        self.expiry[key] = time.time() + seconds
+        return True
+
+    async def keys(self, pattern):
+        return [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+
+    async def incrby(self, key, amount):
+        value = int(await self.get(key) or 0) + amount
+        self.data[key] = str(value)
+        return value
+
+    async def hset(self, name, mapping):
+        data = self.data.setdefault(name, {})
+        added = sum(1 for field in mapping if field not in data)
+        data.update(mapping)
+        return added
+
+    async def hget(self, name, key):
+        return self.data.get(name, {}).get(key)
+
+    async def hgetall(self, name):
+        return dict(self.data.get(name, {}))
+
+    async def hdel(self, name, *keys):
+        data = self.data.get(name, {})
+        return sum(1 for key in keys if data.pop(key, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.queued.append((key, value, ex))
+
+    async def execute(self):
+        return [await self.redis.set(*args) for args in self.queued]
+
+
+class KeyvalTestCase(unittest.IsolatedAsyncioTestCase):
+    """每个测试在临时目录中使用新的 KeyvalDB 实例和 SQLite 数据库"""
+
+    async def asyncSetUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        with open("main_config.toml", "w", encoding="utf-8") as f:
+            f.write('[XYBot]\n'
+                    'keyvalDB-url = "sqlite+aiosqlite:///keyval.db"\n'
+                    'keyvalDB-cache-size = 100\n'
+                    'keyvalDB-flush-interval = 3600\n')
+        self.db = self._new_db()
+        await self.db.initialize()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self._reset_singleton()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    @staticmethod
+    def _reset_singleton():
+        KeyvalDB._instance = None
+        Singleton._instances.pop(KeyvalDB, None)
+
+    def _new_db(self):
+        self._reset_singleton()
+        return KeyvalDB()
+
+    async def reopen(self):
+        """关闭后重新打开数据库，清空内存缓存，之后的读取来自 SQLite"""
+        await self.db.close()
+        self.db = self._new_db()
+        await self.db.initialize()
+
+
+class TestKeyvalSQLite(KeyvalTestCase):
+    async def test_set_get_delete(self):
+        self.assertTrue(await self.db.set("a", "1"))
+        self.assertEqual(await self.db.get("a"), "1")
+        self.assertTrue(await self.db.exists("a"))
+        self.assertTrue(await self.db.delete("a"))
+        self.assertFalse(await self.db.delete("a"))
+        self.assertIsNone(await self.db.get("a"))
+
+    async def test_reads_served_from_cache(self):
+        await self.db.set("a", "1")
+        with mock.patch.object(self.db, "_load", side_effect=AssertionError("不应访问数据库")):
+            self.assertEqual(await self.db.get("a"), "1")
+
+        loads = 0
+        original = self.db._load
+
+        async def counting_load(key):
+            nonlocal loads
+            loads += 1
+            return await original(key)
+
+        with mock.patch.object(self.db, "_load", counting_load):
+            for _ in range(3):
+                self.assertIsNone(await self.db.get("missing"))
+        self.assertEqual(loads, 1)  # 不存在的键也会缓存
+
+    async def test_writes_persist_after_flush(self):
+        await self.db.mset({"a": "1", "b": {"x": 1}})
+        await self.db.set("gone", "1")
+        await self.db.delete("gone")
+        await self.reopen()
+
+        self.assertEqual(await self.db.mget(["a", "b", "gone"]), ["1", "{'x': 1}", None])
+        self.assertEqual(sorted(await self.db.keys("*")), ["a", "b"])
+
+    async def test_expiry(self):
+        now = time.time()
+        with mock.patch("database.keyvalDB.time.time", return_value=now):
+            await self.db.set("short", "1", ex=10)
+            await self.db.set("long", "1", ex=1000)
+            self.assertEqual(await self.db.ttl("short"), 10)
+            self.assertEqual(await self.db.ttl("missing"), -1)
+
+        with mock.patch("database.keyvalDB.time.time", return_value=now + 11):
+            self.assertIsNone(await self.db.get("short"))
+            self.assertEqual(await self.db.get("long"), "1")
+            self.assertEqual(await self.db.keys("*"), ["long"])
+
+    async def test_expire_loop_deletes_due_keys(self):
+        await self.db.set("a", "1", ex=timedelta(milliseconds=100))
+        await asyncio.sleep(1.2)  # 堆为空时清理任务每秒检查一次
+        self.assertIn("a", self.db._dirty)
+        self.assertEqual(self.db._dirty["a"], (None, None))
+
+    async def test_incr_keeps_ttl(self):
+        self.assertEqual(await self.db.incr("n"), 1)
+        await self.db.expire("n", 100)
+        self.assertEqual(await self.db.incr("n", 5), 6)
+        self.assertGreater(await self.db.ttl("n"), 90)
+        await self.db.set("text", "abc")
+        with self.assertRaises(ValueError):
+            await self.db.incr("text")
+
+    async def test_concurrent_incr(self):
+        await asyncio.gather(*(self.db.incr("n") for _ in range(50)))
+        self.assertEqual(await self.db.get("n"), "50")
+
+    async def test_hash(self):
+        self.assertEqual(await self.db.hset("h", "a", 1), 1)
+        self.assertEqual(await self.db.hset("h", mapping={"a": 2, "b": 3}), 1)
+        self.assertEqual(await self.db.hget("h", "a"), "2")
+        self.assertEqual(await self.db.hgetall("h"), {"a": "2", "b": "3"})
+        self.assertEqual(await self.db.hdel("h", "a", "missing"), 1)
+        self.assertEqual(await self.db.hdel("h", "b"), 1)
+        self.assertFalse(await self.db.exists("h"))
+
+        await self.db.set("plain", "x")
+        with self.assertRaises(ValueError):
+            await self.db.hget("plain", "a")
+
+    async def test_concurrent_flushes(self):
+        """keys()、后台写入和 close() 同时写入时不丢数据"""
+        for i in range(200):
+            await self.db.set(f"k{i}", str(i))
+        writes = [self.db._flush(), self.db.keys("k1*"), self.db._flush()]
+        for i in range(200, 300):
+            await self.db.set(f"k{i}", str(i))
+            writes.append(self.db._flush())
+        await asyncio.gather(*writes)
+        await self.reopen()
+
+        self.assertEqual(len(await self.db.keys("k*")), 300)
+        self.assertEqual(await self.db.get("k250"), "250")
+
+    async def test_failed_flush_not_mixed_with_next_flush(self):
+        """一次写入失败后重新放回缓冲的是它自己的数据，不会被同时开始的下一次写入覆盖"""
+        original_factory = self.db._async_session_factory
+        release = asyncio.Event()
+        sessions = 0
+
+        def factory():
+            nonlocal sessions
+            sessions += 1
+            session = original_factory()
+            if sessions == 1:
+                async def failing_commit():
+                    await release.wait()
+                    raise RuntimeError("磁盘已满")
+                session.commit = failing_commit
+            return session
+
+        self.db._async_session_factory = factory
+        await self.db.set("a", "1")
+        first = asyncio.create_task(self.db._flush())
+        await asyncio.sleep(0.05)
+        await self.db.set("b", "2")
+        second = asyncio.create_task(self.db._flush())
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(first, second)
+        await self.reopen()
+
+        self.assertEqual(await self.db.mget(["a", "b"]), ["1", "2"])
+
+    async def test_load_does_not_overwrite_concurrent_write(self):
+        """读取数据库期间同一个键被 set()/delete()，读到的旧值不能进入缓存"""
+        await self.db.mset({"k": "old", "d": "old"})
+        await self.reopen()
+
+        original = self.db._load
+        release = asyncio.Event()
+        blocked = set()
+
+        async def slow_load(key):
+            entry = await original(key)
+            if key not in blocked:  # 只有第一次读取等待
+                blocked.add(key)
+                await release.wait()
+            return entry
+
+        self.db._load = slow_load
+        reads = [asyncio.create_task(self.db.get("k")), asyncio.create_task(self.db.get("d"))]
+        await asyncio.sleep(0.05)
+        await self.db.set("k", "new")
+        self.assertTrue(await self.db.delete("d"))
+        release.set()
+        self.assertEqual(await asyncio.gather(*reads), ["new", None])
+
+        await self.db._flush()
+        self.assertEqual(await self.db.get("k"), "new")
+        self.assertIsNone(await self.db.get("d"))
+
+    async def test_strict_validation(self):
+        await self.db.set(1, 2)
+        self.assertEqual(await self.db.get("1"), "2")
+
+        self.db.strict_validation = True
+        with self.assertRaises(ValueError):
+            await self.db.set(1, "2")
+        with self.assertRaises(ValueError):
+            await self.db.set("a", "2", ex="10")
+
+
+class TestKeyvalRedis(KeyvalTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.redis = FakeRedis()
+        self.db._redis = self.redis
+
+    async def test_operations_forwarded(self):
+        await self.db.set("a", {"x": 1}, ex=60)
+        self.assertEqual(self.redis.commands[-1], ("set", "a", "{'x': 1}", 60))
+        self.assertEqual(await self.db.get("a"), "{'x': 1}")
+        self.assertTrue(await self.db.exists("a"))
+        self.assertGreater(await self.db.ttl("a"), 0)
+        self.assertEqual(await self.db.keys("a*"), ["a"])
+        self.assertTrue(await self.db.delete("a"))
+        self.assertFalse(self.db._dirty)  # 不经过 SQLite 的缓存和写缓冲
+
+    async def test_batch_and_hash(self):
+        await self.db.mset({"a": 1, "b": 2}, ex=30)
+        self.assertEqual(await self.db.mget(["a", "b", "c"]), ["1", "2", None])
+        self.assertEqual(await self.db.incr("a", 4), 5)
+        self.assertEqual(await self.db.hset("h", mapping={"f": 1}), 1)
+        self.assertEqual(await self.db.hgetall("h"), {"f": "1"})
+        self.assertEqual(await self.db.hdel("h", "f"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from utils import log_tailer
+from utils.log_tailer import LogTailer
+
+
+class TailerTestCase(unittest.TestCase):
+    """在临时目录中写日志文件，后台线程收集 LogTailer 返回的行"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.dir = self._tmp.name
+        self.lines = queue.Queue()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write(self, name, text, mode="a"):
+        with open(self.path(name), mode, encoding="utf-8") as f:
+            f.write(text)
+
+    def start(self, patterns=("*.log",), **kwargs):
+        kwargs.setdefault("poll_interval", 0.2)
+        tailer = LogTailer([self.path(pattern) for pattern in patterns], **kwargs)
+        thread = threading.Thread(target=lambda: [self.lines.put(line) for line in tailer.lines()], daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(tailer.stop)
+        return tailer
+
+    def expect(self, *expected, timeout=5):
+        """等待并返回接下来的几行"""
+        received = []
+        deadline = time.monotonic() + timeout
+        while len(received) < len(expected):
+            try:
+                received.append(self.lines.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        self.assertEqual(received, list(expected))
+
+    def expect_nothing(self, wait=0.5):
+        time.sleep(wait)
+        self.assertTrue(self.lines.empty(), f"多出的行: {self.lines.get_nowait() if not self.lines.empty() else ''}")
+
+
+class TestLogTailer(TailerTestCase):
+    def test_existing_content_skipped(self):
+        self.write("app.log", "旧的一行\n")
+        self.start()
+        self.write("app.log", "第一行\n第二行\n")
+        self.expect("第一行", "第二行")
+
+    def test_partial_line_held_back(self):
+        self.write("app.log", "")
+        self.start()
+        self.write("app.log", "半行")
+        self.expect_nothing()
+        self.write("app.log", "内容\r\n下一行\n")
+        self.expect("半行内容", "下一行")
+
+    def test_rotation_by_inode(self):
+        """轮转后读完旧文件剩下的内容，再从头读取新建的同名文件"""
+        self.write("app.log", "")
+        tailer = self.start(patterns=("app.log",))
+        self.write("app.log", "轮转前\n")
+        self.expect("轮转前")
+
+        with open(self.path("app.log"), "a", encoding="utf-8") as old:
+            os.rename(self.path("app.log"), self.path("app.log.1"))
+            old.write("轮转后写入旧文件\n没有换行")  # 写日志的进程还持有旧文件
+        self.write("app.log", "新文件\n")
+
+        self.expect("轮转后写入旧文件", "没有换行", "新文件")
+        self.assertEqual(tailer.get_stats()["rotations"], 1)
+        self.assertEqual(tailer.get_stats()["files"], 1)
+
+    def test_truncation(self):
+        self.write("app.log", "")
+        tailer = self.start()
+        self.write("app.log", "截断前的一行比较长的内容\n")
+        self.expect("截断前的一行比较长的内容")
+
+        self.write("app.log", "短\n", mode="w")
+        self.expect("短")
+        self.assertEqual(tailer.get_stats()["truncations"], 1)
+
+    def test_new_file_after_start_read_from_beginning(self):
+        self.start(patterns=("callback_*.log",))
+        self.write("callback_1.log", "第一行\n第二行\n")
+        self.expect("第一行", "第二行")
+        self.write("other.txt", "不匹配\n")
+        self.expect_nothing()
+
+    def test_long_line_split(self):
+        self.write("app.log", "")
+        self.start(max_line=10, max_read=8)
+        self.write("app.log", "x" * 30)
+        # 超长的行不等待换行符，分段返回
+        received = [self.lines.get(timeout=5)]
+        while sum(map(len, received)) < 30:
+            received.append(self.lines.get(timeout=5))
+        self.assertEqual("".join(received), "x" * 30)
+        self.assertTrue(all(len(line) <= 10 + 8 for line in received))  # 不超过 max_line 加一次读取
+
+        self.write("app.log", "\n下一行\n")
+        self.expect("下一行")
+
+    def test_idle_without_reads(self):
+        """空闲时不被自己读取文件产生的事件反复唤醒"""
+        self.write("app.log", "")
+        tailer = self.start(poll_interval=5)
+        self.write("app.log", "第一行\n")
+        self.expect("第一行")
+
+        with mock.patch.object(tailer, "_read", wraps=tailer._read) as read:
+            time.sleep(0.5)
+        self.assertLessEqual(read.call_count, 1)
+
+
+class TestLogTailerWithoutWatchdog(TailerTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(log_tailer, "Observer", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_polling_fallback(self):
+        tailer = self.start(poll_interval=5)
+        self.assertEqual(tailer.poll_interval, 0.5)
+        self.write("app.log", "第一行\n")
+        self.expect("第一行")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import unittest
+
+try:
+    from utils.media_download import CHUNK_SIZE, ImageDownloader
+except ImportError as e:  # loguru 未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+IMAGE = bytes(range(256)) * 1000  # 约 3.9 段
+IMAGE_MD5 = hashlib.md5(IMAGE).hexdigest()
+
+
+class FakeBot:
+    """按 start_pos 返回图片分段，可以指定分段先失败几次"""
+
+    def __init__(self, image=IMAGE, failures=None, delay=0.01):
+        self.image = image
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    async def get_msg_image(self, msg_id, to_wxid, length, start_pos=0):
+        self.requests.append(start_pos)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures.get(start_pos):
+                self.failures[start_pos] -= 1
+                raise ConnectionError("分段下载失败")
+            return self.image[start_pos:start_pos + CHUNK_SIZE]
+        finally:
+            self.active -= 1
+
+
+class TestImageDownloader(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache_dir = os.path.join(self._tmp.name, "image_cache")
+
+    def make_downloader(self, bot, **config):
+        config.setdefault("cache-dir", self.cache_dir)
+        return ImageDownloader(bot, config)
+
+    async def test_chunks_downloaded_concurrently(self):
+        bot = FakeBot()
+        downloader = self.make_downloader(bot, parallelism=2)
+        self.assertEqual(await downloader.download(1, "wxid_a", len(IMAGE), IMAGE_MD5), IMAGE)
+
+        self.assertEqual(sorted(bot.requests), [0, CHUNK_SIZE, 2 * CHUNK_SIZE, 3 * CHUNK_SIZE])
+        self.assertEqual(bot.max_active, 2)  # 并发数不超过上限
+
+    async def test_failed_chunk_retried(self):
+        bot = FakeBot(failures={CHUNK_SIZE: 2})
+        downloader = self.make_downloader(bot, retries=2)
+        self.assertEqual(await downloader.download(1, "wxid_a", len(IMAGE), IMAGE_MD5), IMAGE)
+
+        self.assertEqual(bot.requests.count(CHUNK_SIZE), 3)
+        self.assertEqual(bot.requests.count(0), 1)  # 只重试失败的分段
+        self.assertEqual(downloader.get_metrics()["chunk_retries"], 2)
+
+    async def test_chunk_failing_after_retries(self):
+        downloader = self.make_downloader(FakeBot(failures={0: 3}), retries=1)
+        self.assertIsNone(await downloader.download(1, "wxid_a", len(IMAGE), IMAGE_MD5))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    async def test_md5_mismatch(self):
+        corrupted = IMAGE[:-1] + b"\x00"
+        bot = FakeBot(image=corrupted)
+        downloader = self.make_downloader(bot)
+        self.assertIsNone(await downloader.download(1, "wxid_a", len(IMAGE), IMAGE_MD5))
+        self.assertEqual(downloader.get_metrics()["md5_mismatches"], 1)
+
+        # 校验失败的数据不写入缓存，再次请求时重新下载
+        bot.image = IMAGE
+        self.assertEqual(await downloader.download(1, "wxid_a", len(IMAGE), IMAGE_MD5), IMAGE)
+        self.assertEqual(downloader.get_metrics()["downloads"], 2)
+
+    async def test_md5_check_disabled(self):
+        corrupted = IMAGE[:-1] + b"\x00"
+        downloader = self.make_downloader(FakeBot(image=corrupted), **{"verify-md5": False})
+        self.assertEqual(await downloader.download(1, "wxid_a", len(IMAGE), IMAGE_MD5), corrupted)
+
+    async def test_cache_hit(self):
+        bot = FakeBot()
+        downloader = self.make_downloader(bot)
+        await downloader.download(1, "wxid_a", len(IMAGE), IMAGE_MD5)
+        requests = len(bot.requests)
+
+        # 转发到其它会话的同一张图片从缓存读取，md5 不区分大小写
+        self.assertEqual(await downloader.download(2, "wxid_b", len(IMAGE), IMAGE_MD5.upper()), IMAGE)
+        self.assertEqual(len(bot.requests), requests)
+        self.assertEqual(downloader.get_metrics()["cache_hits"], 1)
+
+        # 缓存在磁盘上，新的下载器也能命中
+        other = self.make_downloader(FakeBot(failures={0: 99}))
+        self.assertEqual(await other.download(3, "wxid_c", len(IMAGE), IMAGE_MD5), IMAGE)
+
+    async def test_concurrent_requests_download_once(self):
+        bot = FakeBot()
+        downloader = self.make_downloader(bot)
+        results = await asyncio.gather(*(downloader.download(msg_id, "wxid_a", len(IMAGE), IMAGE_MD5)
+                                         for msg_id in range(5)))
+
+        self.assertEqual(results, [IMAGE] * 5)
+        self.assertEqual(downloader.get_metrics()["downloads"], 1)
+        self.assertEqual(downloader.get_metrics()["inflight"], 0)
+
+    async def test_without_md5_not_cached(self):
+        bot = FakeBot()
+        downloader = self.make_downloader(bot)
+        for _ in range(2):
+            self.assertEqual(await downloader.download(1, "wxid_a", len(IMAGE)), IMAGE)
+        self.assertEqual(downloader.get_metrics()["downloads"], 2)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
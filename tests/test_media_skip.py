@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+import wechatapi_sandbox  # noqa: F401  必须在导入 WechatAPI 之前
+
+try:
+    from utils.event_manager import EventManager
+    from utils.xybot import XYBot
+except ImportError as e:  # aiohttp、pysilk、xywechatpad_binary 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+IMAGE_XML = '<msg><img aeskey="key" cdnmidimgurl="url" length="1024" md5="abc" /></msg>'
+FILE_XML = ('<msg><appmsg><title>报告.pdf</title><appattach><attachid>attach_1</attachid>'
+            '<fileext>pdf</fileext></appattach></appmsg></msg>')
+
+
+def make_message(msg_type, content, msg_id=1):
+    # 文件消息由 process_xml_message 归一化后传入，这里直接给出归一化后的字段
+    return {"MsgId": msg_id, "MsgType": msg_type, "FromWxid": "wxid_a", "ToWxid": "wxid_bot",
+            "SenderWxid": "wxid_a", "IsGroup": False, "Content": content, "MsgSource": ""}
+
+
+class TestSkipDownloadWithoutSubscriber(unittest.IsolatedAsyncioTestCase):
+    """没有插件处理、消息被过滤或在风控保护期内时不下载媒体"""
+
+    def setUp(self):
+        self._saved = EventManager._handlers, EventManager._indexes
+        EventManager._handlers = {}
+        EventManager._indexes = {}
+
+        # 只设置处理消息用到的属性，不执行连接协议服务器的初始化
+        self.xybot = XYBot.__new__(XYBot)
+        self.xybot.wxid = "wxid_bot"
+        self.xybot.ignore_protection = True
+        self.xybot.ignore_filter = mock.Mock(**{"check.return_value": True})
+        self.xybot.msg_db = mock.AsyncMock()
+        self.xybot.event_bridge = mock.Mock()
+        self.xybot.bot = mock.AsyncMock()
+        self.xybot.image_downloader = mock.AsyncMock(**{"download.return_value": b"image"})
+        self.received = []
+
+    def tearDown(self):
+        EventManager._handlers, EventManager._indexes = self._saved
+
+    def subscribe(self, event_type):
+        async def handler(bot, message):
+            self.received.append(event_type)
+
+        EventManager._handlers[event_type] = [(handler, None, 50)]
+        EventManager._rebuild_index(event_type)
+
+    async def process_all(self):
+        await self.xybot.process_image_message(make_message(3, IMAGE_XML))
+        await self.xybot.process_video_message(make_message(43, "<msg><videomsg /></msg>"))
+        await self.xybot.process_file_message(make_message(49, FILE_XML))
+        await self.xybot.process_voice_message(make_message(34, '<msg><voicemsg voiceurl="url" length="10" /></msg>'))
+
+    def assert_nothing_downloaded(self):
+        self.xybot.image_downloader.download.assert_not_awaited()
+        self.xybot.bot.download_image.assert_not_awaited()
+        self.xybot.bot.download_video.assert_not_awaited()
+        self.xybot.bot.download_attach.assert_not_awaited()
+        self.xybot.bot.download_voice.assert_not_awaited()
+
+    async def test_no_subscriber(self):
+        self.subscribe("text_message")  # 其它事件的插件不影响
+        await self.process_all()
+
+        self.assert_nothing_downloaded()
+        self.assertEqual(self.xybot.msg_db.save_message.await_count, 4)  # 消息仍然入库
+
+    async def test_filtered_sender(self):
+        for event_type in ("image_message", "video_message", "file_message", "voice_message"):
+            self.subscribe(event_type)
+        self.xybot.ignore_filter.check.return_value = False
+        await self.process_all()
+
+        self.assert_nothing_downloaded()
+        self.assertEqual(self.received, [])
+
+    async def test_risk_protection_period(self):
+        self.subscribe("video_message")
+        self.xybot.ignore_protection = False
+        with mock.patch("utils.xybot.protector.check", return_value=True):
+            await self.xybot.process_video_message(make_message(43, "<msg><videomsg /></msg>"))
+
+        self.xybot.bot.download_video.assert_not_awaited()
+        self.assertEqual(self.received, [])
+
+    async def test_subscriber_downloads(self):
+        for event_type in ("image_message", "video_message", "file_message", "voice_message"):
+            self.subscribe(event_type)
+        await self.process_all()
+
+        self.xybot.image_downloader.download.assert_awaited_once_with(1, "wxid_a", 1024, "abc")
+        self.xybot.bot.download_video.assert_awaited_once_with(1)
+        self.xybot.bot.download_attach.assert_awaited_once_with("attach_1")
+        self.xybot.bot.download_voice.assert_awaited_once_with(1, "url", 10)
+        self.assertEqual(self.received, ["image_message", "video_message", "file_message", "voice_message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
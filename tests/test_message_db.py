@@ -0,0 +1,86 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+
+try:
+    from sqlalchemy import select
+
+    from database.messsagDB import Message, MessageDB
+    from utils.singleton import Singleton
+except ImportError as e:  # sqlalchemy、aiosqlite 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+class TestMessageDBFlush(unittest.IsolatedAsyncioTestCase):
+    """flush() 之后查询能看到之前保存的全部消息，且按保存顺序写入"""
+
+    async def asyncSetUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        with open("main_config.toml", "w", encoding="utf-8") as f:
+            f.write('[XYBot]\n'
+                    'msgDB-url = "sqlite+aiosqlite:///message.db"\n'
+                    'msgDB-batch-size = 2\n'
+                    'msgDB-flush-interval = 3600\n')
+        self._reset_singleton()
+        self.db = MessageDB()
+        await self.db.initialize()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self._reset_singleton()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    @staticmethod
+    def _reset_singleton():
+        MessageDB._instance = None
+        Singleton._instances.pop(MessageDB, None)
+
+    async def saved_ids(self):
+        async with self.db._async_session_factory() as session:
+            result = await session.execute(select(Message.msg_id).order_by(Message.id))
+            return list(result.scalars())
+
+    async def test_get_messages_sees_batch_taken_by_flush_loop(self):
+        await self.db.save_message(1, "wxid_a", "wxid_a", 1, "第一条")
+        await asyncio.sleep(0.05)  # 后台任务取出消息，等待凑满一批
+        self.assertEqual(len(self.db._batch), 1)
+
+        messages = await self.db.get_messages()
+        self.assertEqual([message.msg_id for message in messages], [1])
+
+    async def test_flush_waits_for_inflight_write_and_keeps_order(self):
+        original = self.db._write_rows
+        release = asyncio.Event()
+
+        async def slow_write(rows):
+            if rows[0]["msg_id"] == 1:
+                await release.wait()
+            return await original(rows)
+
+        self.db._write_rows = slow_write
+        for msg_id in (1, 2):
+            await self.db.save_message(msg_id, "wxid_a", "wxid_a", 1, str(msg_id))
+        await asyncio.sleep(0.05)  # 第一批正在写入
+        self.assertFalse(self.db._inflight.done())
+        await self.db.save_message(3, "wxid_a", "wxid_a", 1, "3")
+        await self.db.save_message(4, "wxid_a", "wxid_a", 1, "4")
+        await self.db.save_message(5, "wxid_a", "wxid_a", 1, "5")
+
+        flush = asyncio.create_task(self.db.flush())
+        await asyncio.sleep(0.05)
+        self.assertFalse(flush.done())
+        release.set()
+        await flush
+
+        self.assertEqual(await self.saved_ids(), [1, 2, 3, 4, 5])
+        self.assertEqual(self.db.get_metrics()["written"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
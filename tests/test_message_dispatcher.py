@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+import wechatapi_sandbox  # noqa: F401  必须在导入 WechatAPI 之前
+
+try:
+    from utils.xybot import MessageDispatcher
+except ImportError as e:  # aiohttp、pysilk、xywechatpad_binary 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+def make_message(conversation, msg_id, msg_type=1):
+    return {"MsgId": msg_id, "MsgType": msg_type, "FromWxid": conversation}
+
+
+class Handler:
+    """记录处理过的消息，gate 未打开时阻塞，用来填满队列"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.started = []
+        self.handled = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, message):
+        self.started.append(message["MsgId"])
+        await self.gate.wait()
+        self.handled.append(message["MsgId"])
+        await asyncio.sleep(self.delay)
+
+
+class DispatcherTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.spill_file = os.path.join(self._tmp.name, "spill.jsonl")
+        self.dispatchers = []
+
+    async def asyncTearDown(self):
+        for dispatcher in self.dispatchers:
+            await dispatcher.stop()
+        self._tmp.cleanup()
+
+    def make_dispatcher(self, handler, **config):
+        config.setdefault("spill-file", self.spill_file)
+        dispatcher = MessageDispatcher(handler, lambda message: message["FromWxid"], config)
+        self.dispatchers.append(dispatcher)
+        return dispatcher
+
+    async def wait_for(self, condition, timeout=5):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("等待超时")
+            await asyncio.sleep(0.01)
+
+    async def fill(self, dispatcher, handler, count):
+        """第一条被消费者取走后阻塞，之后的消息留在队列中"""
+        handler.gate.clear()
+        for msg_id in range(count):
+            await dispatcher.submit(make_message("wxid_a", msg_id))
+            await asyncio.sleep(0)
+
+    def spilled_ids(self):
+        with open(self.spill_file, encoding="utf-8") as f:
+            return [json.loads(line)["MsgId"] for line in f]
+
+
+class TestDispatchOrdering(DispatcherTestCase):
+    async def test_per_conversation_order(self):
+        handler = Handler(delay=0.001)
+        dispatcher = self.make_dispatcher(handler, workers=4, **{"queue-size": 400})
+        conversations = [f"{i}@chatroom" for i in range(8)]
+        for n in range(20):
+            for conversation in conversations:
+                await dispatcher.submit(make_message(conversation, (conversation, n)))
+        await self.wait_for(lambda: dispatcher.processed == 160)
+
+        for conversation in conversations:
+            self.assertEqual([n for key, n in handler.handled if key == conversation], list(range(20)))
+        self.assertEqual(dispatcher.get_metrics()["latency"]["count"], 160)
+
+
+class TestOverflowPolicies(DispatcherTestCase):
+    async def test_block(self):
+        handler = Handler()
+        dispatcher = self.make_dispatcher(handler, workers=1, **{"queue-size": 2})
+        await self.fill(dispatcher, handler, 3)
+
+        blocked = asyncio.create_task(dispatcher.submit(make_message("wxid_a", 3)))
+        await asyncio.sleep(0.05)
+        self.assertFalse(blocked.done())  # 队列满时阻塞提交方
+
+        handler.gate.set()
+        await blocked
+        await self.wait_for(lambda: dispatcher.processed == 4)
+        self.assertEqual(handler.handled, [0, 1, 2, 3])
+        self.assertEqual(dispatcher.dropped, 0)
+
+    async def test_drop_oldest(self):
+        handler = Handler()
+        dispatcher = self.make_dispatcher(handler, workers=1, **{"queue-size": 2, "overflow-policy": "drop-oldest"})
+        await self.fill(dispatcher, handler, 5)
+
+        self.assertEqual(dispatcher.dropped, 2)
+        handler.gate.set()
+        await self.wait_for(lambda: dispatcher.processed == 3)
+        self.assertEqual(handler.handled, [0, 3, 4])
+
+
+class TestSpill(DispatcherTestCase):
+    async def test_spill_written_off_loop_and_replayed(self):
+        handler = Handler()
+        dispatcher = self.make_dispatcher(handler, workers=1, **{"queue-size": 2, "overflow-policy": "spill",
+                                                                 "spill-types": [3]})
+        writers = []
+        write_spill = dispatcher._write_spill
+
+        def recording_write(messages):
+            writers.append(threading.current_thread())
+            return write_spill(messages)
+
+        dispatcher._write_spill = recording_write
+        await self.fill(dispatcher, handler, 3)
+        for msg_id in range(3, 6):
+            # 低优先级类型的消息写入溢出文件，提交方不等待
+            await asyncio.wait_for(dispatcher.submit(make_message("wxid_a", msg_id, msg_type=3)), 0.05)
+        await self.wait_for(lambda: dispatcher.spilled == 3)
+
+        self.assertNotIn(threading.main_thread(), writers)
+        self.assertEqual(self.spilled_ids(), [3, 4, 5])
+
+        handler.gate.set()
+        await self.wait_for(lambda: dispatcher.processed == 6)  # 队列空闲后回放
+        self.assertEqual(handler.handled, [0, 1, 2, 3, 4, 5])
+        self.assertFalse(os.path.exists(self.spill_file))
+
+    async def test_stop_keeps_unreplayed_messages(self):
+        """回放途中停止，没有处理的消息写回溢出文件，下次启动时继续回放"""
+        with open(self.spill_file, "w", encoding="utf-8") as f:
+            for msg_id in range(10):
+                f.write(json.dumps(make_message("wxid_a", msg_id)) + "\n")
+
+        handler = Handler()
+        handler.gate.clear()
+        dispatcher = self.make_dispatcher(handler, workers=1, **{"queue-size": 2})
+        dispatcher.start()
+        # 一条正在处理，两条在队列中，回放阻塞在放入第四条
+        await self.wait_for(lambda: handler.started == [0] and dispatcher.depth == 2)
+        await dispatcher.stop()
+
+        handler.gate.set()
+        restarted = self.make_dispatcher(handler, workers=1, **{"queue-size": 2})
+        restarted.start()
+        await self.wait_for(lambda: not os.path.exists(self.spill_file)
+                            and not os.path.exists(restarted.spill_file.with_suffix(".replay"))
+                            and restarted.depth == 0 and len(handler.handled) == 9)
+
+        # 停止时正在处理的那一条被取消，其余消息按顺序回放，不重复
+        self.assertEqual(handler.handled, list(range(1, 10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
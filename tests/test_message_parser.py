@@ -0,0 +1,142 @@
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock
+
+try:
+    from utils.message_parser import find_int, find_text, normalize_message, parse_xml, parse_xml_shared
+except ImportError as e:  # loguru 未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+BOT = "wxid_bot"
+MSG_SOURCE = "<msgsource><atuserlist>,wxid_a,wxid_b</atuserlist><silence>1</silence></msgsource>"
+APPMSG = ("<msg><appmsg><title>标题</title><type>5</type>"
+          "<appattach><totallen>1024</totallen><fileext>pdf</fileext></appattach></appmsg></msg>")
+
+
+def make_message(content, from_wxid, to_wxid=BOT, msg_source=""):
+    return {"MsgId": 1, "Content": {"string": content}, "FromWxid": from_wxid, "ToWxid": to_wxid,
+            "MsgSource": msg_source}
+
+
+class TestNormalizeMessage(unittest.TestCase):
+    def test_group_message(self):
+        message = make_message("wxid_sender:\n你好:世界", "123@chatroom")
+        msg = normalize_message(message, BOT, separator=":\n")
+
+        self.assertEqual((msg.from_wxid, msg.sender_wxid, msg.is_group, msg.content),
+                         ("123@chatroom", "wxid_sender", True, "你好:世界"))
+        self.assertEqual((message["Content"], message["SenderWxid"], message["FromWxid"], message["IsGroup"]),
+                         ("你好:世界", "wxid_sender", "123@chatroom", True))
+        self.assertIs(msg.raw, message)
+
+    def test_group_message_without_sender(self):
+        msg = normalize_message(make_message("没有发送者", "123@chatroom"), BOT, separator=":\n")
+        self.assertEqual((msg.sender_wxid, msg.content), (BOT, "没有发送者"))
+
+    def test_private_message(self):
+        msg = normalize_message(make_message("你好", "wxid_friend"), BOT)
+        self.assertEqual((msg.from_wxid, msg.sender_wxid, msg.is_group), ("wxid_friend", "wxid_friend", False))
+
+        # 机器人自己发出的消息，来源改为接收方
+        message = make_message("你好", BOT, to_wxid="wxid_friend")
+        msg = normalize_message(message, BOT)
+        self.assertEqual((msg.from_wxid, msg.sender_wxid), ("wxid_friend", BOT))
+        self.assertEqual(message["FromWxid"], "wxid_friend")
+
+    def test_strip_and_sender_key(self):
+        message = make_message("wxid_sender:\n<msg>\n\t<emoji/>\n</msg>", "123@chatroom")
+        msg = normalize_message(message, BOT, separator=":\n", strip=True, sender_key="ActualUserWxid")
+        # 先去掉换行再分割，":\n" 已不存在，与原来表情消息的处理一致
+        self.assertEqual(msg.content, "wxid_sender:<msg><emoji/></msg>")
+        self.assertEqual(message["ActualUserWxid"], BOT)
+        self.assertNotIn("SenderWxid", message)
+
+        message = make_message("wxid_sender:\n<msg>\n\t<img/>\n</msg>", "123@chatroom")
+        msg = normalize_message(message, BOT, strip=True)
+        self.assertEqual((msg.sender_wxid, msg.content), ("wxid_sender", "<msg><img/></msg>"))
+
+    def test_plain_string_content(self):
+        message = {"Content": "已处理", "FromWxid": "wxid_friend", "ToWxid": BOT}
+        self.assertEqual(normalize_message(message, BOT).content, "已处理")
+        message = {"FromWxid": "wxid_friend", "ToWxid": BOT}
+        self.assertEqual(normalize_message(message, BOT).content, "")
+
+
+class TestNormalizedMessageLazyFields(unittest.TestCase):
+    def setUp(self):
+        parse_xml_shared.cache_clear()
+
+    def test_xml_parsed_once_on_access(self):
+        with mock.patch("utils.message_parser.parse_xml_shared", wraps=parse_xml_shared) as parse:
+            msg = normalize_message(make_message(APPMSG, "wxid_friend", msg_source=MSG_SOURCE), BOT)
+            parse.assert_not_called()
+            self.assertIs(msg.xml, msg.xml)
+            self.assertEqual(parse.call_count, 1)
+        self.assertEqual(find_text(msg.xml, "appmsg/title"), "标题")
+
+    def test_invalid_xml_raises(self):
+        msg = normalize_message(make_message("不是XML", "wxid_friend"), BOT)
+        with self.assertRaises(ET.ParseError):
+            msg.xml
+
+    def test_ats(self):
+        msg = normalize_message(make_message("@a @b 你好", "123@chatroom", msg_source=MSG_SOURCE), BOT)
+        self.assertEqual(msg.ats, ["wxid_a", "wxid_b"])
+        self.assertEqual(msg.msg_source.find("silence").text, "1")
+
+        for source in ("", "<msgsource/>", "<msgsource><atuserlist></atuserlist></msgsource>", "<msgsource"):
+            with self.subTest(source=source):
+                msg = normalize_message(make_message("你好", "123@chatroom", msg_source=source), BOT)
+                self.assertEqual(msg.ats, [])
+        self.assertIsNone(msg.msg_source)
+
+    def test_ats_without_atuserlist_not_parsed(self):
+        source = "<msgsource><silence>0</silence></msgsource>"
+        with mock.patch("utils.message_parser.parse_xml_shared", wraps=parse_xml_shared) as parse:
+            msg = normalize_message(make_message("你好", "wxid_friend", msg_source=source), BOT)
+            self.assertEqual(msg.ats, [])
+            parse.assert_not_called()
+            self.assertEqual(msg.msg_source.find("silence").text, "0")
+
+
+class TestParseHelpers(unittest.TestCase):
+    def setUp(self):
+        parse_xml_shared.cache_clear()
+
+    def test_parse_xml_cached(self):
+        shared = parse_xml_shared(APPMSG)
+        self.assertIs(parse_xml_shared(APPMSG), shared)
+        copied = parse_xml(APPMSG)
+        self.assertIsNot(copied, shared)
+        self.assertEqual(ET.tostring(copied), ET.tostring(shared))
+        self.assertEqual(parse_xml_shared.cache_info().hits, 2)
+        with self.assertRaises(ET.ParseError):
+            parse_xml("<msg>")
+
+    def test_parse_xml_mutation_not_shared(self):
+        """一个调用方修改返回的树，不影响之后解析相同内容拿到的树"""
+        root = parse_xml(APPMSG)
+        appmsg = root.find("appmsg")
+        appmsg.find("title").text = "已修改"
+        appmsg.set("appid", "changed")
+        appmsg.remove(appmsg.find("appattach"))
+
+        again = parse_xml(APPMSG).find("appmsg")
+        self.assertEqual(find_text(again, "title"), "标题")
+        self.assertIsNone(again.get("appid"))
+        self.assertEqual(find_int(again, "appattach/totallen"), 1024)
+        self.assertEqual(find_text(parse_xml_shared(APPMSG), "appmsg/title"), "标题")
+        self.assertEqual(parse_xml_shared.cache_info().hits, 2)
+
+    def test_find_text_and_int(self):
+        appmsg = parse_xml(APPMSG).find("appmsg")
+        self.assertEqual(find_text(appmsg, "title"), "标题")
+        self.assertEqual(find_text(appmsg, "des"), "")
+        self.assertIsNone(find_text(appmsg, "des", None))
+        self.assertEqual(find_int(appmsg, "type"), 5)
+        self.assertEqual(find_int(appmsg, "appattach/totallen"), 1024)
+        self.assertEqual(find_int(appmsg, "showtype", -1), -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+import wechatapi_sandbox  # noqa: F401  必须在导入 WechatAPI 之前
+
+try:
+    import aiohttp
+    from aiohttp import web
+
+    from utils import message_sync
+    from utils.message_sync import LatencyHistogram, MessageSyncEngine
+except ImportError as e:  # aiohttp、loguru 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+try:
+    from WechatAPI.Client.message import MessageMixin
+    from WechatAPI.Client2.message import MessageMixin as MessageMixin2
+    from WechatAPI.Client3.message import MessageMixin as MessageMixin3
+except ImportError:  # pysilk、xywechatpad_binary 等依赖未安装
+    MessageMixin = None
+
+
+class FakeBot:
+    """按顺序返回预设的同步结果，结果是异常时抛出"""
+
+    def __init__(self, results):
+        self.results = list(results)
+
+    async def sync_message(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def empty():
+    return True, {"AddMsgs": []}
+
+
+def messages(*msg_ids, create_time=None):
+    return True, {"AddMsgs": [{"MsgId": msg_id, "CreateTime": create_time or int(time.time())}
+                              for msg_id in msg_ids]}
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_bucket_bounds_inclusive(self):
+        histogram = LatencyHistogram()
+        for value in (0.05, 0.1, 0.11, 1, 60, 61, -1):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        buckets = snapshot["buckets"]
+        self.assertEqual(buckets["<=0.1s"], 3)  # 负值按 0 计
+        self.assertEqual(buckets["<=0.25s"], 1)
+        self.assertEqual(buckets["<=1s"], 1)
+        self.assertEqual(buckets["<=60s"], 1)
+        self.assertEqual(buckets[">60s"], 1)
+        self.assertEqual(sum(buckets.values()), 7)
+        self.assertEqual(snapshot["count"], 7)
+        self.assertEqual(snapshot["max"], 61)
+        self.assertAlmostEqual(snapshot["avg"], (0.05 + 0.1 + 0.11 + 1 + 60 + 61) / 7)
+
+    def test_empty_snapshot(self):
+        snapshot = LatencyHistogram().snapshot()
+        self.assertEqual((snapshot["count"], snapshot["avg"], snapshot["max"]), (0, 0.0, 0.0))
+        self.assertEqual(len(snapshot["buckets"]), len(LatencyHistogram.BUCKETS) + 1)
+
+
+class TestPollBackoff(unittest.IsolatedAsyncioTestCase):
+    def make_engine(self, results, **config):
+        config.setdefault("report-interval", 0)
+        self.sleeps = []
+        return MessageSyncEngine(FakeBot(results), config)
+
+    async def sleep(self, delay):
+        self.sleeps.append(delay)
+
+    async def poll(self, engine, times):
+        """同步 times 次，只记录等待时间不真正等待"""
+        with mock.patch.object(message_sync.asyncio, "sleep", self.sleep):
+            for _ in range(times):
+                await engine.next_batch()
+
+    async def test_idle_backoff_capped(self):
+        engine = self.make_engine([empty()] * 6, jitter=0)
+        await self.poll(engine, 6)
+
+        # 第一次同步不等待，之后每次空结果间隔乘以退避系数，不超过上限
+        self.assertEqual(self.sleeps, [0.5, 0.75, 1.125, 1.6875, 2.0])
+        self.assertEqual(engine.get_metrics()["current_interval"], 2.0)
+        self.assertEqual(engine.empty_polls, 6)
+
+    async def test_messages_reset_backoff(self):
+        engine = self.make_engine([empty(), empty(), messages(1, 2), empty()], jitter=0)
+        await self.poll(engine, 4)
+
+        # 收到消息后立即再次同步，再次空闲时从最小间隔重新开始
+        self.assertEqual(self.sleeps, [0.5, 0.75])
+        self.assertEqual(engine._sleep, 0.5)
+        self.assertEqual((engine.polls, engine.empty_polls, engine.received), (4, 3, 2))
+
+    async def test_jitter_within_bounds(self):
+        engine = self.make_engine([empty()] * 200, jitter=0.2, **{"max-idle-interval": 0.5})
+        await self.poll(engine, 200)
+
+        self.assertTrue(all(0.4 <= delay <= 0.6 for delay in self.sleeps))
+        self.assertGreater(len(set(self.sleeps)), 1)  # 多个实例不会同一时刻同步
+
+    async def test_error_resets_backoff(self):
+        engine = self.make_engine([empty(), empty(), RuntimeError("连接失败"), empty()], jitter=0)
+        await self.poll(engine, 2)
+        with self.assertRaises(RuntimeError):
+            await self.poll(engine, 1)
+        await self.poll(engine, 1)
+
+        self.assertEqual(self.sleeps, [0.5, 0.75])  # 出错后的下一次同步不再等待
+
+    async def test_latency_recorded(self):
+        engine = self.make_engine([messages(1, 2, create_time=time.time() - 3), (False, "未登录")])
+        await self.poll(engine, 2)
+
+        latency = engine.get_metrics()["latency"]
+        self.assertEqual(latency["count"], 2)
+        self.assertEqual(latency["buckets"]["<=5s"], 2)
+
+
+class TestPushMode(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = MessageSyncEngine(None, {"mode": "push", "push-port": 0, "push-queue-size": 3,
+                                               "report-interval": 0})
+        await self.engine.start()
+        port = self.engine._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/callback"
+        self.session = aiohttp.ClientSession()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.stop()
+
+    async def push(self, payload=None, data=None):
+        async with self.session.post(self.url, json=payload, data=data) as response:
+            return response.status
+
+    async def test_payload_formats(self):
+        self.assertEqual(await self.push({"Data": {"AddMsgs": [{"MsgId": 1}]}}), 200)
+        self.assertEqual(await self.push({"AddMsgs": [{"MsgId": 2}]}), 200)
+        self.assertEqual(await self.push([{"MsgId": 3}]), 200)
+
+        ok, data = await self.engine.next_batch()  # 已经到达的消息合成一批
+        self.assertTrue(ok)
+        self.assertEqual([message["MsgId"] for message in data["AddMsgs"]], [1, 2, 3])
+        self.assertEqual(self.engine.received, 3)
+
+    async def test_invalid_payload_rejected(self):
+        self.assertEqual(await self.push(data=b"not json"), 400)
+        self.assertEqual(await self.push({"Data": "no messages"}), 400)
+        self.assertEqual(self.engine.push_queue.qsize(), 0)
+
+    async def test_full_queue_drops(self):
+        self.assertEqual(await self.push([{"MsgId": i} for i in range(5)]), 200)
+        self.assertEqual(self.engine.get_metrics()["pending"], 3)
+
+    async def test_next_batch_waits_for_push(self):
+        batch = asyncio.create_task(self.engine.next_batch())
+        await asyncio.sleep(0.05)
+        self.assertFalse(batch.done())
+
+        await self.push([{"MsgId": 1}])
+        ok, data = await asyncio.wait_for(batch, 1)
+        self.assertEqual(data["AddMsgs"], [{"MsgId": 1}])
+
+
+@unittest.skipIf(MessageMixin is None, "缺少 WechatAPI 依赖")
+class TestSynckeyCarryOver(unittest.IsolatedAsyncioTestCase):
+    """sync_message 带上上次返回的 KeyBuf，没有返回 KeyBuf 时保留原来的 Synckey"""
+
+    async def asyncSetUp(self):
+        self.synckeys = []
+        self.responses = []
+
+        async def handle(request):
+            self.synckeys.append((await request.json())["Synckey"])
+            return web.json_response(self.responses.pop(0))
+
+        app = web.Application()
+        app.router.add_post("/VXAPI/Msg/Sync", handle)
+        app.router.add_post("/api/Msg/Sync", handle)  # Client2、Client3 的接口路径
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def test_synckey_carried_between_syncs(self):
+        for mixin_class in (MessageMixin, MessageMixin2, MessageMixin3):
+            with self.subTest(client=mixin_class.__module__):
+                self.synckeys.clear()
+                self.responses[:] = [
+                    {"Success": True, "Data": {"AddMsgs": [], "KeyBuf": {"iLen": 4, "buffer": "key1"}}},
+                    {"Success": True, "Data": {"AddMsgs": []}},
+                    {"Success": True, "Data": {"AddMsgs": [], "KeyBuf": {"iLen": 0, "buffer": ""}}},
+                    {"Success": False, "Message": "失败"},
+                    {"Success": True, "Data": {"AddMsgs": [], "KeyBuf": {"iLen": 4, "buffer": "key2"}}},
+                    {"Success": True, "Data": {"AddMsgs": []}},
+                ]
+                client = mixin_class("127.0.0.1", self.port)
+                client.wxid = "wxid_bot"
+                for _ in range(5):
+                    await client.sync_message()
+                await client.sync_message(synckey="")  # 显式传入时使用传入的值
+
+                self.assertEqual(self.synckeys, ["", "key1", "key1", "key1", "key1", ""])
+                self.assertEqual(client.synckey, "key2")
+                await client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
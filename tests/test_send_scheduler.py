@@ -0,0 +1,158 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+import wechatapi_sandbox  # noqa: F401  必须在导入 WechatAPI 之前
+
+try:
+    from WechatAPI.Client.send_scheduler import (PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, SendScheduler,
+                                                 current_send_priority, send_priority)
+    from WechatAPI.Client2 import send_scheduler as client2_scheduler
+    from WechatAPI.Client3 import send_scheduler as client3_scheduler
+    from utils.decorators import schedule
+    from utils.xybot import XYBot
+except ImportError as e:  # aiohttp、pysilk、xywechatpad_binary 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+
+class Recorder:
+    """记录每次发送的接收人、内容和开始时间，统计同时进行的发送数"""
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.sent = []
+        self.active = {}
+        self.max_active = {}
+        self.max_total = 0
+
+    async def send(self, wxid, content):
+        self.active[wxid] = self.active.get(wxid, 0) + 1
+        self.max_active[wxid] = max(self.max_active.get(wxid, 0), self.active[wxid])
+        self.max_total = max(self.max_total, sum(self.active.values()))
+        self.sent.append((wxid, content, time.monotonic()))
+        await asyncio.sleep(self.duration)
+        self.active[wxid] -= 1
+        return content
+
+
+class TestSendScheduler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        asyncio.get_running_loop().set_debug(False)
+
+    async def test_recipients_sent_concurrently(self):
+        """不同接收人并发发送，同一接收人依次发送"""
+        scheduler = SendScheduler(per_chat_rate=0, global_rate=0)
+        recorder = Recorder(duration=0.05)
+        wxids = [f"wxid_{i}" for i in range(5)]
+        start = time.monotonic()
+        results = await asyncio.gather(*(scheduler.submit(wxid, recorder.send, wxid, n)
+                                         for n in range(3) for wxid in wxids))
+
+        self.assertEqual(results, [n for n in range(3) for _ in wxids])
+        self.assertEqual(recorder.max_total, 5)
+        self.assertEqual(set(recorder.max_active.values()), {1})
+        self.assertLess(time.monotonic() - start, 0.5)  # 串行发送需要 15 * 0.05 秒
+        for wxid in wxids:
+            self.assertEqual([content for to, content, _ in recorder.sent if to == wxid], [0, 1, 2])
+
+    async def test_per_chat_rate(self):
+        scheduler = SendScheduler(per_chat_rate=20, per_chat_burst=1, global_rate=0)
+        recorder = Recorder()
+        await asyncio.gather(*(scheduler.submit("wxid_a", recorder.send, "wxid_a", n) for n in range(5)))
+
+        times = [sent_at for _, _, sent_at in recorder.sent]
+        self.assertGreaterEqual(times[-1] - times[0], 4 / 20 * 0.9)
+
+    async def test_global_rate_caps_all_recipients(self):
+        scheduler = SendScheduler(per_chat_rate=0, global_rate=20, global_burst=2)
+        recorder = Recorder()
+        await asyncio.gather(*(scheduler.submit(f"wxid_{n}", recorder.send, f"wxid_{n}", n) for n in range(10)))
+
+        times = [sent_at for _, _, sent_at in recorder.sent]
+        # 突发 2 条之后每秒 20 条
+        self.assertGreaterEqual(times[-1] - times[0], 8 / 20 * 0.9)
+        self.assertEqual(scheduler.get_metrics()["sent"], 10)
+
+    async def test_priority_order_within_recipient(self):
+        scheduler = SendScheduler(per_chat_rate=0, global_rate=0)
+        release = asyncio.Event()
+        recorder = Recorder()
+
+        async def blocking_send(wxid, content):
+            await release.wait()
+            return await recorder.send(wxid, content)
+
+        first = asyncio.create_task(scheduler.submit("wxid_a", blocking_send, "wxid_a", "first"))
+        await asyncio.sleep(0.01)  # 第一条正在发送，后面的排队
+        jobs = [asyncio.create_task(scheduler.submit("wxid_a", recorder.send, "wxid_a", name, priority=priority))
+                for name, priority in (("low", PRIORITY_LOW), ("normal", PRIORITY_NORMAL), ("low2", PRIORITY_LOW))]
+        with send_priority(PRIORITY_HIGH):  # 不传 priority 时取上下文中的优先级
+            jobs.append(asyncio.create_task(scheduler.submit("wxid_a", recorder.send, "wxid_a", "high")))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, *jobs)
+
+        self.assertEqual([content for _, content, _ in recorder.sent], ["first", "high", "normal", "low", "low2"])
+
+    async def test_priority_order_on_global_bucket(self):
+        """账号级限速时，高优先级的会话先拿到令牌"""
+        scheduler = SendScheduler(per_chat_rate=0, global_rate=20, global_burst=1)
+        recorder = Recorder()
+        await scheduler.submit("wxid_warmup", recorder.send, "wxid_warmup", "warmup")  # 用掉突发的令牌
+        jobs = [scheduler.submit(f"wxid_low_{n}", recorder.send, f"wxid_low_{n}", "low", priority=PRIORITY_LOW)
+                for n in range(3)]
+        jobs.append(scheduler.submit("wxid_admin", recorder.send, "wxid_admin", "high", priority=PRIORITY_HIGH))
+        await asyncio.gather(*jobs)
+
+        self.assertEqual([content for _, content, _ in recorder.sent], ["warmup", "high", "low", "low", "low"])
+
+    async def test_failed_send_reported(self):
+        scheduler = SendScheduler(per_chat_rate=0, global_rate=0)
+
+        async def failing_send():
+            raise RuntimeError("发送失败")
+
+        with self.assertRaises(RuntimeError):
+            await scheduler.submit("wxid_a", failing_send)
+        self.assertEqual(scheduler.get_metrics()["failed"], 1)
+
+
+class TestSendPriorityWiring(unittest.IsolatedAsyncioTestCase):
+    def test_clients_share_priority_context(self):
+        with send_priority(PRIORITY_HIGH):
+            self.assertEqual(client2_scheduler.current_send_priority(), PRIORITY_HIGH)
+            self.assertEqual(client3_scheduler.current_send_priority(), PRIORITY_HIGH)
+        self.assertIsNone(client2_scheduler.current_send_priority())
+
+    async def test_scheduled_jobs_sent_at_low_priority(self):
+        class Plugin:
+            @schedule('interval', seconds=30)
+            async def push(self, bot):
+                default = current_send_priority()
+                with send_priority(PRIORITY_HIGH):  # 任务内显式指定的优先级仍然生效
+                    return default, current_send_priority()
+
+        self.assertEqual(await Plugin().push(None), (PRIORITY_LOW, PRIORITY_HIGH))
+        self.assertIsNone(current_send_priority())
+
+    async def test_admin_text_messages_sent_at_high_priority(self):
+        priorities = []
+
+        async def emit(message, is_at):
+            priorities.append(current_send_priority())
+
+        xybot = SimpleNamespace(wxid="wxid_bot", admins={"wxid_admin"}, msg_db=mock.AsyncMock(),
+                                event_bridge=mock.Mock(), _emit_text_message=emit)
+        for sender in ("wxid_admin", "wxid_user"):
+            message = {"MsgId": 1, "MsgType": 1, "FromWxid": sender, "ToWxid": "wxid_bot",
+                       "Content": {"string": "#重载插件"}, "MsgSource": ""}
+            await XYBot.process_text_message(xybot, message)
+
+        self.assertEqual(priorities, [PRIORITY_HIGH, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+import os
+import tempfile
+import time
+import unittest
+
+import db_sandbox  # noqa: F401  必须在导入 database 之前
+
+try:
+    from database.XYBotDB import AsyncXYBotDB, XYBotDB
+    from utils.singleton import Singleton
+except ImportError as e:  # sqlalchemy 等依赖未安装
+    raise unittest.SkipTest(f"缺少依赖: {e}")
+
+USERS = 50
+TICK = 0.005
+
+
+class TestAsyncXYBotDB(unittest.IsolatedAsyncioTestCase):
+    """并发签到时测量事件循环的卡顿时间"""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        with open("main_config.toml", "w", encoding="utf-8") as f:
+            f.write('[XYBot]\nXYBotDB-url = "sqlite:///xybot.db"\nXYBotDB-read-workers = 4\n')
+        Singleton._instances.pop(XYBotDB, None)
+        self.sync_db = XYBotDB()
+        self.db = AsyncXYBotDB(self.sync_db)
+
+    async def asyncSetUp(self):
+        # IsolatedAsyncioTestCase 默认开启调试模式，每次调度都记录调用栈，会放大卡顿时间
+        asyncio.get_running_loop().set_debug(False)
+
+    def tearDown(self):
+        self.sync_db.executor.shutdown(wait=True)
+        self.sync_db.read_executor.shutdown(wait=True)
+        self.sync_db.engine.dispose()
+        Singleton._instances.pop(XYBotDB, None)
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    async def measure_stall(self, work):
+        """运行 work 的同时每 TICK 秒唤醒一次，返回 (最长卡顿, 累计卡顿) 秒"""
+        stalls = []
+        finished = asyncio.Event()
+
+        async def ticker():
+            while not finished.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(TICK)
+                stalls.append(max(0.0, time.perf_counter() - start - TICK))
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(TICK * 2)
+        try:
+            await work()
+        finally:
+            finished.set()
+            await task
+        return max(stalls), sum(stalls)
+
+    async def sign_in_async(self, wxid):
+        """与 SignIn 插件相同的数据库调用"""
+        await self.db.get_signin_stat(wxid)
+        await self.db.get_signin_streak(wxid)
+        await self.db.set_signin_stat(wxid, datetime.datetime.now())
+        await self.db.set_signin_streak(wxid, 1)
+        await self.db.add_points(wxid, 10)
+
+    async def sign_in_blocking(self, wxid):
+        """原来的写法: 在协程中直接调用同步接口"""
+        self.sync_db.get_signin_stat(wxid)
+        self.sync_db.get_signin_streak(wxid)
+        self.sync_db.set_signin_stat(wxid, datetime.datetime.now())
+        self.sync_db.set_signin_streak(wxid, 1)
+        self.sync_db.add_points(wxid, 10)
+
+    async def test_concurrent_sign_ins_do_not_stall_loop(self):
+        async def sign_in_all(sign_in, prefix):
+            await asyncio.gather(*(sign_in(f"{prefix}{i}") for i in range(USERS)))
+
+        blocking_max, blocking_total = await self.measure_stall(
+            lambda: sign_in_all(self.sign_in_blocking, "wxid_sync_"))
+        async_max, async_total = await self.measure_stall(
+            lambda: sign_in_all(self.sign_in_async, "wxid_async_"))
+        print(f"\n{USERS} 个用户并发签到时事件循环卡顿: "
+              f"同步接口 最长 {blocking_max * 1000:.1f}ms 累计 {blocking_total * 1000:.1f}ms, "
+              f"异步接口 最长 {async_max * 1000:.1f}ms 累计 {async_total * 1000:.1f}ms")
+
+        # 同步接口在一次调度中执行完所有签到，异步接口的卡顿只来自调度开销和线程间的GIL切换
+        self.assertLess(async_max, blocking_max / 2)
+        points = await self.db.get_points_many(f"wxid_async_{i}" for i in range(USERS))
+        self.assertEqual(set(points.values()), {10})
+
+    async def test_add_points_updates_ranking(self):
+        """并发加积分后排行与数据库一致"""
+        await self.db.get_leaderboard(10)  # 加载排行索引
+        await asyncio.gather(*(self.db.add_points(f"wxid_{i % 5}", 1) for i in range(100)))
+        self.assertEqual(await self.db.get_leaderboard(10), [(f"wxid_{i}", 20) for i in range(5)])
+        self.assertEqual(await self.db.get_points("wxid_0"), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
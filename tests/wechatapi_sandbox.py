@@ -0,0 +1,20 @@
+"""导入 WechatAPI 客户端后删除测试期间新建的 login_stat.json
+
+导入客户端包时风控保护模块会在包目录下创建 login_stat.json。测试模块在导入 WechatAPI 之前先导入本模块，
+进程退出时删除本次运行新建的文件，已有的文件保持不变。
+"""
+import atexit
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT_PACKAGES = ("Client", "Client2", "Client3")
+
+
+def _remove_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+_login_stats = [os.path.join(ROOT, "WechatAPI", package, "login_stat.json") for package in CLIENT_PACKAGES]
+atexit.register(_remove_files, [path for path in _login_stats if not os.path.exists(path)])
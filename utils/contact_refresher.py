@@ -0,0 +1,181 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from database.contacts_db import get_contact_from_db_async, update_contact_in_db_async
+
+
+def _text(value: Any) -> str:
+    """协议返回的字符串字段可能是 {"string": "..."} 形式"""
+    if isinstance(value, dict):
+        value = value.get("string", "")
+    return value or ""
+
+
+def parse_contact_detail(wxid: str, detail: Dict[str, Any]) -> Dict[str, Any]:
+    """把 get_contract_detail 返回的单个联系人转换为数据库中的联系人信息"""
+    nickname = _text(detail.get("nickname")) or _text(detail.get("NickName"))
+
+    # 处理头像字段 - 优先使用BigHeadImgUrl或SmallHeadImgUrl
+    avatar = detail.get("BigHeadImgUrl") or detail.get("SmallHeadImgUrl") or _text(detail.get("avatar"))
+
+    return {
+        "wxid": wxid,
+        "nickname": nickname or wxid,
+        "avatar": avatar or "",
+        "remark": _text(detail.get("remark")) or _text(detail.get("Remark")),
+        "alias": _text(detail.get("alias")) or _text(detail.get("Alias")),
+    }
+
+
+def _detail_wxid(detail: Dict[str, Any]) -> str:
+    return _text(detail.get("UserName")) or _text(detail.get("userName")) or detail.get("wxid") or ""
+
+
+class ContactRefresher:
+    """联系人信息刷新服务
+
+    - 内存中用LRU记录最近刷新过的联系人，TTL内不再访问数据库和接口
+    - 同一个wxid同时只有一次刷新，其余调用等待同一个结果
+    - 需要从接口获取的wxid攒成一批，用一次 get_contract_detail 查询
+    """
+
+    def __init__(self, bot, config: Dict[str, Any]):
+        """初始化刷新服务
+
+        Args:
+            bot: WechatAPI客户端
+            config: [ContactRefresh] 配置字典
+        """
+        self.bot = bot
+        self.ttl = config.get("ttl", 86400)
+        self.cache_size = max(1, config.get("cache-size", 5000))
+        self.batch_size = min(20, max(1, config.get("batch-size", 20)))  # 接口一次最多查询20个
+        self.batch_delay = config.get("batch-delay", 0.2)
+
+        self._refreshed: "OrderedDict[str, float]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}  # wxid -> 数据库中已有的联系人
+        self._batch_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.fetched = 0
+
+    def _mark(self, wxid: str, refreshed_at: float = None):
+        self._refreshed[wxid] = refreshed_at or time.time()
+        self._refreshed.move_to_end(wxid)
+        while len(self._refreshed) > self.cache_size:
+            self._refreshed.popitem(last=False)
+
+    def invalidate(self, wxid: str):
+        """使联系人缓存失效，下次收到消息时重新获取"""
+        self._refreshed.pop(wxid, None)
+
+    async def refresh(self, wxid: str):
+        """确保联系人信息存在且不超过TTL"""
+        refreshed_at = self._refreshed.get(wxid)
+        if refreshed_at is not None and time.time() - refreshed_at < self.ttl:
+            self._refreshed.move_to_end(wxid)
+            self.hits += 1
+            return
+
+        future = self._inflight.get(wxid)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[wxid] = future
+            asyncio.create_task(self._refresh(wxid, future))
+        await asyncio.shield(future)
+
+    async def _refresh(self, wxid: str, future: asyncio.Future):
+        try:
+            existing = await get_contact_from_db_async(wxid)
+            fresh = existing and existing.get("nickname") and (
+                    wxid.endswith("@chatroom") or time.time() - (existing.get("last_updated") or 0) < self.ttl)
+            if fresh:
+                self._mark(wxid, existing.get("last_updated"))
+                self._finish(wxid)
+            elif wxid.endswith("@chatroom"):
+                # 群聊不获取详细信息，只保存基本信息
+                await update_contact_in_db_async({"wxid": wxid, "nickname": wxid, "type": "group"})
+                logger.debug(f"已在消息处理中更新群聊 {wxid} 的基本信息")
+                self._mark(wxid)
+                self._finish(wxid)
+            else:
+                self._pending[wxid] = existing
+                if len(self._pending) >= self.batch_size:
+                    await self._flush()
+                elif self._batch_task is None or self._batch_task.done():
+                    self._batch_task = asyncio.create_task(self._flush_later())
+        except Exception as e:
+            logger.error(f"更新联系人信息时发生异常: {str(e)}")
+            self._finish(wxid)
+
+    def _finish(self, wxid: str):
+        future = self._inflight.pop(wxid, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_delay)
+        await self._flush()
+
+    async def _flush(self):
+        """用一次接口调用获取一批联系人详情并保存"""
+        if not self._pending:
+            return
+        batch = dict(list(self._pending.items())[:self.batch_size])
+        for wxid in batch:
+            self._pending.pop(wxid)
+        if self._pending and (self._batch_task is None or self._batch_task.done()):
+            self._batch_task = asyncio.create_task(self._flush_later())
+
+        wxids = list(batch)
+        details: Dict[str, Dict[str, Any]] = {}
+        try:
+            logger.debug(f"开始获取联系人 {wxids} 的详细信息")
+            result = await self.bot.get_contract_detail(wxids if len(wxids) > 1 else wxids[0])
+            if isinstance(result, dict):
+                result = [result]
+            items: List[Dict[str, Any]] = [item for item in result or [] if isinstance(item, dict)]
+            for item in items:
+                item_wxid = _detail_wxid(item)
+                if item_wxid in batch:
+                    details[item_wxid] = item
+            if len(wxids) == 1 and not details and items:
+                details[wxids[0]] = items[0]
+            self.fetched += len(details)
+        except Exception as e:
+            logger.error(f"调用API获取联系人 {wxids} 详情失败: {str(e)}")
+
+        for wxid, existing in batch.items():
+            try:
+                if wxid in details:
+                    contact_info = parse_contact_detail(wxid, details[wxid])
+                elif existing:
+                    # 获取失败时保留已有信息，TTL后再试
+                    contact_info = None
+                else:
+                    logger.warning(f"无法获取联系人 {wxid} 的详细信息，保存基本信息")
+                    contact_info = {"wxid": wxid, "nickname": wxid, "type": "friend"}
+
+                if contact_info is not None:
+                    await update_contact_in_db_async(contact_info)
+                    logger.debug(f"已在消息处理中更新联系人 {wxid} 的信息")
+                self._mark(wxid)
+            except Exception as e:
+                logger.error(f"保存联系人 {wxid} 信息失败: {str(e)}")
+            finally:
+                self._finish(wxid)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取刷新服务统计信息"""
+        return {
+            "cached": len(self._refreshed),
+            "inflight": len(self._inflight),
+            "pending": len(self._pending),
+            "hits": self.hits,
+            "fetched": self.fetched,
+        }
@@ -26,7 +26,10 @@ def schedule(
 
         @wraps(func)
         async def wrapper(self, *args, **kwargs):
-            return await func(self, *args, **kwargs)
+            # 定时任务发送的多是定时推送和群发，按低优先级排队，不挤占对用户消息的回复
+            from WechatAPI.Client.send_scheduler import PRIORITY_LOW, send_priority
+            with send_priority(PRIORITY_LOW):
+                return await func(self, *args, **kwargs)
 
         setattr(wrapper, '_is_scheduled', True)
         setattr(wrapper, '_schedule_trigger', trigger)
@@ -56,8 +59,41 @@ def remove_job_safe(scheduler: AsyncIOScheduler, job_id: str):
         pass
 
 
-def on_text_message(priority=50):
-    """文本消息装饰器"""
+def _set_routes(func, commands, prefixes, regex):
+    """记录处理函数的命令路由条件，由 EventManager 编译进分发索引"""
+    if commands is not None:
+        setattr(func, '_commands', commands)
+    if prefixes is not None:
+        setattr(func, '_prefixes', prefixes)
+    if regex is not None:
+        setattr(func, '_regex', regex)
+
+
+def _set_execution(func, blocking, timeout):
+    """记录处理函数的执行方式
+
+    blocking=False 的处理函数是旁观者：不能阻止事件继续传递，与其它处理函数并发执行。
+    timeout 为单个处理函数的超时时间(秒)，None 时使用全局配置。
+    """
+    setattr(func, '_blocking', blocking)
+    if timeout is not None:
+        setattr(func, '_timeout', timeout)
+
+
+def on_text_message(priority=50, commands=None, prefixes=None, regex=None, blocking=True, timeout=None):
+    """文本消息装饰器
+
+    声明路由条件后，只有内容匹配的消息才会调用该处理函数，未声明时所有文本消息都会调用。
+
+    - commands: 命令词列表，消息的第一个词等于其中之一时匹配
+    - prefixes: 前缀列表，消息以其中之一开头时匹配
+    - regex: 正则表达式或其列表，从消息开头匹配
+    - blocking: 为 False 时与其它处理函数并发执行，返回值不影响事件传递
+    - timeout: 处理函数超时时间(秒)
+
+    commands 和 prefixes 传入字符串时表示插件实例上保存命令列表的属性名，在插件加载时读取，
+    例如 @on_text_message(commands="command") 使用配置文件中读取到的 self.command
+    """
     def decorator(func):
         if callable(priority):  # 无参数调用时
             func_to_decorate = priority
@@ -67,12 +103,14 @@ def on_text_message(priority=50):
         # 有参数调用时
         setattr(func, '_event_type', 'text_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
+        _set_routes(func, commands, prefixes, regex)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_image_message(priority=50):
+def on_image_message(priority=50, blocking=True, timeout=None):
     """图片消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -82,12 +120,13 @@ def on_image_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'image_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_voice_message(priority=50):
+def on_voice_message(priority=50, blocking=True, timeout=None):
     """语音消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -97,12 +136,13 @@ def on_voice_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'voice_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_emoji_message(priority=50):
+def on_emoji_message(priority=50, blocking=True, timeout=None):
     """表情消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -112,12 +152,13 @@ def on_emoji_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'emoji_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_file_message(priority=50):
+def on_file_message(priority=50, blocking=True, timeout=None):
     """文件消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -127,12 +168,13 @@ def on_file_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'file_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_quote_message(priority=50):
+def on_quote_message(priority=50, blocking=True, timeout=None):
     """引用消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -142,12 +184,13 @@ def on_quote_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'quote_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_video_message(priority=50):
+def on_video_message(priority=50, blocking=True, timeout=None):
     """视频消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -157,12 +200,13 @@ def on_video_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'video_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_pat_message(priority=50):
+def on_pat_message(priority=50, blocking=True, timeout=None):
     """拍一拍消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -172,12 +216,13 @@ def on_pat_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'pat_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_at_message(priority=50):
+def on_at_message(priority=50, blocking=True, timeout=None):
     """被@消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -187,12 +232,13 @@ def on_at_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'at_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_system_message(priority=50):
+def on_system_message(priority=50, blocking=True, timeout=None):
     """系统消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -202,12 +248,13 @@ def on_system_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'system_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_other_message(priority=50):
+def on_other_message(priority=50, blocking=True, timeout=None):
     """其他消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -217,12 +264,13 @@ def on_other_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'other_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_article_message(priority=50):
+def on_article_message(priority=50, blocking=True, timeout=None):
     """公众号文章消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -232,12 +280,13 @@ def on_article_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'article_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_xml_message(priority=50):
+def on_xml_message(priority=50, blocking=True, timeout=None):
     """XML消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -247,6 +296,7 @@ def on_xml_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'xml_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        _set_execution(func, blocking, timeout)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
\ No newline at end of file
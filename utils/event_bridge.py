@@ -0,0 +1,165 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+HANDSHAKE_TIMEOUT = 5  # 等待DOW框架确认握手的最长时间（秒）
+
+
+class BridgeRejected(ConnectionError):
+    """DOW框架拒绝了事件桥连接（密钥不一致）或没有确认握手"""
+
+
+class MessageEventBridge:
+    """把处理后的消息以结构化事件直接推送给DOW框架(WX849Channel)
+
+    取代 wx849_callback_daemon.py 扫描日志再用正则还原消息的方式。
+    事件通过本机TCP连接逐行发送JSON，连接断开时事件保留在有界缓冲中，重连后继续发送。
+
+    协议: 连接建立后先发送 {"auth": key}，DOW框架回复 {"ok": true} 后，每行发送一个消息事件，
+    格式与回调接口的单条消息相同。握手被拒绝或没有回复时不发送任何事件，按退避时间重连。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """初始化事件桥
+
+        Args:
+            config: [EventBridge] 配置字典
+        """
+        self.enabled = config.get("enabled", False)
+        self.host = config.get("host", "127.0.0.1")
+        self.port = config.get("port", 8089)
+        self.key = config.get("key", "")
+        self.queue_size = max(1, config.get("queue-size", 10000))
+
+        self._events: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+        self.published = 0
+        self.sent = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"消息事件桥已启动，目标: {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    def publish(self, event: Dict[str, Any]):
+        """发布消息事件，不等待发送完成"""
+        if not self.enabled:
+            return
+        if len(self._events) >= self.queue_size:
+            self._events.popleft()
+            self.dropped += 1
+        self._events.append(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.published += 1
+        self._wakeup.set()
+
+    async def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._writer = None
+        self._reader = None
+
+    async def _connect(self):
+        """建立连接并完成握手，DOW框架确认后才开始发送事件"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(json.dumps({"auth": self.key}).encode("utf-8") + b"\n")
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT)
+            try:
+                reply = json.loads(line) if line else {}
+            except ValueError:
+                reply = {}
+            if not isinstance(reply, dict) or not reply.get("ok"):
+                self.rejected += 1
+                reason = reply.get("error") if isinstance(reply, dict) else None
+                raise BridgeRejected(f"DOW框架拒绝了事件桥连接: {reason or '连接被关闭'}，请检查两边的密钥是否一致")
+        except BaseException as e:
+            writer.close()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise BridgeRejected(f"{HANDSHAKE_TIMEOUT}秒内没有收到DOW框架的握手确认") from e
+            raise
+        self._reader, self._writer = reader, writer
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            await self._wakeup.wait()
+            try:
+                if self._writer is None:
+                    await self._connect()
+                    logger.info(f"已连接消息事件桥: {self.host}:{self.port}")
+                    backoff = 1
+                while self._events:
+                    if self._reader.at_eof():
+                        raise ConnectionResetError("DOW框架已关闭事件桥连接")
+                    batch = [self._events.popleft() for _ in range(len(self._events))]
+                    try:
+                        self._writer.write(b"".join(batch))
+                        await self._writer.drain()
+                    except BaseException:
+                        # 发送失败的事件放回缓冲，重连后补发
+                        self._events.extendleft(reversed(batch))
+                        raise
+                    self.sent += len(batch)
+                self._wakeup.clear()
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"消息事件桥连接失败: {e}，{backoff}秒后重试，待发送 {len(self._events)} 条")
+                await self._close()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """获取事件桥统计信息"""
+        return {
+            "published": self.published,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "pending": len(self._events),
+            "connected": self._writer is not None,
+        }
+
+
+def message_event(message: Dict[str, Any], msg_type: int = None, **extra) -> Dict[str, Any]:
+    """把XYBot处理过的消息转换为回调接口使用的消息格式"""
+    event = {
+        "MsgId": message.get("MsgId", 0),
+        "NewMsgId": message.get("NewMsgId", 0),
+        "MsgType": msg_type if msg_type is not None else message.get("MsgType", 1),
+        "FromUserName": {"string": message.get("FromWxid", "")},
+        "ToUserName": {"string": message.get("ToWxid", "")},
+        "FromWxid": message.get("FromWxid", ""),
+        "SenderWxid": message.get("SenderWxid", ""),
+        "Content": message.get("Content", ""),
+        "MsgSource": message.get("MsgSource", ""),
+        "CreateTime": message.get("CreateTime", int(time.time())),
+    }
+    if message.get("PushContent"):
+        event["PushContent"] = message["PushContent"]
+    event.update(extra)
+    return event
@@ -1,9 +1,164 @@
+import asyncio
 import copy
-from typing import Callable, Dict, List
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+_MUTABLE_TYPES = (dict, list, set, bytearray)
+
+
+class MessageView(dict):
+    """写时复制的消息视图
+
+    每个处理函数拿到一个独立的视图：顶层字段只做浅拷贝，字符串等不可变字段与原消息共享，
+    列表、字典等可变字段在第一次被读取时才复制一份私有副本。处理函数修改消息不会影响
+    原消息和其它处理函数，未修改时也不会复制 Content 等大字段。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._owned = set()
+
+    def _private(self, key):
+        """返回 key 对应的值，可变值先替换为私有副本"""
+        value = super().__getitem__(key)
+        if key not in self._owned:
+            self._owned.add(key)
+            if isinstance(value, _MUTABLE_TYPES):
+                value = copy.deepcopy(value)
+                super().__setitem__(key, value)
+        return value
+
+    def _own_all(self):
+        for key in list(super().keys()):
+            self._private(key)
+
+    def __getitem__(self, key):
+        return self._private(key)
+
+    def __setitem__(self, key, value):
+        self._owned.add(key)
+        super().__setitem__(key, value)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self._private(key)
+        return default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self._private(key)
+        self[key] = default
+        return default
+
+    def pop(self, key, *default):
+        if key in self:
+            self._private(key)
+        self._owned.discard(key)
+        return super().pop(key, *default)
+
+    def __iter__(self):
+        # dict(view)、{**view} 和 dict.update(view) 对重写了 __iter__ 的子类会逐个调用 __getitem__，
+        # 拿到的是私有副本而不是原消息中的列表和字典
+        return super().__iter__()
+
+    def values(self):
+        self._own_all()
+        return super().values()
+
+    def items(self):
+        self._own_all()
+        return super().items()
+
+    def copy(self):
+        return MessageView(self)
+
+    def __reduce__(self):
+        return MessageView, (dict(self.items()),)
+
+
+def _handler_kwarg(value: Any) -> Any:
+    if type(value) is dict or isinstance(value, MessageView):
+        return MessageView(value)
+    return copy.deepcopy(value)
+
+
+def _resolve_words(value: Any, instance: object) -> List[str]:
+    """字符串表示插件实例上的属性名，在绑定时读取；列表为固定的命令词"""
+    if isinstance(value, str):
+        value = getattr(instance, value, None)
+        if isinstance(value, str):
+            value = [value]
+    return [str(word) for word in value or [] if word]
+
+
+class _DispatchIndex:
+    """事件的命令路由索引
+
+    处理函数按 _handlers 中的位置编号。声明了命令、前缀或正则的处理函数只在消息内容匹配时调用，
+    未声明的处理函数对所有消息调用。命令词用字典精确匹配消息的第一个词，前缀用前缀树一次扫描匹配。
+    """
+
+    def __init__(self, handlers: List[tuple[Callable, object, int]]):
+        self.routed: List[bool] = []
+        self.commands: Dict[str, Set[int]] = {}
+        self.prefix_trie: dict = {}
+        self.patterns: List[tuple[re.Pattern, int]] = []
+
+        for position, (handler, instance, _) in enumerate(handlers):
+            commands = _resolve_words(getattr(handler, "_commands", None), instance)
+            prefixes = _resolve_words(getattr(handler, "_prefixes", None), instance)
+            patterns = getattr(handler, "_regex", None) or []
+            if isinstance(patterns, (str, re.Pattern)):
+                patterns = [patterns]
+
+            self.routed.append(bool(commands or prefixes or patterns))
+            for command in commands:
+                self.commands.setdefault(command, set()).add(position)
+            for prefix in prefixes:
+                node = self.prefix_trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, set()).add(position)
+            for pattern in patterns:
+                self.patterns.append((re.compile(pattern) if isinstance(pattern, str) else pattern, position))
+
+        self.has_routes = any(self.routed)
+
+    def match(self, content: str) -> Set[int]:
+        """返回内容匹配的处理函数位置"""
+        matched = set()
+        words = content.split(maxsplit=1)
+        if words:
+            matched |= self.commands.get(words[0], set())
+
+        node = self.prefix_trie
+        for char in content:
+            node = node.get(char)
+            if node is None:
+                break
+            matched |= node.get(None, set())
+
+        for pattern, position in self.patterns:
+            if position not in matched and pattern.match(content):
+                matched.add(position)
+        return matched
 
 
 class EventManager:
     _handlers: Dict[str, List[tuple[Callable, object, int]]] = {}
+    _indexes: Dict[str, _DispatchIndex] = {}
+    _stats: Dict[str, Dict[str, int]] = {}
+    _handler_stats: Dict[str, Dict[str, Any]] = {}
+
+    handler_timeout: Optional[float] = None
+    handler_budget: Optional[float] = None
+
+    @classmethod
+    def _rebuild_index(cls, event_type: str):
+        cls._indexes[event_type] = _DispatchIndex(cls._handlers[event_type])
 
     @classmethod
     def bind_instance(cls, instance: object):
@@ -13,33 +168,114 @@ class EventManager:
             if hasattr(method, '_event_type'):
                 event_type = getattr(method, '_event_type')
                 priority = getattr(method, '_priority', 50)
-                
-                if event_type not in cls._handlers:
-                    cls._handlers[event_type] = []
-                cls._handlers[event_type].append((method, instance, priority))
+
+                # 生成新列表而不是原地修改，正在进行的 emit 继续使用旧列表和旧索引
                 # 按优先级排序，优先级高的在前
-                cls._handlers[event_type].sort(key=lambda x: x[2], reverse=True)
+                cls._handlers[event_type] = sorted(
+                    [*cls._handlers.get(event_type, []), (method, instance, priority)],
+                    key=lambda x: x[2], reverse=True)
+                cls._rebuild_index(event_type)
+
+    @classmethod
+    def configure(cls, handler_timeout: Optional[float] = None, handler_budget: Optional[float] = None):
+        """设置处理函数的默认超时时间和耗时预算(秒)，0 或 None 表示不限制"""
+        cls.handler_timeout = handler_timeout or None
+        cls.handler_budget = handler_budget or None
+
+    @classmethod
+    async def _run_handler(cls, handler: Callable, *args, **kwargs) -> Any:
+        """执行单个处理函数，超时或超出耗时预算时记录日志和统计"""
+        name = getattr(handler, "__qualname__", repr(handler))
+        stats = cls._handler_stats.setdefault(name, {"calls": 0, "slow": 0, "timeouts": 0, "max": 0.0})
+        stats["calls"] += 1
+        timeout = getattr(handler, "_timeout", cls.handler_timeout)
+
+        start = time.monotonic()
+        try:
+            if timeout is None:
+                return await handler(*args, **kwargs)
+            deadline = asyncio.timeout(timeout)
+            try:
+                async with deadline:
+                    return await handler(*args, **kwargs)
+            except TimeoutError:
+                # 处理函数自己抛出的 TimeoutError 原样抛出，只有超过我们设置的期限才算超时
+                if not deadline.expired():
+                    raise
+                stats["timeouts"] += 1
+                logger.warning("事件处理函数 {} 超时({}秒)，已取消", name, timeout)
+                return None
+        finally:
+            elapsed = time.monotonic() - start
+            stats["max"] = max(stats["max"], elapsed)
+            if cls.handler_budget and elapsed > cls.handler_budget:
+                stats["slow"] += 1
+                logger.warning("事件处理函数 {} 耗时 {:.2f} 秒，超出预算 {} 秒", name, elapsed, cls.handler_budget)
+
+    @classmethod
+    async def _run_observer(cls, handler: Callable, *args, **kwargs):
+        try:
+            await cls._run_handler(handler, *args, **kwargs)
+        except Exception as e:
+            logger.exception("事件处理函数 {} 出错: {}", getattr(handler, "__qualname__", handler), e)
 
     @classmethod
     async def emit(cls, event_type: str, *args, **kwargs) -> None:
-        """触发事件"""
+        """触发事件
+
+        阻塞处理函数按优先级依次执行，返回 False 时停止传递；
+        非阻塞处理函数(blocking=False)同时开始并发执行，不受传递是否停止的影响，emit 等待它们全部结束后返回。
+        """
         if event_type not in cls._handlers:
             return
 
+        handlers = cls._handlers[event_type]
+        index = cls._indexes.get(event_type)
         api_client, message = args
-        for handler, instance, priority in cls._handlers[event_type]:
-            # 只对 message 进行深拷贝，api_client 保持不变
-            handler_args = (api_client, copy.deepcopy(message))
-            new_kwargs = {k: copy.deepcopy(v) for k, v in kwargs.items()}
 
-            result = await handler(*handler_args, **new_kwargs)
+        matched: Optional[Set[int]] = None
+        if index is not None and index.has_routes and isinstance(message, dict):
+            matched = index.match(str(message.get("Content", "")).strip())
 
-            if isinstance(result, bool):
-                # True 继续执行 False 停止执行
-                if not result:
-                    break
+        stats = cls._stats.setdefault(event_type, {"messages": 0, "candidates": 0, "invoked": 0})
+        stats["messages"] += 1
+        stats["candidates"] += len(handlers)
+
+        blocking = []
+        observers = []
+        for position, (handler, instance, priority) in enumerate(handlers):
+            if matched is not None and index.routed[position] and position not in matched:
+                continue
+            stats["invoked"] += 1
+            if getattr(handler, "_blocking", True):
+                blocking.append(handler)
             else:
-                continue  # 我也不知道你返回了个啥玩意，反正继续执行就是了
+                # 每个处理函数拿到写时复制的消息视图，api_client 保持不变
+                observers.append(asyncio.create_task(cls._run_observer(
+                    handler, api_client, MessageView(message),
+                    **{k: _handler_kwarg(v) for k, v in kwargs.items()})))
+
+        try:
+            for handler in blocking:
+                handler_args = (api_client, MessageView(message))
+                new_kwargs = {k: _handler_kwarg(v) for k, v in kwargs.items()}
+
+                result = await cls._run_handler(handler, *handler_args, **new_kwargs)
+
+                if isinstance(result, bool):
+                    # True 继续执行 False 停止执行
+                    if not result:
+                        break
+                else:
+                    continue  # 我也不知道你返回了个啥玩意，反正继续执行就是了
+        finally:
+            if observers:
+                await asyncio.gather(*observers, return_exceptions=True)
+
+    @classmethod
+    def has_handlers(cls, event_type: str) -> bool:
+        """是否有处理函数绑定了该事件，没有时可以跳过下载媒体等准备工作"""
+        return bool(cls._handlers.get(event_type))
 
     @classmethod
     def unbind_instance(cls, instance: object):
@@ -50,3 +286,25 @@ class EventManager:
                 for handler, inst, priority in cls._handlers[event_type]
                 if inst is not instance
             ]
+            cls._rebuild_index(event_type)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """获取各事件的分发统计
+
+        candidates 为不使用路由索引时需要调用的处理函数数量，invoked 为实际调用的数量
+        """
+        result = {}
+        for event_type, stats in cls._stats.items():
+            messages = stats["messages"] or 1
+            result[event_type] = {
+                **stats,
+                "avg_candidates": stats["candidates"] / messages,
+                "avg_invoked": stats["invoked"] / messages,
+            }
+        return result
+
+    @classmethod
+    def get_handler_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """获取各处理函数的调用次数、超时次数、超出预算次数和最长耗时"""
+        return {name: dict(stats) for name, stats in cls._handler_stats.items()}
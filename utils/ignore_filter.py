@@ -0,0 +1,172 @@
+import os
+import re
+import time
+import tomllib
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+# 微信团队和系统通知账号
+SYSTEM_ACCOUNTS = frozenset({
+    'weixin',  # 微信团队
+    'filehelper',  # 文件传输助手
+    'fmessage',  # 朋友推荐通知
+    'medianote',  # 语音记事本
+    'floatbottle',  # 漂流瓶
+    'qmessage',  # QQ离线消息
+    'qqmail',  # QQ邮箱提醒
+    'tmessage',  # 腾讯新闻
+    'weibo',  # 微博推送
+    'newsapp',  # 新闻推送
+    'notification_messages',  # 服务通知
+    'helper_entry',  # 新版微信运动
+    'mphelper',  # 公众号助手
+    'brandsessionholder',  # 公众号消息
+    'weixinreminder',  # 微信提醒
+    'officialaccounts',  # 公众平台
+})
+
+# 特殊账号特征，分组名即统计中的规则名
+SPECIAL_ACCOUNT_PATTERN = re.compile(
+    r"(?P<official_account>^gh_)"  # 公众号wxid通常以gh_开头
+    r"|(?P<wxpay>wxpay)"  # 微信支付相关通知
+    r"|(?i:(?P<tencent_game>tencent|game))"  # 腾讯游戏相关通知
+    r"|(?i:(?P<service_account>service|official))"  # 微信官方账号通常包含"service"或"official"
+)
+
+# 特殊账号判断结果缓存的最大条目数
+RULE_CACHE_SIZE = 10000
+
+
+class IgnoreFilter:
+    """消息过滤器
+
+    配置加载一次后编译为集合和正则，每条消息只做集合查找和一次正则匹配。
+    配置文件修改后自动重新加载，并按规则统计被过滤的消息数量。
+    """
+
+    def __init__(self, config_path: str = "main_config.toml", reload_interval: float = 5.0):
+        """初始化过滤器
+
+        Args:
+            config_path: 配置文件路径
+            reload_interval: 检查配置文件是否修改的间隔（秒），0表示不自动重新加载
+        """
+        self.config_path = config_path
+        self.reload_interval = reload_interval
+        self.counters: Counter = Counter()
+
+        self.ignore_mode = "None"
+        self.whitelist: frozenset = frozenset()
+        self.blacklist: frozenset = frozenset()
+
+        # 特殊账号规则与配置无关，按wxid缓存判断结果，避免每条消息都做正则匹配
+        self._rule_cache: Dict[str, Optional[str]] = {}
+
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self, config: Dict[str, Any] = None):
+        """从配置重新构建过滤集合
+
+        Args:
+            config: 已加载的配置，为空时从配置文件读取
+        """
+        if config is None:
+            try:
+                self._mtime = os.stat(self.config_path).st_mtime
+                with open(self.config_path, "rb") as f:
+                    config = tomllib.load(f)
+            except (OSError, tomllib.TOMLDecodeError) as e:
+                logger.error(f"加载消息过滤配置失败: {e}")
+                return
+
+        # 优先读取顶层设置，没有则从AutoRestart部分读取
+        if "ignore-mode" in config:
+            section = config
+        elif "ignore-mode" in config.get("AutoRestart", {}):
+            section = config["AutoRestart"]
+        else:
+            section = {}
+
+        self.ignore_mode = section.get("ignore-mode", "None")
+        self.whitelist = frozenset(section.get("whitelist", []))
+        self.blacklist = frozenset(section.get("blacklist", []))
+
+    def _maybe_reload(self):
+        if not self.reload_interval:
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            mtime = os.stat(self.config_path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+            logger.info(f"消息过滤配置已重新加载: 模式={self.ignore_mode}, "
+                        f"白名单{len(self.whitelist)}个, 黑名单{len(self.blacklist)}个")
+
+    def _special_rule(self, wxid: Any) -> Optional[str]:
+        """返回命中的特殊账号规则名，未命中返回None"""
+        if not wxid or not isinstance(wxid, str):
+            return None
+        rule = self._rule_cache.get(wxid, False)
+        if rule is not False:
+            return rule
+
+        if wxid in SYSTEM_ACCOUNTS:
+            rule = "system_account"
+        else:
+            match = SPECIAL_ACCOUNT_PATTERN.search(wxid)
+            rule = match.lastgroup if match else None
+
+        if len(self._rule_cache) >= RULE_CACHE_SIZE:
+            self._rule_cache.clear()
+        self._rule_cache[wxid] = rule
+        return rule
+
+    def check(self, from_wxid: str, sender_wxid: str) -> bool:
+        """检查消息是否需要处理
+
+        Args:
+            from_wxid: 消息来源，群聊为群wxid
+            sender_wxid: 发送者wxid
+
+        Returns:
+            bool: 需要处理返回True，被过滤返回False
+        """
+        self._maybe_reload()
+
+        rule = self._special_rule(sender_wxid) or self._special_rule(from_wxid)
+        if rule:
+            self.counters[rule] += 1
+            logger.debug("忽略特殊账号消息: {} 规则: {}", sender_wxid or from_wxid, rule)
+            return False
+
+        is_group = isinstance(from_wxid, str) and from_wxid.endswith("@chatroom")
+
+        if self.ignore_mode == "Whitelist":
+            # 群聊消息：群聊ID或发送者ID在白名单中；私聊消息：发送者ID在白名单中
+            allowed = sender_wxid in self.whitelist or (is_group and from_wxid in self.whitelist)
+            rule = None if allowed else "whitelist"
+        elif self.ignore_mode == "Blacklist":
+            # 群聊消息：群聊ID和发送者ID都不在黑名单中；私聊消息：发送者ID不在黑名单中
+            blocked = sender_wxid in self.blacklist or (is_group and from_wxid in self.blacklist)
+            rule = "blacklist" if blocked else None
+
+        if rule:
+            self.counters[rule] += 1
+            logger.debug("消息被{}过滤: 来源={} 发送者={}", rule, from_wxid, sender_wxid)
+            return False
+
+        self.counters["passed"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取各规则的命中次数"""
+        return dict(self.counters)
@@ -0,0 +1,281 @@
+import glob
+import logging
+import os
+import threading
+from collections import deque
+from fnmatch import fnmatch
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # 没有watchdog时退化为定时检查
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+
+class _TailedFile:
+    """正在跟踪的日志文件，用 (设备号, inode) 识别，文件被重命名后继续从原位置读取"""
+
+    def __init__(self, path: str, key: Tuple[int, int], position: int):
+        self.path = path
+        self.key = key
+        self.position = position
+        self.partial = b""  # 还没有换行符结尾的内容
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    # 打开和只读关闭不改变文件内容，跟踪器自己读取文件也会产生这两种事件，处理它们会反复唤醒读取
+    IGNORED_EVENTS = ("opened", "closed_no_write")
+
+    def __init__(self, tailer: "LogTailer"):
+        self.tailer = tailer
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type in self.IGNORED_EVENTS:
+            return
+        self.tailer.notify_event(event.event_type, event.src_path, getattr(event, "dest_path", ""))
+
+
+class LogTailer:
+    """按glob跟踪日志文件新增的行
+
+    由文件系统事件（Linux上为inotify）唤醒，空闲时不占用CPU；没有事件时每隔 poll_interval 秒
+    再检查一次，防止漏掉事件。
+
+    - 日志轮转后新建的、匹配glob的文件会自动开始跟踪，从头读取
+    - 文件按inode识别，被重命名的文件继续从原位置读取；同名文件被替换时读取新文件
+    - 文件被截断时从头读取
+    - 每次最多读取 max_read 字节，单行最长 max_line 字节，只返回完整的行
+    """
+
+    def __init__(self, patterns: List[str], from_end: bool = True, poll_interval: float = 5.0,
+                 max_read: int = 1024 * 1024, max_line: int = 1024 * 1024, encoding: str = "utf-8"):
+        """初始化跟踪器
+
+        Args:
+            patterns: 日志文件的glob列表
+            from_end: 启动时已存在的文件是否从末尾开始读取
+            poll_interval: 没有文件事件时重新检查的间隔（秒）
+            max_read: 每个文件每轮最多读取的字节数，读不完的下一轮继续
+            max_line: 单行最大字节数，超出时强制分行
+            encoding: 日志文件编码
+        """
+        self.patterns = [os.path.abspath(pattern) for pattern in patterns]
+        self.from_end = from_end
+        self.poll_interval = poll_interval if Observer is not None else min(poll_interval, 0.5)
+        self.max_read = max_read
+        self.max_line = max_line
+        self.encoding = encoding
+
+        self.files: Dict[Tuple[int, int], _TailedFile] = {}
+        self.paths: Dict[str, Tuple[int, int]] = {}
+
+        self._wakeup = threading.Event()
+        self._events = deque()  # 监听线程记录的 (事件类型, 原路径, 新路径)，由读取线程处理
+        self._rescan = True
+        self._running = False
+        self._observer = None
+
+        self.lines_read = 0
+        self.rotations = 0
+        self.truncations = 0
+
+        self._scan(initial=True)
+
+    def matches(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        return any(fnmatch(path, pattern) for pattern in self.patterns)
+
+    def notify(self, rescan: bool = False):
+        """文件发生变化，唤醒读取"""
+        if rescan:
+            self._rescan = True
+        self._wakeup.set()
+
+    def notify_event(self, event_type: str, src_path: str, dest_path: str = ""):
+        """记录文件事件并唤醒读取，可以在监听线程中调用
+
+        文件和路径表只在读取线程中修改，事件留到下一轮读取前由 _apply_events 处理。
+        """
+        if event_type == "moved" or any(path and self.matches(path) for path in (src_path, dest_path)):
+            self._events.append((event_type, src_path, dest_path))
+            self._wakeup.set()
+
+    def _apply_events(self):
+        while self._events:
+            event_type, src_path, dest_path = self._events.popleft()
+            if event_type == "moved":
+                self.moved(src_path, dest_path)
+            if event_type not in ("modified", "closed") or os.path.abspath(src_path) not in self.paths:
+                self._rescan = True
+
+    def moved(self, src_path: str, dest_path: str):
+        """记录文件的新路径，移出glob的文件在停止跟踪前还能读完剩余内容，需在读取线程中调用"""
+        key = self.paths.get(os.path.abspath(src_path))
+        tailed = self.files.get(key) if key else None
+        if tailed is not None:
+            tailed.path = os.path.abspath(dest_path)
+
+    def follow(self, path: str, position: int = 0):
+        """指定从某个位置开始读取文件，需在迭代前调用"""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logger.warning(f"无法跟踪日志文件 {path}: {e}")
+            return
+        key = (stat.st_dev, stat.st_ino)
+        self.files[key] = _TailedFile(path, key, position)
+        self.paths[path] = key
+
+    def start(self):
+        """启动文件事件监听"""
+        if self._running:
+            return
+        self._running = True
+        self._wakeup.set()
+        if Observer is None:
+            logger.warning(f"未安装watchdog，改为每 {self.poll_interval} 秒检查一次日志文件")
+            return
+
+        self._observer = Observer()
+        handler = _ChangeHandler(self)
+        for directory in {os.path.dirname(pattern) for pattern in self.patterns}:
+            if os.path.isdir(directory):
+                self._observer.schedule(handler, directory, recursive=False)
+            else:
+                logger.warning(f"日志目录不存在，改为定时检查: {directory}")
+        self._observer.daemon = True
+        self._observer.start()
+
+    def stop(self):
+        """停止跟踪，正在等待的迭代会结束"""
+        self._running = False
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def lines(self) -> Iterator[str]:
+        """逐行返回日志文件新增的完整行（不含换行符），直到调用 stop()"""
+        self.start()
+        try:
+            while self._running:
+                # 处理本轮读取期间到达的事件，没有事件时等待，超时后也重新检查文件
+                if not self._wakeup.wait(self.poll_interval):
+                    self._rescan = True
+                self._wakeup.clear()
+                if not self._running:
+                    break
+                self._apply_events()
+                if self._rescan:
+                    self._rescan = False
+                    for tailed in self._scan():
+                        yield from self._read(tailed, final=True)
+                for tailed in list(self.files.values()):
+                    yield from self._read(tailed)
+        finally:
+            self.stop()
+
+    def _scan(self, initial: bool = False) -> List[_TailedFile]:
+        """展开glob，开始跟踪新文件，处理重命名、替换和删除
+
+        Returns:
+            List[_TailedFile]: 不再匹配glob、停止跟踪的文件
+        """
+        seen: Dict[Tuple[int, int], str] = {}
+        for pattern in self.patterns:
+            for path in glob.glob(pattern):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                key = (stat.st_dev, stat.st_ino)
+                seen[key] = path
+
+                tailed = self.files.get(key)
+                if tailed is None:
+                    position = stat.st_size if initial and self.from_end else 0
+                    self.files[key] = _TailedFile(path, key, position)
+                    if not initial:
+                        logger.info(f"开始跟踪新日志文件: {path}")
+                elif tailed.path != path:
+                    logger.info(f"日志文件已重命名: {tailed.path} -> {path}")
+                    self.rotations += 1
+                    tailed.path = path
+
+        removed = []
+        for key in list(self.files):
+            if key not in seen:
+                tailed = self.files.pop(key)
+                self.rotations += 1
+                removed.append(tailed)
+                logger.info(f"日志文件已移除或轮转，停止跟踪: {tailed.path}")
+        self.paths = {path: key for key, path in seen.items()}
+        return removed
+
+    def _read(self, tailed: _TailedFile, final: bool = False) -> Iterator[str]:
+        """读取文件新增的内容
+
+        final为True时表示文件已停止跟踪，分批读到末尾，最后没有换行符的内容也作为一行返回。
+        """
+        while True:
+            try:
+                with open(tailed.path, "rb") as f:
+                    stat = os.fstat(f.fileno())
+                    if (stat.st_dev, stat.st_ino) != tailed.key:
+                        # 同名文件已被替换，下一轮重新扫描
+                        if not final:
+                            self.notify(rescan=True)
+                        return
+                    if stat.st_size < tailed.position:
+                        logger.info(f"日志文件被截断，从头读取: {tailed.path}")
+                        self.truncations += 1
+                        tailed.position = 0
+                        tailed.partial = b""
+                    f.seek(tailed.position)
+                    data = f.read(min(stat.st_size - tailed.position, self.max_read))
+            except OSError:
+                if not final:
+                    self.notify(rescan=True)
+                return
+
+            tailed.position += len(data)
+            more = tailed.position < stat.st_size
+            yield from self._split(tailed, data, flush=final and not more)
+            if not more:
+                return
+            if not final:
+                # 没有读完，让出后下一轮继续
+                self._wakeup.set()
+                return
+
+    def _split(self, tailed: _TailedFile, data: bytes, flush: bool = False) -> Iterator[str]:
+        """把新读取的内容拼接到上次剩余的内容后，返回其中完整的行"""
+        if not data and not (flush and tailed.partial):
+            return
+        *complete, tailed.partial = (tailed.partial + data).split(b"\n")
+        if len(tailed.partial) > self.max_line:
+            logger.warning(f"日志行超过 {self.max_line} 字节，强制分行: {tailed.path}")
+            flush = True
+        if flush:
+            complete.append(tailed.partial)
+            tailed.partial = b""
+
+        for raw in complete:
+            line = raw.decode(self.encoding, errors="ignore").rstrip("\r")
+            if line:
+                self.lines_read += 1
+                yield line
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取跟踪统计信息"""
+        return {
+            "files": len(self.files),
+            "lines_read": self.lines_read,
+            "rotations": self.rotations,
+            "truncations": self.truncations,
+        }
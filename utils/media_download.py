@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+CHUNK_SIZE = 64 * 1024  # 协议接口每次最多返回64KB
+
+
+class ImageDownloader:
+    """图片分段并发下载
+
+    - 所有分段并发请求（有并发上限），写入预先分配的缓冲区，失败的分段单独重试
+    - 下载完成后用图片XML中的md5校验
+    - 按md5缓存到磁盘，转发的同一张图片不会重复下载
+    """
+
+    def __init__(self, bot, config: Dict[str, Any]):
+        """初始化下载器
+
+        Args:
+            bot: WechatAPI客户端
+            config: [ImageDownload] 配置字典
+        """
+        self.bot = bot
+        self.parallelism = max(1, config.get("parallelism", 4))
+        self.retries = max(0, config.get("retries", 2))
+        self.verify_md5 = config.get("verify-md5", True)
+        self.cache_dir = config.get("cache-dir", "resource/image_cache")
+        self.cache_max_files = config.get("cache-max-files", 2000)
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._cache_writes = 0
+
+        self.cache_hits = 0
+        self.downloads = 0
+        self.chunk_retries = 0
+        self.md5_mismatches = 0
+
+    def _cache_path(self, md5: str) -> str:
+        return os.path.join(self.cache_dir, f"{md5.lower()}.img")
+
+    def _read_cache(self, md5: str) -> Optional[bytes]:
+        try:
+            with open(self._cache_path(md5), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_cache(self, md5: str, data: bytes):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(md5)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        # 每写入一定数量后清理最旧的缓存文件
+        self._cache_writes += 1
+        if self.cache_max_files and self._cache_writes % 100 == 0:
+            self._prune_cache()
+
+    def _prune_cache(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".img"):
+                entries.append((entry.stat().st_mtime, entry.path))
+        if len(entries) <= self.cache_max_files:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.cache_max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def download(self, msg_id, to_wxid: str, length: int, md5: str = None) -> Optional[bytes]:
+        """下载消息中的图片
+
+        Args:
+            msg_id: 消息ID
+            to_wxid: 消息所在会话
+            length: 图片大小，从图片XML中获取
+            md5: 图片md5，用于校验和缓存
+
+        Returns:
+            bytes: 图片数据，下载或校验失败时返回None
+        """
+        if not md5:
+            return await self._download(msg_id, to_wxid, length, md5)
+
+        cached = await asyncio.to_thread(self._read_cache, md5)
+        if cached is not None:
+            self.cache_hits += 1
+            logger.debug(f"图片缓存命中: md5={md5}")
+            return cached
+
+        # 同一张图片同时只下载一次
+        future = self._inflight.get(md5)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[md5] = future
+        try:
+            data = await self._download(msg_id, to_wxid, length, md5)
+            if data is not None:
+                try:
+                    await asyncio.to_thread(self._write_cache, md5, data)
+                except OSError as e:
+                    logger.warning(f"写入图片缓存失败: {e}")
+            return data
+        except BaseException:
+            data = None
+            raise
+        finally:
+            # 出错时等待同一张图片的调用方拿到None，各自走备用下载方式
+            self._inflight.pop(md5, None)
+            future.set_result(data)
+
+    async def _download(self, msg_id, to_wxid: str, length: int, md5: Optional[str]) -> Optional[bytes]:
+        self.downloads += 1
+        buffer = bytearray(length)
+        semaphore = asyncio.Semaphore(self.parallelism)
+        chunks = (length + CHUNK_SIZE - 1) // CHUNK_SIZE
+        logger.info(f"开始分段下载图片，总大小: {length} 字节，分 {chunks} 段并发下载")
+
+        async def fetch(start_pos: int) -> bool:
+            expected = min(CHUNK_SIZE, length - start_pos)
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.chunk_retries += 1
+                    await asyncio.sleep(0.2 * attempt)
+                try:
+                    async with semaphore:
+                        data = await self.bot.get_msg_image(msg_id, to_wxid, length, start_pos=start_pos)
+                except Exception as e:
+                    logger.warning(f"下载图片分段 {start_pos} 出错(第{attempt + 1}次): {e}")
+                    continue
+                if data and len(data) == expected:
+                    buffer[start_pos:start_pos + expected] = data
+                    return True
+                logger.warning(f"图片分段 {start_pos} 大小不符(第{attempt + 1}次): "
+                               f"{len(data) if data else 0}/{expected}")
+            return False
+
+        results = await asyncio.gather(*(fetch(i * CHUNK_SIZE) for i in range(chunks)))
+        if not all(results):
+            logger.warning(f"分段下载图片失败，{results.count(False)}/{chunks} 段未下载成功")
+            return None
+
+        data = bytes(buffer)
+        if md5 and self.verify_md5 and hashlib.md5(data).hexdigest() != md5.lower():
+            self.md5_mismatches += 1
+            logger.warning(f"图片md5校验失败: 期望 {md5}")
+            return None
+        return data
+
+    def get_metrics(self) -> Dict[str, int]:
+        """获取下载统计信息"""
+        return {
+            "cache_hits": self.cache_hits,
+            "downloads": self.downloads,
+            "chunk_retries": self.chunk_retries,
+            "md5_mismatches": self.md5_mismatches,
+            "inflight": len(self._inflight),
+        }
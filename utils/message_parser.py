@@ -0,0 +1,140 @@
+import functools
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+
+@functools.lru_cache(maxsize=256)
+def parse_xml_shared(text: str) -> ET.Element:
+    """解析XML字符串，相同内容只解析一次，返回缓存中的树
+
+    同一内容的所有调用方拿到的是同一棵树，只供框架内部读取，不要修改返回的节点。
+    插件请使用 parse_xml。
+
+    Raises:
+        ET.ParseError: 内容不是合法的XML
+    """
+    return ET.fromstring(text)
+
+
+def _copy_tree(root: ET.Element) -> ET.Element:
+    """复制整棵树，比 copy.deepcopy 和重新解析都快"""
+    root_copy = root.makeelement(root.tag, root.attrib)
+    stack = [(root, root_copy)]
+    while stack:
+        source, target = stack.pop()
+        target.text, target.tail = source.text, source.tail
+        for child in source:
+            child_copy = target.makeelement(child.tag, child.attrib)
+            target.append(child_copy)
+            stack.append((child, child_copy))
+    return root_copy
+
+
+def parse_xml(text: str) -> ET.Element:
+    """解析XML字符串，返回调用方独有的树
+
+    复制 parse_xml_shared 缓存的树，框架已经解析过的内容不需要重新解析，
+    调用方修改返回的节点不会影响框架、其他插件和之后的消息。
+
+    Raises:
+        ET.ParseError: 内容不是合法的XML
+    """
+    return _copy_tree(parse_xml_shared(text))
+
+
+class NormalizedMessage:
+    """归一化后的消息
+
+    发送者、群聊等字段在创建时计算一次并写回原消息字典，
+    XML内容、MsgSource和@列表在第一次访问时才解析。
+    """
+
+    def __init__(self, raw: Dict[str, Any], from_wxid: str, sender_wxid: str, is_group: bool, content: str):
+        self.raw = raw
+        self.from_wxid = from_wxid
+        self.sender_wxid = sender_wxid
+        self.is_group = is_group
+        self.content = content
+
+    @functools.cached_property
+    def xml(self) -> ET.Element:
+        """消息内容的XML树（与 parse_xml_shared 共用，只读），解析失败时抛出 ET.ParseError"""
+        return parse_xml_shared(self.content)
+
+    @functools.cached_property
+    def msg_source(self) -> Optional[ET.Element]:
+        """MsgSource的XML树（只读），没有或解析失败时为None"""
+        source = self.raw.get("MsgSource", "")
+        if not source:
+            return None
+        try:
+            return parse_xml_shared(source)
+        except ET.ParseError as e:
+            logger.error("解析MsgSource失败: {}", e)
+            return None
+
+    @functools.cached_property
+    def ats(self) -> List[str]:
+        """被@的wxid列表"""
+        # 大部分消息没有@，不需要为此解析MsgSource
+        if "atuserlist" not in (self.raw.get("MsgSource") or ""):
+            return []
+        if self.msg_source is None:
+            return []
+        atuserlist = self.msg_source.find("atuserlist")
+        if atuserlist is None or not atuserlist.text:
+            return []
+        return [wxid for wxid in atuserlist.text.strip(",").split(",") if wxid]
+
+
+def normalize_message(message: Dict[str, Any], bot_wxid: str, separator: str = ":", strip: bool = False,
+                      sender_key: str = "SenderWxid") -> NormalizedMessage:
+    """提取消息内容、发送者和是否群聊，写回消息字典
+
+    Args:
+        message: 已处理过 FromWxid/ToWxid 的原始消息
+        bot_wxid: 机器人的wxid
+        separator: 群聊消息中发送者与内容之间的分隔符
+        strip: 是否去掉内容中的换行和制表符
+        sender_key: 发送者写入的字段名
+
+    Returns:
+        NormalizedMessage: 归一化后的消息
+    """
+    content = message.get("Content", {})
+    content = content.get("string", "") if isinstance(content, dict) else (content or "")
+    if strip:
+        content = content.replace("\n", "").replace("\t", "")
+
+    from_wxid = message["FromWxid"]
+    is_group = from_wxid.endswith("@chatroom")
+    if is_group:
+        sender, sep, rest = content.partition(separator)
+        if sep:
+            content = rest
+        else:
+            sender = bot_wxid
+    else:
+        sender = from_wxid
+        if from_wxid == bot_wxid:
+            from_wxid = message["ToWxid"]
+
+    message["Content"] = content
+    message[sender_key] = sender
+    message["FromWxid"] = from_wxid
+    message["IsGroup"] = is_group
+    return NormalizedMessage(message, from_wxid, sender, is_group, content)
+
+
+def find_text(node: ET.Element, path: str, default: Any = "") -> Any:
+    """查找子节点的文本，节点不存在时返回默认值"""
+    element = node.find(path)
+    return element.text if element is not None else default
+
+
+def find_int(node: ET.Element, path: str, default: int = 0) -> int:
+    """查找子节点的整数值，节点不存在时返回默认值"""
+    element = node.find(path)
+    return int(element.text) if element is not None else default
@@ -0,0 +1,188 @@
+import asyncio
+import bisect
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from loguru import logger
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图（单位：秒）"""
+
+    BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        value = max(0.0, value)
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"<={bound}s": count for bound, count in zip(self.BUCKETS, self.counts)}
+        buckets[f">{self.BUCKETS[-1]}s"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "avg": self.sum / self.total if self.total else 0.0,
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class MessageSyncEngine:
+    """消息同步引擎
+
+    poll 模式：收到消息后立即再次同步，空闲时按退避间隔(带抖动)同步，Synckey由客户端在调用间保留。
+    push 模式：启动一个本地HTTP回调地址，协议服务器推送的消息进入异步队列。
+
+    两种模式都统计消息从创建到被框架接收的延迟直方图。
+    """
+
+    def __init__(self, bot, config: Dict[str, Any]):
+        """初始化同步引擎
+
+        Args:
+            bot: WechatAPI客户端
+            config: [MessageSync] 配置字典
+        """
+        self.bot = bot
+        self.mode = config.get("mode", "poll")
+
+        # 轮询参数
+        self.idle_interval = config.get("idle-interval", 0.5)
+        self.max_idle_interval = config.get("max-idle-interval", 2.0)
+        self.backoff_factor = config.get("backoff-factor", 1.5)
+        self.jitter = config.get("jitter", 0.2)
+
+        # 统计信息输出间隔（秒），0表示不输出
+        self.report_interval = config.get("report-interval", 300)
+
+        # 推送参数
+        self.push_host = config.get("push-host", "127.0.0.1")
+        self.push_port = config.get("push-port", 9012)
+        self.push_path = config.get("push-path", "/callback")
+        self.push_queue: asyncio.Queue = asyncio.Queue(maxsize=config.get("push-queue-size", 10000))
+
+        self._delay = 0.0  # 当前退避间隔
+        self._sleep = 0.0  # 下次同步前的等待时间(含抖动)
+        self._runner: Optional[web.AppRunner] = None
+
+        self.latency = LatencyHistogram()
+        self.polls = 0
+        self.empty_polls = 0
+        self.received = 0
+        self._last_report = time.monotonic()
+
+    async def start(self):
+        """启动同步引擎，push 模式下启动回调服务"""
+        if self.mode != "push":
+            logger.info("消息同步使用轮询模式，空闲间隔: {}~{}秒", self.idle_interval, self.max_idle_interval)
+            return
+
+        app = web.Application()
+        app.router.add_post(self.push_path, self._handle_push)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.push_host, self.push_port).start()
+        logger.success("消息同步使用推送模式，回调地址: http://{}:{}{}", self.push_host, self.push_port, self.push_path)
+
+    async def stop(self):
+        """停止回调服务"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_push(self, request: web.Request) -> web.Response:
+        try:
+            payload = await request.json()
+        except Exception:
+            return web.json_response({"Success": False, "Message": "invalid json"}, status=400)
+
+        # 兼容 Sync 接口格式 {"Data": {"AddMsgs": [...]}}、{"AddMsgs": [...]} 和消息数组
+        if isinstance(payload, dict):
+            data = payload.get("Data", payload)
+            messages = data.get("AddMsgs") if isinstance(data, dict) else None
+        else:
+            messages = payload
+        if not isinstance(messages, list):
+            return web.json_response({"Success": False, "Message": "no messages"}, status=400)
+
+        for message in messages:
+            try:
+                self.push_queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning("推送消息队列已满，丢弃消息: {}", message.get("MsgId") if isinstance(message, dict) else "")
+        return web.json_response({"Success": True})
+
+    def _next_idle_delay(self) -> float:
+        if self._delay <= 0:
+            delay = self.idle_interval
+        else:
+            delay = min(self.max_idle_interval, self._delay * self.backoff_factor)
+        self._delay = delay
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _record(self, messages: List[Dict[str, Any]]):
+        now = time.time()
+        for message in messages:
+            create_time = message.get("CreateTime") if isinstance(message, dict) else None
+            if isinstance(create_time, (int, float)) and create_time > 0:
+                self.latency.observe(now - create_time)
+        self.received += len(messages)
+
+        if self.report_interval and time.monotonic() - self._last_report >= self.report_interval:
+            self._last_report = time.monotonic()
+            logger.info("消息同步统计: {}", self.get_metrics())
+
+    async def next_batch(self) -> Tuple[bool, Any]:
+        """获取下一批消息
+
+        Returns:
+            tuple[bool, Any]: 与 sync_message 相同的 (ok, data) 结构
+        """
+        if self.mode == "push":
+            messages = [await self.push_queue.get()]
+            while not self.push_queue.empty():
+                messages.append(self.push_queue.get_nowait())
+            self._record(messages)
+            return True, {"AddMsgs": messages}
+
+        if self._sleep > 0:
+            await asyncio.sleep(self._sleep)
+
+        try:
+            ok, data = await self.bot.sync_message()
+        except Exception:
+            self._delay = self._sleep = 0.0
+            raise
+        self.polls += 1
+
+        messages = data.get("AddMsgs") if ok and isinstance(data, dict) else None
+        if messages:
+            # 有新消息时立即再次同步
+            self._delay = self._sleep = 0.0
+            self._record(messages)
+        else:
+            self.empty_polls += 1
+            self._sleep = self._next_idle_delay()
+        return ok, data
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取同步统计信息"""
+        return {
+            "mode": self.mode,
+            "polls": self.polls,
+            "empty_polls": self.empty_polls,
+            "received": self.received,
+            "pending": self.push_queue.qsize(),
+            "current_interval": self._delay,
+            "latency": self.latency.snapshot(),
+        }
@@ -1,18 +1,254 @@
 import tomllib
 import xml.etree.ElementTree as ET
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, List, Optional
 import asyncio
 import io
 import html
+import json
 import re
+import time
 
 from loguru import logger
 
-from WechatAPI import WechatAPIClient
+from WechatAPI import WechatAPIClient, PRIORITY_HIGH, send_priority
 from WechatAPI.Client.protect import protector
 from database.messsagDB import MessageDB
-from database.contacts_db import update_contact_in_db, get_contact_from_db
+from utils.contact_refresher import ContactRefresher
+from utils.event_bridge import MessageEventBridge, message_event
 from utils.event_manager import EventManager
+from utils.ignore_filter import IgnoreFilter
+from utils.media_download import ImageDownloader
+from utils.message_parser import find_int, find_text, normalize_message, parse_xml_shared
+from utils.message_sync import LatencyHistogram
+
+
+# 表示群成员发生变化的系统消息类型和内容关键词
+ROSTER_SYSMSG_TYPES = {"sysmsgtemplate", "delchatroommember"}
+ROSTER_KEYWORDS = ("加入了群聊", "加入群聊", "移出了群聊", "退出了群聊", "修改群名为", "群昵称")
+
+
+class MessageDispatcher:
+    """有界消息分发器
+
+    固定数量的消费协程，每个协程一个有界队列。同一会话的消息总是进入同一个队列，
+    保证会话内按顺序处理，不同会话并行处理。队列满时按 overflow-policy 处理:
+
+    - block: 阻塞提交方(消息同步循环)，形成背压
+    - drop-oldest: 丢弃该队列中最早的消息
+    - spill: 低优先级类型的消息写入磁盘，队列空闲后回放；其它消息仍然阻塞
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop-oldest", "spill")
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 key_func: Callable[[Dict[str, Any]], str], config: Dict[str, Any]):
+        """初始化分发器
+
+        Args:
+            handler: 处理单条消息的协程函数
+            key_func: 返回消息所属会话的函数
+            config: [MessageDispatcher] 配置字典
+        """
+        self.handler = handler
+        self.key_func = key_func
+        self.worker_count = max(1, config.get("workers", 8))
+        self.queue_size = max(self.worker_count, config.get("queue-size", 1000))
+        self.overflow_policy = config.get("overflow-policy", "block")
+        if self.overflow_policy not in self.OVERFLOW_POLICIES:
+            logger.warning("未知的消息队列溢出策略: {}，使用 block", self.overflow_policy)
+            self.overflow_policy = "block"
+        self.spill_types = set(config.get("spill-types", [3, 43, 47, 10002]))
+        self.spill_file = Path(config.get("spill-file", "resource/message_spill.jsonl"))
+
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._replay_task: Optional[asyncio.Task] = None
+        # 溢出的消息先进入内存缓冲，由后台任务在线程中写入磁盘
+        self._spill_buffer: List[Dict[str, Any]] = []
+        self._spill_task: Optional[asyncio.Task] = None
+        self._spill_lock = asyncio.Lock()
+
+        self.latency = LatencyHistogram()
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    def start(self):
+        """启动消费协程，重复调用无副作用"""
+        if self._workers:
+            return
+        per_queue = self.queue_size // self.worker_count
+        self._queues = [asyncio.Queue(maxsize=per_queue) for _ in range(self.worker_count)]
+        self._workers = [asyncio.create_task(self._consume(queue)) for queue in self._queues]
+        logger.info("消息分发器已启动，消费者: {}，队列容量: {}，溢出策略: {}",
+                    self.worker_count, self.queue_size, self.overflow_policy)
+        # 上次停止时没有回放完的消息留在 .replay 文件中
+        if self.spill_file.exists() or self.spill_file.with_suffix(".replay").exists():
+            self._start_replay()
+
+    async def stop(self):
+        """停止消费协程，队列中未处理的消息写入溢出文件，下次启动时回放"""
+        if self._spill_task is not None:
+            await asyncio.gather(self._spill_task, return_exceptions=True)
+        tasks = [*self._workers, *([self._replay_task] if self._replay_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        pending = []
+        for queue in self._queues:
+            while not queue.empty():
+                _, message = queue.get_nowait()
+                pending.append(message)
+        pending.extend(self._spill_buffer)
+        self._spill_buffer = []
+        if pending:
+            # 回放被中断时，队列中的消息比回放文件中剩余的消息早，写在它们前面
+            replay_file = self.spill_file.with_suffix(".replay")
+            saved = await asyncio.to_thread(self._write_spill, pending,
+                                            replay_file if replay_file.exists() else None)
+            logger.info("消息分发器停止，{} 条未处理的消息已写入溢出文件", saved)
+        self._workers.clear()
+        self._queues.clear()
+        self._replay_task = None
+        self._spill_task = None
+
+    @property
+    def depth(self) -> int:
+        """当前排队的消息总数"""
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def submit(self, message: Dict[str, Any]):
+        """提交一条消息，队列已满时按溢出策略处理"""
+        self.start()
+        queue = self._queues[hash(self.key_func(message)) % self.worker_count]
+        item = (time.monotonic(), message)
+
+        if not queue.full():
+            queue.put_nowait(item)
+            return
+
+        if self.overflow_policy == "drop-oldest":
+            try:
+                _, oldest = queue.get_nowait()
+                queue.task_done()
+                self.dropped += 1
+                logger.warning("消息队列已满，丢弃最早的消息: {}", oldest.get("MsgId"))
+            except asyncio.QueueEmpty:
+                pass
+            queue.put_nowait(item)
+            return
+
+        if self.overflow_policy == "spill" and message.get("MsgType") in self.spill_types:
+            self._spill(message)
+            return
+
+        await queue.put(item)
+
+    async def _consume(self, queue: asyncio.Queue):
+        while True:
+            enqueued_at, message = await queue.get()
+            try:
+                await self.handler(message)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.exception("处理消息失败: {}", e)
+            finally:
+                self.latency.observe(time.monotonic() - enqueued_at)
+                queue.task_done()
+
+    def _spill(self, message: Dict[str, Any]):
+        """放入溢出缓冲后立即返回，不在事件循环中读写文件"""
+        self._spill_buffer.append(message)
+        if self._spill_task is None or self._spill_task.done():
+            self._spill_task = asyncio.create_task(self._flush_spill())
+
+    async def _flush_spill(self):
+        while self._spill_buffer:
+            messages, self._spill_buffer = self._spill_buffer, []
+            async with self._spill_lock:
+                written = await asyncio.to_thread(self._write_spill, messages)
+            if written:
+                self._start_replay()
+
+    def _write_spill(self, messages: List[Dict[str, Any]], front: Optional[Path] = None) -> int:
+        """把消息追加到溢出文件，返回写入的数量，无法写入的消息计为丢弃
+
+        传入 front 时改为写在该文件已有内容的前面
+        """
+        lines = []
+        for message in messages:
+            try:
+                lines.append(json.dumps(message, ensure_ascii=False) + "\n")
+            except (TypeError, ValueError) as e:
+                self.dropped += 1
+                logger.error("消息无法序列化，已丢弃: {}", e)
+        if not lines:
+            return 0
+        try:
+            self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+            if front is not None:
+                tmp_file = front.with_suffix(".tmp")
+                tmp_file.write_text("".join(lines) + front.read_text(encoding="utf-8"), encoding="utf-8")
+                tmp_file.replace(front)
+            else:
+                with open(self.spill_file, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+        except OSError as e:
+            self.dropped += len(lines)
+            logger.error("消息写入溢出文件失败，已丢弃 {} 条: {}", len(lines), e)
+            return 0
+        self.spilled += len(lines)
+        return len(lines)
+
+    def _start_replay(self):
+        if self._replay_task is None or self._replay_task.done():
+            self._replay_task = asyncio.create_task(self._replay_spill())
+
+    async def _replay_spill(self):
+        """队列回落到一半以下时回放溢出到磁盘的消息"""
+        replay_file = self.spill_file.with_suffix(".replay")
+        while self.spill_file.exists() or replay_file.exists():
+            await asyncio.sleep(1)
+            if self.depth > self.queue_size // 2:
+                continue
+            # 与写入溢出文件互斥，避免写入线程追加到已经改名的文件
+            async with self._spill_lock:
+                if not replay_file.exists():
+                    await asyncio.to_thread(self.spill_file.replace, replay_file)
+                lines = (await asyncio.to_thread(replay_file.read_text, encoding="utf-8")).splitlines()
+
+            # 全部放入队列后才删除回放文件；回放中途被取消时把没有放入队列的消息写回去
+            count = 0
+            try:
+                for index, line in enumerate(lines):
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    queue = self._queues[hash(self.key_func(message)) % self.worker_count]
+                    await queue.put((time.monotonic(), message))
+                    count += 1
+            except asyncio.CancelledError:
+                replay_file.write_text("".join(line + "\n" for line in lines[index:]), encoding="utf-8")
+                raise
+            replay_file.unlink()
+            logger.info("已回放 {} 条溢出消息", count)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取分发器统计信息"""
+        return {
+            "queued": self.depth,
+            "queue_depth": [queue.qsize() for queue in self._queues],
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "latency": self.latency.snapshot(),
+        }
 
 
 class XYBot:
@@ -47,30 +283,13 @@ class XYBot:
 
         # 读取群聊唤醒词配置
         xybot_config = main_config.get("XYBot", {})
+        self.admins = set(xybot_config.get("admins", []))
         self.group_wakeup_words = xybot_config.get("group-wakeup-words", ["bot"])
         self.enable_group_wakeup = xybot_config.get("enable-group-wakeup", True)
         logger.info(f"群聊唤醒词: {self.group_wakeup_words}, 启用状态: {self.enable_group_wakeup}")
 
-        # 从配置文件中读取消息过滤设置
-        try:
-            # 尝试从顶层读取设置
-            if "ignore-mode" in main_config:
-                self.ignore_mode = main_config["ignore-mode"]
-                self.whitelist = main_config["whitelist"]
-                self.blacklist = main_config["blacklist"]
-            # 如果顶层没有，尝试从AutoRestart部分读取
-            elif "AutoRestart" in main_config and "ignore-mode" in main_config["AutoRestart"]:
-                self.ignore_mode = main_config["AutoRestart"]["ignore-mode"]
-                self.whitelist = main_config["AutoRestart"]["whitelist"]
-                self.blacklist = main_config["AutoRestart"]["blacklist"]
-            else:
-                # 如果都没有，使用默认值
-                raise KeyError("ignore-mode not found in config")
-        except KeyError as e:
-            # 如果读取失败，使用默认值
-            self.ignore_mode = "None"
-            self.whitelist = []
-            self.blacklist = []
+        # 从配置文件中读取消息过滤设置，配置文件修改后自动重新加载
+        self.ignore_filter = IgnoreFilter(config_path, xybot_config.get("ignore-reload-interval", 5.0))
 
         # 记录配置信息
         logger.info(f"消息过滤模式: {self.ignore_mode}")
@@ -79,6 +298,46 @@ class XYBot:
 
         self.msg_db = MessageDB()
 
+        dispatcher_config = main_config.get("MessageDispatcher", {})
+        self.dispatcher = MessageDispatcher(self.process_message, self._conversation_key, dispatcher_config)
+        EventManager.configure(handler_timeout=dispatcher_config.get("handler-timeout", 0),
+                               handler_budget=dispatcher_config.get("handler-budget", 5.0))
+
+        contact_config = main_config.get("ContactRefresh", {})
+        self.contact_refresher = ContactRefresher(self.bot, contact_config)
+        self.image_downloader = ImageDownloader(self.bot, main_config.get("ImageDownload", {}))
+        # 把消息以结构化事件推送给DOW框架，取代回调守护进程扫描日志
+        self.event_bridge = MessageEventBridge(main_config.get("EventBridge", {}))
+
+        # 群成员列表和机器人群昵称缓存: 群wxid -> (过期时间, 数据)
+        self.protocol_version = str(main_config.get("Protocol", {}).get("version", "849"))
+        self.group_member_ttl = contact_config.get("group-member-ttl", 600)
+        self.display_name_ttl = contact_config.get("display-name-ttl", 3600)
+        self._member_api_url_cache = ""
+        self._group_members: Dict[str, tuple] = {}
+        self._bot_display_names: Dict[str, tuple] = {}
+
+    def _conversation_key(self, message: Dict[str, Any]) -> str:
+        """获取原始消息所属的会话，群聊为群wxid，私聊为对方wxid"""
+        wxids = []
+        for key in ("FromUserName", "ToUserName", "ToWxid"):
+            value = message.get(key)
+            if isinstance(value, dict):
+                value = value.get("string")
+            if value:
+                wxids.append(str(value))
+        for wxid in wxids:
+            if wxid.endswith("@chatroom"):
+                return wxid
+        for wxid in wxids:
+            if wxid != self.wxid:
+                return wxid
+        return wxids[0] if wxids else ""
+
+    async def dispatch(self, message: Dict[str, Any]):
+        """将消息交给分发器，队列满时可能阻塞调用方"""
+        await self.dispatcher.submit(message)
+
     def update_profile(self, wxid: str, nickname: str, alias: str, phone: str):
         """更新机器人信息"""
         self.wxid = wxid
@@ -94,11 +353,34 @@ class XYBot:
         """
         return self.wxid is not None
 
-    async def get_chatroom_member_list(self, group_wxid: str):
+    def _member_api_url(self) -> str:
+        """获取群成员详情接口地址，首次调用时确定并缓存"""
+        if self._member_api_url_cache:
+            return self._member_api_url_cache
+
+        # 获取微信API的基本配置
+        api_base = "http://127.0.0.1:9011"
+        if hasattr(self.bot, 'ip') and hasattr(self.bot, 'port'):
+            api_base = f"http://{self.bot.ip}:{self.bot.port}"
+
+        # 先检查是否有显式设置的前缀，没有则根据协议版本确定
+        api_prefix = getattr(self.bot, 'api_prefix', "") or getattr(self.bot, '_api_prefix', "")
+        if api_prefix == "":
+            api_prefix = "/VXAPI" if self.protocol_version == "849" else "/api"  # 855 或 ipad 使用 /api
+            logger.info(f"使用{self.protocol_version}协议前缀: {api_prefix}")
+
+        self._member_api_url_cache = f"{api_base}{api_prefix}/Group/GetChatRoomMemberDetail"
+        logger.info(f"使用API路径: {self._member_api_url_cache}")
+        return self._member_api_url_cache
+
+    async def get_chatroom_member_list(self, group_wxid: str, use_cache: bool = True):
         """获取群成员列表
 
+        成员列表按群缓存，超过TTL或收到入群、退群、改名等系统消息后重新获取
+
         Args:
             group_wxid: 群聊的wxid
+            use_cache: 是否使用缓存的成员列表
 
         Returns:
             list: 群成员列表
@@ -107,6 +389,21 @@ class XYBot:
             logger.error(f"无效的群ID: {group_wxid}，只有群聊才能获取成员列表")
             return []
 
+        cached = self._group_members.get(group_wxid)
+        if use_cache and cached and time.time() < cached[0]:
+            return list(cached[1])
+
+        members = await self._fetch_chatroom_member_list(group_wxid)
+        if members:
+            self._group_members[group_wxid] = (time.time() + self.group_member_ttl, members)
+            for member in members:
+                if member.get("wxid") == self.wxid:
+                    self._set_bot_display_name(group_wxid, member.get("DisplayName") or member.get("nickname") or "")
+                    break
+        return list(members)
+
+    async def _fetch_chatroom_member_list(self, group_wxid: str):
+        """从协议接口获取群成员列表"""
         try:
             logger.info(f"开始获取群 {group_wxid} 的成员列表")
 
@@ -115,63 +412,28 @@ class XYBot:
                 import aiohttp
                 import json
 
-                # 获取微信API的基本配置
-                api_base = "http://127.0.0.1:9011"
-                if hasattr(self.bot, 'ip') and hasattr(self.bot, 'port'):
-                    api_base = f"http://{self.bot.ip}:{self.bot.port}"
-
-                # 确定API路径前缀
-                api_prefix = ""
-
-                # 先检查是否有显式设置的前缀
-                if hasattr(self.bot, 'api_prefix'):
-                    api_prefix = self.bot.api_prefix
-                elif hasattr(self.bot, '_api_prefix'):
-                    api_prefix = self.bot._api_prefix
-
-                # 如果没有显式设置，则根据协议版本确定
-                if api_prefix == "":
-                    # 读取协议版本配置
-                    try:
-                        import tomllib
-                        with open("main_config.toml", "rb") as f:
-                            config = tomllib.load(f)
-                            protocol_version = config.get("Protocol", {}).get("version", "849")
-
-                            # 根据协议版本选择前缀
-                            if protocol_version == "849":
-                                api_prefix = "/VXAPI"
-                                logger.info(f"使用849协议前缀: {api_prefix}")
-                            else:  # 855 或 ipad
-                                api_prefix = "/api"
-                                logger.info(f"使用{protocol_version}协议前缀: {api_prefix}")
-                    except Exception as e:
-                        logger.warning(f"读取协议版本失败，使用默认前缀: {e}")
-                        # 默认使用 849 的前缀
-                        api_prefix = "/VXAPI"
-                        logger.info(f"使用默认协议前缀: {api_prefix}")
+                api_url = self._member_api_url()
 
                 # 获取当前登录的wxid
                 wxid = ""
                 if hasattr(self.bot, 'wxid'):
                     wxid = self.bot.wxid
 
-                logger.info(f"使用API路径: {api_base}{api_prefix}/Group/GetChatRoomMemberDetail")
-
-                # 直接调用API获取群成员
-                async with aiohttp.ClientSession() as session:
+                # 直接调用API获取群成员，优先复用客户端的连接池
+                http_session = self.bot.http_session() if hasattr(self.bot, 'http_session') else aiohttp.ClientSession()
+                async with http_session as session:
                     json_param = {"QID": group_wxid, "Wxid": wxid}
                     logger.info(f"发送请求参数: {json.dumps(json_param)}")
 
                     response = await session.post(
-                        f'{api_base}{api_prefix}/Group/GetChatRoomMemberDetail',
+                        api_url,
                         json=json_param,
                         headers={"Content-Type": "application/json"}
                     )
-
                     # 检查响应状态
                     if response.status != 200:
                         logger.error(f"获取群成员列表失败: HTTP状态码 {response.status}")
+                        response.release()
                         return []
 
                     # 解析响应数据
@@ -234,210 +496,45 @@ class XYBot:
             logger.error(f"获取群成员列表时发生异常: {str(e)}")
             return []
 
+    def _set_bot_display_name(self, group_wxid: str, display_name: str):
+        self._bot_display_names[group_wxid] = (time.time() + self.display_name_ttl, display_name)
+
+    async def get_bot_display_name(self, group_wxid: str) -> str:
+        """获取机器人在群里的昵称，缓存未命中时才获取群成员列表"""
+        cached = self._bot_display_names.get(group_wxid)
+        if cached and time.time() < cached[0]:
+            return cached[1]
+
+        await self.get_chatroom_member_list(group_wxid)
+        cached = self._bot_display_names.get(group_wxid)
+        if cached is None:
+            # 成员列表中没有机器人时也缓存空结果，避免每条@消息都请求接口
+            self._set_bot_display_name(group_wxid, "")
+            return ""
+        return cached[1]
+
+    def invalidate_group_cache(self, group_wxid: str, display_name: bool = False):
+        """群成员变化后清除缓存
+
+        Args:
+            group_wxid: 群聊的wxid
+            display_name: 是否同时清除机器人的群昵称缓存
+        """
+        self._group_members.pop(group_wxid, None)
+        if display_name:
+            self._bot_display_names.pop(group_wxid, None)
+
     async def update_contact_info(self, wxid: str):
         """更新联系人信息
 
+        TTL内已刷新过的联系人直接返回，同一联系人的并发刷新合并为一次，
+        需要调用接口的联系人按批查询
+
         Args:
             wxid: 联系人的wxid
         """
         try:
-            # 先检查数据库中是否已有该联系人的信息
-            existing_contact = get_contact_from_db(wxid)
-
-            # 如果数据库中没有该联系人的信息，或者信息不完整，则从 API 获取
-            if not existing_contact or not existing_contact.get('nickname'):
-                # 从 API 获取联系人信息
-                try:
-                    # 如果是群聊，不获取详细信息
-                    if wxid.endswith("@chatroom"):
-                        contact_info = {
-                            'wxid': wxid,
-                            'nickname': wxid,
-                            'type': 'group'
-                        }
-                        # 更新到数据库
-                        update_contact_in_db(contact_info)
-                        logger.debug(f"已在消息处理中更新群聊 {wxid} 的基本信息")
-                    else:
-                        # 获取联系人详细信息
-                        logger.debug(f"开始获取联系人 {wxid} 的详细信息")
-                        try:
-                            detail = await self.bot.get_contract_detail(wxid)
-                            logger.debug(f"获取到联系人 {wxid} 的详细信息: {detail}")
-
-                            if detail:
-                                # 处理返回结果
-                                if isinstance(detail, list) and len(detail) > 0:
-                                    detail_item = detail[0]
-                                    logger.debug(f"联系人 {wxid} 详情项类型: {type(detail_item)}")
-
-                                    if isinstance(detail_item, dict):
-                                        # 记录详细的字段信息，帮助调试
-                                        logger.debug(f"联系人 {wxid} 详情字段: {list(detail_item.keys())}")
-
-                                        # 检查nickname字段的类型和值
-                                        nickname_value = detail_item.get('nickname')
-                                        if nickname_value is None:
-                                            # 尝试其他可能的字段名
-                                            nickname_value = detail_item.get('NickName')
-                                            if nickname_value is None:
-                                                logger.warning(f"联系人 {wxid} 没有找到nickname或NickName字段")
-                                            else:
-                                                logger.debug(f"联系人 {wxid} 使用NickName字段: {nickname_value}")
-                                        else:
-                                            logger.debug(f"联系人 {wxid} 使用nickname字段: {nickname_value}")
-
-                                        # 如果nickname是字典类型，尝试获取其中的string字段
-                                        if isinstance(nickname_value, dict):
-                                            logger.debug(f"联系人 {wxid} 的nickname是字典类型: {nickname_value}")
-                                            nickname_string = nickname_value.get('string')
-                                            if nickname_string:
-                                                nickname_value = nickname_string
-                                                logger.debug(f"从字典中提取nickname.string: {nickname_string}")
-
-                                        # 处理头像字段 - 优先使用BigHeadImgUrl或SmallHeadImgUrl
-                                        avatar_value = detail_item.get('BigHeadImgUrl', '')
-                                        if not avatar_value:
-                                            avatar_value = detail_item.get('SmallHeadImgUrl', '')
-                                        if not avatar_value:
-                                            # 如果没有直接的URL，尝试使用avatar字段
-                                            avatar_value = detail_item.get('avatar', '')
-                                            if isinstance(avatar_value, dict):
-                                                avatar_value = avatar_value.get('string', '')
-
-                                        logger.debug(f"联系人 {wxid} 的头像地址: {avatar_value}")
-
-                                        # 处理备注字段
-                                        remark_value = detail_item.get('remark', '')
-                                        if remark_value is None or not remark_value:
-                                            remark_value = detail_item.get('Remark', '')
-                                        if isinstance(remark_value, dict):
-                                            remark_value = remark_value.get('string', '')
-
-                                        # 处理微信号字段
-                                        alias_value = detail_item.get('alias', '')
-                                        if alias_value is None or not alias_value:
-                                            alias_value = detail_item.get('Alias', '')
-                                        if isinstance(alias_value, dict):
-                                            alias_value = alias_value.get('string', '')
-
-                                        # 构建联系人信息
-                                        contact_info = {
-                                            'wxid': wxid,
-                                            'nickname': nickname_value if nickname_value else wxid,
-                                            'avatar': avatar_value,
-                                            'remark': remark_value,
-                                            'alias': alias_value
-                                        }
-                                        logger.debug(f"解析联系人 {wxid} 详情成功: {contact_info}")
-                                    else:
-                                        logger.warning(f"联系人 {wxid} 详情格式不是字典: {detail_item}")
-                                        # 创建基本联系人信息
-                                        contact_info = {
-                                            'wxid': wxid,
-                                            'nickname': wxid,
-                                            'type': 'friend'
-                                        }
-                                elif isinstance(detail, dict):
-                                    # 记录详细的字段信息，帮助调试
-                                    logger.debug(f"联系人 {wxid} 详情字段(字典格式): {list(detail.keys())}")
-
-                                    # 检查nickname字段的类型和值
-                                    nickname_value = detail.get('nickname')
-                                    if nickname_value is None:
-                                        # 尝试其他可能的字段名
-                                        nickname_value = detail.get('NickName')
-                                        if nickname_value is None:
-                                            logger.warning(f"联系人 {wxid} 没有找到nickname或NickName字段")
-                                        else:
-                                            logger.debug(f"联系人 {wxid} 使用NickName字段: {nickname_value}")
-                                    else:
-                                        logger.debug(f"联系人 {wxid} 使用nickname字段: {nickname_value}")
-
-                                    # 如果nickname是字典类型，尝试获取其中的string字段
-                                    if isinstance(nickname_value, dict):
-                                        logger.debug(f"联系人 {wxid} 的nickname是字典类型: {nickname_value}")
-                                        nickname_string = nickname_value.get('string')
-                                        if nickname_string:
-                                            nickname_value = nickname_string
-                                            logger.debug(f"从字典中提取nickname.string: {nickname_string}")
-
-                                    # 处理头像字段 - 优先使用BigHeadImgUrl或SmallHeadImgUrl
-                                    avatar_value = detail.get('BigHeadImgUrl', '')
-                                    if not avatar_value:
-                                        avatar_value = detail.get('SmallHeadImgUrl', '')
-                                    if not avatar_value:
-                                        # 如果没有直接的URL，尝试使用avatar字段
-                                        avatar_value = detail.get('avatar', '')
-                                        if isinstance(avatar_value, dict):
-                                            avatar_value = avatar_value.get('string', '')
-
-                                    logger.debug(f"联系人 {wxid} 的头像地址(字典格式): {avatar_value}")
-
-                                    # 处理备注字段
-                                    remark_value = detail.get('remark', '')
-                                    if remark_value is None or not remark_value:
-                                        remark_value = detail.get('Remark', '')
-                                    if isinstance(remark_value, dict):
-                                        remark_value = remark_value.get('string', '')
-
-                                    # 处理微信号字段
-                                    alias_value = detail.get('alias', '')
-                                    if alias_value is None or not alias_value:
-                                        alias_value = detail.get('Alias', '')
-                                    if isinstance(alias_value, dict):
-                                        alias_value = alias_value.get('string', '')
-
-                                    # 构建联系人信息
-                                    contact_info = {
-                                        'wxid': wxid,
-                                        'nickname': nickname_value if nickname_value else wxid,
-                                        'avatar': avatar_value,
-                                        'remark': remark_value,
-                                        'alias': alias_value
-                                    }
-                                    logger.debug(f"解析联系人 {wxid} 详情成功(字典格式): {contact_info}")
-                                else:
-                                    logger.warning(f"联系人 {wxid} 详情格式不支持: {type(detail)}")
-                                    # 创建基本联系人信息
-                                    contact_info = {
-                                        'wxid': wxid,
-                                        'nickname': wxid,
-                                        'type': 'friend'
-                                    }
-                            else:
-                                logger.warning(f"无法获取联系人 {wxid} 的详细信息，API返回空数据")
-                                # 创建基本联系人信息
-                                contact_info = {
-                                    'wxid': wxid,
-                                    'nickname': wxid,
-                                    'type': 'friend'
-                                }
-
-                            # 更新到数据库
-                            update_contact_in_db(contact_info)
-                            logger.debug(f"已在消息处理中更新联系人 {wxid} 的信息")
-                        except Exception as e:
-                            logger.error(f"调用API获取联系人 {wxid} 详情失败: {str(e)}")
-                            # 创建基本联系人信息
-                            contact_info = {
-                                'wxid': wxid,
-                                'nickname': wxid,
-                                'type': 'friend'
-                            }
-                            # 仍然更新到数据库，确保至少有基本信息
-                            update_contact_in_db(contact_info)
-                            logger.debug(f"已在消息处理中更新联系人 {wxid} 的基本信息")
-                except Exception as e:
-                    logger.error(f"在消息处理中获取联系人 {wxid} 信息失败: {str(e)}")
-                    # 创建基本联系人信息并保存
-                    contact_info = {
-                        'wxid': wxid,
-                        'nickname': wxid,
-                        'type': 'friend' if not wxid.endswith("@chatroom") else 'group'
-                    }
-                    update_contact_in_db(contact_info)
-                    logger.debug(f"已在消息处理中更新联系人 {wxid} 的基本信息(异常处理)")
+            await self.contact_refresher.refresh(wxid)
         except Exception as e:
             logger.error(f"更新联系人信息时发生异常: {str(e)}")
 
@@ -467,25 +564,10 @@ class XYBot:
         if message.get("FromWxid") == self.wxid and isinstance(to_wxid, str) and to_wxid.endswith("@chatroom"):
             message["FromWxid"], message["ToWxid"] = message["ToWxid"], message["FromWxid"]
 
-        # 异步更新发送者联系人信息
+        # 异步更新发送者联系人信息，群聊只更新群聊本身信息
         from_wxid = message.get("FromWxid", "")
         if from_wxid and from_wxid != self.wxid:
-            # 如果是群聊，只更新群聊本身信息
-            if from_wxid.endswith("@chatroom"):
-                logger.info(f"开始异步更新群聊信息: {from_wxid}")
-                update_task = asyncio.create_task(self.update_contact_info(from_wxid))
-                # 添加回调以记录完成状态
-                update_task.add_done_callback(
-                    lambda t: logger.info(f"完成群聊信息更新: {from_wxid}, 状态: {'success' if not t.exception() else f'error: {t.exception()}'}")
-                )
-            # 如果是私聊，更新发送者信息
-            elif not from_wxid.endswith("@chatroom"):
-                logger.info(f"开始异步更新发送者联系人信息: {from_wxid}")
-                update_task = asyncio.create_task(self.update_contact_info(from_wxid))
-                # 添加回调以记录完成状态
-                update_task.add_done_callback(
-                    lambda t: logger.info(f"完成发送者联系人信息更新: {from_wxid}, 状态: {'success' if not t.exception() else f'error: {t.exception()}'}")
-                )
+            asyncio.create_task(self.update_contact_info(from_wxid))
 
         # 根据消息类型触发不同的事件
         if msg_type == 1:  # 文本消息
@@ -509,43 +591,32 @@ class XYBot:
                 logger.warning("风控保护: 新设备登录后4小时内请挂机")
         elif msg_type == 51:
             pass
+        elif msg_type == 10000:  # 系统提示，如入群、修改群名
+            content = message.get("Content", {})
+            content = content.get("string", "") if isinstance(content, dict) else str(content)
+            if from_wxid.endswith("@chatroom") and any(keyword in content for keyword in ROSTER_KEYWORDS):
+                self.invalidate_group_cache(from_wxid, display_name="群昵称" in content)
+            logger.info("收到系统提示消息: {}", message)
         else:
             logger.info("未知的消息类型: {}", message)
 
+    def _should_emit(self, message: Dict[str, Any], event_type: str) -> bool:
+        """消息是否需要交给插件: 有插件处理该事件、未被过滤且不在风控保护期内"""
+        if not EventManager.has_handlers(event_type):
+            logger.debug("没有插件处理 {}，跳过下载: 消息ID:{}", event_type, message.get("MsgId", ""))
+            return False
+        if not self.ignore_check(message["FromWxid"], message["SenderWxid"]):
+            return False
+        if self.ignore_protection or not protector.check(14400):
+            return True
+        logger.warning("风控保护: 新设备登录后4小时内请挂机")
+        return False
+
     async def process_text_message(self, message: Dict[str, Any]):
         """处理文本消息"""
-        message["Content"] = message.get("Content", {}).get("string", "")
+        msg = normalize_message(message, self.wxid, separator=":\n")
 
-        if message["FromWxid"].endswith("@chatroom"):  # 群聊消息
-            message["IsGroup"] = True
-            split_content = message["Content"].split(":\n", 1)
-            if len(split_content) > 1:
-                message["Content"] = split_content[1]
-                message["SenderWxid"] = split_content[0]
-
-                # 不更新群聊中发送者的联系人信息
-                # 根据需求，只更新群聊本身信息，不更新群聊中发送者信息
-            else:
-                message["Content"] = split_content[0]
-                message["SenderWxid"] = self.wxid
-        else:
-            message["SenderWxid"] = message["FromWxid"]
-            if message["FromWxid"] == self.wxid:
-                message["FromWxid"] = message["ToWxid"]
-            message["IsGroup"] = False
-
-        try:
-            root = ET.fromstring(message.get("MsgSource", ""))
-            ats = root.find("atuserlist").text if root.find("atuserlist") is not None else ""
-        except Exception as e:
-            logger.error("解析文本消息失败: {}", e)
-            ats = ""
-
-        if ats:
-            ats = ats.strip(",").split(",")
-        else:
-            ats = []
-        message["Ats"] = ats if ats and ats[0] != "" else []
+        message["Ats"] = list(msg.ats)
 
         await self.msg_db.save_message(
             msg_id=int(message.get("MsgId", 0)),
@@ -556,7 +627,19 @@ class XYBot:
             is_group=message["IsGroup"]
         )
 
-        if self.wxid in message.get("Ats", []):
+        is_at = self.wxid in message.get("Ats", [])
+        self.event_bridge.publish(message_event(message, 1, IsAtMessage=is_at, AtList=message["Ats"]))
+
+        if message["SenderWxid"] in self.admins:
+            # 管理员命令的回复优先于普通回复和群发
+            with send_priority(PRIORITY_HIGH):
+                await self._emit_text_message(message, is_at)
+        else:
+            await self._emit_text_message(message, is_at)
+
+    async def _emit_text_message(self, message: Dict[str, Any], is_at: bool):
+        """把文本消息交给插件，被@时先检查唤醒词"""
+        if is_at:
             logger.info("收到被@消息: 消息ID:{} 来自:{} 发送人:{} @:{} 内容:{}",
                         message.get("MsgId", ""), message["FromWxid"],
                         message["SenderWxid"], message["Ats"], message["Content"])
@@ -590,29 +673,12 @@ class XYBot:
 
     async def process_image_message(self, message: Dict[str, Any]):
         """处理图片消息"""
-        message["Content"] = message.get("Content", {}).get("string", "").replace("\n", "").replace("\t", "")
-
-        if message["FromWxid"].endswith("@chatroom"):
-            message["IsGroup"] = True
-            split_content = message["Content"].split(":", 1)
-            if len(split_content) > 1:
-                message["Content"] = split_content[1]
-                message["SenderWxid"] = split_content[0]
-
-                # 不更新群聊中发送者的联系人信息
-                # 根据需求，只更新群聊本身信息，不更新群聊中发送者信息
-            else:
-                message["Content"] = split_content[0]
-                message["SenderWxid"] = self.wxid
-        else:
-            message["SenderWxid"] = message["FromWxid"]
-            if message["FromWxid"] == self.wxid:
-                message["FromWxid"] = message["ToWxid"]
-            message["IsGroup"] = False
+        msg = normalize_message(message, self.wxid, strip=True)
 
         logger.info("收到图片消息: 消息ID:{} 来自:{} 发送人:{} XML:{}",
                     message.get("MsgId", ""), message["FromWxid"],
                     message["SenderWxid"], message["Content"])
+        self.event_bridge.publish(message_event(message, 3))
 
         await self.msg_db.save_message(
             msg_id=int(message.get("MsgId", 0)),
@@ -625,7 +691,7 @@ class XYBot:
 
         aeskey, cdnmidimgurl, length, md5 = None, None, None, None
         try:
-            root = ET.fromstring(message["Content"])
+            root = msg.xml
             img_element = root.find('img')
             if img_element is not None:
                 aeskey = img_element.get('aeskey')
@@ -637,61 +703,20 @@ class XYBot:
             logger.error("解析图片消息失败: {}, 内容: {}", e, message["Content"])
             return
 
-        # 尝试使用新的get_msg_image方法分段下载图片
+        # 没有插件处理或消息被过滤时不下载图片
+        if not self._should_emit(message, "image_message"):
+            return
+
+        # 分段并发下载图片，按md5缓存，失败时使用download_image下载
         try:
+            image_data = None
             if length and length.isdigit():
-                img_length = int(length)
-                logger.debug(f"尝试使用get_msg_image下载图片: MsgId={message.get('MsgId')}, length={img_length}")
-
-                # 分段下载图片
-                chunk_size = 64 * 1024  # 64KB
-                chunks = (img_length + chunk_size - 1) // chunk_size  # 向上取整
-                full_image_data = bytearray()
-
-                logger.info(f"开始分段下载图片，总大小: {img_length} 字节，分 {chunks} 段下载")
-
-                download_success = True
-                for i in range(chunks):
-                    try:
-                        # 下载当前段
-                        start_pos = i * chunk_size
-                        chunk_data = await self.bot.get_msg_image(message.get('MsgId'), message["FromWxid"], img_length, start_pos=start_pos)
-                        if chunk_data and len(chunk_data) > 0:
-                            full_image_data.extend(chunk_data)
-                            logger.debug(f"第 {i+1}/{chunks} 段下载成功，大小: {len(chunk_data)} 字节")
-                        else:
-                            logger.error(f"第 {i+1}/{chunks} 段下载失败，数据为空")
-                            download_success = False
-                            break
-                    except Exception as e:
-                        logger.error(f"下载第 {i+1}/{chunks} 段时出错: {e}")
-                        download_success = False
-                        break
-
-                if download_success and len(full_image_data) > 0:
-                    # 验证图片数据
-                    try:
-                        import base64
-                        from PIL import Image, ImageFile
-                        ImageFile.LOAD_TRUNCATED_IMAGES = True  # 允许加载截断的图片
-
-                        image_data = bytes(full_image_data)
-                        # 验证图片数据
-                        Image.open(io.BytesIO(image_data))
-                        message["Content"] = base64.b64encode(image_data).decode('utf-8')
-                        logger.info(f"分段下载图片成功，总大小: {len(image_data)} 字节")
-                    except Exception as img_error:
-                        logger.error(f"验证分段下载的图片数据失败: {img_error}")
-                        # 如果验证失败，尝试使用download_image
-                        if aeskey and cdnmidimgurl:
-                            logger.warning("尝试使用download_image下载图片")
-                            message["Content"] = await self.bot.download_image(aeskey, cdnmidimgurl)
-                else:
-                    logger.warning(f"分段下载图片失败，已下载: {len(full_image_data)}/{img_length} 字节")
-                    # 如果分段下载失败，尝试使用download_image
-                    if aeskey and cdnmidimgurl:
-                        logger.warning("尝试使用download_image下载图片")
-                        message["Content"] = await self.bot.download_image(aeskey, cdnmidimgurl)
+                image_data = await self.image_downloader.download(message.get("MsgId"), message["FromWxid"],
+                                                                  int(length), md5)
+            if image_data:
+                import base64
+                message["Content"] = base64.b64encode(image_data).decode('utf-8')
+                logger.info(f"分段下载图片成功，总大小: {len(image_data)} 字节")
             elif aeskey and cdnmidimgurl:
                 logger.debug("使用download_image下载图片")
                 message["Content"] = await self.bot.download_image(aeskey, cdnmidimgurl)
@@ -703,33 +728,11 @@ class XYBot:
                 except Exception as e2:
                     logger.error(f"备用方法下载图片也失败: {e2}")
 
-        if self.ignore_check(message["FromWxid"], message["SenderWxid"]):
-            if self.ignore_protection or not protector.check(14400):
-                await EventManager.emit("image_message", self.bot, message)
-            else:
-                logger.warning("风控保护: 新设备登录后4小时内请挂机")
+        await EventManager.emit("image_message", self.bot, message)
 
     async def process_voice_message(self, message: Dict[str, Any]):
         """处理语音消息"""
-        message["Content"] = message.get("Content", {}).get("string", "").replace("\n", "").replace("\t", "")
-
-        if message["FromWxid"].endswith("@chatroom"):
-            message["IsGroup"] = True
-            split_content = message["Content"].split(":", 1)
-            if len(split_content) > 1:
-                message["Content"] = split_content[1]
-                message["SenderWxid"] = split_content[0]
-
-                # 不更新群聊中发送者的联系人信息
-                # 根据需求，只更新群聊本身信息，不更新群聊中发送者信息
-            else:
-                message["Content"] = split_content[0]
-                message["SenderWxid"] = self.wxid
-        else:
-            message["SenderWxid"] = message["FromWxid"]
-            if message["FromWxid"] == self.wxid:
-                message["FromWxid"] = message["ToWxid"]
-            message["IsGroup"] = False
+        msg = normalize_message(message, self.wxid, strip=True)
 
         logger.info("收到语音消息: 消息ID:{} 来自:{} 发送人:{} XML:{}",
                     message.get("MsgId", ""), message["FromWxid"],
@@ -744,10 +747,14 @@ class XYBot:
             is_group=message["IsGroup"]
         )
 
+        # 没有插件处理或消息被过滤时不下载语音
+        if not self._should_emit(message, "voice_message"):
+            return
+
         if message["IsGroup"] or not message.get("ImgBuf", {}).get("buffer", ""):
             voiceurl, length = None, None
             try:
-                root = ET.fromstring(message["Content"])
+                root = msg.xml
                 voicemsg_element = root.find('voicemsg')
                 if voicemsg_element is not None:
                     voiceurl = voicemsg_element.get('voiceurl')
@@ -763,33 +770,11 @@ class XYBot:
             silk_base64 = message.get("ImgBuf", {}).get("buffer", "")
             message["Content"] = await self.bot.silk_base64_to_wav_byte(silk_base64)
 
-        if self.ignore_check(message["FromWxid"], message["SenderWxid"]):
-            if self.ignore_protection or not protector.check(14400):
-                await EventManager.emit("voice_message", self.bot, message)
-            else:
-                logger.warning("风控保护: 新设备登录后4小时内请挂机")
+        await EventManager.emit("voice_message", self.bot, message)
 
     async def process_emoji_message(self, message: Dict[str, Any]):
         """处理表情消息"""
-        message["Content"] = message.get("Content", {}).get("string", "").replace("\n", "").replace("\t", "")
-
-        if message["FromWxid"].endswith("@chatroom"):  # 群聊消息
-            message["IsGroup"] = True
-            split_content = message["Content"].split(":\n", 1)
-            if len(split_content) > 1:
-                message["Content"] = split_content[1]
-                message["ActualUserWxid"] = split_content[0]
-
-                # 不更新群聊中发送者的联系人信息
-                # 根据需求，只更新群聊本身信息，不更新群聊中发送者信息
-            else:
-                message["Content"] = split_content[0]
-                message["ActualUserWxid"] = self.wxid
-        else:
-            message["ActualUserWxid"] = message["FromWxid"]
-            if message["FromWxid"] == self.wxid:
-                message["FromWxid"] = message["ToWxid"]
-            message["IsGroup"] = False
+        normalize_message(message, self.wxid, separator=":\n", strip=True, sender_key="ActualUserWxid")
 
         logger.info("收到表情消息: 消息ID:{} 来自:{} 发送人:{} XML:{}",
                     message.get("MsgId", ""), message["FromWxid"],
@@ -815,25 +800,7 @@ class XYBot:
 
     async def process_xml_message(self, message: Dict[str, Any]):
         """处理xml消息"""
-        message["Content"] = message.get("Content", {}).get("string", "").replace("\n", "").replace("\t", "")
-
-        if message["FromWxid"].endswith("@chatroom"):
-            message["IsGroup"] = True
-            split_content = message["Content"].split(":", 1)
-            if len(split_content) > 1:
-                message["Content"] = split_content[1]
-                message["SenderWxid"] = split_content[0]
-
-                # 不更新群聊中发送者的联系人信息
-                # 根据需求，只更新群聊本身信息，不更新群聊中发送者信息
-            else:
-                message["Content"] = split_content[0]
-                message["SenderWxid"] = self.wxid
-        else:
-            message["SenderWxid"] = message["FromWxid"]
-            if message["FromWxid"] == self.wxid:
-                message["FromWxid"] = message["ToWxid"]
-            message["IsGroup"] = False
+        msg = normalize_message(message, self.wxid, strip=True)
 
         # 保存消息到数据库（即使解析失败也保存）
         await self.msg_db.save_message(
@@ -846,7 +813,7 @@ class XYBot:
         )
 
         try:
-            root = ET.fromstring(message["Content"])
+            root = msg.xml
             appmsg = root.find("appmsg")
             if appmsg is None:
                 logger.warning("XML 中未找到 appmsg 节点，内容: {}", message["Content"])
@@ -882,6 +849,7 @@ class XYBot:
                         message.get("MsgId", ""), message["FromWxid"],
                         message["SenderWxid"], message["Content"])
             logger.debug("完整 XML 内容: {}", message["Content"])
+            self.event_bridge.publish(message_event(message, 6))
             if self.ignore_check(message["FromWxid"], message["SenderWxid"]):
                 if self.ignore_protection or not protector.check(14400):
                     logger.debug("触发 article_message 事件: 消息ID: {}", message.get("MsgId", ""))
@@ -905,7 +873,7 @@ class XYBot:
         """处理引用消息"""
         quote_message = {}
         try:
-            root = ET.fromstring(message["Content"])
+            root = parse_xml_shared(message["Content"])
             appmsg = root.find("appmsg")
             text = appmsg.find("title").text
             refermsg = appmsg.find("refermsg")
@@ -931,34 +899,24 @@ class XYBot:
 
                 quote_message["Content"] = refermsg.find("content").text
 
-                quote_root = ET.fromstring(quote_message["Content"])
+                quote_root = parse_xml_shared(quote_message["Content"])
                 quote_appmsg = quote_root.find("appmsg")
 
-                quote_message["Content"] = quote_appmsg.find("title").text if isinstance(quote_appmsg.find("title"), ET.Element) else ""
-                quote_message["destination"] = quote_appmsg.find("des").text if isinstance(quote_appmsg.find("des"), ET.Element) else ""
-                quote_message["action"] = quote_appmsg.find("action").text if isinstance(quote_appmsg.find("action"), ET.Element) else ""
-                quote_message["XmlType"] = int(quote_appmsg.find("type").text) if isinstance(quote_appmsg.find("type"), ET.Element) else 0
-                quote_message["showtype"] = int(quote_appmsg.find("showtype").text) if isinstance(quote_appmsg.find("showtype"), ET.Element) else 0
-                quote_message["soundtype"] = int(quote_appmsg.find("soundtype").text) if isinstance(quote_appmsg.find("soundtype"), ET.Element) else 0
-                quote_message["url"] = quote_appmsg.find("url").text if isinstance(quote_appmsg.find("url"), ET.Element) else ""
-                quote_message["lowurl"] = quote_appmsg.find("lowurl").text if isinstance(quote_appmsg.find("lowurl"), ET.Element) else ""
-                quote_message["dataurl"] = quote_appmsg.find("dataurl").text if isinstance(quote_appmsg.find("dataurl"), ET.Element) else ""
-                quote_message["lowdataurl"] = quote_appmsg.find("lowdataurl").text if isinstance(quote_appmsg.find("lowdataurl"), ET.Element) else ""
-                quote_message["songlyric"] = quote_appmsg.find("songlyric").text if isinstance(quote_appmsg.find("songlyric"), ET.Element) else ""
-                quote_message["appattach"] = {}
-                quote_message["appattach"]["totallen"] = int(quote_appmsg.find("appattach").find("totallen").text) if isinstance(quote_appmsg.find("appattach").find("totallen"), ET.Element) else 0
-                quote_message["appattach"]["attachid"] = quote_appmsg.find("appattach").find("attachid").text if isinstance(quote_appmsg.find("appattach").find("attachid"), ET.Element) else ""
-                quote_message["appattach"]["emoticonmd5"] = quote_appmsg.find("appattach").find("emoticonmd5").text if isinstance(quote_appmsg.find("appattach").find("emoticonmd5"), ET.Element) else ""
-                quote_message["appattach"]["fileext"] = quote_appmsg.find("appattach").find("fileext").text if isinstance(quote_appmsg.find("appattach").find("fileext"), ET.Element) else ""
-                quote_message["appattach"]["cdnthumbaeskey"] = quote_appmsg.find("appattach").find("cdnthumbaeskey").text if isinstance(quote_appmsg.find("appattach").find("cdnthumbaeskey"), ET.Element) else ""
-                quote_message["appattach"]["aeskey"] = quote_appmsg.find("appattach").find("aeskey").text if isinstance(quote_appmsg.find("appattach").find("aeskey"), ET.Element) else ""
-                quote_message["extinfo"] = quote_appmsg.find("extinfo").text if isinstance(quote_appmsg.find("extinfo"), ET.Element) else ""
-                quote_message["sourceusername"] = quote_appmsg.find("sourceusername").text if isinstance(quote_appmsg.find("sourceusername"), ET.Element) else ""
-                quote_message["sourcedisplayname"] = quote_appmsg.find("sourcedisplayname").text if isinstance(quote_appmsg.find("sourcedisplayname"), ET.Element) else ""
-                quote_message["thumburl"] = quote_appmsg.find("thumburl").text if isinstance(quote_appmsg.find("thumburl"), ET.Element) else ""
-                quote_message["md5"] = quote_appmsg.find("md5").text if isinstance(quote_appmsg.find("md5"), ET.Element) else ""
-                quote_message["statextstr"] = quote_appmsg.find("statextstr").text if isinstance(quote_appmsg.find("statextstr"), ET.Element) else ""
-                quote_message["directshare"] = int(quote_appmsg.find("directshare").text) if isinstance(quote_appmsg.find("directshare"), ET.Element) else 0
+                appattach = quote_appmsg.find("appattach")
+                for key, tag in (("Content", "title"), ("destination", "des"), ("action", "action"), ("url", "url"),
+                                 ("lowurl", "lowurl"), ("dataurl", "dataurl"), ("lowdataurl", "lowdataurl"),
+                                 ("songlyric", "songlyric"), ("extinfo", "extinfo"), ("sourceusername", "sourceusername"),
+                                 ("sourcedisplayname", "sourcedisplayname"), ("thumburl", "thumburl"), ("md5", "md5"),
+                                 ("statextstr", "statextstr")):
+                    quote_message[key] = find_text(quote_appmsg, tag)
+                for key, tag in (("XmlType", "type"), ("showtype", "showtype"), ("soundtype", "soundtype"),
+                                 ("directshare", "directshare")):
+                    quote_message[key] = find_int(quote_appmsg, tag)
+                quote_message["appattach"] = {
+                    "totallen": find_int(appattach, "totallen"),
+                    **{tag: find_text(appattach, tag)
+                       for tag in ("attachid", "emoticonmd5", "fileext", "cdnthumbaeskey", "aeskey")},
+                }
 
             elif quote_message["MsgType"] == 3:  # 处理引用图片，以这个cdnthumbaeskey为图片缓存的唯一标识，方便后续在dow插件里根据cdnthumbaeskey获取到相应的图片
                 quote_message["NewMsgId"] = refermsg.find("svrid").text
@@ -990,6 +948,9 @@ class XYBot:
         logger.info("收到引用消息: 消息ID:{} 来自:{} 发送人:{} 内容:{} 引用:{}",
                     message.get("MsgId", ""), message["FromWxid"],
                     message["SenderWxid"], message["Content"], message["Quote"])
+        self.event_bridge.publish(message_event(
+            message, 49, QuotedMessage=message["Quote"],
+            IsAtMessage=self.wxid in message.get("Ats", []) or "@" in message["Content"]))
 
         if self.ignore_check(message["FromWxid"], message["SenderWxid"]):
             if self.ignore_protection or not protector.check(14400):
@@ -998,25 +959,7 @@ class XYBot:
                 logger.warning("风控保护: 新设备登录后4小时内请挂机")
 
     async def process_video_message(self, message):
-        message["Content"] = message.get("Content", {}).get("string", "")
-
-        if message["FromWxid"].endswith("@chatroom"):
-            message["IsGroup"] = True
-            split_content = message["Content"].split(":", 1)
-            if len(split_content) > 1:
-                message["Content"] = split_content[1]
-                message["SenderWxid"] = split_content[0]
-
-                # 不更新群聊中发送者的联系人信息
-                # 根据需求，只更新群聊本身信息，不更新群聊中发送者信息
-            else:
-                message["Content"] = split_content[0]
-                message["SenderWxid"] = self.wxid
-        else:
-            message["SenderWxid"] = message["FromWxid"]
-            if message["FromWxid"] == self.wxid:
-                message["FromWxid"] = message["ToWxid"]
-            message["IsGroup"] = False
+        normalize_message(message, self.wxid)
 
         logger.info("收到视频消息: 消息ID:{} 来自:{} 发送人:{} XML:{}",
                     message.get("MsgId", ""), message["FromWxid"],
@@ -1031,18 +974,18 @@ class XYBot:
             is_group=message["IsGroup"]
         )
 
+        # 没有插件处理或消息被过滤时不下载视频
+        if not self._should_emit(message, "video_message"):
+            return
+
         message["Video"] = await self.bot.download_video(message.get("MsgId", 0))
 
-        if self.ignore_check(message["FromWxid"], message["SenderWxid"]):
-            if self.ignore_protection or not protector.check(14400):
-                await EventManager.emit("video_message", self.bot, message)
-            else:
-                logger.warning("风控保护: 新设备登录后4小时内请挂机")
+        await EventManager.emit("video_message", self.bot, message)
 
     async def process_file_message(self, message: Dict[str, Any]):
         """处理文件消息"""
         try:
-            root = ET.fromstring(message["Content"])
+            root = parse_xml_shared(message["Content"])
             filename = root.find("appmsg").find("title").text
             attach_id = root.find("appmsg").find("appattach").find("attachid").text
             file_extend = root.find("appmsg").find("appattach").find("fileext").text
@@ -1066,43 +1009,31 @@ class XYBot:
             is_group=message["IsGroup"]
         )
 
+        # 没有插件处理或消息被过滤时不下载文件
+        if not self._should_emit(message, "file_message"):
+            return
+
         message["File"] = await self.bot.download_attach(attach_id)
 
-        if self.ignore_check(message["FromWxid"], message["SenderWxid"]):
-            if self.ignore_protection or not protector.check(14400):
-                await EventManager.emit("file_message", self.bot, message)
-            else:
-                logger.warning("风控保护: 新设备登录后4小时内请挂机")
+        await EventManager.emit("file_message", self.bot, message)
 
     async def process_system_message(self, message: Dict[str, Any]):
         """处理系统消息"""
-        message["Content"] = message.get("Content", {}).get("string", "")
-
-        if message["FromWxid"].endswith("@chatroom"):
-            message["IsGroup"] = True
-            split_content = message["Content"].split(":", 1)
-            if len(split_content) > 1:
-                message["Content"] = split_content[1]
-                message["SenderWxid"] = split_content[0]
-
-                # 不更新群聊中发送者的联系人信息
-                # 根据需求，只更新群聊本身信息，不更新群聊中发送者信息
-            else:
-                message["Content"] = split_content[0]
-                message["SenderWxid"] = self.wxid
-        else:
-            message["SenderWxid"] = message["FromWxid"]
-            if message["FromWxid"] == self.wxid:
-                message["FromWxid"] = message["ToWxid"]
-            message["IsGroup"] = False
+        msg = normalize_message(message, self.wxid)
 
         try:
-            root = ET.fromstring(message["Content"])
+            root = msg.xml
             msg_type = root.attrib["type"]
         except Exception as e:
             logger.error("解析系统消息失败: {}, 内容: {}", e, message["Content"])
             return
 
+        if message["IsGroup"] and (msg_type in ROSTER_SYSMSG_TYPES
+                                   or any(keyword in message["Content"] for keyword in ROSTER_KEYWORDS)):
+            # 入群、退群、改名后群成员列表已过期
+            self.invalidate_group_cache(message["FromWxid"],
+                                        display_name=self.wxid in message["Content"] or "群昵称" in message["Content"])
+
         if msg_type == "pat":
             await self.process_pat_message(message)
         elif msg_type == "ClientCheckGetExtInfo":
@@ -1118,7 +1049,7 @@ class XYBot:
     async def process_pat_message(self, message: Dict[str, Any]):
         """处理拍一拍请求消息"""
         try:
-            root = ET.fromstring(message["Content"])
+            root = parse_xml_shared(message["Content"])
             pat = root.find("pat")
             patter = pat.find("fromusername").text
             patted = pat.find("pattedusername").text
@@ -1178,13 +1109,10 @@ class XYBot:
             # 尝试从群成员列表中获取机器人的群昵称
             if message["FromWxid"].endswith("@chatroom"):
                 try:
-                    # 异步获取群成员列表
-                    members = await self.get_chatroom_member_list(message["FromWxid"])
-                    for member in members:
-                        if member.get("wxid") == self.wxid and member.get("nickname"):
-                            robot_names.append(member["nickname"])
-                            logger.debug(f"从群成员列表中获取到机器人的群昵称: {member['nickname']}")
-                            break
+                    display_name = await self.get_bot_display_name(message["FromWxid"])
+                    if display_name:
+                        robot_names.append(display_name)
+                        logger.debug(f"获取到机器人的群昵称: {display_name}")
                 except Exception as e:
                     logger.warning(f"获取群成员列表失败: {e}")
 
@@ -1547,90 +1475,20 @@ class XYBot:
         # 没有唤醒词，返回True让消息继续传递给处理链
         return True
 
-    def ignore_check(self, FromWxid: str, SenderWxid: str):
-        # 过滤公众号消息（公众号wxid通常以gh_开头）
-        if SenderWxid and isinstance(SenderWxid, str) and SenderWxid.startswith('gh_'):
-            logger.debug(f"忽略公众号消息: {SenderWxid}")
-            return False
-        if FromWxid and isinstance(FromWxid, str) and FromWxid.startswith('gh_'):
-            logger.debug(f"忽略公众号消息: {FromWxid}")
-            return False
-
-        # 过滤微信团队和系统通知
-        system_accounts = [
-            'weixin', # 微信团队
-            'filehelper', # 文件传输助手
-            'fmessage', # 朋友推荐通知
-            'medianote', # 语音记事本
-            'floatbottle', # 漂流瓶
-            'qmessage', # QQ离线消息
-            'qqmail', # QQ邮箱提醒
-            'tmessage', # 腾讯新闻
-            'weibo', # 微博推送
-            'newsapp', # 新闻推送
-            'notification_messages', # 服务通知
-            'helper_entry', # 新版微信运动
-            'mphelper', # 公众号助手
-            'brandsessionholder', # 公众号消息
-            'weixinreminder', # 微信提醒
-            'officialaccounts', # 公众平台
-        ]
-
-        # 检查是否是系统账号
-        for account in system_accounts:
-            if (SenderWxid and isinstance(SenderWxid, str) and SenderWxid == account) or \
-               (FromWxid and isinstance(FromWxid, str) and FromWxid == account):
-                logger.debug(f"忽略系统账号消息: {SenderWxid or FromWxid}")
-                return False
+    @property
+    def ignore_mode(self) -> str:
+        return self.ignore_filter.ignore_mode
 
-        # 检测其他特殊账号特征
-        # 微信支付相关通知
-        if (SenderWxid and isinstance(SenderWxid, str) and 'wxpay' in SenderWxid) or \
-           (FromWxid and isinstance(FromWxid, str) and 'wxpay' in FromWxid):
-            logger.debug(f"忽略微信支付相关消息: {SenderWxid or FromWxid}")
-            return False
+    @property
+    def whitelist(self) -> frozenset:
+        return self.ignore_filter.whitelist
 
-        # 腾讯游戏相关通知
-        if (SenderWxid and isinstance(SenderWxid, str) and ('tencent' in SenderWxid.lower() or 'game' in SenderWxid.lower())) or \
-           (FromWxid and isinstance(FromWxid, str) and ('tencent' in FromWxid.lower() or 'game' in FromWxid.lower())):
-            logger.debug(f"忽略腾讯游戏相关消息: {SenderWxid or FromWxid}")
-            return False
-
-        # 其他特殊账号特征
-        # 微信官方账号通常包含"service"或"official"
-        if (SenderWxid and isinstance(SenderWxid, str) and ('service' in SenderWxid.lower() or 'official' in SenderWxid.lower())) or \
-           (FromWxid and isinstance(FromWxid, str) and ('service' in FromWxid.lower() or 'official' in FromWxid.lower())):
-            logger.debug(f"忽略官方服务账号消息: {SenderWxid or FromWxid}")
-            return False
+    @property
+    def blacklist(self) -> frozenset:
+        return self.ignore_filter.blacklist
 
-
-
-        # 先检查是否是群聊消息
-        is_group = FromWxid and isinstance(FromWxid, str) and FromWxid.endswith("@chatroom")
-
-        if self.ignore_mode == "Whitelist":
-            if is_group:
-                # 群聊消息：有两种情况
-                # 1. 群聊ID在白名单中（处理该群中的所有消息）
-                # 2. 发送者ID在白名单中（无论群聊ID是否在白名单中）
-
-                # 当发送者ID在白名单中，或者群聊ID在白名单中时，才处理消息
-                # 修改逻辑，允许处理白名单群聊中的所有消息，而不仅仅是机器人自己发送的消息
-                logger.debug(f"白名单检查: 群聊ID={FromWxid}, 发送者ID={SenderWxid}, 群聊ID在白名单中={FromWxid in self.whitelist}, 发送者ID在白名单中={SenderWxid in self.whitelist}")
-                return SenderWxid in self.whitelist or FromWxid in self.whitelist
-            else:
-                # 私聊消息：发送者ID在白名单中
-                return SenderWxid in self.whitelist
-        elif self.ignore_mode == "Blacklist":
-            if is_group:
-                # 群聊消息：群聊ID不在黑名单中且发送者ID不在黑名单中
-                return (FromWxid not in self.blacklist) and (SenderWxid not in self.blacklist)
-            else:
-                # 私聊消息：发送者ID不在黑名单中
-                return SenderWxid not in self.blacklist
-        else:
-            # 默认处理所有消息
-            return True
+    def ignore_check(self, FromWxid: str, SenderWxid: str):
+        return self.ignore_filter.check(FromWxid, SenderWxid)
 
     # 朋友圈相关方法
     async def get_friend_circle_list(self, max_id: int = 0) -> dict:
@@ -9,14 +9,16 @@ import os
 import sys
 import json
 import time
+import asyncio
 import logging
 import traceback
-import requests
+import aiohttp
 import threading
 from datetime import datetime
-import glob
 import re  # 添加正则表达式模块
 
+from utils.log_tailer import LogTailer
+
 # 配置日志
 log_dir = "logs"
 if not os.path.exists(log_dir):
@@ -37,6 +39,13 @@ logger = logging.getLogger(__name__)
 DOW_CALLBACK_URL = "http://127.0.0.1:8088/wx849/callback"  # DOW框架的回调URL
 DOW_CALLBACK_KEY = ""  # 从DOW框架启动日志中获取，或在配置中设置
 
+# 转发配置
+FORWARD_BATCH_SIZE = 20  # 每次请求最多合并的消息数
+FORWARD_FLUSH_INTERVAL = 0.05  # 等待凑满一批的最长时间（秒）
+FORWARD_MAX_RETRIES = 5  # 单批消息失败后的重试次数，仍失败则写入暂存文件
+FORWARD_QUEUE_SIZE = 10000  # 待转发消息上限，队列满时暂停读取日志
+FORWARD_SPOOL_FILE = os.path.join(log_dir, "wx849_callback_spool.jsonl")  # 未送达消息的暂存文件，重启后继续投递
+
 # 如果存在配置文件，从中读取配置
 config_file = "wx849_callback_config.json"
 if os.path.exists(config_file):
@@ -45,20 +54,305 @@ if os.path.exists(config_file):
             config = json.load(f)
             DOW_CALLBACK_URL = config.get("callback_url", DOW_CALLBACK_URL)
             DOW_CALLBACK_KEY = config.get("callback_key", DOW_CALLBACK_KEY)
+            FORWARD_BATCH_SIZE = config.get("batch_size", FORWARD_BATCH_SIZE)
+            FORWARD_FLUSH_INTERVAL = config.get("flush_interval", FORWARD_FLUSH_INTERVAL)
+            FORWARD_MAX_RETRIES = config.get("max_retries", FORWARD_MAX_RETRIES)
+            FORWARD_QUEUE_SIZE = config.get("queue_size", FORWARD_QUEUE_SIZE)
+            FORWARD_SPOOL_FILE = config.get("spool_file", FORWARD_SPOOL_FILE)
             logger.info(f"已从配置文件加载回调设置: URL={DOW_CALLBACK_URL}")
     except Exception as e:
         logger.error(f"读取配置文件失败: {e}")
 
-# 消息队列
-message_queue = []
-message_queue_lock = threading.Lock()
-
 # 用户昵称缓存字典
 user_nickname_cache = {}
 
 # 已处理的图片消息ID缓存
 processed_image_msgs = set()
 
+
+class RetryableError(Exception):
+    """DOW框架暂时不可用，稍后重试"""
+
+
+class CallbackForwarder:
+    """异步批量转发消息到DOW框架
+
+    在独立线程的事件循环中运行，从有界队列取消息，合并为一次 {"messages": [...]} 请求，
+    复用长连接发送。失败时指数退避重试，仍失败的批次写入暂存文件，恢复连接或重启后按顺序补发。
+    """
+
+    def __init__(self, url, key="", batch_size=20, flush_interval=0.05, max_retries=5,
+                 queue_size=10000, spool_file=None):
+        self.url = url
+        self.headers = {"Content-Type": "application/json"}
+        # 只有当有密钥时才添加Authorization头
+        if key:
+            self.headers["Authorization"] = f"Bearer {key}"
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max(0, max_retries)
+        self.queue_size = queue_size
+        self.spool_file = spool_file
+
+        self._loop = None
+        self._queue = None
+        self._stopping = None
+        self._session = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._spooled = bool(spool_file and os.path.exists(spool_file))
+        self._next_replay = 0
+        self._replay_backoff = 1
+
+        # 统计信息
+        self.started_at = time.time()
+        self.received = 0
+        self.sent = 0
+        self.batches = 0
+        self.retries = 0
+        self.spooled = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._last_stats_log = time.time()
+
+    @property
+    def pending(self):
+        """队列中等待转发的消息数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """在后台线程启动转发循环"""
+        self._thread = threading.Thread(target=self._thread_main, name="CallbackForwarder", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=10):
+        """停止转发，未送达的消息写入暂存文件"""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+
+    def submit(self, message):
+        """提交一条消息，队列满时阻塞调用方（读取日志的线程）"""
+        self.received += 1
+        future = asyncio.run_coroutine_threadsafe(self._queue.put((time.time(), message)), self._loop)
+        future.result()
+
+    def get_stats(self):
+        """获取转发统计信息"""
+        uptime = max(time.time() - self.started_at, 1e-6)
+        return {
+            "received": self.received,
+            "sent": self.sent,
+            "batches": self.batches,
+            "retries": self.retries,
+            "spooled": self.spooled,
+            "dropped": self.dropped,
+            "pending": self.pending,
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "throughput": round(self.sent / uptime, 2),  # 每秒转发消息数
+        }
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run())
+        except Exception as e:
+            logger.error(f"转发循环异常退出: {e}")
+            logger.error(traceback.format_exc())
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopping = asyncio.Event()
+        self._ready.set()
+
+        connector = aiohttp.TCPConnector(limit=1, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            self._session = session
+            if self._spooled:
+                await self._replay_spool()
+            while not (self._stopping.is_set() and self._queue.empty()):
+                batch = await self._next_batch()
+                if batch:
+                    await self._deliver(batch)
+                self._maybe_log_stats()
+        logger.info(f"转发已停止: {self.get_stats()}")
+
+    async def _next_batch(self):
+        """取出一批消息，第一条到达后最多再等待 flush_interval 凑满一批"""
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout=1)
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        deadline = self._loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _deliver(self, batch):
+        messages = [message for _, message in batch]
+
+        # 已有暂存的批次时先补发，保证顺序；DOW框架仍不可用则直接暂存，不阻塞队列
+        if self._spooled:
+            if self._loop.time() >= self._next_replay:
+                await self._replay_spool()
+            if self._spooled:
+                self._append_spool(messages)
+                return
+
+        result = await self._post_with_retry(messages)
+        if result is None:
+            self._append_spool(messages)
+            return
+        if result:
+            now = time.time()
+            self.last_lag = now - batch[0][0]
+            self.max_lag = max(self.max_lag, self.last_lag)
+            logger.info(f"消息转发成功: {len(messages)} 条，延迟 {self.last_lag * 1000:.1f}ms")
+
+    async def _post(self, messages):
+        """发送一批消息，成功返回True，无法处理的请求返回False"""
+        try:
+            async with self._session.post(self.url, json={"messages": messages}) as response:
+                if response.status == 200:
+                    body = await response.read()
+                    # 已经送达，响应内容异常时只记录日志，不重试，避免重复投递
+                    try:
+                        result = json.loads(body)
+                    except ValueError:
+                        result = None
+                    if not isinstance(result, dict):
+                        logger.warning(f"DOW框架返回了无法识别的响应: {body[:200]!r}")
+                    elif not result.get("success", False):
+                        logger.error(f"DOW框架处理失败: {result.get('message', '未知错误')}")
+                    self.sent += len(messages)
+                    self.batches += 1
+                    return True
+                text = await response.text()
+                if response.status >= 500:
+                    raise RetryableError(f"状态码: {response.status}, 内容: {text[:200]}")
+                # 认证失败等请求错误重试也不会成功
+                logger.error(f"发送失败，状态码: {response.status}, 内容: {text[:200]}，丢弃 {len(messages)} 条消息")
+                self.dropped += len(messages)
+                return False
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise RetryableError(str(e) or type(e).__name__) from e
+
+    async def _post_with_retry(self, messages):
+        """带指数退避重试的发送，重试耗尽返回None"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._post(messages)
+            except RetryableError as e:
+                if attempt == self.max_retries or self._stopping.is_set():
+                    logger.error(f"发送消息失败: {e}，已重试 {attempt} 次")
+                    return None
+                delay = min(0.5 * 2 ** attempt, 30)
+                self.retries += 1
+                logger.warning(f"发送消息失败: {e}，{delay}秒后第 {attempt + 1} 次重试")
+                await asyncio.sleep(delay)
+
+    def _append_spool(self, messages):
+        if not self.spool_file:
+            self.dropped += len(messages)
+            return
+        try:
+            with open(self.spool_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(messages, ensure_ascii=False) + "\n")
+            self.spooled += len(messages)
+            if not self._spooled:
+                self._spooled = True
+                self._next_replay = self._loop.time() + self._replay_backoff
+            logger.warning(f"{len(messages)} 条消息暂未送达，已写入暂存文件 {self.spool_file}")
+        except OSError as e:
+            self.dropped += len(messages)
+            logger.error(f"写入暂存文件失败: {e}，丢弃 {len(messages)} 条消息")
+
+    def _read_spool(self):
+        batches = []
+        with open(self.spool_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    batches.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"暂存文件中有无效的行，已跳过: {line[:100]}")
+        return batches
+
+    def _write_spool(self, batches):
+        """用剩余的批次替换暂存文件，失败时保留原文件，返回是否成功"""
+        try:
+            if not batches:
+                if os.path.exists(self.spool_file):
+                    os.remove(self.spool_file)
+                return True
+            tmp_file = f"{self.spool_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                for messages in batches:
+                    f.write(json.dumps(messages, ensure_ascii=False) + "\n")
+            os.replace(tmp_file, self.spool_file)
+            return True
+        except OSError as e:
+            logger.error(f"更新暂存文件失败: {e}")
+            return False
+
+    async def _replay_spool(self):
+        """按顺序补发暂存文件中的批次，每送达一批就更新暂存文件"""
+        try:
+            batches = self._read_spool()
+        except FileNotFoundError:
+            self._spooled = False
+            return
+        except OSError as e:
+            logger.error(f"读取暂存文件失败: {e}")
+            self._next_replay = self._loop.time() + self._replay_backoff
+            self._replay_backoff = min(self._replay_backoff * 2, 30)
+            return
+
+        logger.info(f"开始补发暂存的 {len(batches)} 批消息")
+        for index, messages in enumerate(batches):
+            try:
+                await self._post(messages)
+            except RetryableError as e:
+                logger.warning(f"补发暂存消息失败: {e}，剩余 {len(batches) - index} 批，{self._replay_backoff}秒后再试")
+                self._next_replay = self._loop.time() + self._replay_backoff
+                self._replay_backoff = min(self._replay_backoff * 2, 30)
+                self._write_spool(batches[index:])
+                return
+        if not self._write_spool([]):
+            # 暂存文件删不掉时保持暂存状态，稍后再试，已送达的批次可能重复发送，由DOW框架去重
+            self._next_replay = self._loop.time() + self._replay_backoff
+            self._replay_backoff = min(self._replay_backoff * 2, 30)
+            return
+        self._spooled = False
+        self._replay_backoff = 1
+        logger.info("暂存消息已全部补发")
+
+    def _maybe_log_stats(self):
+        if time.time() - self._last_stats_log >= 60:
+            self._last_stats_log = time.time()
+            logger.info(f"转发统计: {self.get_stats()}")
+
+
 class MessageMonitor:
     def __init__(self):
         self.is_running = True
@@ -72,33 +366,31 @@ class MessageMonitor:
             "logs/wechat_message.log"
         ]
 
-        # 记录每个文件的上次读取位置
-        self.file_positions = {}
-        # 扩展文件路径模式
-        self.actual_file_paths = []
-        for pattern in self.message_file_paths:
-            matching_files = glob.glob(pattern)
-            for file_path in matching_files:
-                if os.path.exists(file_path) and file_path not in self.actual_file_paths:
-                    self.actual_file_paths.append(file_path)
-                    self.file_positions[file_path] = os.path.getsize(file_path)
+        # 消息转发器
+        self.forwarder = CallbackForwarder(DOW_CALLBACK_URL, DOW_CALLBACK_KEY,
+                                           batch_size=FORWARD_BATCH_SIZE,
+                                           flush_interval=FORWARD_FLUSH_INTERVAL,
+                                           max_retries=FORWARD_MAX_RETRIES,
+                                           queue_size=FORWARD_QUEUE_SIZE,
+                                           spool_file=FORWARD_SPOOL_FILE)
 
-        logger.info(f"监控的日志文件: {self.actual_file_paths}")
+        # 跟踪日志文件，日志轮转后新建的文件也会自动跟踪
+        self.tailer = LogTailer(self.message_file_paths)
+        logger.info(f"监控的日志文件: {[tailed.path for tailed in self.tailer.files.values()]}")
 
     def start(self):
         """启动监控"""
         logger.info("启动消息监控...")
 
-        # 启动消息处理线程
-        processor_thread = threading.Thread(target=self.process_messages)
-        processor_thread.daemon = True
-        processor_thread.start()
+        # 启动消息转发
+        self.forwarder.start()
 
-        # 主循环 - 监控消息文件
+        # 主循环 - 日志文件有新内容时逐行解析
         try:
-            while self.is_running:
-                self.check_message_files()
-                time.sleep(0.5)  # 每0.5秒检查一次
+            for line in self.tailer.lines():
+                if not self.is_running:
+                    break
+                self.parse_line(line)
         except KeyboardInterrupt:
             logger.info("收到中断信号，正在停止...")
             self.is_running = False
@@ -106,87 +398,52 @@ class MessageMonitor:
             logger.error(f"监控异常: {e}")
             logger.error(traceback.format_exc())
             self.is_running = False
+        finally:
+            self.forwarder.stop()
 
-    def check_message_files(self):
-        """检查消息文件变化"""
-        for file_path in self.actual_file_paths:
-            if not os.path.exists(file_path):
-                continue
+    def parse_line(self, line):
+        """解析一行日志，提取消息"""
+        if not line.strip():
+            return
 
-            try:
-                # 获取当前文件大小
-                current_size = os.path.getsize(file_path)
-
-                # 如果是新文件或文件被重置
-                if file_path not in self.file_positions or current_size < self.file_positions[file_path]:
-                    self.file_positions[file_path] = 0
-
-                # 如果文件有新内容
-                if current_size > self.file_positions[file_path]:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        # 移动到上次读取的位置
-                        f.seek(self.file_positions[file_path])
-
-                        # 读取新增内容
-                        new_content = f.read()
-
-                        # 更新位置
-                        self.file_positions[file_path] = current_size
-
-                        # 处理新内容
-                        self.parse_new_content(new_content)
-            except Exception as e:
-                logger.error(f"读取文件 {file_path} 失败: {e}")
-
-    def parse_new_content(self, content):
-        """解析日志内容，提取消息"""
-        # 按行分割
-        lines = content.split('\n')
-
-        for line in lines:
-            if not line.strip():
-                continue
-
-            try:
-                # 检查昵称更新行
-                nickname_pattern = r"更新用户昵称缓存: (wxid_\w+) -> (.+)"
-                nickname_match = re.search(nickname_pattern, line)
-                if nickname_match:
-                    wxid = nickname_match.group(1)
-                    nickname = nickname_match.group(2)
-                    user_nickname_cache[wxid] = nickname
-                    logger.info(f"缓存用户昵称: {wxid} -> {nickname}")
-                    continue
-
-                # 匹配更多可能的消息模式，特别是原始框架特定的格式
-                if ("收到文本消息" in line or
-                    "收到消息" in line or
-                    "收到图片消息" in line or  # 特别关注图片消息
-                    "收到语音消息" in line or
-                    "收到被@消息" in line or  # 添加被@消息类型
-                    "收到引用消息" in line or  # 添加引用消息类型
-                    "MsgId" in line or
-                    "收到链接分享消息" in line):
-
-                    # 特别处理图片消息，确保它们被正确识别
-                    if "收到图片消息" in line:
-                        logger.info(f"发现图片消息行: {line[:100]}...")
-                    # 特别处理链接分享消息，确保它们被正确识别
-                    elif "收到链接分享消息" in line:
-                        logger.info(f"发现链接分享消息行: {line[:100]}...")
-
-                    logger.info(f"发现可能的消息行: {line[:100]}...")
-
-                    # 尝试提取消息数据
-                    message_data = self.extract_message_from_line(line)
-
-                    if message_data:
-                        # 使用锁保护队列操作
-                        with message_queue_lock:
-                            message_queue.append(message_data)
-                            logger.info(f"添加消息到队列，当前队列长度: {len(message_queue)}")
-            except Exception as e:
-                logger.error(f"解析行异常: {e}, 行内容: {line[:100]}...")
+        try:
+            # 检查昵称更新行
+            nickname_pattern = r"更新用户昵称缓存: (wxid_\w+) -> (.+)"
+            nickname_match = re.search(nickname_pattern, line)
+            if nickname_match:
+                wxid = nickname_match.group(1)
+                nickname = nickname_match.group(2)
+                user_nickname_cache[wxid] = nickname
+                logger.info(f"缓存用户昵称: {wxid} -> {nickname}")
+                return
+
+            # 匹配更多可能的消息模式，特别是原始框架特定的格式
+            if ("收到文本消息" in line or
+                "收到消息" in line or
+                "收到图片消息" in line or  # 特别关注图片消息
+                "收到语音消息" in line or
+                "收到被@消息" in line or  # 添加被@消息类型
+                "收到引用消息" in line or  # 添加引用消息类型
+                "MsgId" in line or
+                "收到链接分享消息" in line):
+
+                # 特别处理图片消息，确保它们被正确识别
+                if "收到图片消息" in line:
+                    logger.info(f"发现图片消息行: {line[:100]}...")
+                # 特别处理链接分享消息，确保它们被正确识别
+                elif "收到链接分享消息" in line:
+                    logger.info(f"发现链接分享消息行: {line[:100]}...")
+
+                logger.info(f"发现可能的消息行: {line[:100]}...")
+
+                # 尝试提取消息数据
+                message_data = self.extract_message_from_line(line)
+
+                if message_data:
+                    self.forwarder.submit(message_data)
+                    logger.info(f"添加消息到队列，当前队列长度: {self.forwarder.pending}")
+        except Exception as e:
+            logger.error(f"解析行异常: {e}, 行内容: {line[:100]}...")
 
     def extract_message_from_line(self, line):
         """从日志行提取消息数据"""
@@ -580,7 +837,7 @@ class MessageMonitor:
             if new_match:
                 chat_id, content = new_match.groups()
                 # 只有在队列为空时才添加，避免重复
-                if not message_queue:
+                if not self.forwarder.pending:
                     msg_data = {
                         "MsgId": int(time.time() * 1000),  # 生成一个临时ID
                         "FromUserName": {"string": chat_id},
@@ -608,69 +865,57 @@ class MessageMonitor:
             logger.error(traceback.format_exc())
             return None
 
-    def process_messages(self):
-        """处理消息队列"""
-        logger.info("启动消息处理线程")
+EVENT_BRIDGE_CHECK_INTERVAL = 30  # DOW框架未接受事件桥时，重新检查的间隔（秒）
+
+
+def event_bridge_config():
+    """读取原始框架的 [EventBridge] 配置，未开启时返回None"""
+    try:
+        import tomllib
+        with open("main_config.toml", "rb") as f:
+            config = tomllib.load(f).get("EventBridge", {})
+    except Exception:
+        return None
+    return config if config.get("enabled", False) else None
+
+
+def probe_event_bridge(config, timeout=3):
+    """用与原始框架相同的握手连接DOW框架的事件桥，DOW框架确认时返回True"""
+    import socket
+    try:
+        with socket.create_connection((config.get("host", "127.0.0.1"), config.get("port", 8089)),
+                                      timeout=timeout) as sock:
+            sock.sendall(json.dumps({"auth": config.get("key", "")}).encode("utf-8") + b"\n")
+            reply = sock.makefile("rb").readline()
+        return bool(json.loads(reply).get("ok")) if reply else False
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def watch_event_bridge(monitor, config, interval=EVENT_BRIDGE_CHECK_INTERVAL):
+    """DOW框架接受事件桥连接后停止扫描日志，避免消息重复投递"""
+    while monitor.is_running:
+        time.sleep(interval)
+        if probe_event_bridge(config):
+            logger.info("DOW框架已接受消息事件桥连接，消息由原始框架直接推送，停止扫描日志")
+            monitor.is_running = False
+            monitor.tailer.stop()
+            return
 
-        while self.is_running:
-            try:
-                # 检查队列是否有消息
-                if message_queue:
-                    # 使用锁保护队列操作
-                    with message_queue_lock:
-                        # 获取最早的消息
-                        if message_queue:
-                            message = message_queue.pop(0)
-                            logger.debug(f"从队列取出消息，剩余: {len(message_queue)}")
-                        else:
-                            message = None
-
-                    # 处理消息
-                    if message:
-                        self.send_to_dow(message)
-
-                # 短暂休眠避免CPU过载
-                time.sleep(0.1)
-            except Exception as e:
-                logger.error(f"处理消息异常: {e}")
-                logger.error(traceback.format_exc())
-
-    def send_to_dow(self, message_data):
-        """将消息发送给DOW框架"""
-        try:
-            headers = {
-                "Content-Type": "application/json"
-            }
-
-            # 只有当有密钥时才添加Authorization头
-            if DOW_CALLBACK_KEY:
-                headers["Authorization"] = f"Bearer {DOW_CALLBACK_KEY}"
-
-            # 发送完整消息数据，不过滤任何字段
-            logger.debug(f"发送完整消息数据: {json.dumps(message_data, ensure_ascii=False)[:200]}...")
-
-            # 发送POST请求
-            response = requests.post(DOW_CALLBACK_URL,
-                                   json=message_data,
-                                   headers=headers,
-                                   timeout=5)
-
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("success", False):
-                    logger.info("消息转发成功")
-                else:
-                    logger.error(f"DOW框架处理失败: {result.get('message', '未知错误')}")
-            else:
-                logger.error(f"发送失败，状态码: {response.status_code}, 内容: {response.text}")
-        except Exception as e:
-            logger.error(f"发送消息异常: {e}")
-            logger.error(traceback.format_exc())
 
 if __name__ == "__main__":
     logger.info("======== 启动微信消息回调守护进程 ========")
+    bridge_config = event_bridge_config()
+    if bridge_config is not None:
+        if probe_event_bridge(bridge_config):
+            logger.info("main_config.toml 已开启 [EventBridge]，且DOW框架已接受事件桥连接，守护进程退出")
+            sys.exit(0)
+        # DOW框架未启动或密钥不一致时事件桥收不到消息，继续扫描日志转发，直到事件桥可用
+        logger.warning("已开启 [EventBridge]，但DOW框架未接受事件桥连接（未启动或密钥不一致），继续扫描日志转发消息")
     logger.info(f"回调URL: {DOW_CALLBACK_URL}")
 
     # 创建并启动监控器
     monitor = MessageMonitor()
-    monitor.start()
\ No newline at end of file
+    if bridge_config is not None:
+        threading.Thread(target=watch_event_bridge, args=(monitor, bridge_config), daemon=True).start()
+    monitor.start()
@@ -12,6 +12,8 @@ import logging
 from datetime import datetime
 import traceback
 
+from utils.log_tailer import LogTailer
+
 # 配置日志
 logging.basicConfig(
     level=logging.DEBUG,  # 修改为DEBUG级别
@@ -222,7 +224,7 @@ def parse_log_line(line):
 
 
 def monitor_log_file(log_file_path):
-    """监控日志文件"""
+    """监控日志文件，日志轮转后继续跟踪同目录下新的XYBot日志"""
     # 确保日志文件存在
     if not os.path.exists(log_file_path):
         with open(log_file_path, "w", encoding="utf-8") as f:
@@ -232,37 +234,35 @@ def monitor_log_file(log_file_path):
     file_size = os.path.getsize(log_file_path)
     logger.info(f"日志文件大小: {file_size} 字节")
 
-    with open(log_file_path, "r", encoding="utf-8", errors="ignore") as f:
-        # 从头开始读取文件
-        f.seek(0)
-        logger.info(f"从头开始读取文件")
-
-        line_count = 0
-        while True:
-            line = f.readline()
-            if line:
-                line = line.strip()
-                if line:
-                    line_count += 1
-                    # 检查是否包含关键字
-                    if "收到被@消息" in line:
-                        logger.info(f"发现被@消息行: {line}")
-
-                    # 解析日志行
-                    message_data = parse_log_line(line)
-                    if message_data:
-                        logger.info(f"成功解析消息: {message_data.get('MsgId')}, 类型: {message_data.get('MsgType')}, 是否被@: {message_data.get('IsAtMessage', False)}")
-                        # 发送回调
-                        result = send_callback(message_data)
-                        logger.info(f"回调结果: {result}")
-                    elif "收到被@消息" in line:
-                        logger.warning(f"无法解析被@消息行: {line}")
-            else:
-                # 每100行输出一次统计信息
-                if line_count > 0 and line_count % 100 == 0:
-                    logger.info(f"已处理 {line_count} 行日志")
-                # 没有新行，等待一段时间
-                time.sleep(0.1)
+    log_pattern = os.path.join(os.path.dirname(log_file_path), "XYBot_*.log")
+    tailer = LogTailer([log_pattern, log_file_path])
+    # 从头开始读取文件
+    tailer.follow(log_file_path, 0)
+    logger.info(f"从头开始读取文件")
+
+    line_count = 0
+    for line in tailer.lines():
+        line = line.strip()
+        if not line:
+            continue
+        line_count += 1
+        # 检查是否包含关键字
+        if "收到被@消息" in line:
+            logger.info(f"发现被@消息行: {line}")
+
+        # 解析日志行
+        message_data = parse_log_line(line)
+        if message_data:
+            logger.info(f"成功解析消息: {message_data.get('MsgId')}, 类型: {message_data.get('MsgType')}, 是否被@: {message_data.get('IsAtMessage', False)}")
+            # 发送回调
+            result = send_callback(message_data)
+            logger.info(f"回调结果: {result}")
+        elif "收到被@消息" in line:
+            logger.warning(f"无法解析被@消息行: {line}")
+
+        # 每100行输出一次统计信息
+        if line_count % 100 == 0:
+            logger.info(f"已处理 {line_count} 行日志")
 
 def main():
     """主函数"""